@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Action Ansible: collecte LLDP, ARP et système d'un switch Aruba en une seule session SSH
+
+Remplace les trois tâches arubaoss_command (ou les trois appels sshpass) et
+les passes set_fact de parsing/enrichissement : l'action s'exécute sur le
+contrôleur, ouvre une session Netmiko, envoie 'show lldp neighbors detail',
+'show arp' et 'show system', puis retourne directement les données parsées et
+enrichies (même schéma que le script Python).
+
+Options:
+    host: Adresse du switch (défaut: ansible_host, sinon inventory_hostname)
+    username: Utilisateur (défaut: ansible_user)
+    password: Mot de passe (défaut: ansible_password)
+    port: Port SSH (défaut: ansible_port, sinon 22)
+    device_type: Type de device Netmiko (défaut: aruba_os)
+    timeout: Timeout de connexion en secondes (défaut: 60)
+    timing_file: Profils de temporisation adaptative partagés avec le script
+        (défaut: profils en mémoire pour la durée de la tâche)
+
+Résultat:
+    switch_data: {switch_ip, switch_model, timestamp, neighbors_count, neighbors}
+    system_info: {model, serial, firmware, hostname}
+    command_latency: Latence par commande (secondes)
+
+Exemple:
+    - name: Collecter et parser les données LLDP
+      aruba_lldp_collect:
+      register: collected
+"""
+
+import os
+import sys
+
+from ansible.plugins.action import ActionBase
+
+# Le collecteur est partagé avec le script Python (python/lldp_discovery.py)
+PYTHON_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'python'))
+if PYTHON_DIR not in sys.path:
+    sys.path.insert(0, PYTHON_DIR)
+
+from command_timing import CommandTimingStore  # noqa: E402
+from lldp_discovery import ArubaLLDPDiscovery  # noqa: E402
+
+
+class ActionModule(ActionBase):
+    """Collecte et parsing LLDP en un aller-retour par switch"""
+
+    TRANSFERS_FILES = False
+    _VALID_ARGS = frozenset(('host', 'username', 'password', 'port', 'device_type', 'timeout', 'timing_file'))
+
+    def run(self, tmp=None, task_vars=None):
+        task_vars = task_vars or {}
+        result = super(ActionModule, self).run(tmp, task_vars)
+        result['changed'] = False
+
+        args = self._task.args
+        host = args.get('host') or task_vars.get('ansible_host') or task_vars.get('inventory_hostname')
+        username = args.get('username') or task_vars.get('ansible_user')
+        password = args.get('password') or task_vars.get('ansible_password')
+        port = int(args.get('port') or task_vars.get('ansible_port') or 22)
+
+        if not all([host, username, password]):
+            result['failed'] = True
+            result['msg'] = "host, username et password sont requis (ou ansible_host/ansible_user/ansible_password)"
+            return result
+
+        timing_store = CommandTimingStore(args.get('timing_file'))
+        discovery = ArubaLLDPDiscovery(host, username, password, args.get('device_type', 'aruba_os'), port=port,
+                                       timeout=int(args.get('timeout', 60)), timing_store=timing_store)
+
+        if not discovery.connect():
+            result['failed'] = True
+            result['unreachable'] = True
+            result['msg'] = f"Impossible de se connecter à {host}"
+            return result
+
+        try:
+            switch_data = discovery.get_lldp_neighbors()
+            system_info = discovery.get_system_info()
+        finally:
+            discovery.disconnect()
+
+        if not switch_data:
+            result['failed'] = True
+            result['msg'] = f"Aucune donnée récupérée pour {host}"
+            return result
+
+        timing_store.save()
+
+        result['switch_data'] = {
+            'switch_ip': switch_data['switch_ip'],
+            'switch_model': system_info.get('model', 'Unknown'),
+            'timestamp': switch_data['timestamp'],
+            'neighbors_count': switch_data['neighbors_count'],
+            'neighbors': switch_data['neighbors']
+        }
+        result['system_info'] = system_info
+        result['command_latency'] = {command: latency['mean']
+                                     for command, latency in timing_store.latency_report().items()}
+        return result
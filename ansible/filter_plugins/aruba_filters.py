@@ -3,9 +3,16 @@
 Filtres personnalisés Ansible pour parser les données Aruba LLDP
 """
 
-import re
-import json
-from typing import Dict, List, Any
+import os
+import sys
+from typing import Dict, List, Any, Iterable, Mapping, Optional
+
+# Les parsers sont partagés avec le script Python (python/aruba_parsers.py)
+PYTHON_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'python'))
+if PYTHON_DIR not in sys.path:
+    sys.path.insert(0, PYTHON_DIR)
+
+import aruba_parsers  # noqa: E402
 
 
 class FilterModule:
@@ -16,7 +23,8 @@ class FilterModule:
             'parse_lldp_neighbors': self.parse_lldp_neighbors,
             'parse_arp_table': self.parse_arp_table,
             'parse_system_info': self.parse_system_info,
-            'enrich_with_arp': self.enrich_with_arp
+            'enrich_with_arp': self.enrich_with_arp,
+            'consolidate_discovery': self.consolidate_discovery
         }
     
     def parse_lldp_neighbors(self, lldp_output: str) -> List[Dict[str, Any]]:
@@ -29,29 +37,7 @@ class FilterModule:
         Returns:
             Liste des voisins parsés
         """
-        neighbors = []
-        
-        # Split par blocs de voisins
-        neighbor_blocks = re.split(r'Local Port\s*:\s*(\S+)', lldp_output)[1:]
-        
-        for i in range(0, len(neighbor_blocks), 2):
-            if i + 1 < len(neighbor_blocks):
-                local_port = neighbor_blocks[i].strip()
-                neighbor_info = neighbor_blocks[i + 1]
-                
-                neighbor = {
-                    'local_port': local_port,
-                    'remote_chassis_id': self._extract_field(neighbor_info, r'Chassis ID\s*:\s*(.+)'),
-                    'remote_port_id': self._extract_field(neighbor_info, r'Port ID\s*:\s*(.+)'),
-                    'remote_system_name': self._extract_field(neighbor_info, r'System Name\s*:\s*(.+)'),
-                    'remote_system_description': self._extract_field(neighbor_info, r'System Description\s*:\s*(.+)'),
-                    'remote_port_description': self._extract_field(neighbor_info, r'Port Description\s*:\s*(.+)'),
-                    'management_addresses': self._extract_mgmt_addresses(neighbor_info)
-                }
-                
-                neighbors.append(neighbor)
-        
-        return neighbors
+        return aruba_parsers.parse_lldp_neighbors(lldp_output, missing="")
     
     def parse_arp_table(self, arp_output: str) -> Dict[str, str]:
         """
@@ -63,16 +49,7 @@ class FilterModule:
         Returns:
             Dict mapping IP -> MAC
         """
-        arp_table = {}
-        
-        for line in arp_output.split('\n'):
-            # Pattern pour ligne ARP: IP Address    MAC Address      Type   Port
-            match = re.search(r'(\d+\.\d+\.\d+\.\d+)\s+([0-9a-fA-F:.-]+)\s+', line)
-            if match:
-                ip, mac = match.groups()
-                arp_table[ip] = mac.lower()
-        
-        return arp_table
+        return aruba_parsers.parse_arp_table(arp_output)
     
     def parse_system_info(self, system_output: str) -> Dict[str, str]:
         """
@@ -84,22 +61,7 @@ class FilterModule:
         Returns:
             Dict avec les informations système
         """
-        system_info = {}
-        
-        # Patterns pour extraire les informations clés
-        patterns = {
-            'model': r'Product Model\s*:\s*(.+)',
-            'serial': r'Serial Number\s*:\s*(.+)',
-            'firmware': r'Firmware Version\s*:\s*(.+)',
-            'hostname': r'System Name\s*:\s*(.+)'
-        }
-        
-        for key, pattern in patterns.items():
-            match = re.search(pattern, system_output, re.IGNORECASE)
-            if match:
-                system_info[key] = match.group(1).strip()
-        
-        return system_info
+        return aruba_parsers.parse_system_info(system_output)
     
     def enrich_with_arp(self, neighbors: List[Dict], arp_table: Dict[str, str]) -> List[Dict[str, Any]]:
         """
@@ -112,40 +74,50 @@ class FilterModule:
         Returns:
             Liste enrichie des voisins
         """
-        enriched = []
+        # Enrichissement en place: sur des copies, les variables d'entrée restent inchangées
+        return aruba_parsers.enrich_neighbors([dict(neighbor) for neighbor in neighbors],
+                                              aruba_parsers.build_mac_index(arp_table))
+    
+    def consolidate_discovery(self, hostvars: Mapping[str, Mapping[str, Any]], hosts: Optional[Iterable[str]] = None,
+                              timestamp: str = '', fact: str = 'switch_data') -> Dict[str, Any]:
+        """
+        Construit le rapport consolidé en un seul passage sur l'inventaire
         
-        for neighbor in neighbors:
-            enriched_neighbor = neighbor.copy()
-            
-            # Recherche des correspondances MAC/IP
-            chassis_id = neighbor.get('remote_chassis_id', '').lower()
-            matching_ips = []
-            
-            # Recherche par MAC address dans l'ARP
-            for ip, mac in arp_table.items():
-                if chassis_id in mac or mac in chassis_id:
-                    matching_ips.append(ip)
-            
-            # Ajout des adresses de management
-            mgmt_addresses = neighbor.get('management_addresses', [])
-            all_ips = list(set(matching_ips + mgmt_addresses))
-            
-            enriched_neighbor.update({
-                'ip_addresses': all_ips,
-                'mac_address': chassis_id,
-                'hostname': neighbor.get('remote_system_name', 'Unknown')
-            })
+        Remplace les chaînes hostvars | dict2items | selectattr(...) évaluées une
+        fois par champ du résumé : seules les variables des hôtes demandés sont
+        lues, une fois chacune.
+        
+        Args:
+            hostvars: Variables des hôtes (hostvars)
+            hosts: Hôtes à consolider, par exemple groups['aruba_switches']
+                (défaut: tous les hôtes de hostvars)
+            timestamp: Horodatage de la découverte
+            fact: Nom du fait contenant les données du switch
             
-            enriched.append(enriched_neighbor)
+        Returns:
+            Dict {discovery_timestamp, switches, summary} au format du script Python
+        """
+        hosts = list(hostvars) if hosts is None else list(hosts)
+        switches = {}
+        successful = 0
+        total_neighbors = 0
         
-        return enriched
-    
-    def _extract_field(self, text: str, pattern: str) -> str:
-        """Extrait un champ spécifique du texte"""
-        match = re.search(pattern, text, re.IGNORECASE | re.MULTILINE)
-        return match.group(1).strip() if match else ""
-    
-    def _extract_mgmt_addresses(self, text: str) -> List[str]:
-        """Extrait les adresses de management"""
-        pattern = r'Management Address\s*:\s*(\d+\.\d+\.\d+\.\d+)'
-        return re.findall(pattern, text, re.IGNORECASE)
+        for host in hosts:
+            host_vars = hostvars[host] if host in hostvars else {}
+            if fact not in host_vars:
+                continue
+            switch_data = host_vars[fact]
+            switches[host] = switch_data
+            if switch_data.get('connection_status', 'success') == 'success':
+                successful += 1
+            total_neighbors += int(switch_data.get('neighbors_count') or 0)
+        
+        return {
+            'discovery_timestamp': timestamp,
+            'switches': switches,
+            'summary': {
+                'total_switches': len(hosts),
+                'successful_connections': successful,
+                'total_neighbors': total_neighbors
+            }
+        }
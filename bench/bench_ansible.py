@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+"""
+Banc d'essai de la collecte Ansible en une session (action aruba_lldp_collect)
+
+Compare, contre une flotte SSH factice :
+  - une session SSH par commande puis parsing par les filtres Ansible, comme
+    le fait lldp_discovery_ssh.yml (un appel sshpass/ssh par commande) ;
+  - la collecte de l'action aruba_lldp_collect : une session par switch, les
+    trois commandes, parsing et enrichissement en un aller-retour.
+
+Si Ansible est installé, l'action est aussi exécutée telle qu'Ansible
+l'appelle (ActionModule.run, connexion Ansible factice) et comparée au
+collecteur, et la syntaxe des playbooks est vérifiée (--syntax-check). Avec
+--playbooks, les playbooks eux-mêmes sont chronométrés sur un inventaire
+généré pointant vers la flotte factice et les fichiers écrits par
+lldp_discovery_fast.yml sont vérifiés ; un playbook dont les prérequis
+manquent (sshpass, collection Aruba) est ignoré.
+
+Usage: python3 bench/bench_ansible.py --switches 20 --workers 10
+       python3 bench/bench_ansible.py --switches 20 --playbooks
+"""
+
+import argparse
+import importlib.util
+import json
+import logging
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional, Tuple
+
+import paramiko
+
+from common import REPO_ROOT, setup_paths, timed, print_table
+
+setup_paths()
+sys.path.insert(0, os.path.join(REPO_ROOT, 'ansible', 'filter_plugins'))
+
+import synthetic  # noqa: E402
+from mock_ssh_server import MockSSHFabric, MockSwitch  # noqa: E402
+from aruba_filters import FilterModule  # noqa: E402
+from command_timing import CommandTimingStore  # noqa: E402
+from lldp_discovery import ArubaLLDPDiscovery  # noqa: E402
+
+COMMANDS = ('show lldp neighbors detail', 'show arp', 'show system')
+ANSIBLE_DIR = os.path.join(REPO_ROOT, 'ansible')
+FILTERS = FilterModule().filters()
+
+
+def ssh_command_line(host: str, port: int, command: str) -> Optional[List[str]]:
+    """
+    Ligne de commande du client OpenSSH pour une commande, comme dans lldp_discovery_ssh.yml
+
+    Le mot de passe est fourni par sshpass s'il est installé, sinon par SSH_ASKPASS.
+
+    Returns:
+        Arguments de la commande, ou None si le client ssh est absent
+    """
+    if not shutil.which('ssh'):
+        return None
+    ssh = ['ssh', '-p', str(port), '-o', 'StrictHostKeyChecking=no', '-o', 'UserKnownHostsFile=/dev/null',
+           '-o', 'PreferredAuthentications=password', '-o', 'LogLevel=ERROR', f"bench@{host}", command]
+    if shutil.which('sshpass'):
+        return ['sshpass', '-p', 'bench'] + ssh
+    return ssh
+
+
+def askpass_env() -> Dict[str, str]:
+    """Environnement fournissant le mot de passe de la flotte factice au client ssh"""
+    script = os.path.join(tempfile.mkdtemp(prefix='lldp-askpass-'), 'askpass.sh')
+    with open(script, 'w', encoding='utf-8') as f:
+        f.write("#!/bin/sh\necho bench\n")
+    os.chmod(script, 0o700)
+    return dict(os.environ, SSH_ASKPASS=script, SSH_ASKPASS_REQUIRE='force', DISPLAY=os.environ.get('DISPLAY', ':0'))
+
+
+ASKPASS_ENV = askpass_env()
+
+
+def exec_command(host: str, port: int, command: str) -> str:
+    """Une session SSH complète pour une seule commande (équivalent de 'sshpass ssh host cmd')"""
+    command_line = ssh_command_line(host, port, command)
+    if command_line:
+        completed = subprocess.run(command_line, env=ASKPASS_ENV, stdin=subprocess.DEVNULL,
+                                   capture_output=True, text=True, errors='ignore')
+        return completed.stdout
+
+    client = paramiko.SSHClient()
+    client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+    client.connect(host, port=port, username='bench', password='bench', look_for_keys=False, allow_agent=False)
+    try:
+        _, stdout, _ = client.exec_command(command)
+        return stdout.read().decode(errors='ignore')
+    finally:
+        client.close()
+
+
+def collect_per_command(host: str, port: int) -> int:
+    """Collecte façon lldp_discovery_ssh.yml: une session par commande, puis filtres"""
+    outputs = {command: exec_command(host, port, command) for command in COMMANDS}
+    neighbors = FILTERS['enrich_with_arp'](FILTERS['parse_lldp_neighbors'](outputs['show lldp neighbors detail']),
+                                           FILTERS['parse_arp_table'](outputs['show arp']))
+    FILTERS['parse_system_info'](outputs['show system'])
+    return len(neighbors)
+
+
+def collect_single_session(host: str, port: int) -> int:
+    """Collecte de l'action aruba_lldp_collect: une session pour les trois commandes"""
+    return collect_with_system_info(host, port)[0]['neighbors_count']
+
+
+def collect_with_system_info(host: str, port: int) -> Tuple[Dict[str, Any], Dict[str, str]]:
+    """Données et informations système collectées directement, référence de l'action"""
+    discovery = ArubaLLDPDiscovery(host, 'bench', 'bench', port=port, timing_store=CommandTimingStore())
+    if not discovery.connect():
+        raise RuntimeError(f"Connexion impossible à {host}")
+    try:
+        switch_data = discovery.get_lldp_neighbors()
+        system_info = discovery.get_system_info()
+    finally:
+        discovery.disconnect()
+    return switch_data, system_info
+
+
+def load_action_module():
+    """Classe ActionModule de l'action aruba_lldp_collect, None si Ansible n'est pas installé"""
+    if importlib.util.find_spec('ansible') is None:
+        return None
+    path = os.path.join(ANSIBLE_DIR, 'action_plugins', 'aruba_lldp_collect.py')
+    spec = importlib.util.spec_from_file_location('aruba_lldp_collect', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.ActionModule
+
+
+def run_action(action_class, task_args: Dict[str, Any], task_vars: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Exécute l'action comme Ansible (ActionModule.run) sans playbook
+
+    La connexion Ansible est factice : l'action s'exécute sur le contrôleur et
+    ouvre elle-même sa session vers le switch.
+
+    Returns:
+        Résultat de la tâche, ou {'failed': True, 'exception': nom} si l'action lève une exception
+    """
+    from ansible.parsing.dataloader import DataLoader
+    from ansible.playbook.play_context import PlayContext
+    from ansible.playbook.task import Task
+
+    task = Task()
+    task.action = 'aruba_lldp_collect'
+    task.args = task_args
+    connection = SimpleNamespace(_shell=SimpleNamespace(tmpdir=None))
+    action = action_class(task, connection, PlayContext(), DataLoader(), None)
+    try:
+        return action.run(task_vars=task_vars)
+    except Exception as e:
+        return {'failed': True, 'exception': type(e).__name__, 'msg': str(e)}
+
+
+def closed_port() -> int:
+    """Port local sans serveur à l'écoute (switch injoignable)"""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def check_action(action_class, host: str, port: int) -> List[Tuple[str, bool]]:
+    """Vérifie l'action exécutée par ActionModule.run contre la flotte factice"""
+    task_vars = {'inventory_hostname': 'sw-0', 'ansible_host': host, 'ansible_port': port,
+                 'ansible_user': 'bench', 'ansible_password': 'bench'}
+    result = run_action(action_class, {}, task_vars)
+    reference, system_info = collect_with_system_info(host, port)
+    switch_data = result.get('switch_data', {})
+    collected = (not result.get('failed') and result.get('changed') is False
+                 and switch_data.get('neighbors') == reference['neighbors']
+                 and switch_data.get('neighbors_count') == reference['neighbors_count']
+                 and switch_data.get('switch_model') == system_info.get('model', 'Unknown')
+                 and result.get('system_info') == system_info
+                 and set(COMMANDS) <= set(result.get('command_latency', {})))
+
+    missing = run_action(action_class, {}, {'inventory_hostname': host})
+    unreachable = run_action(action_class, {'timeout': 5}, dict(task_vars, ansible_host='127.0.0.1',
+                                                                ansible_port=closed_port()))
+    invalid = run_action(action_class, {'unknown_option': 1}, task_vars)
+    return [
+        ("ActionModule.run: mêmes données que le collecteur", collected),
+        ("ActionModule.run: identifiants manquants refusés",
+         bool(missing.get('failed')) and 'exception' not in missing),
+        ("ActionModule.run: switch injoignable signalé (unreachable)",
+         bool(unreachable.get('failed') and unreachable.get('unreachable'))),
+        ("ActionModule.run: option inconnue refusée", invalid.get('exception') == 'AnsibleActionFail'),
+    ]
+
+
+def check_syntax() -> List[Tuple[str, bool]]:
+    """ansible-playbook --syntax-check sur les playbooks (collection Aruba requise pour lldp_discovery.yml)"""
+    checks = []
+    for playbook in ('lldp_discovery_ssh.yml', 'lldp_discovery.yml', 'lldp_discovery_fast.yml'):
+        if playbook == 'lldp_discovery.yml' and missing_requirement(playbook, 22):
+            continue
+        completed = subprocess.run(['ansible-playbook', '-i', 'inventory.ini', '--syntax-check', playbook],
+                                   cwd=ANSIBLE_DIR, stdin=subprocess.DEVNULL, capture_output=True, text=True)
+        checks.append((f"Syntaxe de {playbook} valide", completed.returncode == 0))
+    return checks
+
+
+def write_inventory(path: str, hosts: List[str], port: int):
+    """Inventaire Ansible pointant vers la flotte factice"""
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("[aruba_switches]\n")
+        for i, host in enumerate(hosts):
+            f.write(f"sw-{i} ansible_host={host} ansible_port={port} ansible_user=bench ansible_password=bench\n")
+        f.write("\n[aruba_switches:vars]\n")
+        f.write("ansible_ssh_common_args='-o StrictHostKeyChecking=no -o UserKnownHostsFile=/dev/null'\n")
+
+
+def missing_requirement(playbook: str, port: int) -> Optional[str]:
+    """Prérequis manquant pour exécuter un playbook contre la flotte factice, sinon None"""
+    if playbook == 'lldp_discovery_ssh.yml':
+        if not shutil.which('sshpass'):
+            return 'sshpass absent'
+        if port != 22:
+            return 'le playbook ne transmet pas ansible_port à ssh (utiliser --port 22)'
+    if playbook == 'lldp_discovery.yml':
+        listing = subprocess.run(['ansible-galaxy', 'collection', 'list', 'arubanetworks.aos_switch'],
+                                 capture_output=True, text=True)
+        if 'arubanetworks.aos_switch' not in listing.stdout:
+            return 'collection arubanetworks.aos_switch absente'
+    return None
+
+
+def check_fast_outputs(output_dir: str, counts: List[int]) -> bool:
+    """Fichiers écrits par lldp_discovery_fast.yml: un par switch et le rapport consolidé"""
+    try:
+        per_switch = []
+        for i in range(len(counts)):
+            with open(os.path.join(output_dir, f"sw-{i}_lldp_discovery.json"), 'r', encoding='utf-8') as f:
+                per_switch.append(json.load(f)['neighbors_count'])
+        with open(os.path.join(output_dir, 'consolidated_lldp_discovery_fast.json'), 'r', encoding='utf-8') as f:
+            consolidated = json.load(f)
+    except (OSError, ValueError, KeyError):
+        return False
+    return per_switch == counts and bool(consolidated)
+
+
+def run_playbooks(hosts: List[str], port: int, workers: int,
+                  counts: List[int]) -> Tuple[List[List[str]], List[Tuple[str, bool]]]:
+    """
+    Chronomètre les playbooks sur un inventaire de switches factices
+
+    Returns:
+        (lignes du tableau, vérifications des sorties de lldp_discovery_fast.yml)
+    """
+    work_dir = tempfile.mkdtemp(prefix='lldp-ansible-')
+    inventory = os.path.join(work_dir, 'inventory.ini')
+    write_inventory(inventory, hosts, port)
+
+    rows = []
+    checks = []
+    for playbook in ('lldp_discovery_ssh.yml', 'lldp_discovery.yml', 'lldp_discovery_fast.yml'):
+        reason = missing_requirement(playbook, port)
+        if reason:
+            rows.append([playbook, '-', f"ignoré: {reason}"])
+            continue
+
+        output_dir = os.path.join(work_dir, playbook.replace('.yml', ''))
+        timings: Dict[str, float] = {}
+        with timed(playbook, timings):
+            completed = subprocess.run(
+                ['ansible-playbook', '-i', inventory, '-f', str(workers), playbook,
+                 '-e', f"output_directory={output_dir}"],
+                cwd=ANSIBLE_DIR, stdin=subprocess.DEVNULL, capture_output=True, text=True
+            )
+        status = 'ok' if completed.returncode == 0 else f"échec (code {completed.returncode})"
+        rows.append([playbook, f"{timings[playbook]:.2f}s", status])
+        if playbook == 'lldp_discovery_fast.yml':
+            checks.append(("lldp_discovery_fast.yml: fichiers par switch et rapport consolidé corrects",
+                           completed.returncode == 0 and check_fast_outputs(output_dir, counts)))
+    return rows, checks
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de la collecte Ansible en une session')
+    parser.add_argument('--switches', type=int, default=20, help='Nombre de switches factices')
+    parser.add_argument('--ports', type=int, default=24, help='Voisins LLDP par switch')
+    parser.add_argument('--latency', type=float, default=0.05, help='Latence par commande (s)')
+    parser.add_argument('--workers', type=int, default=10, help='Switches traités en parallèle (forks Ansible)')
+    parser.add_argument('--port', type=int, default=0, help='Port SSH de la flotte factice (défaut: éphémère)')
+    parser.add_argument('--playbooks', action='store_true', help='Chronomètre aussi les playbooks (ansible-playbook)')
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    logging.getLogger('paramiko').setLevel(logging.CRITICAL)
+
+    switches = [
+        MockSwitch(synthetic.switch_ip(i), f"sw-{i}", synthetic.switch_outputs(i, args.ports, variant='aos-s'),
+                   args.latency)
+        for i in range(args.switches)
+    ]
+    hosts = [switch.host for switch in switches]
+
+    with MockSSHFabric(switches, port=args.port) as fabric:
+        rows = []
+        neighbors = {}
+        for label, collect in (('une session par commande (sshpass)', collect_per_command),
+                               ('une session par switch (aruba_lldp_collect)', collect_single_session)):
+            timings: Dict[str, float] = {}
+            logins_before = fabric.total_logins
+            with timed(label, timings):
+                with ThreadPoolExecutor(max_workers=args.workers) as executor:
+                    neighbors[label] = list(executor.map(lambda host: collect(host, fabric.port), hosts))
+            rows.append([label, f"{timings[label]:.2f}s", fabric.total_logins - logins_before])
+
+        client = 'client OpenSSH' if shutil.which('ssh') else 'client Paramiko (ssh absent)'
+        print(f"Flotte factice: {args.switches} switches, {args.ports} voisins, "
+              f"latence {args.latency * 1000:.0f} ms par commande, {args.workers} en parallèle")
+        print(f"Sessions par commande ouvertes avec le {client}")
+        print()
+        print_table(rows, ['Collecte', 'Durée', 'Connexions SSH'])
+        print()
+
+        counts = list(neighbors.values())
+        checks = [("Même nombre de voisins enrichis", counts[0] == counts[1])]
+
+        action_class = load_action_module()
+        if action_class is not None:
+            checks += check_action(action_class, hosts[0], fabric.port)
+        if shutil.which('ansible-playbook'):
+            checks += check_syntax()
+
+        if args.playbooks:
+            if shutil.which('ansible-playbook'):
+                rows, playbook_checks = run_playbooks(hosts, fabric.port, args.workers, counts[1])
+                print_table(rows, ['Playbook', 'Durée', 'Statut'])
+                print()
+                checks += playbook_checks
+            else:
+                print("ansible-playbook introuvable, chronométrage des playbooks ignoré")
+                print()
+
+        for label, ok in checks:
+            print(f"{label}: {'oui' if ok else 'NON'}")
+        if action_class is None:
+            print("Ansible non installé: action et syntaxe des playbooks non vérifiées")
+
+    if not all(ok for _, ok in checks):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Banc d'essai du moteur asyncio contre une flotte SSH factice de grande taille
+
+Le moteur async interroge toute la flotte (1 000 switches par défaut) ; le moteur
+séquentiel Netmiko n'est mesuré que sur un échantillon puis extrapolé, une
+exécution complète prenant plusieurs heures. Les sorties des deux moteurs sont
+comparées sur l'échantillon.
+
+Usage: python3 bench/bench_async.py --switches 1000 --concurrency 200 --sample 5
+"""
+
+import argparse
+import json
+import logging
+
+from common import setup_paths, strip_timestamps, timed, print_table
+
+setup_paths()
+
+import synthetic  # noqa: E402
+from mock_ssh_server import MockSSHFabric, MockSwitch  # noqa: E402
+from lldp_discovery import discover_all_switches  # noqa: E402
+from async_discovery import discover_all_switches_async  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark du moteur asyncio')
+    parser.add_argument('--switches', type=int, default=1000, help='Nombre de switches factices')
+    parser.add_argument('--ports', type=int, default=24, help='Voisins LLDP par switch')
+    parser.add_argument('--latency', type=float, default=0.5, help='Latence par commande (s)')
+    parser.add_argument('--concurrency', type=int, default=200, help='Sessions SSH simultanées (async)')
+    parser.add_argument('--sample', type=int, default=5, help='Switches mesurés en séquentiel')
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    logging.getLogger('paramiko').setLevel(logging.CRITICAL)
+    logging.getLogger('asyncssh').setLevel(logging.WARNING)
+
+    switches = [
+        MockSwitch(synthetic.switch_ip(i), f"sw-{i}", synthetic.switch_outputs(i, args.ports), args.latency)
+        for i in range(args.switches)
+    ]
+
+    with MockSSHFabric(switches) as fabric:
+        config = synthetic.fleet_config(args.switches, fabric.port)
+        sample = config[:args.sample]
+        timings = {}
+
+        with timed('sequential', timings):
+            sequential = discover_all_switches(sample)
+        with timed('async_sample', timings):
+            async_sample = discover_all_switches_async(sample, concurrency=args.concurrency)
+        with timed('async_fleet', timings):
+            fleet = discover_all_switches_async(config, concurrency=args.concurrency)
+
+    identical = json.dumps(strip_timestamps(sequential)) == json.dumps(strip_timestamps(async_sample))
+    per_switch = timings['sequential'] / max(1, len(sample))
+    rows = [
+        [f"séquentiel netmiko ({len(sample)} switches)", f"{timings['sequential']:.2f}s", f"{per_switch:.2f}s"],
+        [f"séquentiel extrapolé ({args.switches} switches)", f"{per_switch * args.switches:.0f}s", '-'],
+        [f"async ({args.switches} switches, {args.concurrency} sessions)", f"{timings['async_fleet']:.2f}s",
+         f"{timings['async_fleet'] / args.switches:.3f}s"],
+    ]
+    print_table(rows, ['Mode', 'Durée', 'Par switch'])
+    print()
+    print(f"Switches en succès (async): {fleet['summary']['successful_connections']}/{args.switches}")
+    print(f"Sortie identique netmiko/async: {'oui' if identical else 'NON'}")
+    if not identical:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Banc d'essai de la consolidation du rapport Ansible sur un hostvars synthétique
+
+Compare, sur un inventaire de plusieurs milliers de switches :
+  - les chaînes hostvars | dict2items | selectattr(...) de lldp_discovery.yml,
+    évaluées une fois par champ du résumé ;
+  - la boucle all_results + [item] de lldp_discovery_ssh.yml, quadratique ;
+  - le filtre consolidate_discovery, en un seul passage.
+
+Les expressions sont rendues avec Jinja2 (NativeEnvironment, comme les
+variables natives d'Ansible) ; dict2items, combine et flatten reproduisent les
+filtres ansible.builtin correspondants. Sans Jinja2, seul le filtre est mesuré.
+La boucle SSH ne compte que le rendu des expressions, pas le coût d'une
+itération de tâche Ansible, bien supérieur.
+
+Avec --ansible, les tâches de consolidation sont aussi exécutées par
+ansible-playbook sur un inventaire synthétique (connexion locale), chacune
+chronométrée dans le playbook.
+
+Usage: python3 bench/bench_consolidate.py --hosts 5000 --neighbors 24
+       python3 bench/bench_consolidate.py --hosts 2000 --ansible
+"""
+
+import argparse
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+from typing import Any, Dict, List
+
+from common import REPO_ROOT, setup_paths, timed, print_table
+
+setup_paths()
+sys.path.insert(0, os.path.join(REPO_ROOT, 'ansible', 'filter_plugins'))
+
+import synthetic  # noqa: E402
+from aruba_filters import FilterModule  # noqa: E402
+from aruba_parsers import parse_lldp_neighbors  # noqa: E402
+
+try:
+    from jinja2.nativetypes import NativeEnvironment
+except ImportError:
+    NativeEnvironment = None
+
+TIMESTAMP = '2025-07-10T10:30:00Z'
+
+# Expressions de l'ancien play de consolidation (lldp_discovery.yml)
+LEGACY_SWITCHES = ("{{ hostvars | dict2items | selectattr('value.all_switches_data', 'defined') "
+                   "| map(attribute='value.all_switches_data') | list | combine }}")
+LEGACY_SUCCESSFUL = ("{{ hostvars | dict2items | selectattr('value.all_switches_data', 'defined') "
+                     "| list | length }}")
+LEGACY_NEIGHBORS = ("{{ hostvars | dict2items | selectattr('value.all_switches_data', 'defined') "
+                    "| map(attribute='value.all_switches_data') | map('dict2items') | flatten "
+                    "| map(attribute='value.neighbors_count') | map('int') | sum }}")
+LEGACY_TOTAL = "{{ groups['aruba_switches'] | length }}"
+# Itération de la boucle de lldp_discovery_ssh.yml
+SSH_LOOP_ITEM = "{{ all_results | default([]) + [hostvars[item].switch_data] }}"
+FILTER = "{{ hostvars | consolidate_discovery(groups['aruba_switches'], ansible_date_time.iso8601) }}"
+
+
+def dict2items(mapping: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [{'key': key, 'value': value} for key, value in mapping.items()]
+
+
+def combine(dictionaries: List[Dict[str, Any]]) -> Dict[str, Any]:
+    # Comme ansible.builtin.combine: chaque fusion copie le dictionnaire accumulé
+    result: Dict[str, Any] = {}
+    for dictionary in dictionaries:
+        result = result.copy()
+        result.update(dictionary)
+    return result
+
+
+def flatten(items: List[Any]) -> List[Any]:
+    flat = []
+    for item in items:
+        flat.extend(flatten(item) if isinstance(item, list) else [item])
+    return flat
+
+
+def build_hostvars(hosts: int, neighbors: int) -> Dict[str, Dict[str, Any]]:
+    """hostvars synthétique: switch_data et all_switches_data par switch, quelques variables d'inventaire"""
+    parsed = parse_lldp_neighbors(synthetic.lldp_neighbors_detail(0, neighbors), missing="")
+    hostvars = {}
+    for i in range(hosts):
+        name = f"sw-{i}"
+        switch_data = {
+            'switch_ip': synthetic.switch_ip(i),
+            'switch_model': 'Unknown',
+            'timestamp': TIMESTAMP,
+            'neighbors_count': str(len(parsed)),
+            'neighbors': parsed
+        }
+        hostvars[name] = {
+            'inventory_hostname': name,
+            'ansible_host': synthetic.switch_ip(i),
+            'ansible_user': 'admin',
+            'group_names': ['aruba_switches'],
+            'switch_data': switch_data,
+            'all_switches_data': {name: switch_data}
+        }
+    hostvars['localhost'] = {'inventory_hostname': 'localhost', 'group_names': []}
+    return hostvars
+
+
+# Plays exécutés par ansible-playbook (--ansible): préparation des faits sur
+# les switches, puis chaque variante de consolidation encadrée par deux relevés
+# de now() sur localhost
+ANSIBLE_FACTS_PLAY = """---
+- hosts: aruba_switches
+  gather_facts: no
+  tasks:
+    - set_fact:
+        switch_data: "{{ synthetic_switch_data }}"
+        all_switches_data: "{{ {inventory_hostname: synthetic_switch_data} }}"
+
+- hosts: localhost
+  gather_facts: no
+  vars:
+    ansible_date_time: {iso8601: '%s'}
+  tasks:
+""" % TIMESTAMP
+ANSIBLE_CONSOLIDATION_TASKS = {
+    'chaînes Jinja (lldp_discovery.yml)': """    - set_fact:
+        consolidated_report:
+          switches: "%s"
+          summary:
+            total_switches: "%s"
+            successful_connections: "%s"
+            total_neighbors: "%s"
+""" % (LEGACY_SWITCHES, LEGACY_TOTAL, LEGACY_SUCCESSFUL, LEGACY_NEIGHBORS),
+    'boucle all_results + [item] (lldp_discovery_ssh.yml)': """    - set_fact:
+        all_results: "%s"
+      loop: "{{ groups['aruba_switches'] }}"
+      when: hostvars[item].switch_data is defined
+""" % SSH_LOOP_ITEM,
+    'filtre consolidate_discovery': """    - set_fact:
+        consolidated_report: "%s"
+""" % FILTER
+}
+ANSIBLE_TIMER = """    - set_fact:
+        bench_start: "{{ now().timestamp() }}"
+%s    - debug:
+        msg: "BENCH %d {{ now().timestamp() - bench_start | float }}"
+"""
+
+
+def run_ansible(hostvars: Dict[str, Dict[str, Any]], group: List[str], loop_max: int) -> List[List[str]]:
+    """Chronomètre les tâches de consolidation avec ansible-playbook (boucle SSH ignorée au-delà de loop_max)"""
+    work_dir = tempfile.mkdtemp(prefix='lldp-consolidate-')
+    with open(os.path.join(work_dir, 'inventory.ini'), 'w', encoding='utf-8') as f:
+        f.write("localhost ansible_connection=local\n[aruba_switches]\n")
+        f.write("".join(f"{host} ansible_connection=local\n" for host in group))
+    os.makedirs(os.path.join(work_dir, 'group_vars'))
+    with open(os.path.join(work_dir, 'group_vars', 'aruba_switches.json'), 'w', encoding='utf-8') as f:
+        json.dump({'synthetic_switch_data': hostvars[group[0]]['switch_data']}, f)
+
+    labels = [label for label in ANSIBLE_CONSOLIDATION_TASKS
+              if not (label.startswith('boucle') and len(group) > loop_max)]
+    with open(os.path.join(work_dir, 'playbook.yml'), 'w', encoding='utf-8') as f:
+        f.write(ANSIBLE_FACTS_PLAY)
+        for index, label in enumerate(labels):
+            f.write(ANSIBLE_TIMER % (ANSIBLE_CONSOLIDATION_TASKS[label], index))
+
+    env = dict(os.environ, ANSIBLE_FILTER_PLUGINS=os.path.join(REPO_ROOT, 'ansible', 'filter_plugins'))
+    completed = subprocess.run(['ansible-playbook', '-i', 'inventory.ini', '-f', '50', 'playbook.yml'],
+                               cwd=work_dir, env=env, stdin=subprocess.DEVNULL, capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise SystemExit(f"Échec de ansible-playbook:\n{completed.stdout[-2000:]}")
+
+    durations = {int(index): float(seconds)
+                 for index, seconds in re.findall(r'BENCH (\d+) ([0-9.]+)', completed.stdout)}
+    rows = [[label, f"{durations[index]:.2f}s"] for index, label in enumerate(labels)]
+    rows += [[label, f"ignorée (> {loop_max} switches)"] for label in ANSIBLE_CONSOLIDATION_TASKS
+             if label not in labels]
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de la consolidation du rapport Ansible')
+    parser.add_argument('--hosts', type=int, default=5000, help='Nombre de switches dans hostvars')
+    parser.add_argument('--neighbors', type=int, default=24, help='Voisins LLDP par switch')
+    parser.add_argument('--ssh-loop-max', type=int, default=5000,
+                        help='Au-delà de ce nombre de switches, la boucle quadratique est ignorée')
+    parser.add_argument('--ansible', action='store_true', help='Chronomètre aussi les tâches avec ansible-playbook')
+    parser.add_argument('--ansible-loop-max', type=int, default=100,
+                        help='Avec --ansible, au-delà de ce nombre de switches la boucle SSH est ignorée '
+                             '(environ 5 minutes pour 200 switches)')
+    args = parser.parse_args()
+
+    hostvars = build_hostvars(args.hosts, args.neighbors)
+    group = [host for host in hostvars if host != 'localhost']
+    variables = {'hostvars': hostvars, 'groups': {'aruba_switches': group},
+                 'ansible_date_time': {'iso8601': TIMESTAMP}}
+    consolidate = FilterModule().filters()['consolidate_discovery']
+    print(f"hostvars synthétique: {args.hosts} switches, {args.neighbors} voisins par switch")
+    print()
+
+    timings: Dict[str, float] = {}
+    with timed('consolidate_discovery (Python)', timings):
+        report = consolidate(hostvars, group, TIMESTAMP)
+
+    identical = True
+    if NativeEnvironment is None:
+        print("Jinja2 absent: seules les mesures du filtre sont effectuées")
+    else:
+        env = NativeEnvironment()
+        env.filters.update({'dict2items': dict2items, 'combine': combine, 'flatten': flatten})
+        env.filters.update(FilterModule().filters())
+
+        label = 'chaînes Jinja (lldp_discovery.yml)'
+        with timed(label, timings):
+            legacy = {
+                'discovery_timestamp': TIMESTAMP,
+                'switches': env.from_string(LEGACY_SWITCHES).render(variables),
+                'summary': {
+                    'total_switches': env.from_string(LEGACY_TOTAL).render(variables),
+                    'successful_connections': env.from_string(LEGACY_SUCCESSFUL).render(variables),
+                    'total_neighbors': env.from_string(LEGACY_NEIGHBORS).render(variables)
+                }
+            }
+        identical = legacy == report
+
+        if args.hosts <= args.ssh_loop_max:
+            label = 'boucle all_results + [item] (lldp_discovery_ssh.yml)'
+            template = env.from_string(SSH_LOOP_ITEM)
+            with timed(label, timings):
+                all_results: List[Dict[str, Any]] = []
+                for item in group:
+                    all_results = template.render(variables, all_results=all_results, item=item)
+            identical = identical and len(all_results) == len(report['switches'])
+
+        label = 'filtre consolidate_discovery (Jinja)'
+        with timed(label, timings):
+            rendered = env.from_string(FILTER).render(variables)
+        identical = identical and rendered == report
+
+    reference = timings.get('chaînes Jinja (lldp_discovery.yml)')
+    rows = [[label, f"{seconds:.3f}s", f"x{reference / seconds:.0f}" if reference and seconds else '-']
+            for label, seconds in timings.items()]
+    print_table(rows, ['Consolidation', 'Durée', 'Gain vs chaînes Jinja'])
+    print()
+    print(f"Rapport identique: {'oui' if identical else 'NON'}")
+
+    if args.ansible:
+        print()
+        if shutil.which('ansible-playbook'):
+            print_table(run_ansible(hostvars, group, args.ansible_loop_max), ['Tâche de consolidation (ansible-playbook)', 'Durée'])
+        else:
+            print("ansible-playbook introuvable, chronométrage des tâches ignoré")
+    if not identical:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
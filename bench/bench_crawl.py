@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Banc d'essai du parcours récursif sur une fabrique SSH factice interconnectée
+
+Les switches factices forment un arbre (synthetic.fabric_links) : chacun voit
+son parent et ses enfants en LLDP, avec leur adresse loopback comme adresse de
+management, en plus de voisins d'accès dont certains annoncent une description
+de switch Aruba hors de la fabrique (10.x). Le switch racine répond aussi sur
+une seconde adresse, la seule que ses enfants annoncent en LLDP : le parcours
+doit le reconnaître à sa MAC de châssis et ne pas l'interroger deux fois.
+Compare la découverte à partir de l'inventaire complet et le parcours depuis
+le seul switch racine, puis vérifie la liste d'exclusion et la profondeur
+maximale.
+
+Usage: python3 bench/bench_crawl.py --switches 40 --fanout 3 --workers 10
+"""
+
+import argparse
+import json
+import logging
+from functools import partial
+from typing import Any, Dict, List
+
+from common import setup_paths, strip_timestamps, timed, print_table
+
+setup_paths()
+
+import synthetic  # noqa: E402
+from mock_ssh_server import MockSSHFabric, MockSwitch  # noqa: E402
+from command_timing import CommandTimingStore  # noqa: E402
+from crawl import CrawlScope, crawl_switches  # noqa: E402
+from lldp_discovery import discover_all_switches  # noqa: E402
+
+
+def subtree(root: int, count: int, fanout: int) -> List[int]:
+    """Index des switches de la fabrique sous root (root compris)"""
+    nodes, index = [root], 0
+    while index < len(nodes):
+        first = nodes[index] * fanout + 1
+        nodes.extend(child for child in range(first, first + fanout) if child < count)
+        index += 1
+    return nodes
+
+
+def depth_of(index: int, fanout: int) -> int:
+    depth = 0
+    while index:
+        index = (index - 1) // fanout
+        depth += 1
+    return depth
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark du parcours récursif')
+    parser.add_argument('--switches', type=int, default=40, help='Switches de la fabrique')
+    parser.add_argument('--fanout', type=int, default=3, help='Switches reliés sous chaque switch')
+    parser.add_argument('--ports', type=int, default=12, help='Voisins d\'accès par switch')
+    parser.add_argument('--latency', type=float, default=0.05, help='Latence par commande (s)')
+    parser.add_argument('--workers', type=int, default=10, help='Switches interrogés en parallèle')
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    logging.getLogger('paramiko').setLevel(logging.CRITICAL)
+
+    links = synthetic.fabric_links(args.switches, args.fanout, args.ports)
+    outputs = [synthetic.switch_outputs(i, args.ports, variant='aos-s', links=links[i]) for i in range(args.switches)]
+    # Seconde adresse de management du switch racine, annoncée par ses enfants à la place de la première
+    root_alias = synthetic.switch_ip(args.switches)
+    for _, child, _ in links[0]:
+        lldp = outputs[child]['show lldp neighbors detail']
+        outputs[child]['show lldp neighbors detail'] = lldp.replace(f"Address : {synthetic.switch_ip(0)}\n",
+                                                                    f"Address : {root_alias}\n")
+    switches = [MockSwitch(synthetic.switch_ip(i), f"sw-{i}", outputs[i], args.latency)
+                for i in range(args.switches)]
+    switches.append(MockSwitch(root_alias, 'sw-0', outputs[0], args.latency))
+    fabric_scope = ['127.0.0.0/16']
+
+    rows = []
+    checks = []
+    with MockSSHFabric(switches) as fabric:
+        config = synthetic.fleet_config(args.switches, fabric.port)
+        discover = partial(discover_all_switches, workers=args.workers, switch_timeout=30,
+                           timing_store=CommandTimingStore())
+        timings: Dict[str, float] = {}
+
+        with timed('inventaire complet', timings):
+            inventory = discover(config)
+        rows.append(['inventaire complet', f"{timings['inventaire complet']:.2f}s",
+                     inventory['summary']['successful_connections'], '-'])
+
+        def crawl(label: str, **kwargs: Any) -> Dict[str, Any]:
+            logins_before = dict(fabric.logins)
+            with timed(label, timings):
+                results = crawl_switches([config[0]], discover, **kwargs)
+            crawl_summary = results['summary']['crawl']
+            rows.append([label, f"{timings[label]:.2f}s", results['summary']['successful_connections'],
+                         ' / '.join(str(count) for count in crawl_summary['switches_per_level'])])
+            repeated = [host for host, count in fabric.logins.items() if count - logins_before.get(host, 0) > 1]
+            checks.append((f"{label}: un seul passage par switch", not repeated))
+            return results
+
+        crawled = crawl('parcours depuis la racine', scope=CrawlScope(fabric_scope))
+        same = (json.dumps(strip_timestamps(crawled)['switches'], sort_keys=True)
+                == json.dumps(strip_timestamps(inventory)['switches'], sort_keys=True))
+        checks.append(("parcours depuis la racine: mêmes switches et mêmes voisins que l'inventaire", same))
+        expected_levels = [sum(1 for i in range(args.switches) if depth_of(i, args.fanout) == depth)
+                           for depth in range(depth_of(args.switches - 1, args.fanout) + 1)]
+        checks.append(("parcours depuis la racine: un niveau par profondeur de l'arbre",
+                       crawled['summary']['crawl']['switches_per_level'] == expected_levels))
+        checks.append(("parcours depuis la racine: seconde adresse de la racine reconnue à sa MAC de châssis",
+                       root_alias not in fabric.logins and crawled['summary']['total_switches'] == args.switches))
+
+        excluded = subtree(1, args.switches, args.fanout)
+        pruned = crawl('exclusion du switch 1', scope=CrawlScope(fabric_scope, [f"{synthetic.switch_ip(1)}/32"]))
+        checks.append((f"exclusion du switch 1: {len(excluded)} switches de son sous-arbre ignorés",
+                       set(pruned['switches']) == set(inventory['switches']) -
+                       {synthetic.switch_ip(i) for i in excluded}))
+
+        shallow = crawl('profondeur maximale 1', scope=CrawlScope(fabric_scope), max_depth=1)
+        checks.append(("profondeur maximale 1: racine et switches directement reliés",
+                       len(shallow['switches']) == 1 + min(args.fanout, args.switches - 1)))
+
+    print(f"Fabrique factice: {args.switches} switches en arbre (fanout {args.fanout}), "
+          f"{args.ports} voisins d'accès, latence {args.latency * 1000:.0f} ms par commande")
+    print()
+    print_table(rows, ['Découverte', 'Durée', 'Switches', 'Switches par niveau'])
+    print()
+    for label, ok in checks:
+        print(f"{label}: {'oui' if ok else 'NON'}")
+    if not all(ok for _, ok in checks):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Banc d'essai du mode démon avec pool de sessions SSH persistantes
+
+Exécute plusieurs cycles de découverte contre une flotte SSH factice, d'abord
+avec une connexion neuve par switch et par cycle, puis avec le pool de
+sessions. Vérifie que le pool ne s'authentifie qu'une fois par switch, que le
+JSON produit est identique, et que l'éviction LRU respecte --max-sessions.
+
+Usage: python3 bench/bench_daemon.py --switches 20 --cycles 5 --workers 10
+"""
+
+import argparse
+import json
+import logging
+
+from common import setup_paths, strip_timestamps, timed, print_table
+
+setup_paths()
+
+import synthetic  # noqa: E402
+from mock_ssh_server import MockSSHFabric, MockSwitch  # noqa: E402
+from lldp_discovery import discover_all_switches  # noqa: E402
+from polling_daemon import SessionPool  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark du pool de sessions du mode démon')
+    parser.add_argument('--switches', type=int, default=20, help='Nombre de switches factices')
+    parser.add_argument('--ports', type=int, default=24, help='Voisins LLDP par switch')
+    parser.add_argument('--latency', type=float, default=0.05, help='Latence par commande (s)')
+    parser.add_argument('--workers', type=int, default=10, help='Taille du pool parallèle')
+    parser.add_argument('--cycles', type=int, default=5, help='Nombre de cycles de découverte')
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    logging.getLogger('paramiko').setLevel(logging.CRITICAL)
+
+    switches = [
+        MockSwitch(synthetic.switch_ip(i), f"sw-{i}", synthetic.switch_outputs(i, args.ports), args.latency)
+        for i in range(args.switches)
+    ]
+
+    rows = []
+    with MockSSHFabric(switches) as fabric:
+        config = synthetic.fleet_config(args.switches, fabric.port)
+        timings = {}
+
+        with timed('connexions neuves', timings):
+            for _ in range(args.cycles):
+                fresh = discover_all_switches(config, workers=args.workers)
+        rows.append(['connexions neuves', f"{timings['connexions neuves']:.2f}s", fabric.total_logins, '-'])
+
+        logins_before = fabric.total_logins
+        pool = SessionPool(max_sessions=args.switches)
+        with timed('pool persistant', timings):
+            for _ in range(args.cycles):
+                pooled = discover_all_switches(config, workers=args.workers, discover_fn=pool.discover)
+        pool.close()
+        pooled_logins = fabric.total_logins - logins_before
+        rows.append(['pool persistant', f"{timings['pool persistant']:.2f}s", pooled_logins, pool.evictions])
+
+        logins_before = fabric.total_logins
+        small = max(1, args.switches // 2)
+        small_pool = SessionPool(max_sessions=small)
+        label = f'pool LRU ({small} sessions)'
+        with timed(label, timings):
+            for _ in range(args.cycles):
+                discover_all_switches(config, workers=min(args.workers, small), discover_fn=small_pool.discover)
+        peak = len(small_pool)
+        small_pool.close()
+        rows.append([label, f"{timings[label]:.2f}s", fabric.total_logins - logins_before, small_pool.evictions])
+
+    print_table(rows, ['Mode', f'Durée ({args.cycles} cycles)', 'Connexions SSH', 'Évictions'])
+    print()
+
+    identical = json.dumps(strip_timestamps(fresh)) == json.dumps(strip_timestamps(pooled))
+    print(f"Sortie identique connexions neuves/pool: {'oui' if identical else 'NON'}")
+    print(f"Une seule connexion par switch avec le pool: {'oui' if pooled_logins == args.switches else 'NON'}")
+    print(f"Sessions ouvertes en fin de cycle avec le pool LRU: {peak} (max {small})")
+    if not identical or pooled_logins != args.switches or peak > small:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
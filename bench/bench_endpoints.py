@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Banc d'essai de la localisation des équipements terminaux (--mac-table, --endpoints)
+
+Génère une fabrique en arbre dont chaque switch porte des équipements sans LLDP
+sur ses ports d'accès. Comme un vrai domaine L2, chaque switch apprend toutes
+les MAC de la fabrique : celles de ses ports d'accès, celles de chaque
+sous-arbre sur le port descendant correspondant et les autres sur son port
+montant (100 000 entrées MAC par défaut). Seul le switch de cœur a une table
+ARP. Les switches pairs répondent au format AOS-S, les impairs au format AOS-CX.
+
+Mesure le parsing des tables MAC avec l'exclusion des ports montants, la
+construction de l'index (jointure par dictionnaire avec l'ARP de la flotte)
+et une jointure par parcours de la table ARP, extrapolée. Vérifie que chaque
+équipement est localisé une seule fois, sur son vrai port d'accès avec sa VLAN
+et son IP, puis la même localisation de bout en bout par le script en ligne de
+commande contre le serveur SSH factice (moteurs netmiko et async).
+
+Usage: python3 bench/bench_endpoints.py --switches 50 --fanout 3 --endpoints 40
+"""
+
+import argparse
+import json
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from common import setup_paths, timed, print_table, REPO_ROOT
+
+setup_paths()
+
+import synthetic  # noqa: E402
+from mock_ssh_server import MockSSHFabric, MockSwitch  # noqa: E402
+from aruba_parsers import parse_mac_address_table, parse_arp_table  # noqa: E402
+from lldp_discovery import ArubaLLDPDiscovery  # noqa: E402
+from endpoints import build_endpoint_index  # noqa: E402
+
+# Un équipement sur 20 est silencieux: présent dans les tables MAC, absent de l'ARP
+SILENT_EVERY = 20
+
+# Équipement attendu: (switch, port, VLAN, IP ou None)
+Location = Tuple[str, str, str, Optional[str]]
+
+
+def variant_of(index: int) -> str:
+    return 'aos-cx' if index % 2 else 'aos-s'
+
+
+def build_outputs(switches: int, fanout: int, ports: int,
+                  endpoints: int) -> Tuple[List[Dict[str, str]], Dict[str, Location]]:
+    """
+    Sorties LLDP, ARP et MAC de chaque switch de la fabrique et positions attendues
+
+    Returns:
+        (sorties par switch indexées par commande, MAC -> position attendue)
+    """
+    links = synthetic.fabric_links(switches, fanout, ports)
+    parents = [None] + [(index - 1) // fanout for index in range(1, switches)]
+
+    owned: List[List[Tuple[str, int, int]]] = []
+    expected: Dict[str, Location] = {}
+    arp_lines = [" IP ARP table", "", "  IP Address       MAC Address       Type    Port",
+                 "  ---------------  ----------------- ------- ----"]
+    for index in range(switches):
+        entries = []
+        for endpoint in range(endpoints):
+            mac, port, vlan = synthetic.endpoint_mac(index, endpoint), endpoint % ports + 1, 10 + endpoint % 4
+            ip = None if endpoint % SILENT_EVERY == SILENT_EVERY - 1 else synthetic.endpoint_ip(index, endpoint)
+            entries.append((mac, port, vlan))
+            expected[mac] = (synthetic.switch_ip(index), synthetic.local_port_name(port, variant_of(index)),
+                             str(vlan), ip)
+            if ip:
+                arp_lines.append(f"  {ip:<16} {mac}  dynamic {ports + 2}")
+        owned.append(entries)
+
+    outputs = []
+    for index in range(switches):
+        # Port par lequel ce switch joint chaque switch de la fabrique
+        via = {}
+        for owner in range(switches):
+            node, child = owner, None
+            while node is not None and node != index:
+                node, child = parents[node], node
+            if owner == index:
+                via[owner] = None
+            elif node is None:
+                via[owner] = ports + 1
+            else:
+                via[owner] = ports + 2 + (child - 1) % fanout
+        table = [(mac, via[owner] or port, vlan) for owner in range(switches) for mac, port, vlan in owned[owner]]
+        outputs.append({
+            ArubaLLDPDiscovery.LLDP_COMMAND: synthetic.lldp_neighbors_detail(index, 0, variant_of(index),
+                                                                             links=links[index]),
+            ArubaLLDPDiscovery.ARP_COMMAND: "\n".join(arp_lines if index == 0 else arp_lines[:4]) + "\n",
+            ArubaLLDPDiscovery.MAC_TABLE_COMMAND: synthetic.mac_address_table(table, variant_of(index)),
+        })
+    return outputs, expected
+
+
+def naive_join(entries: List[Dict[str, str]], arp_table: Dict[str, str]) -> List[List[str]]:
+    """Jointure par parcours de la table ARP pour chaque entrée MAC (référence)"""
+    arp_entries = [(ip, mac.replace('-', '').replace(':', '').lower()) for ip, mac in arp_table.items()]
+    return [[ip for ip, mac in arp_entries if mac == entry['mac'].replace(':', '')] for entry in entries]
+
+
+def correct(index_endpoints: Dict[str, List[Dict[str, Any]]], expected: Dict[str, Location]) -> bool:
+    """Chaque équipement localisé une seule fois, au bon endroit, avec la bonne IP"""
+    if set(index_endpoints) != set(expected):
+        return False
+    for mac, locations in index_endpoints.items():
+        switch, port, vlan, ip = expected[mac]
+        if len(locations) != 1:
+            return False
+        location = locations[0]
+        if (location['switch'], location['port'], location['vlan']) != (switch, port, vlan) \
+                or location['ip_addresses'] != ([ip] if ip else []):
+            return False
+    return True
+
+
+def run_cli(config: List[Dict[str, Any]], work_dir: str, engine: str) -> Dict[str, Any]:
+    """Lance lldp_discovery.py avec --endpoints et retourne l'index écrit"""
+    config_path = os.path.join(work_dir, 'switches_config.json')
+    endpoints_path = os.path.join(work_dir, f'endpoints_{engine}.json')
+    with open(config_path, 'w', encoding='utf-8') as f:
+        json.dump({'switches': config}, f)
+    completed = subprocess.run([sys.executable, os.path.join('python', 'lldp_discovery.py'), '-c', config_path,
+                                '-o', os.path.join(work_dir, f'lldp_discovery_{engine}.json'), '-w', '10',
+                                '--engine', engine, '--switch-timeout', '30', '--endpoints', endpoints_path],
+                               cwd=REPO_ROOT, stdin=subprocess.DEVNULL, capture_output=True, text=True)
+    if completed.returncode != 0:
+        print(completed.stdout[-2000:], completed.stderr[-2000:])
+        return {}
+    with open(endpoints_path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de la localisation des équipements terminaux')
+    parser.add_argument('--switches', type=int, default=50, help='Switches de la fabrique')
+    parser.add_argument('--fanout', type=int, default=3, help='Switches reliés sous chaque switch')
+    parser.add_argument('--ports', type=int, default=48, help='Ports d\'accès par switch')
+    parser.add_argument('--endpoints', type=int, default=40, help='Équipements terminaux par switch')
+    parser.add_argument('--naive-sample', type=int, default=500,
+                        help='Entrées MAC jointes par parcours de l\'ARP (extrapolé)')
+    parser.add_argument('--e2e-switches', type=int, default=7,
+                        help='Switches de la localisation de bout en bout (0 pour la désactiver)')
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    logging.getLogger('paramiko').setLevel(logging.CRITICAL)
+
+    outputs, expected = build_outputs(args.switches, args.fanout, args.ports, args.endpoints)
+    total_entries = sum(len(parse_mac_address_table(switch[ArubaLLDPDiscovery.MAC_TABLE_COMMAND]))
+                        for switch in outputs)
+
+    rows = []
+    checks = []
+    timings: Dict[str, float] = {}
+
+    with timed('collecte', timings):
+        fleet = []
+        for index, switch in enumerate(outputs):
+            collector = ArubaLLDPDiscovery(synthetic.switch_ip(index), 'bench', 'bench', collect_mac_table=True)
+            fleet.append((collector.host, collector.build_switch_data(switch[ArubaLLDPDiscovery.LLDP_COMMAND],
+                                                                       switch[ArubaLLDPDiscovery.ARP_COMMAND],
+                                                                       switch[ArubaLLDPDiscovery.MAC_TABLE_COMMAND])))
+    rows.append([f"Parsing des tables MAC et exclusion des ports montants ({total_entries} entrées)",
+                 f"{timings['collecte']:.2f}s"])
+
+    with timed('index', timings):
+        index = build_endpoint_index(fleet)
+    rows.append(['Index des équipements (jointure par dictionnaire)', f"{timings['index']:.3f}s"])
+
+    access_entries = [entry for _, switch_data in fleet for entry in switch_data['mac_table']]
+    core_arp = parse_arp_table(outputs[0][ArubaLLDPDiscovery.ARP_COMMAND])
+    sample = access_entries[:args.naive_sample]
+    start = time.perf_counter()
+    naive_join(sample, core_arp)
+    naive = (time.perf_counter() - start) * len(access_entries) / max(1, len(sample))
+    rows.append([f"Jointure par parcours de l'ARP ({len(core_arp)} entrées, extrapolé)", f"{naive:.1f}s"])
+
+    summary = index.summary()
+    checks.append(("Chaque équipement localisé une seule fois sur son port d'accès, avec VLAN et IP",
+                   correct(index.endpoints, expected)))
+    checks.append(("Entrées des ports montants exclues",
+                   len(access_entries) == len(expected) and summary['ambiguous'] == 0))
+    silent = sum(1 for location in expected.values() if location[3] is None)
+    checks.append(("Équipements silencieux localisés sans IP", summary['with_ip'] == len(expected) - silent))
+    mac, (switch, port, vlan, ip) = next((mac, location) for mac, location in expected.items() if location[3])
+    checks.append(("Recherche par IP et par MAC au format AOS-S",
+                   [location['mac'] for location in index.locate(ip)] == [mac]
+                   and index.locate(mac.replace(':', '')[:6] + '-' + mac.replace(':', '')[6:])[0]['port'] == port))
+
+    # Sans exclusion des ports montants, chaque équipement apparaît sur tous les switches
+    unfiltered: Dict[str, int] = {}
+    for switch in outputs:
+        for entry in parse_mac_address_table(switch[ArubaLLDPDiscovery.MAC_TABLE_COMMAND]):
+            unfiltered[entry['mac']] = unfiltered.get(entry['mac'], 0) + 1
+    ambiguous_unfiltered = sum(1 for count in unfiltered.values() if count > 1)
+
+    if args.e2e_switches:
+        e2e_outputs, e2e_expected = build_outputs(args.e2e_switches, 2, 12, 20)
+        mock_switches = [MockSwitch(synthetic.switch_ip(i), f"sw-{i}", e2e_outputs[i], 0.01)
+                         for i in range(args.e2e_switches)]
+        work_dir = tempfile.mkdtemp(prefix='lldp-endpoints-')
+        try:
+            with MockSSHFabric(mock_switches) as fabric:
+                config = synthetic.fleet_config(args.e2e_switches, fabric.port)
+                for engine in ('netmiko', 'async'):
+                    with timed(engine, timings):
+                        written = run_cli(config, work_dir, engine)
+                    rows.append([f"Script en ligne de commande, moteur {engine} ({args.e2e_switches} switches)",
+                                 f"{timings[engine]:.2f}s"])
+                    checks.append((f"Index écrit par --endpoints correct (moteur {engine})",
+                                   correct(written.get('endpoints', {}), e2e_expected)))
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(f"Fabrique synthétique: {args.switches} switches (AOS-S et AOS-CX), {len(expected)} équipements "
+          f"terminaux, {total_entries} entrées MAC dont {len(access_entries)} sur les ports d'accès")
+    print(f"Équipements ambigus sans exclusion des ports montants: {ambiguous_unfiltered}, avec: "
+          f"{summary['ambiguous']}")
+    print()
+    print_table(rows, ['Étape', 'Durée'])
+    print()
+    for label, ok in checks:
+        print(f"{label}: {'oui' if ok else 'NON'}")
+    if not all(ok for _, ok in checks):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
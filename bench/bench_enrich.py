@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Banc d'essai de l'enrichissement ARP par index MAC
+
+Compare l'ancienne jointure par sous-chaîne (table ARP entière parcourue pour
+chaque voisin) à la recherche dans l'index MAC canonique, sur 50 000 entrées
+ARP et 500 voisins, et vérifie la résolution quand les formats de MAC diffèrent
+entre LLDP et ARP (ChassisId AOS-S "aa bb cc dd ee ff" / ARP "aabbcc-ddeeff").
+
+Usage: python3 bench/bench_enrich.py --arp 50000 --neighbors 500
+"""
+
+import argparse
+import time
+
+from common import setup_paths, print_table
+
+setup_paths()
+
+import synthetic  # noqa: E402
+from aruba_parsers import parse_arp_table, parse_lldp_neighbors, build_mac_index, enrich_neighbors  # noqa: E402
+
+
+def legacy_enrich(neighbors, arp_table):
+    """Ancienne implémentation de _enrich_neighbor_data / enrich_with_arp (référence)"""
+    enriched = []
+    for neighbor in neighbors:
+        enriched_neighbor = neighbor.copy()
+        chassis_id = neighbor.get('remote_chassis_id', '').lower()
+        matching_ips = []
+        for ip, mac in arp_table.items():
+            if chassis_id in mac or mac in chassis_id:
+                matching_ips.append(ip)
+        mgmt_addresses = neighbor.get('management_addresses', [])
+        enriched_neighbor.update({
+            'ip_addresses': list(set(matching_ips + mgmt_addresses)),
+            'mac_address': chassis_id,
+            'hostname': neighbor.get('remote_system_name', 'Unknown')
+        })
+        enriched.append(enriched_neighbor)
+    return enriched
+
+
+def resolved(neighbors):
+    """Nombre de voisins dont une IP a été trouvée dans l'ARP (hors adresses de management)"""
+    return sum(1 for n in neighbors if set(n['ip_addresses']) - set(n['management_addresses']))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de l'enrichissement ARP")
+    parser.add_argument('--arp', type=int, default=50000, help="Entrées ARP")
+    parser.add_argument('--neighbors', type=int, default=500, help='Voisins LLDP')
+    args = parser.parse_args()
+
+    neighbors = parse_lldp_neighbors(synthetic.lldp_neighbors_detail(0, args.neighbors), missing='')
+    # Les adresses de management sont retirées pour que seule la jointure ARP résolve les IPs
+    for neighbor in neighbors:
+        neighbor['management_addresses'] = []
+    arp_table = parse_arp_table(synthetic.arp_table(0, args.neighbors, args.arp - args.neighbors))
+
+    start = time.perf_counter()
+    legacy = legacy_enrich(neighbors, arp_table)
+    legacy_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    mac_index = build_mac_index(arp_table)
+    index_build = time.perf_counter() - start
+    start = time.perf_counter()
+    indexed = enrich_neighbors(neighbors, mac_index)
+    lookup_time = time.perf_counter() - start
+
+    identical = all(
+        sorted(a['ip_addresses']) == sorted(b['ip_addresses']) and a['mac_address'] == b['mac_address']
+        for a, b in zip(legacy, indexed)
+    )
+
+    # Formats AOS-S: chassis ID avec espaces côté LLDP, aabbcc-ddeeff côté ARP
+    aos_neighbors = parse_lldp_neighbors(synthetic.lldp_neighbors_detail(0, args.neighbors, 'aos-s'), missing='')
+    for neighbor in aos_neighbors:
+        neighbor['management_addresses'] = []
+    aos_arp = parse_arp_table(synthetic.arp_table(0, args.neighbors, 0, mac_format='aos-s'))
+
+    total = legacy_time
+    rows = [
+        ['ancien (sous-chaînes)', f"{legacy_time * 1000:.1f} ms", '1x'],
+        ['construction index', f"{index_build * 1000:.1f} ms", '-'],
+        ['recherche index', f"{lookup_time * 1000:.2f} ms", '-'],
+        ['index total', f"{(index_build + lookup_time) * 1000:.1f} ms", f"{total / (index_build + lookup_time):.0f}x"],
+    ]
+    print(f"{len(arp_table)} entrées ARP x {len(neighbors)} voisins")
+    print_table(rows, ['Méthode', 'Durée', 'Accélération'])
+    print()
+    print(f"Mêmes IPs et MAC que l'ancienne jointure: {'oui' if identical else 'NON'}")
+    print(f"Voisins résolus avec formats AOS-S: ancien {resolved(legacy_enrich(aos_neighbors, aos_arp))}"
+          f"/{len(aos_neighbors)}, index {resolved(enrich_neighbors(aos_neighbors, build_mac_index(aos_arp)))}"
+          f"/{len(aos_neighbors)}")
+    empty = enrich_neighbors([{'remote_chassis_id': '', 'management_addresses': []}], mac_index)[0]
+    print(f"Chassis ID vide: {len(empty['ip_addresses'])} IP associée(s)")
+    if not identical:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
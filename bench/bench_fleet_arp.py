@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Banc d'essai de l'index ARP partagé de la flotte (switches "arp_source")
+
+Fabrique SSH factice dont seuls les switches de cœur ont une table ARP : chacun
+porte les entrées d'une partie des switches d'accès, dont les tables ARP sont
+vides (2530 en L2). Les IPs de l'ARP sont distinctes des adresses de
+management annoncées par LLDP, pour distinguer ce que l'ARP a résolu.
+
+Compare, par le script en ligne de commande :
+  - la collecte actuelle, 'show arp' sur chaque switch ;
+  - les switches de cœur marqués "arp_source": true, les autres sans 'show arp'.
+
+Vérifie que 'show arp' n'est exécuté que sur les switches sources, que les
+voisins sont identiques à une collecte où chaque switch aurait sa propre table
+ARP complète (moteurs netmiko et async), et que le rejeu de la capture
+(--save-raw puis --replay) reconstruit le même résultat.
+
+Usage: python3 bench/bench_fleet_arp.py --switches 40 --cores 2 --ports 24 --latency 0.05 --arp-latency 0.5
+"""
+
+import argparse
+import json
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from typing import Any, Dict, List, Optional, Tuple
+
+from common import setup_paths, strip_timestamps, timed, print_table, REPO_ROOT
+
+setup_paths()
+
+import synthetic  # noqa: E402
+from mock_ssh_server import MockSSHFabric, MockSwitch  # noqa: E402
+from lldp_discovery import ArubaLLDPDiscovery  # noqa: E402
+
+ARP_HEADER = [" IP ARP table", "", "  IP Address       MAC Address       Type    Port",
+              "  ---------------  ----------------- ------- ----"]
+
+
+def data_ip(switch_index: int, port: int) -> str:
+    """IP d'un voisin connue seulement par l'ARP (distincte de son adresse de management)"""
+    return f"172.{16 + switch_index // 256 % 16}.{switch_index % 256}.{port}"
+
+
+def arp_output(entries: List[Tuple[str, str]]) -> str:
+    """Sortie 'show arp' à partir de paires (IP, MAC)"""
+    return "\n".join(ARP_HEADER + [f"  {ip:<16} {mac}  dynamic 1" for ip, mac in entries]) + "\n"
+
+
+def fleet_outputs(switches: int, cores: int, ports: int, arp_everywhere: bool) -> List[Dict[str, str]]:
+    """
+    Sorties des switches factices
+
+    Args:
+        switches: Switches de la flotte, les premiers étant les switches de cœur
+        cores: Switches de cœur ; chacun porte l'ARP des switches d'index congru au sien
+        ports: Voisins LLDP par switch
+        arp_everywhere: Référence: chaque switch a la table ARP complète de ses voisins
+
+    Returns:
+        Sorties par switch, indexées par commande
+    """
+    own = [[(data_ip(index, port), synthetic.neighbor_mac(index, port)) for port in range(1, ports + 1)]
+           for index in range(switches)]
+    outputs = []
+    for index in range(switches):
+        if arp_everywhere:
+            entries = own[index]
+        elif index < cores:
+            entries = [entry for other in range(index, switches, cores) for entry in own[other]]
+        else:
+            entries = []
+        outputs.append({
+            ArubaLLDPDiscovery.LLDP_COMMAND: synthetic.lldp_neighbors_detail(index, ports, 'aos-s'),
+            ArubaLLDPDiscovery.ARP_COMMAND: arp_output(entries),
+        })
+    return outputs
+
+
+def resolved(results: Dict[str, Any]) -> int:
+    """Voisins dont une IP vient de l'ARP"""
+    return sum(1 for data in results.get('switches', {}).values() for neighbor in data['neighbors']
+               if any(ip.startswith('172.') for ip in neighbor['ip_addresses']))
+
+
+def neighbors_only(results: Dict[str, Any]) -> Dict[str, Any]:
+    """Voisins par switch, sans horodatages ni table ARP des switches sources"""
+    return {host: data['neighbors'] for host, data in strip_timestamps(results)['switches'].items()}
+
+
+def run_cli(config: List[Dict[str, Any]], work_dir: str, name: str, args: List[str]) -> Optional[Dict[str, Any]]:
+    """Lance lldp_discovery.py et retourne les résultats écrits"""
+    config_path = os.path.join(work_dir, f'{name}_config.json')
+    output_path = os.path.join(work_dir, f'{name}.json')
+    with open(config_path, 'w', encoding='utf-8') as f:
+        json.dump({'switches': config}, f)
+    completed = subprocess.run([sys.executable, os.path.join('python', 'lldp_discovery.py'), '-c', config_path,
+                                '-o', output_path, '--fixed-timing'] + args,
+                               cwd=REPO_ROOT, stdin=subprocess.DEVNULL, capture_output=True, text=True)
+    if completed.returncode != 0:
+        print(completed.stdout[-2000:], completed.stderr[-2000:])
+        return None
+    with open(output_path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de l\'index ARP partagé de la flotte')
+    parser.add_argument('--switches', type=int, default=40, help='Switches de la flotte')
+    parser.add_argument('--cores', type=int, default=2, help='Switches de cœur (sources ARP)')
+    parser.add_argument('--ports', type=int, default=24, help='Voisins LLDP par switch')
+    parser.add_argument('--latency', type=float, default=0.05, help='Latence par commande en secondes')
+    parser.add_argument('--arp-latency', type=float, default=0.5,
+                        help='Latence de \'show arp\' en secondes (pagination de la CLI 2530)')
+    parser.add_argument('--workers', type=int, default=10, help='Switches interrogés en parallèle')
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    logging.getLogger('paramiko').setLevel(logging.CRITICAL)
+
+    total_neighbors = args.switches * args.ports
+    rows = []
+    checks = []
+    timings: Dict[str, float] = {}
+    results: Dict[str, Optional[Dict[str, Any]]] = {}
+    arp_commands: Dict[str, int] = {}
+    work_dir = tempfile.mkdtemp(prefix='lldp-fleet-arp-')
+    try:
+        for arp_everywhere in (True, False):
+            outputs = fleet_outputs(args.switches, args.cores, args.ports, arp_everywhere)
+            switches = [MockSwitch(synthetic.switch_ip(i), f"sw-{i}", outputs[i], args.latency,
+                                   command_latency={ArubaLLDPDiscovery.ARP_COMMAND: args.arp_latency})
+                        for i in range(args.switches)]
+            with MockSSHFabric(switches) as fabric:
+                config = synthetic.fleet_config(args.switches, fabric.port)
+                sources = [dict(switch_config, arp_source=True) if index < args.cores else switch_config
+                           for index, switch_config in enumerate(config)]
+                if arp_everywhere:
+                    runs = [('reference', config, ['-w', str(args.workers)])]
+                else:
+                    capture_dir = os.path.join(work_dir, 'raw')
+                    runs = [('per_switch', config, ['-w', str(args.workers)]),
+                            ('shared', sources, ['-w', str(args.workers), '--save-raw', capture_dir]),
+                            ('per_switch_async', config, ['-w', str(args.workers), '--engine', 'async']),
+                            ('shared_async', sources, ['-w', str(args.workers), '--engine', 'async'])]
+                for name, run_config, cli_args in runs:
+                    before = fabric.commands.get(ArubaLLDPDiscovery.ARP_COMMAND, 0)
+                    with timed(name, timings):
+                        results[name] = run_cli(run_config, work_dir, name, cli_args)
+                    arp_commands[name] = fabric.commands.get(ArubaLLDPDiscovery.ARP_COMMAND, 0) - before
+        with timed('replay', timings):
+            results['replay'] = run_cli([], work_dir, 'replay', ['--replay', os.path.join(work_dir, 'raw')])
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    if any(result is None for result in results.values()):
+        print("Exécution en ligne de commande: NON")
+        raise SystemExit(1)
+
+    labels = {
+        'reference': "Référence: table ARP complète sur chaque switch",
+        'per_switch': "'show arp' sur chaque switch (actuel)",
+        'shared': "Index ARP de la flotte (sources: switches de cœur)",
+        'per_switch_async': "'show arp' sur chaque switch, moteur async",
+        'shared_async': "Index ARP de la flotte, moteur async",
+    }
+    for name, label in labels.items():
+        rows.append([label, f"{timings[name]:.2f}s", arp_commands[name],
+                     f"{resolved(results[name])}/{total_neighbors}"])
+    rows.append(["Rejeu de la capture de l'index ARP de la flotte", f"{timings['replay']:.2f}s", 0,
+                 f"{resolved(results['replay'])}/{total_neighbors}"])
+
+    reference = neighbors_only(results['reference'])
+    checks.append(("'show arp' exécuté seulement sur les switches sources",
+                   arp_commands['shared'] == args.cores and arp_commands['shared_async'] == args.cores))
+    for name, label in (('shared', 'netmiko'), ('shared_async', 'async'), ('replay', 'rejeu')):
+        checks.append((f"Voisins identiques à la référence ({label})", neighbors_only(results[name]) == reference))
+    summary = results['shared']['summary'].get('fleet_arp', {})
+    checks.append(("Résumé de l'index ARP de la flotte",
+                   summary.get('sources') == args.cores and summary.get('macs') == total_neighbors))
+    checks.append(("Sans index partagé, seuls les voisins des switches de cœur sont résolus",
+                   resolved(results['per_switch']) == args.cores * args.ports))
+
+    print(f"Flotte factice: {args.switches} switches dont {args.cores} de cœur, {total_neighbors} voisins, "
+          f"latence {args.latency * 1000:.0f} ms par commande, {args.arp_latency * 1000:.0f} ms pour 'show arp'")
+    print()
+    print_table(rows, ['Collecte', 'Durée', "Commandes 'show arp'", 'Voisins résolus par ARP'])
+    print()
+    for label, ok in checks:
+        print(f"{label}: {'oui' if ok else 'NON'}")
+    if not all(ok for _, ok in checks):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
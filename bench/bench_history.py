@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Banc d'essai de l'historique SQLite sur une série d'exécutions synthétiques
+
+Simule une journée d'interrogations (une exécution toutes les 15 minutes) sur
+une flotte synthétique où quelques équipements changent de port à chaque
+exécution, et mesure :
+  - l'ajout de chaque exécution (une transaction) et la taille de la base,
+    comparée au nombre de voisins interrogés ;
+  - les recherches indexées par MAC, IP, nom et (switch, port) ;
+  - la même recherche "où était la MAC X" en relisant les fichiers JSON de
+    chaque exécution, comme avant l'historique.
+
+Vérifie que chaque recherche à un instant donné renvoie le port où la MAC
+suivie se trouvait réellement.
+
+Usage: python3 bench/bench_history.py --switches 100 --ports 24 --polls 96
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+
+from common import setup_paths, timed, print_table
+
+setup_paths()
+
+import synthetic  # noqa: E402
+from lldp_discovery import ArubaLLDPDiscovery  # noqa: E402
+from history_store import HistoryStore  # noqa: E402
+
+START = datetime(2024, 5, 2)
+POLL_INTERVAL = timedelta(minutes=15)
+
+
+def build_fleet(switches: int, ports: int) -> Dict[str, Dict[str, Any]]:
+    """Données de découverte d'une flotte synthétique, comme results['switches']"""
+    parser = ArubaLLDPDiscovery('bench', 'bench', 'bench')
+    fleet = {}
+    for index in range(switches):
+        outputs = synthetic.switch_outputs(index, ports, variant='aos-s')
+        parser.host = synthetic.switch_ip(index)
+        fleet[parser.host] = parser.build_switch_data(outputs['show lldp neighbors detail'], outputs['show arp'])
+    return fleet
+
+
+def move_neighbors(fleet: Dict[str, Dict[str, Any]], moves: int, rng: random.Random):
+    """Échange les ports de deux voisins d'un même switch, moves fois"""
+    hosts = list(fleet)
+    for _ in range(moves):
+        neighbors = fleet[rng.choice(hosts)]['neighbors']
+        first, second = rng.sample(range(len(neighbors)), 2)
+        a, b = dict(neighbors[first]), dict(neighbors[second])
+        a['local_port'], b['local_port'] = b['local_port'], a['local_port']
+        neighbors[first], neighbors[second] = a, b
+
+
+def locate(fleet: Dict[str, Dict[str, Any]], mac: str) -> List[str]:
+    return [f"{host}:{neighbor['local_port']}" for host, data in fleet.items()
+            for neighbor in data['neighbors'] if neighbor.get('mac_address') == mac]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de l\'historique SQLite')
+    parser.add_argument('--switches', type=int, default=100, help='Nombre de switches')
+    parser.add_argument('--ports', type=int, default=24, help='Voisins par switch')
+    parser.add_argument('--polls', type=int, default=96, help='Exécutions simulées (une toutes les 15 minutes)')
+    parser.add_argument('--moves', type=int, default=5, help='Échanges de ports entre deux exécutions')
+    parser.add_argument('--lookups', type=int, default=2000, help='Recherches par type')
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    rng = random.Random(0)
+    fleet = build_fleet(args.switches, args.ports)
+    neighbors = sum(data['neighbors_count'] for data in fleet.values())
+    tracked_host = synthetic.switch_ip(0)
+    tracked_mac = fleet[tracked_host]['neighbors'][0]['mac_address']
+
+    work_dir = tempfile.mkdtemp(prefix='lldp-history-')
+    db_path = os.path.join(work_dir, 'history.db')
+    json_paths = []
+    truth = []
+    ingest_seconds = []
+    timings: Dict[str, float] = {}
+    try:
+        with HistoryStore(db_path) as store:
+            for poll in range(args.polls):
+                if poll:
+                    move_neighbors(fleet, args.moves, rng)
+                    # La MAC suivie change de port une exécution sur quatre
+                    if poll % 4 == 0:
+                        move_neighbors({tracked_host: fleet[tracked_host]}, 1, rng)
+                timestamp = (START + poll * POLL_INTERVAL).isoformat()
+                for data in fleet.values():
+                    data['timestamp'] = timestamp
+                results = {'discovery_timestamp': timestamp, 'switches': fleet,
+                           'summary': {'total_switches': len(fleet), 'successful_connections': len(fleet),
+                                       'total_neighbors': neighbors}}
+                truth.append((timestamp, locate(fleet, tracked_mac)))
+
+                with timed('ingest', timings):
+                    store.ingest(results)
+                ingest_seconds.append(timings['ingest'])
+
+                path = os.path.join(work_dir, f'lldp_discovery_{poll:04d}.json')
+                with open(path, 'w', encoding='utf-8') as f:
+                    json.dump(results, f, indent=2, ensure_ascii=False)
+                json_paths.append(path)
+
+            stats = store.stats()
+            db_size = sum(os.path.getsize(os.path.join(work_dir, name)) for name in os.listdir(work_dir)
+                          if name.startswith('history.db'))
+            json_size = sum(os.path.getsize(path) for path in json_paths)
+
+            print(f"Flotte synthétique: {args.switches} switches, {neighbors} voisins, "
+                  f"{args.polls} exécutions, {args.moves} échanges de ports par exécution")
+            print()
+            print_table([
+                ['Ajout d\'une exécution (moyenne)', f"{sum(ingest_seconds) / len(ingest_seconds) * 1000:.1f} ms"],
+                ['Ajout de la première exécution', f"{ingest_seconds[0] * 1000:.1f} ms"],
+                ['Voisins interrogés', stats['neighbors_polled']],
+                ['Observations en base', f"{stats['observations']} ({stats['open_observations']} en cours)"],
+                ['Taille de la base', f"{db_size / 1e6:.1f} Mo"],
+                ['Taille des fichiers JSON', f"{json_size / 1e6:.1f} Mo"],
+            ], ['Historique', 'Valeur'])
+            print()
+
+            count = args.lookups
+            hosts = list(fleet)
+            samples = [rng.choice(fleet[rng.choice(hosts)]['neighbors']) for _ in range(count)]
+            timings = {}
+            with timed('MAC', timings):
+                for neighbor in samples:
+                    store.query(mac=neighbor['mac_address'])
+            with timed('IP', timings):
+                for neighbor in samples:
+                    store.query(ip=neighbor['ip_addresses'][0])
+            with timed('nom', timings):
+                for neighbor in samples:
+                    store.query(hostname=neighbor['hostname'])
+            with timed('switch et port', timings):
+                for neighbor in samples:
+                    store.query(switch=tracked_host, port=neighbor['local_port'], current=True)
+            with timed('MAC à un instant', timings):
+                located = [store.query(mac=tracked_mac, at=timestamp) for timestamp, _ in truth]
+
+            scan_count = min(5, count)
+            with timed('relecture des fichiers JSON', timings):
+                for neighbor in samples[:scan_count]:
+                    for path in json_paths:
+                        with open(path, encoding='utf-8') as f:
+                            data = json.load(f)
+                        locate(data['switches'], neighbor['mac_address'])
+
+        rows = [[label, f"{seconds:.3f}s",
+                 f"{seconds / (len(truth) if label == 'MAC à un instant' else scan_count if label.startswith('relecture') else count) * 1000:.3f} ms"]
+                for label, seconds in timings.items()]
+        print_table(rows, ['Recherche', 'Durée', 'Par recherche'])
+        print()
+
+        correct = all([f"{row['switch']}:{row['local_port']}" for row in rows_at] == expected
+                      for rows_at, (_, expected) in zip(located, truth))
+        changes = stats['observations'] - neighbors
+        print(f"Observations créées après la première exécution: {changes} "
+              f"(au plus {2 * (args.moves + 1) * (args.polls - 1)} changements)")
+        print(f"Position de la MAC suivie correcte à chaque instant: {'oui' if correct else 'NON'}")
+        if not correct or changes > 2 * (args.moves + 1) * (args.polls - 1):
+            raise SystemExit(1)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Banc d'essai des mesures par phase sur une fabrique SSH factice
+
+Un des switches factices répond lentement à 'show arp'. Mesure :
+  - le surcoût des mesures par phase sur une découverte complète (même flotte,
+    avec et sans RunMetrics) ;
+  - la décomposition par phase (connexion, chaque commande, parsing, enrichissement)
+    et le switch le plus lent par phase.
+
+Vérifie que les mesures désignent le switch et la commande lents, que les
+résultats sont identiques avec et sans mesures, puis lance le script en ligne
+de commande avec --metrics-file (OpenMetrics) et --profile : résumé intégré à
+la sortie JSON, exposition lisible ligne à ligne et profil chargeable par pstats.
+
+Usage: python3 bench/bench_metrics.py --switches 20 --ports 48 --latency 0.02
+"""
+
+import argparse
+import json
+import logging
+import os
+import pstats
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+from typing import Any, Dict, List
+
+from common import setup_paths, strip_timestamps, timed, print_table, REPO_ROOT
+
+setup_paths()
+
+import synthetic  # noqa: E402
+from mock_ssh_server import MockSSHFabric, MockSwitch  # noqa: E402
+from command_timing import CommandTimingStore  # noqa: E402
+from lldp_discovery import discover_all_switches  # noqa: E402
+from run_metrics import RunMetrics  # noqa: E402
+
+SAMPLE_LINE = re.compile(r'^[a-zA-Z_:][a-zA-Z0-9_:]*(\{([a-zA-Z_][a-zA-Z0-9_]*="(\\.|[^"\\])*",?)*\})? -?[0-9.e+-]+$')
+
+
+def slowest(summary: Dict[str, Any], phase: str) -> str:
+    """Switch dont la phase (ou la commande 'command:<commande>') a duré le plus longtemps"""
+    def duration(data: Dict[str, Any]) -> float:
+        if phase.startswith('command:'):
+            return data['commands'].get(phase[len('command:'):], {}).get('seconds', 0.0)
+        return data['phases'].get(phase, 0.0)
+    return max(summary['switches'], key=lambda host: duration(summary['switches'][host]))
+
+
+def check_exposition(text: str) -> bool:
+    """Chaque ligne est un commentaire HELP/TYPE/UNIT, # EOF ou un échantillon valide"""
+    return all(line.startswith(('# HELP ', '# TYPE ', '# UNIT ')) or line == '# EOF' or SAMPLE_LINE.match(line)
+               for line in text.splitlines())
+
+
+def run_cli(config: List[Dict[str, Any]], work_dir: str, workers: int) -> List[Any]:
+    """Lance lldp_discovery.py avec --metrics-file et --profile et vérifie ses sorties"""
+    config_path = os.path.join(work_dir, 'switches_config.json')
+    output_path = os.path.join(work_dir, 'lldp_discovery.json')
+    metrics_path = os.path.join(work_dir, 'lldp_discovery.prom')
+    profile_path = os.path.join(work_dir, 'parse.prof')
+    with open(config_path, 'w', encoding='utf-8') as f:
+        json.dump({'switches': config}, f)
+
+    completed = subprocess.run([sys.executable, os.path.join('python', 'lldp_discovery.py'), '-c', config_path,
+                                '-o', output_path, '-w', str(workers), '--fixed-timing',
+                                '--metrics-file', metrics_path, '--metrics-format', 'openmetrics',
+                                '--profile', profile_path],
+                               cwd=REPO_ROOT, stdin=subprocess.DEVNULL, capture_output=True, text=True)
+    if completed.returncode != 0:
+        print(completed.stdout[-2000:], completed.stderr[-2000:])
+        return [("Exécution en ligne de commande", False)]
+
+    with open(output_path, encoding='utf-8') as f:
+        timings = json.load(f)['summary'].get('timings', {})
+    with open(metrics_path, encoding='utf-8') as f:
+        exposition = f.read()
+    stats = pstats.Stats(profile_path)
+    profiled = {function for _, _, function in stats.stats}
+
+    return [
+        ("Résumé intégré à la sortie JSON (tous les switches)", len(timings.get('switches', {})) == len(config)),
+        ("Exposition OpenMetrics valide et terminée par # EOF",
+         check_exposition(exposition) and exposition.endswith('# EOF\n')),
+        ("Profil pstats avec parsing LLDP, parsing ARP et enrichissement",
+         {'parse_lldp_neighbors', 'parse_arp_table', 'enrich_neighbors'} <= profiled),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark des mesures par phase')
+    parser.add_argument('--switches', type=int, default=20, help='Nombre de switches factices')
+    parser.add_argument('--ports', type=int, default=48, help='Voisins LLDP par switch')
+    parser.add_argument('--latency', type=float, default=0.02, help='Latence par commande (s)')
+    parser.add_argument('--slow-arp', type=float, default=0.5, help='Latence de \'show arp\' sur le switch lent (s)')
+    parser.add_argument('--workers', type=int, default=10, help='Switches interrogés en parallèle')
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    logging.getLogger('paramiko').setLevel(logging.CRITICAL)
+
+    slow_index = args.switches // 2
+    switches = [MockSwitch(synthetic.switch_ip(i), f"sw-{i}", synthetic.switch_outputs(i, args.ports, variant='aos-s'),
+                           args.latency, command_latency={'show arp': args.slow_arp} if i == slow_index else None)
+                for i in range(args.switches)]
+    slow_host = synthetic.switch_ip(slow_index)
+
+    timings: Dict[str, float] = {}
+    checks = []
+    work_dir = tempfile.mkdtemp(prefix='lldp-metrics-')
+    try:
+        with MockSSHFabric(switches) as fabric:
+            config = synthetic.fleet_config(args.switches, fabric.port)
+            # Premier passage pour apprendre les profils de temporisation
+            timing_store = CommandTimingStore()
+            discover_all_switches(config, workers=args.workers, timing_store=timing_store)
+
+            with timed('sans mesures', timings):
+                plain = discover_all_switches(config, workers=args.workers, timing_store=timing_store)
+            metrics = RunMetrics()
+            with timed('avec mesures', timings):
+                measured = discover_all_switches(config, workers=args.workers, timing_store=timing_store,
+                                                 metrics=metrics)
+            summary = metrics.summary()
+
+            checks.append(("Résultats identiques avec et sans mesures",
+                           json.dumps(strip_timestamps(plain), sort_keys=True)
+                           == json.dumps(strip_timestamps(measured), sort_keys=True)))
+            checks.append(("Commande lente attribuée au bon switch", slowest(summary, 'command:show arp') == slow_host))
+            checks.append(("Durée totale la plus longue sur le switch lent", slowest(summary, 'total') == slow_host))
+            checks.append(("Octets reçus mesurés pour chaque switch",
+                           all(data['bytes_received'] > 0 for data in summary['switches'].values())))
+            checks.append(("Exposition Prometheus valide", check_exposition(metrics.to_prometheus(measured['summary']))))
+            checks.extend(run_cli(config, work_dir, args.workers))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(f"Fabrique SSH factice: {args.switches} switches, {args.ports} voisins, latence "
+          f"{args.latency * 1000:.0f} ms par commande, 'show arp' à {args.slow_arp * 1000:.0f} ms sur {slow_host}")
+    print()
+    print_table([[label, f"{seconds:.2f}s"] for label, seconds in timings.items()], ['Découverte', 'Durée'])
+    print()
+    rows = [[phase, values['count'], f"{values['total'] * 1000:.1f} ms", f"{values['mean'] * 1000:.2f} ms",
+             f"{values['max'] * 1000:.2f} ms", slowest(summary, phase)]
+            for phase, values in summary['phases'].items()]
+    print_table(rows, ['Phase', 'Switches', 'Total', 'Moyenne', 'Max', 'Switch le plus lent'])
+    print()
+    for label, ok in checks:
+        print(f"{label}: {'oui' if ok else 'NON'}")
+    if not all(ok for _, ok in checks):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
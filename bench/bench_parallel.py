@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Banc d'essai de la découverte parallèle contre une flotte SSH factice
+
+Compare discover_all_switches en séquentiel et avec un pool de workers, vérifie
+que le JSON produit est identique et qu'un switch muet est abandonné à l'expiration
+de son délai sans bloquer les autres.
+
+Vérifie aussi qu'un switch lent abandonné en cours de collecte arrête sa tâche
+peu après son échéance, sans écrire dans le cache de snapshots, la capture
+brute, les profils de temporisation ni les mesures.
+
+Usage: python3 bench/bench_parallel.py --switches 20 --latency 0.5 --workers 10
+"""
+
+import argparse
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from common import setup_paths, strip_timestamps, timed, print_table
+
+setup_paths()
+
+import synthetic  # noqa: E402
+from mock_ssh_server import MockSSHFabric, MockSwitch  # noqa: E402
+from lldp_discovery import discover_all_switches  # noqa: E402
+from snapshot_cache import SnapshotCache  # noqa: E402
+from command_timing import CommandTimingStore  # noqa: E402
+from raw_capture import RawCapture, capture_filename  # noqa: E402
+from run_metrics import RunMetrics  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de la découverte parallèle')
+    parser.add_argument('--switches', type=int, default=20, help='Nombre de switches factices')
+    parser.add_argument('--ports', type=int, default=24, help='Voisins LLDP par switch')
+    parser.add_argument('--latency', type=float, default=0.5, help='Latence par commande (s)')
+    parser.add_argument('--workers', type=int, default=10, help='Taille du pool parallèle')
+    parser.add_argument('--switch-timeout', type=float, default=20, help='Délai maximal par switch (s)')
+    parser.add_argument('--hang', type=int, default=1, help='Nombre de switches muets ajoutés')
+    parser.add_argument('--slow-timeout', type=float, default=3,
+                        help='Délai maximal par switch du scénario de switch lent abandonné (s)')
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    logging.getLogger('paramiko').setLevel(logging.CRITICAL)
+
+    switches = [
+        MockSwitch(synthetic.switch_ip(i), f"sw-{i}", synthetic.switch_outputs(i, args.ports), args.latency)
+        for i in range(args.switches)
+    ]
+    hang_hosts = {synthetic.switch_ip(args.switches + i) for i in range(args.hang)}
+    # Switch lent: connexion et LLDP normaux, 'show arp' bien au-delà du délai maximal
+    slow_index = args.switches + args.hang
+    slow_host = synthetic.switch_ip(slow_index)
+    switches.append(MockSwitch(slow_host, f"sw-{slow_index}", synthetic.switch_outputs(slow_index, args.ports),
+                               args.latency, command_latency={'show arp': args.slow_timeout + 30}))
+    work_dir = tempfile.mkdtemp(prefix='lldp-parallel-')
+
+    with MockSSHFabric(switches, hang_hosts=hang_hosts) as fabric:
+        config = synthetic.fleet_config(args.switches, fabric.port)
+        timings = {}
+
+        with timed('séquentiel', timings):
+            sequential = discover_all_switches(config)
+        with timed(f'parallèle ({args.workers} workers)', timings):
+            parallel = discover_all_switches(config, workers=args.workers)
+
+        hang_config = config + synthetic.fleet_config(args.switches + args.hang, fabric.port)[args.switches:]
+        with timed(f'parallèle + {args.hang} muet(s)', timings):
+            with_hang = discover_all_switches(hang_config, workers=args.workers,
+                                              switch_timeout=args.switch_timeout)
+
+        # Switch lent abandonné, avec cache, capture, temporisation et mesures actifs
+        slow_config = config[:1] + [dict(config[0], host=slow_host)]
+        snapshot_cache = SnapshotCache(os.path.join(work_dir, 'snapshots'))
+        raw_capture = RawCapture(os.path.join(work_dir, 'raw'))
+        timing_store = CommandTimingStore(os.path.join(work_dir, 'command_timing.json'))
+        metrics = RunMetrics()
+        with timed(f'parallèle + 1 lent abandonné à {args.slow_timeout:g}s', timings):
+            with_slow = discover_all_switches(slow_config, workers=2, switch_timeout=args.slow_timeout,
+                                              snapshot_cache=snapshot_cache, timing_store=timing_store,
+                                              raw_capture=raw_capture, metrics=metrics)
+        returned = time.monotonic()
+        for thread in threading.enumerate():
+            if thread.name.startswith('lldp'):
+                thread.join(timeout=60)
+        worker_tail = time.monotonic() - returned
+        timing_store.save()
+        with open(timing_store.path, encoding='utf-8') as f:
+            slow_profile = json.load(f)['hosts'].get(slow_host, {})
+
+    side_effects = [name for name, found in (
+        ('cache de snapshots', os.path.exists(snapshot_cache._path(slow_host))),
+        ('capture brute', os.path.exists(os.path.join(raw_capture.capture_dir, capture_filename(slow_host)))),
+        ('temporisation', 'show arp' in slow_profile.get('commands', {})),
+        ('mesures', 'total' in metrics.summary()['switches'].get(slow_host, {}).get('phases', {})),
+    ) if found]
+    shutil.rmtree(work_dir, ignore_errors=True)
+
+    identical = json.dumps(strip_timestamps(sequential)) == json.dumps(strip_timestamps(parallel))
+    rows = [[label, f"{seconds:.2f}s"] for label, seconds in timings.items()]
+    rows.append(["fin de la tâche abandonnée après le retour", f"{worker_tail:.2f}s"])
+    print_table(rows, ['Mode', 'Durée'])
+    print()
+    checks = [
+        ("Sortie identique séquentiel/parallèle", identical),
+        ("Switch lent abandonné, l'autre collecté", list(with_slow['switches']) == [config[0]['host']]),
+        ("Tâche abandonnée arrêtée moins de 2s après le retour", worker_tail < 2),
+        ("Aucune écriture de la tâche abandonnée (cache, capture, temporisation, mesures)", not side_effects),
+    ]
+    print(f"Switches en succès avec muet(s): {with_hang['summary']['successful_connections']}"
+          f"/{with_hang['summary']['total_switches']}")
+    for label, ok in checks:
+        print(f"{label}: {'oui' if ok else 'NON'}")
+    if side_effects:
+        print(f"Écritures tardives: {', '.join(side_effects)}")
+    if not all(ok for _, ok in checks):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
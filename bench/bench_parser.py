@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Banc d'essai du parser LLDP partagé (python/aruba_parsers.py)
+
+Compare le parser en une passe à l'ancienne implémentation par re.search
+(conservée ci-dessous comme référence) sur une sortie synthétique de 10 000
+blocs voisins, vérifie que les résultats sont identiques et mesure le parser
+sur les variantes AOS-S (2530) et AOS-CX (6100).
+
+Usage: python3 bench/bench_parser.py --neighbors 10000
+"""
+
+import argparse
+import re
+import time
+
+from common import setup_paths, print_table
+
+setup_paths()
+
+import synthetic  # noqa: E402
+from aruba_parsers import parse_lldp_neighbors  # noqa: E402
+
+
+def legacy_parse_lldp_output(output, missing=None):
+    """Ancienne implémentation de _parse_lldp_output / parse_lldp_neighbors (référence)"""
+    def extract_field(text, pattern):
+        match = re.search(pattern, text, re.IGNORECASE | re.MULTILINE)
+        return match.group(1).strip() if match else missing
+
+    neighbors = []
+    neighbor_blocks = re.split(r'Local Port\s*:\s*(\S+)', output)[1:]
+    for i in range(0, len(neighbor_blocks), 2):
+        if i + 1 < len(neighbor_blocks):
+            neighbor_info = neighbor_blocks[i + 1]
+            neighbors.append({
+                'local_port': neighbor_blocks[i].strip(),
+                'remote_chassis_id': extract_field(neighbor_info, r'Chassis ID\s*:\s*(.+)'),
+                'remote_port_id': extract_field(neighbor_info, r'Port ID\s*:\s*(.+)'),
+                'remote_system_name': extract_field(neighbor_info, r'System Name\s*:\s*(.+)'),
+                'remote_system_description': extract_field(neighbor_info, r'System Description\s*:\s*(.+)'),
+                'remote_port_description': extract_field(neighbor_info, r'Port Description\s*:\s*(.+)'),
+                'management_addresses': re.findall(r'Management Address\s*:\s*(\d+\.\d+\.\d+\.\d+)',
+                                                   neighbor_info, re.IGNORECASE),
+            })
+    return neighbors
+
+
+def best_of(repeat, func, *args, **kwargs):
+    """Meilleur temps sur plusieurs exécutions et dernier résultat"""
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark du parser LLDP')
+    parser.add_argument('--neighbors', type=int, default=10000, help='Nombre de blocs voisins')
+    parser.add_argument('--repeat', type=int, default=3, help='Nombre de répétitions (meilleur temps retenu)')
+    args = parser.parse_args()
+
+    outputs = {
+        variant: synthetic.lldp_neighbors_detail(0, args.neighbors, variant)
+        for variant in ('generic', 'aos-s', 'aos-cx')
+    }
+
+    legacy_time, legacy = best_of(args.repeat, legacy_parse_lldp_output, outputs['generic'])
+    rows = [['ancien (re.search)', 'generic', f"{legacy_time * 1000:.1f} ms", '1.0x']]
+    identical = True
+
+    for missing in (None, ''):
+        _, expected = best_of(1, legacy_parse_lldp_output, outputs['generic'], missing)
+        identical &= parse_lldp_neighbors(outputs['generic'], missing=missing) == expected
+
+    for variant, output in outputs.items():
+        elapsed, parsed = best_of(args.repeat, parse_lldp_neighbors, output)
+        rows.append(['une passe', variant, f"{elapsed * 1000:.1f} ms", f"{legacy_time / elapsed:.1f}x"])
+        # Mêmes voisins quel que soit le format (hors représentation du port local et du chassis)
+        same = [{k: v for k, v in n.items() if k not in ('local_port', 'remote_chassis_id')} for n in parsed]
+        reference = [{k: v for k, v in n.items() if k not in ('local_port', 'remote_chassis_id')} for n in legacy]
+        identical &= same == reference
+
+    print(f"{args.neighbors} blocs voisins")
+    print_table(rows, ['Parser', 'Format', 'Durée', 'Accélération'])
+    print()
+    print(f"Résultats identiques: {'oui' if identical else 'NON'}")
+    if not identical:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
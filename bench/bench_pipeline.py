@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Banc d'essai du pipeline complet de collecte et de parsing sur une flotte synthétique
+
+Génère des sorties 'show lldp neighbors detail', 'show arp' et 'show system'
+(2530 / 6100) à l'échelle demandée puis mesure chaque étape : parsing LLDP,
+parsing ARP, enrichissement, parsing système, filtres Ansible (FilterModule),
+sérialisation JSON, et une exécution de bout en bout contre le serveur SSH
+factice. Pour chaque étape sont relevés la durée (meilleure de --repeat
+exécutions) et le pic mémoire (tracemalloc).
+
+Les résultats sont comparés à une référence (bench/baseline.json) enregistrée
+avec --save-baseline ; une étape plus lente ou plus gourmande que la référence
+au-delà de --tolerance fait échouer le banc.
+
+Usage: python3 bench/bench_pipeline.py --switches 200 --ports 48 --arp-extra 2000
+       python3 bench/bench_pipeline.py --save-baseline
+"""
+
+import argparse
+import json
+import logging
+import os
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Tuple
+
+from common import REPO_ROOT, setup_paths, timed, print_table
+
+setup_paths()
+sys.path.insert(0, os.path.join(REPO_ROOT, 'ansible', 'filter_plugins'))
+
+import synthetic  # noqa: E402
+from mock_ssh_server import MockSSHFabric, MockSwitch  # noqa: E402
+from aruba_filters import FilterModule  # noqa: E402
+from aruba_parsers import parse_system_info  # noqa: E402
+from command_timing import CommandTimingStore  # noqa: E402
+from lldp_discovery import ArubaLLDPDiscovery, discover_all_switches, new_results, record_switch_result  # noqa: E402
+
+DEFAULT_BASELINE = os.path.join(REPO_ROOT, 'bench', 'baseline.json')
+# En dessous de ces écarts absolus, une différence est considérée comme du bruit
+NOISE_SECONDS = 0.005
+NOISE_MB = 0.5
+
+
+def measure(fn: Callable[[], Any], repeat: int) -> Tuple[float, float, Any]:
+    """
+    Mesure une étape
+
+    Returns:
+        (meilleure durée en secondes, pic mémoire en Mo, résultat)
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return best, peak / 1e6, result
+
+
+def run_pipeline(fleet: List[Dict[str, str]], repeat: int) -> Dict[str, Dict[str, float]]:
+    """Mesure chaque étape du pipeline hors ligne sur l'ensemble de la flotte"""
+    parser = ArubaLLDPDiscovery('bench', 'bench', 'bench')
+    filters = FilterModule().filters()
+    stages = {}
+
+    def record(name: str, fn: Callable[[], Any]) -> Any:
+        seconds, peak_mb, result = measure(fn, repeat)
+        stages[name] = {'seconds': round(seconds, 4), 'peak_mb': round(peak_mb, 2)}
+        return result
+
+    neighbors = record('_parse_lldp_output',
+                       lambda: [parser._parse_lldp_output(outputs['show lldp neighbors detail']) for outputs in fleet])
+    arp_tables = record('_parse_arp_output',
+                        lambda: [parser._parse_arp_output(outputs['show arp']) for outputs in fleet])
+    enriched = record('_enrich_neighbor_data',
+                      lambda: [parser._enrich_neighbor_data(n, a) for n, a in zip(neighbors, arp_tables)])
+    record('parse_system_info', lambda: [parse_system_info(outputs['show system']) for outputs in fleet])
+
+    def ansible_filters():
+        return [
+            (filters['enrich_with_arp'](filters['parse_lldp_neighbors'](outputs['show lldp neighbors detail']),
+                                        filters['parse_arp_table'](outputs['show arp'])),
+             filters['parse_system_info'](outputs['show system']))
+            for outputs in fleet
+        ]
+    record('FilterModule (4 filtres)', ansible_filters)
+
+    results = new_results(len(fleet))
+    for index, switch_neighbors in enumerate(enriched):
+        record_switch_result(results, synthetic.switch_ip(index), {
+            'switch_ip': synthetic.switch_ip(index), 'timestamp': '', 'neighbors_count': len(switch_neighbors),
+            'neighbors': switch_neighbors
+        })
+    record('json.dumps (indent=2)', lambda: json.dumps(results, indent=2, ensure_ascii=False))
+    return stages
+
+
+def run_end_to_end(fleet: List[Dict[str, str]], switches: int, workers: int) -> Dict[str, float]:
+    """Découverte complète contre le serveur SSH factice"""
+    mock_switches = [MockSwitch(synthetic.switch_ip(i), f"sw-{i}", fleet[i]) for i in range(switches)]
+    timing_file = os.path.join(tempfile.mkdtemp(prefix='lldp-bench-'), 'command_timing.json')
+    timings = {}
+
+    with MockSSHFabric(mock_switches) as fabric:
+        config = synthetic.fleet_config(switches, fabric.port)
+        tracemalloc.start()
+        try:
+            with timed('e2e', timings):
+                results = discover_all_switches(config, workers=workers, timing_store=CommandTimingStore(timing_file))
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    if results['summary']['successful_connections'] != switches:
+        raise SystemExit(f"Découverte de bout en bout incomplète: "
+                         f"{results['summary']['successful_connections']}/{switches}")
+    return {'seconds': round(timings['e2e'], 4), 'peak_mb': round(peak / 1e6, 2)}
+
+
+def compare(stages: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]],
+            tolerance: float) -> Tuple[List[List[Any]], List[str]]:
+    """Lignes du tableau de résultats et liste des régressions par rapport à la référence"""
+    rows, regressions = [], []
+    for name, current in stages.items():
+        reference = baseline.get(name)
+        if reference is None:
+            rows.append([name, f"{current['seconds']:.3f}s", f"{current['peak_mb']:.1f} Mo", '-', '-'])
+            continue
+
+        ratio = current['seconds'] / reference['seconds'] if reference['seconds'] else 1.0
+        status = f"{(ratio - 1) * 100:+.0f}%"
+        if (current['seconds'] > reference['seconds'] * (1 + tolerance)
+                and current['seconds'] - reference['seconds'] > NOISE_SECONDS):
+            regressions.append(f"{name}: {reference['seconds']:.3f}s -> {current['seconds']:.3f}s")
+            status += ' RÉGRESSION'
+        if (current['peak_mb'] > reference['peak_mb'] * (1 + tolerance)
+                and current['peak_mb'] - reference['peak_mb'] > NOISE_MB):
+            regressions.append(f"{name}: pic mémoire {reference['peak_mb']:.1f} -> {current['peak_mb']:.1f} Mo")
+            status += ' MÉMOIRE'
+        rows.append([name, f"{current['seconds']:.3f}s", f"{current['peak_mb']:.1f} Mo",
+                     f"{reference['seconds']:.3f}s / {reference['peak_mb']:.1f} Mo", status])
+    return rows, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark du pipeline de collecte et de parsing')
+    parser.add_argument('--switches', type=int, default=200, help='Nombre de switches synthétiques')
+    parser.add_argument('--ports', type=int, default=48, help='Ports occupés par switch')
+    parser.add_argument('--neighbors-per-port', type=int, default=1, help='Voisins LLDP par port')
+    parser.add_argument('--arp-extra', type=int, default=2000, help='Entrées ARP supplémentaires par switch')
+    parser.add_argument('--variant', choices=['generic', 'aos-s', 'aos-cx'], default='aos-s',
+                        help='Format des sorties CLI (aos-s: 2530, aos-cx: 6100)')
+    parser.add_argument('--repeat', type=int, default=3, help='Exécutions par étape (meilleure retenue)')
+    parser.add_argument('--e2e-switches', type=int, default=20,
+                        help='Switches de la découverte de bout en bout (0 pour la désactiver)')
+    parser.add_argument('--workers', type=int, default=10, help='Workers de la découverte de bout en bout')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='Fichier de référence')
+    parser.add_argument('--save-baseline', action='store_true', help='Enregistre les résultats comme référence')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='Dégradation tolérée par rapport à la référence (défaut: 0.25, soit 25%%)')
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    logging.getLogger('paramiko').setLevel(logging.CRITICAL)
+
+    scenario = {key: getattr(args, key) for key in ('switches', 'ports', 'neighbors_per_port', 'arp_extra',
+                                                    'variant', 'e2e_switches', 'workers')}
+    fleet = [synthetic.switch_outputs(i, args.ports, args.arp_extra, args.variant, args.neighbors_per_port)
+             for i in range(max(args.switches, args.e2e_switches))]
+    neighbors = args.ports * args.neighbors_per_port
+    print(f"Flotte synthétique {args.variant}: {args.switches} switches, {neighbors} voisins et "
+          f"{neighbors + args.arp_extra} entrées ARP par switch")
+    print()
+
+    stages = run_pipeline(fleet[:args.switches], args.repeat)
+    if args.e2e_switches:
+        stages[f'bout en bout SSH factice ({args.e2e_switches} switches)'] = run_end_to_end(
+            fleet, args.e2e_switches, args.workers)
+
+    baseline = {}
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            saved = json.load(f)
+        if saved.get('scenario') == scenario:
+            baseline = saved.get('stages', {})
+        else:
+            print(f"Référence {args.baseline} enregistrée pour un autre scénario, comparaison ignorée")
+            print()
+
+    rows, regressions = compare(stages, baseline, args.tolerance)
+    print_table(rows, ['Étape', 'Durée', 'Pic mémoire', 'Référence', 'Écart'])
+    print()
+    print(f"Pic RSS du processus: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} Mo")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump({'scenario': scenario, 'python': sys.version.split()[0], 'stages': stages}, f, indent=2)
+            f.write('\n')
+        print(f"Référence enregistrée dans {os.path.relpath(args.baseline, REPO_ROOT)}")
+    elif regressions:
+        print()
+        print("Régressions:")
+        for regression in regressions:
+            print(f"  - {regression}")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
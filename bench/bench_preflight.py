@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Banc d'essai de la vérification rapide (test_connectivity.py) sur une flotte SSH factice
+
+La flotte mélange des switches joignables, des switches éteints (SYN ignorés),
+un switch dont le port est ouvert mais le SSH muet et un switch configuré avec
+un mauvais mot de passe. Mesure :
+  - l'ancien test séquentiel (connexion Netmiko complète et trois commandes par
+    switch, 30 s de timeout), extrapolé pour les switches qui ne répondent pas ;
+  - la vérification parallèle : sonde TCP concurrente puis authentification seule
+    des switches qui répondent ;
+  - la découverte de toute la flotte, sans cache puis avec --skip-dead (switches
+    morts écartés d'après le cache de vérification).
+
+Vérifie le statut de chaque switch, que seuls les switches qui répondent sont
+authentifiés, que la découverte avec le cache donne les mêmes voisins, et la
+durée de validité du cache (expiration, identifiants corrigés).
+
+Usage: python3 bench/bench_preflight.py --switches 40 --dead 5 --workers 10
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+from typing import Dict
+
+from common import setup_paths, strip_timestamps, timed, print_table
+
+setup_paths()
+
+import synthetic  # noqa: E402
+from mock_ssh_server import MockSSHFabric, MockSwitch  # noqa: E402
+from command_timing import CommandTimingStore  # noqa: E402
+from lldp_discovery import discover_all_switches  # noqa: E402
+from preflight import (PreflightCache, run_preflight, select_live_switches,  # noqa: E402
+                       STATUS_OK, STATUS_UNREACHABLE, STATUS_AUTH_FAILED)
+from test_connectivity import test_switch_connection  # noqa: E402
+
+OLD_TIMEOUT = 30
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de la vérification rapide de connectivité')
+    parser.add_argument('--switches', type=int, default=40, help='Switches joignables')
+    parser.add_argument('--dead', type=int, default=5, help='Switches éteints (SYN ignorés)')
+    parser.add_argument('--ports', type=int, default=12, help='Voisins LLDP par switch')
+    parser.add_argument('--latency', type=float, default=0.02, help='Latence par commande (s)')
+    parser.add_argument('--workers', type=int, default=10, help='Switches interrogés en parallèle')
+    parser.add_argument('--switch-timeout', type=float, default=10,
+                        help='Délai maximal par switch de la découverte (s)')
+    parser.add_argument('--sequential-sample', type=int, default=5,
+                        help='Switches joignables testés avec l\'ancien test séquentiel')
+    args = parser.parse_args()
+
+    # Les échecs de connexion aux switches éteints sont attendus
+    logging.getLogger().setLevel(logging.CRITICAL)
+    logging.getLogger('paramiko').setLevel(logging.CRITICAL)
+
+    switches = [MockSwitch(synthetic.switch_ip(i), f"sw-{i}", synthetic.switch_outputs(i, args.ports, variant='aos-s'),
+                           args.latency) for i in range(args.switches)]
+    dead_hosts = {synthetic.switch_ip(args.switches + i) for i in range(args.dead)}
+    hang_host = synthetic.switch_ip(args.switches + args.dead)
+    bad_password_host = synthetic.switch_ip(0)
+
+    rows = []
+    checks = []
+    timings: Dict[str, float] = {}
+    work_dir = tempfile.mkdtemp(prefix='lldp-preflight-')
+    cache_path = os.path.join(work_dir, 'preflight_cache.json')
+    try:
+        with MockSSHFabric(switches, hang_hosts={hang_host}, blackhole_hosts=dead_hosts) as fabric:
+            config = synthetic.fleet_config(args.switches + args.dead + 1, fabric.port)
+            config[0]['password'] = 'wrong'
+            live_hosts = {switch.host for switch in switches} - {bad_password_host}
+
+            # Ancien test: une session Netmiko complète et trois commandes par switch, l'un après l'autre
+            sample = config[1:1 + args.sequential_sample]
+            with timed('ancien test', timings), contextlib.redirect_stdout(io.StringIO()):
+                for switch_config in sample:
+                    test_switch_connection(switch_config['host'], switch_config['username'],
+                                           switch_config['password'], port=switch_config['port'])
+            per_switch = timings['ancien test'] / len(sample)
+            silent = args.dead + 1
+            rows.append([f"Ancien test séquentiel (extrapolé, {silent} muets à {OLD_TIMEOUT}s)",
+                         f"{per_switch * (len(config) - silent) + silent * OLD_TIMEOUT:.0f}s"])
+
+            logins_before = fabric.total_logins
+            cache = PreflightCache(cache_path, ttl=900)
+            with timed('vérification', timings):
+                results = run_preflight(config, probe_timeout=1.0, auth_timeout=3, workers=args.workers, cache=cache)
+            cache.save()
+            rows.append(['Vérification parallèle (sonde TCP + authentification)', f"{timings['vérification']:.2f}s"])
+
+            status = {result['host']: result['status'] for result in results}
+            expected = {host: STATUS_OK for host in live_hosts}
+            expected.update({host: STATUS_UNREACHABLE for host in dead_hosts | {hang_host}})
+            expected[bad_password_host] = STATUS_AUTH_FAILED
+            checks.append(("Statut correct pour chaque switch", status == expected))
+            checks.append(("Authentification tentée seulement sur les switches qui répondent",
+                           fabric.total_logins - logins_before == len(live_hosts)))
+
+            timing_store = CommandTimingStore()
+            with timed('découverte sans cache', timings):
+                plain = discover_all_switches(config, workers=args.workers, switch_timeout=args.switch_timeout,
+                                              timing_store=timing_store)
+            rows.append(['Découverte de toute la flotte, sans cache', f"{timings['découverte sans cache']:.2f}s"])
+
+            reloaded = PreflightCache(cache_path, ttl=900)
+            with timed('découverte --skip-dead', timings):
+                live, skipped = select_live_switches(config, reloaded)
+                skipping = discover_all_switches(live, workers=args.workers, switch_timeout=args.switch_timeout,
+                                                 timing_store=timing_store)
+            rows.append([f"Découverte avec --skip-dead ({len(skipped)} écartés)",
+                         f"{timings['découverte --skip-dead']:.2f}s"])
+
+            checks.append(("Switches morts et mot de passe refusé écartés d'après le cache",
+                           set(skipped) == dead_hosts | {hang_host, bad_password_host}))
+            checks.append(("Mêmes voisins avec et sans cache",
+                           json.dumps(strip_timestamps(plain)['switches'], sort_keys=True)
+                           == json.dumps(strip_timestamps(skipping)['switches'], sort_keys=True)))
+
+            fixed = [dict(switch_config) for switch_config in config]
+            fixed[0]['password'] = 'bench'
+            checks.append(("Identifiants corrigés: le switch n'est plus écarté",
+                           bad_password_host not in select_live_switches(fixed, reloaded)[1]))
+            expired = PreflightCache(cache_path, ttl=0.5)
+            time.sleep(0.6)
+            checks.append(("Résultats expirés ignorés", not select_live_switches(config, expired)[1]))
+
+            probed_live, probed_skipped = select_live_switches(config, PreflightCache(None), use_cache=False,
+                                                               probe=True, probe_timeout=1.0)
+            checks.append(("--preflight seul: switches éteints écartés par la sonde TCP",
+                           set(probed_skipped) == dead_hosts))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(f"Flotte SSH factice: {args.switches} switches joignables (dont un mauvais mot de passe), "
+          f"{args.dead} éteints, 1 au SSH muet")
+    print()
+    print_table(rows, ['Étape', 'Durée'])
+    print()
+    for label, ok in checks:
+        print(f"{label}: {'oui' if ok else 'NON'}")
+    if not all(ok for _, ok in checks):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Banc d'essai de l'empreinte mémoire des voisins LLDP sur une grande flotte
+
+Compare, pour toute la flotte synthétique (200 000 voisins par défaut) :
+  - l'ancienne représentation : un dict par voisin, copié par l'enrichissement
+    ARP, chaînes répétées (descriptions système, ports) conservées par voisin ;
+  - les dicts actuels : chaînes répétées internées, enrichissement en place.
+
+Mesure la mémoire conservée par les résultats et le pic pendant le parsing
+(tracemalloc), et vérifie que le JSON produit est identique octet pour octet.
+
+Usage: python3 bench/bench_records.py --switches 4200 --ports 48
+"""
+
+import argparse
+import gc
+import json
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from common import setup_paths, print_table
+
+setup_paths()
+
+import synthetic  # noqa: E402
+from aruba_parsers import (parse_lldp_neighbors, parse_arp_table, build_mac_index, enrich_neighbors,  # noqa: E402
+                           normalize_mac, IPV4_PATTERN, NEIGHBOR_FIELDS, _DISPATCH_CACHE, _dispatch,
+                           _BLOCK_START, _MGMT_ADDRESS)
+
+
+def legacy_parse(output: str, missing: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Ancien parse_lldp_neighbors: un dict par voisin (référence)"""
+    neighbors = []
+    neighbor = None
+    for line in output.splitlines():
+        raw_key, sep, value = line.partition(':')
+        if not sep:
+            continue
+        action = _DISPATCH_CACHE.get(raw_key, 0)
+        if action == 0:
+            action = _dispatch(raw_key)
+        if action is None:
+            continue
+        value = value.strip()
+        if not value:
+            continue
+        if action == _BLOCK_START:
+            neighbor = {'local_port': value.split()[0]}
+            for field in NEIGHBOR_FIELDS:
+                neighbor[field] = missing
+            neighbor['management_addresses'] = []
+            neighbors.append(neighbor)
+        elif neighbor is None:
+            continue
+        elif action == _MGMT_ADDRESS:
+            match = IPV4_PATTERN.match(value)
+            if match:
+                neighbor['management_addresses'].append(match.group(0))
+        elif not neighbor[action]:
+            neighbor[action] = value
+    return neighbors
+
+
+def legacy_enrich(neighbors: List[Dict[str, Any]], mac_index: Dict[str, List[str]]) -> List[Dict[str, Any]]:
+    """Ancien enrich_neighbors: chaque voisin copié avant enrichissement (référence)"""
+    enriched = []
+    for neighbor in neighbors:
+        enriched_neighbor = neighbor.copy()
+        chassis_id = (neighbor.get('remote_chassis_id') or '').lower()
+        mac = normalize_mac(chassis_id)
+        matching_ips = mac_index.get(mac, []) if mac else []
+        mgmt_addresses = neighbor.get('management_addresses', [])
+        enriched_neighbor.update({
+            'ip_addresses': list(dict.fromkeys(matching_ips + mgmt_addresses)),
+            'mac_address': mac or chassis_id,
+            'hostname': neighbor.get('remote_system_name', 'Unknown')
+        })
+        enriched.append(enriched_neighbor)
+    return enriched
+
+
+def collect(fleet: List[Dict[str, str]], parse: Callable, enrich: Callable) -> Dict[str, List[Any]]:
+    """Parse et enrichit chaque switch comme la découverte, seuls les voisins enrichis étant conservés"""
+    results = {}
+    for index, outputs in enumerate(fleet):
+        neighbors = parse(outputs['show lldp neighbors detail'])
+        mac_index = build_mac_index(parse_arp_table(outputs['show arp']))
+        results[synthetic.switch_ip(index)] = enrich(neighbors, mac_index)
+    return results
+
+
+def measure(fleet: List[Dict[str, str]], parse: Callable, enrich: Callable) -> Tuple[float, float, float, Any]:
+    """
+    Collecte la flotte sous tracemalloc
+
+    Returns:
+        (durée en secondes, mémoire conservée en Mo, pic en Mo, résultats)
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        start = time.perf_counter()
+        results = collect(fleet, parse, enrich)
+        seconds = time.perf_counter() - start
+        gc.collect()
+        retained, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return seconds, retained / 1e6, peak / 1e6, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark mémoire des voisins LLDP')
+    parser.add_argument('--switches', type=int, default=4200, help='Nombre de switches synthétiques')
+    parser.add_argument('--ports', type=int, default=48, help='Voisins LLDP par switch')
+    parser.add_argument('--variant', choices=['generic', 'aos-s', 'aos-cx'], default='aos-s',
+                        help='Format des sorties CLI')
+    args = parser.parse_args()
+
+    fleet = [synthetic.switch_outputs(i, args.ports, variant=args.variant) for i in range(args.switches)]
+    total = args.switches * args.ports
+
+    rows = []
+    measured = {}
+    for label, parse, enrich in (('dicts copiés (ancien)', legacy_parse, legacy_enrich),
+                                 ('dicts internés, en place', parse_lldp_neighbors, enrich_neighbors)):
+        seconds, retained, peak, results = measure(fleet, parse, enrich)
+        measured[label] = (retained, results)
+        rows.append([label, f"{seconds:.2f}s", f"{retained:.0f} Mo", f"{retained * 1e6 / total:.0f} o",
+                     f"{peak:.0f} Mo"])
+
+    (legacy_mb, legacy), (record_mb, records) = measured.values()
+    identical = json.dumps(legacy, indent=2, ensure_ascii=False) == json.dumps(records, indent=2, ensure_ascii=False)
+
+    print(f"Flotte synthétique {args.variant}: {args.switches} switches, {total} voisins")
+    print()
+    print_table(rows, ['Représentation', 'Durée', 'Mémoire conservée', 'Par voisin', 'Pic'])
+    print()
+    print(f"Réduction de la mémoire conservée: {(1 - record_mb / legacy_mb) * 100:.0f}%")
+    print(f"JSON identique octet pour octet: {'oui' if identical else 'NON'}")
+    if not identical or record_mb >= legacy_mb:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Banc d'essai du rejeu hors ligne des transcriptions brutes
+
+Génère un répertoire de capture synthétique (format --save-raw), puis compare
+le rejeu sur un seul processus et sur tous les cœurs ; vérifie que le JSON
+produit est identique et que Netmiko n'est pas importé. Un répertoire de
+capture réel peut être passé avec --capture-dir.
+
+Usage: python3 bench/bench_replay.py --switches 2000 --ports 48 --arp-extra 2000
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+
+from common import setup_paths, strip_timestamps, timed, print_table
+
+setup_paths()
+
+import synthetic  # noqa: E402
+from raw_capture import RawCapture  # noqa: E402
+from replay import replay_captures  # noqa: E402
+
+
+def build_corpus(capture_dir: str, switches: int, ports: int, arp_extra: int):
+    """Écrit une capture synthétique au format --save-raw"""
+    capture = RawCapture(capture_dir)
+    hosts = [synthetic.switch_ip(i) for i in range(switches)]
+    capture.write_manifest(hosts)
+    for i, host in enumerate(hosts):
+        outputs = synthetic.switch_outputs(i, ports, arp_extra)
+        commands = [{'command': command, 'started_at': '', 'duration': 0.0, 'output': output}
+                    for command, output in outputs.items()]
+        capture.save(host, 'aruba_os', commands)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark du rejeu hors ligne')
+    parser.add_argument('--switches', type=int, default=2000, help='Nombre de switches capturés')
+    parser.add_argument('--ports', type=int, default=48, help='Voisins LLDP par switch')
+    parser.add_argument('--arp-extra', type=int, default=2000, help='Entrées ARP supplémentaires par switch')
+    parser.add_argument('--workers', type=int, default=None, help='Processus du rejeu parallèle (défaut: cœurs)')
+    parser.add_argument('--capture-dir', default=None, help='Répertoire de capture existant (défaut: synthétique)')
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+
+    capture_dir = args.capture_dir
+    if capture_dir is None:
+        capture_dir = tempfile.mkdtemp(prefix='lldp-raw-')
+        timings = {}
+        with timed('génération', timings):
+            build_corpus(capture_dir, args.switches, args.ports, args.arp_extra)
+        size = sum(os.path.getsize(os.path.join(capture_dir, name)) for name in os.listdir(capture_dir))
+        print(f"Capture synthétique: {args.switches} switches, {size / 1e6:.1f} Mo compressés "
+              f"({timings['génération']:.1f}s)")
+        print()
+
+    workers = args.workers or os.cpu_count() or 1
+    timings = {}
+    with timed('séquentiel (1 processus)', timings):
+        single = replay_captures(capture_dir, workers=1)
+    with timed(f'parallèle ({workers} processus)', timings):
+        parallel = replay_captures(capture_dir, workers=workers)
+
+    switches = parallel['summary']['successful_connections']
+    rows = [[label, f"{seconds:.2f}s", f"{switches / seconds:.0f}"] for label, seconds in timings.items()]
+    print_table(rows, ['Rejeu', 'Durée', 'Switches/s'])
+    print()
+
+    identical = json.dumps(strip_timestamps(single)) == json.dumps(strip_timestamps(parallel))
+    print(f"Sortie identique 1 processus/{workers} processus: {'oui' if identical else 'NON'}")
+    print(f"Netmiko importé: {'oui' if 'netmiko' in sys.modules else 'non'}")
+    if not identical or 'netmiko' in sys.modules:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Banc d'essai du collecteur REST AOS-CX face à la collecte CLI SSH
+
+Mesure :
+  - le coût de conversion des voisins LLDP et de la table ARP : parser CLI
+    AOS-CX (texte) contre réponses JSON de l'API ;
+  - la découverte de bout en bout d'une flotte 6100 factice, par la CLI (serveur
+    SSH factice) et par l'API REST (serveur HTTP factice), à latence égale par
+    commande et par requête ;
+  - la réutilisation des sessions REST par le pool du mode démon.
+
+Vérifie que les deux collectes produisent les mêmes voisins, que chaque switch
+REST n'ouvre qu'une connexion TCP et qu'un login, et que le rejeu d'une capture
+REST (--save-raw) redonne le même résultat.
+
+Usage: python3 bench/bench_rest.py --switches 20 --ports 48 --latency 0.05
+"""
+
+import argparse
+import json
+import logging
+import shutil
+import tempfile
+import time
+from typing import Any, Dict, List
+
+from common import setup_paths, strip_timestamps, timed, print_table
+
+setup_paths()
+
+import synthetic  # noqa: E402
+from mock_ssh_server import MockSSHFabric, MockSwitch  # noqa: E402
+from mock_rest_server import MockRestFabric, MockRestSwitch, rest_payloads  # noqa: E402
+from aoscx_rest import (ARP_REQUEST, CHASSIS_REQUEST, LLDP_REQUEST, SYSTEM_REQUEST,  # noqa: E402
+                        parse_rest_arp_table, parse_rest_lldp_neighbors)
+from aruba_parsers import parse_arp_table, parse_lldp_neighbors  # noqa: E402
+from command_timing import CommandTimingStore  # noqa: E402
+from lldp_discovery import discover_all_switches  # noqa: E402
+from polling_daemon import SessionPool  # noqa: E402
+from raw_capture import RawCapture  # noqa: E402
+from replay import replay_captures  # noqa: E402
+
+
+def rest_config(count: int, port: int) -> List[Dict[str, Any]]:
+    """Configuration des switches factices en collecte REST (HTTP, sans TLS)"""
+    config = synthetic.fleet_config(count, port)
+    for switch_config in config:
+        switch_config.update({'device_type': 'aruba_aoscx_rest', 'use_ssl': False})
+    return config
+
+
+def parse_costs(neighbors: int, repeat: int) -> List[List[Any]]:
+    """Conversion CLI vs JSON d'un switch de neighbors voisins"""
+    outputs = synthetic.switch_outputs(0, neighbors, variant='aos-cx')
+    payloads = synthetic.aoscx_rest_payloads(0, neighbors)
+    lldp_json, arp_json = json.dumps(payloads['lldp']), json.dumps(payloads['arp'])
+
+    timings: Dict[str, float] = {}
+    with timed('CLI', timings):
+        for _ in range(repeat):
+            cli = (parse_lldp_neighbors(outputs['show lldp neighbors detail']), parse_arp_table(outputs['show arp']))
+    with timed('REST', timings):
+        for _ in range(repeat):
+            rest = (parse_rest_lldp_neighbors(lldp_json), parse_rest_arp_table(arp_json))
+    if cli != rest:
+        raise SystemExit("Les conversions CLI et REST diffèrent")
+
+    size_cli = len(outputs['show lldp neighbors detail']) + len(outputs['show arp'])
+    size_rest = len(lldp_json) + len(arp_json)
+    return [[label, f"{seconds / repeat * 1000:.2f} ms", f"{(size_cli if label == 'CLI' else size_rest) / 1e3:.0f} ko"]
+            for label, seconds in timings.items()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark du collecteur REST AOS-CX')
+    parser.add_argument('--switches', type=int, default=20, help='Nombre de switches factices')
+    parser.add_argument('--ports', type=int, default=48, help='Voisins LLDP par switch')
+    parser.add_argument('--latency', type=float, default=0.05, help='Latence par commande CLI et par requête REST (s)')
+    parser.add_argument('--workers', type=int, default=10, help='Switches interrogés en parallèle')
+    parser.add_argument('--repeat', type=int, default=200, help='Répétitions de la mesure de conversion')
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    logging.getLogger('paramiko').setLevel(logging.CRITICAL)
+
+    print(f"Conversion des sorties d'un switch de {args.ports} voisins ({args.repeat} répétitions)")
+    print()
+    print_table(parse_costs(args.ports, args.repeat), ['Collecte', 'LLDP + ARP', 'Taille des réponses'])
+    print()
+
+    ssh_switches = [MockSwitch(synthetic.switch_ip(i), f"sw-{i}",
+                               synthetic.switch_outputs(i, args.ports, variant='aos-cx'), args.latency)
+                    for i in range(args.switches)]
+    rest_switches = []
+    for i in range(args.switches):
+        payloads = synthetic.aoscx_rest_payloads(i, args.ports)
+        rest_switches.append(MockRestSwitch(synthetic.switch_ip(i), rest_payloads({
+            LLDP_REQUEST: payloads['lldp'], ARP_REQUEST: payloads['arp'],
+            SYSTEM_REQUEST: payloads['system'], CHASSIS_REQUEST: payloads['chassis'],
+            'system?attributes=hostname': {'hostname': payloads['system']['hostname']},
+        }), args.latency))
+
+    rows = []
+    checks = []
+    timings: Dict[str, float] = {}
+    capture_dir = tempfile.mkdtemp(prefix='lldp-rest-')
+    try:
+        with MockSSHFabric(ssh_switches) as ssh_fabric, MockRestFabric(rest_switches) as rest_fabric:
+            ssh_config = synthetic.fleet_config(args.switches, ssh_fabric.port)
+            with timed('CLI SSH', timings):
+                cli_results = discover_all_switches(ssh_config, workers=args.workers, switch_timeout=60,
+                                                    timing_store=CommandTimingStore())
+            rows.append(['CLI SSH', f"{timings['CLI SSH']:.2f}s", cli_results['summary']['successful_connections'],
+                         ssh_fabric.total_logins, '-'])
+
+            config = rest_config(args.switches, rest_fabric.port)
+            with timed('API REST', timings):
+                rest_results = discover_all_switches(config, workers=args.workers, switch_timeout=60,
+                                                     timing_store=CommandTimingStore(),
+                                                     raw_capture=RawCapture(capture_dir))
+            rows.append(['API REST', f"{timings['API REST']:.2f}s", rest_results['summary']['successful_connections'],
+                         sum(rest_fabric.logins.values()), sum(rest_fabric.connections.values())])
+
+            checks.append(("Mêmes voisins en CLI et en REST",
+                           json.dumps(strip_timestamps(cli_results), sort_keys=True)
+                           == json.dumps(strip_timestamps(rest_results), sort_keys=True)))
+            checks.append(("Une connexion TCP, un login et deux requêtes par switch REST",
+                           all(rest_fabric.connections.get(switch.host) == 1 and rest_fabric.logins.get(switch.host) == 1
+                               and rest_fabric.requests.get(switch.host) == 2 for switch in rest_switches)))
+            replayed = replay_captures(capture_dir, workers=1)
+            checks.append(("Rejeu de la capture REST identique",
+                           json.dumps(strip_timestamps(replayed)['switches'], sort_keys=True)
+                           == json.dumps(strip_timestamps(rest_results)['switches'], sort_keys=True)))
+
+            # Mode démon: sessions REST conservées d'un cycle à l'autre
+            logins_before = sum(rest_fabric.logins.values())
+            connections_before = sum(rest_fabric.connections.values())
+            pool = SessionPool(max_sessions=args.switches)
+            cycles = []
+            try:
+                for _ in range(3):
+                    start = time.perf_counter()
+                    discover_all_switches(config, workers=args.workers, switch_timeout=60, discover_fn=pool.discover)
+                    cycles.append(time.perf_counter() - start)
+            finally:
+                pool.close()
+            rows.append(['API REST, démon (3 cycles)', ' / '.join(f"{seconds:.2f}s" for seconds in cycles),
+                         args.switches, sum(rest_fabric.logins.values()) - logins_before,
+                         sum(rest_fabric.connections.values()) - connections_before])
+            checks.append(("Démon: un seul login REST par switch sur trois cycles",
+                           sum(rest_fabric.logins.values()) - logins_before == args.switches))
+    finally:
+        shutil.rmtree(capture_dir, ignore_errors=True)
+
+    print(f"Flotte 6100 factice: {args.switches} switches, {args.ports} voisins, "
+          f"latence {args.latency * 1000:.0f} ms par commande ou requête, {args.workers} en parallèle")
+    print()
+    print_table(rows, ['Découverte', 'Durée', 'Switches', 'Logins', 'Connexions TCP'])
+    print()
+    for label, ok in checks:
+        print(f"{label}: {'oui' if ok else 'NON'}")
+    if not all(ok for _, ok in checks):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Banc d'essai des nouvelles tentatives et des disjoncteurs sur une flotte SSH factice
+
+La flotte mélange des switches sains, des switches instables (première
+connexion TCP coupée à chaque interrogation), des switches éteints (SYN
+ignorés) et un switch configuré avec un mauvais mot de passe. Mesure :
+  - une interrogation sans nouvelle tentative, puis avec --retries : switches
+    instables récupérés, durée bornée par le délai maximal par switch ;
+  - une série d'interrogations sans puis avec disjoncteurs persistants : les
+    switches en échec répété ne coûtent plus leur timeout à chaque passage.
+
+Vérifie que seules les erreurs passagères sont retentées, que les disjoncteurs
+ouverts écartent les bons switches, que la sonde d'un disjoncteur semi-ouvert
+est unique et double la durée de repos en cas d'échec, que des identifiants
+corrigés referment le disjoncteur, et que l'état figure dans le résumé JSON
+produit par le script en ligne de commande.
+
+Usage: python3 bench/bench_retry.py --switches 30 --flaky 5 --dead 5 --polls 4
+"""
+
+import argparse
+import json
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+
+from common import setup_paths, timed, print_table, REPO_ROOT
+
+setup_paths()
+
+import synthetic  # noqa: E402
+from mock_ssh_server import MockSSHFabric, MockSwitch  # noqa: E402
+from command_timing import CommandTimingStore  # noqa: E402
+from lldp_discovery import discover_all_switches  # noqa: E402
+from retry_scheduler import RetryScheduler, CIRCUIT_OPEN, ERROR_AUTH  # noqa: E402
+
+
+def reset_flaky(switches: List[MockSwitch], flaky: int):
+    """Chaque switch instable coupe de nouveau sa première connexion"""
+    for switch in switches[1:1 + flaky]:
+        switch.drop_sessions = 1
+
+
+def run_cli(config: List[Dict[str, Any]], work_dir: str, args: argparse.Namespace) -> Dict[str, Any]:
+    """Lance lldp_discovery.py avec --retries et --circuit-breaker et retourne le résumé JSON"""
+    config_path = os.path.join(work_dir, 'switches_config.json')
+    output_path = os.path.join(work_dir, 'lldp_discovery.json')
+    with open(config_path, 'w', encoding='utf-8') as f:
+        json.dump({'switches': config}, f)
+    completed = subprocess.run([sys.executable, os.path.join('python', 'lldp_discovery.py'), '-c', config_path,
+                                '-o', output_path, '-w', str(args.workers), '--switch-timeout',
+                                str(args.switch_timeout), '--retries', '2', '--retry-delay', str(args.retry_delay),
+                                '--circuit-breaker', '--breaker-file', os.path.join(work_dir, 'cli_breaker.json'),
+                                '--breaker-threshold', '1'],
+                               cwd=REPO_ROOT, stdin=subprocess.DEVNULL, capture_output=True, text=True)
+    if completed.returncode != 0:
+        print(completed.stdout[-2000:], completed.stderr[-2000:])
+        return {}
+    with open(output_path, encoding='utf-8') as f:
+        return json.load(f)['summary']
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark des nouvelles tentatives et des disjoncteurs')
+    parser.add_argument('--switches', type=int, default=30, help='Switches joignables')
+    parser.add_argument('--flaky', type=int, default=5, help='Switches instables parmi les joignables')
+    parser.add_argument('--dead', type=int, default=5, help='Switches éteints (SYN ignorés)')
+    parser.add_argument('--ports', type=int, default=12, help='Voisins LLDP par switch')
+    parser.add_argument('--latency', type=float, default=0.02, help='Latence par commande (s)')
+    parser.add_argument('--workers', type=int, default=10, help='Switches interrogés en parallèle')
+    parser.add_argument('--switch-timeout', type=float, default=3, help='Délai maximal par switch (s)')
+    parser.add_argument('--retry-delay', type=float, default=0.2, help='Délai avant la première nouvelle tentative')
+    parser.add_argument('--polls', type=int, default=4, help='Interrogations successives de la flotte')
+    args = parser.parse_args()
+
+    # Les échecs de connexion sont attendus
+    logging.getLogger().setLevel(logging.CRITICAL)
+    logging.getLogger('paramiko').setLevel(logging.CRITICAL)
+
+    switches = [MockSwitch(synthetic.switch_ip(i), f"sw-{i}", synthetic.switch_outputs(i, args.ports, variant='aos-s'),
+                           args.latency) for i in range(args.switches)]
+    dead_hosts = {synthetic.switch_ip(args.switches + i) for i in range(args.dead)}
+    bad_password_host = synthetic.switch_ip(0)
+    flaky_hosts = {switch.host for switch in switches[1:1 + args.flaky]}
+    failing_hosts = dead_hosts | {bad_password_host}
+
+    rows = []
+    checks = []
+    timings: Dict[str, float] = {}
+    work_dir = tempfile.mkdtemp(prefix='lldp-retry-')
+    breaker_path = os.path.join(work_dir, 'circuit_breaker.json')
+    discover = {'workers': args.workers, 'switch_timeout': args.switch_timeout}
+    try:
+        with MockSSHFabric(switches, blackhole_hosts=dead_hosts) as fabric:
+            config = synthetic.fleet_config(args.switches + args.dead, fabric.port)
+            config[0]['password'] = 'wrong'
+            discover['timing_store'] = CommandTimingStore()
+            # Premier passage pour apprendre les profils de temporisation (switches instables déjà servis)
+            discover_all_switches(config, **discover)
+
+            # Une interrogation, sans puis avec nouvelles tentatives
+            reset_flaky(switches, args.flaky)
+            with timed('sans nouvelle tentative', timings):
+                plain = discover_all_switches(config, **discover)
+            reset_flaky(switches, args.flaky)
+            scheduler = RetryScheduler(max_retries=2, base_delay=args.retry_delay)
+            with timed('--retries 2', timings):
+                retried = discover_all_switches(config, scheduler=scheduler, **discover)
+            summary = scheduler.summary()
+            for label, results in (('sans nouvelle tentative', plain), ('--retries 2', retried)):
+                rows.append([f"1 interrogation, {label}",
+                             f"{results['summary']['successful_connections']}/{len(config)}",
+                             f"{timings[label]:.2f}s"])
+
+            checks.append(("Switches instables récupérés par les nouvelles tentatives",
+                           set(retried['switches']) - set(plain['switches']) == flaky_hosts))
+            checks.append(("Nouvelles tentatives limitées aux erreurs passagères dans le délai du switch",
+                           summary['retries'] == args.flaky and summary['errors'].get(ERROR_AUTH) == 1))
+            checks.append(("Durée avec nouvelles tentatives bornée",
+                           timings['--retries 2'] < timings['sans nouvelle tentative'] + args.switch_timeout))
+
+            # Série d'interrogations, sans puis avec disjoncteurs persistants
+            for label, path in (('sans disjoncteur', None), ('avec disjoncteurs', breaker_path)):
+                durations = []
+                for _ in range(args.polls):
+                    reset_flaky(switches, args.flaky)
+                    poll_scheduler = RetryScheduler(path, max_retries=2, base_delay=args.retry_delay,
+                                                    failure_threshold=2, cooldown=600)
+                    with timed('poll', timings):
+                        results = discover_all_switches(config, scheduler=poll_scheduler, **discover)
+                    poll_scheduler.save()
+                    durations.append(timings['poll'])
+                rows.append([f"{args.polls} interrogations, {label}",
+                             f"{results['summary']['successful_connections']}/{len(config)}",
+                             f"{sum(durations):.2f}s ({' + '.join(f'{d:.1f}' for d in durations)})"])
+                timings[label] = sum(durations)
+
+            circuits = poll_scheduler.summary()['circuits']
+            checks.append(("Disjoncteurs ouverts sur les switches éteints et le mot de passe refusé",
+                           {host for host, circuit in circuits.items() if circuit['state'] == CIRCUIT_OPEN}
+                           == failing_hosts))
+            checks.append(("Switches écartés à la dernière interrogation",
+                           set(poll_scheduler.summary()['skipped']) == failing_hosts))
+            checks.append(("Série d'interrogations plus rapide avec disjoncteurs",
+                           timings['avec disjoncteurs'] < timings['sans disjoncteur']))
+
+            # Durée de repos écoulée: une seule sonde par switch, réouverture pour une durée doublée
+            with open(breaker_path, encoding='utf-8') as f:
+                state = json.load(f)
+            for entry in state['hosts'].values():
+                entry['open_until'] = (datetime.now() - timedelta(seconds=1)).isoformat()
+            with open(breaker_path, 'w', encoding='utf-8') as f:
+                json.dump(state, f)
+            reset_flaky(switches, args.flaky)
+            probe_scheduler = RetryScheduler(breaker_path, max_retries=2, base_delay=args.retry_delay,
+                                             failure_threshold=2, cooldown=600)
+            discover_all_switches(config, scheduler=probe_scheduler, **discover)
+            probed = probe_scheduler.summary()
+            checks.append(("Disjoncteur semi-ouvert: une seule sonde, sans nouvelle tentative",
+                           probed['retries'] == args.flaky and not probed['skipped']))
+            checks.append(("Sonde en échec: disjoncteur rouvert avec une durée de repos doublée",
+                           all(probed['circuits'][host]['state'] == CIRCUIT_OPEN
+                               and probed['circuits'][host]['trips'] == 2 for host in failing_hosts)))
+            probe_scheduler.save()
+
+            fixed = [dict(switch_config) for switch_config in config]
+            fixed[0]['password'] = 'bench'
+            fixed_scheduler = RetryScheduler(breaker_path, failure_threshold=2, cooldown=600)
+            fixed_results = discover_all_switches(fixed, scheduler=fixed_scheduler, **discover)
+            checks.append(("Identifiants corrigés: disjoncteur refermé après un succès",
+                           bad_password_host in fixed_results['switches']
+                           and bad_password_host not in fixed_scheduler.summary()['circuits']))
+
+            reset_flaky(switches, args.flaky)
+            cli_summary = run_cli(config, work_dir, args)
+            breaker = cli_summary.get('circuit_breaker', {})
+            checks.append(("État des disjoncteurs dans le résumé JSON du script",
+                           breaker.get('retries') == args.flaky
+                           and set(breaker.get('circuits', {})) == failing_hosts))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(f"Flotte SSH factice: {args.switches} switches joignables (dont {args.flaky} instables et un mauvais "
+          f"mot de passe), {args.dead} éteints, délai maximal {args.switch_timeout:g}s par switch")
+    print()
+    print_table(rows, ['Exécution', 'Switches', 'Durée'])
+    print()
+    for label, ok in checks:
+        print(f"{label}: {'oui' if ok else 'NON'}")
+    if not all(ok for _, ok in checks):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
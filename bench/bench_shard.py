@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Banc d'essai de la découverte répartie (--shard i/N) et de la sous-commande merge
+
+Hors ligne, sur un inventaire synthétique (5 000 switches par défaut) :
+  - durée de l'affectation et équilibre des partitions ;
+  - switches déplacés en passant de N à N+1 nœuds, hachage de rendez-vous
+    comparé à un hachage modulo N ;
+  - affectation identique d'un processus à l'autre (PYTHONHASHSEED différents).
+
+De bout en bout, contre le serveur SSH factice (deux switches de cœur
+"arp_source") : exécution sur un seul nœud comparée à N nœuds lancés en
+parallèle (une partition en NDJSON), puis fusion par merge. Vérifie que la
+fusion est identique à l'exécution unique et que merge refuse une partition
+manquante, en double ou d'un autre découpage.
+
+Usage: python3 bench/bench_shard.py --inventory 5000 --switches 30 --shards 3 --latency 0.3
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from common import setup_paths, strip_timestamps, timed, print_table, REPO_ROOT
+
+setup_paths()
+
+import synthetic  # noqa: E402
+from mock_ssh_server import MockSSHFabric, MockSwitch  # noqa: E402
+from sharding import shard_of, select_shard  # noqa: E402
+
+ASSIGNMENT_SCRIPT = ("import sys; sys.path.insert(0, 'python'); from sharding import shard_of; "
+                     "print(','.join(str(shard_of(f'10.{i // 250}.0.{i % 250}', 4)) for i in range(500)))")
+
+
+def modulo_shard(host: str, count: int) -> int:
+    """Hachage stable modulo N (référence)"""
+    return int.from_bytes(hashlib.blake2b(host.encode('utf-8'), digest_size=8).digest(), 'big') % count + 1
+
+
+def moved(hosts: List[str], count: int, assign) -> int:
+    """Switches qui changent de partition en passant de count à count + 1 nœuds"""
+    return sum(1 for host in hosts if assign(host, count) != assign(host, count + 1))
+
+
+def comparable(results: Dict[str, Any]) -> Dict[str, Any]:
+    """Switches et compteurs du résumé, sans horodatages"""
+    summary = results['summary']
+    return {'switches': strip_timestamps(results)['switches'],
+            'summary': {key: summary[key] for key in ('total_switches', 'successful_connections', 'total_neighbors')}}
+
+
+def cli(args: List[str]) -> subprocess.Popen:
+    return subprocess.Popen([sys.executable, os.path.join('python', 'lldp_discovery.py')] + args, cwd=REPO_ROOT,
+                            stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+
+
+def wait_all(processes: List[subprocess.Popen]) -> bool:
+    ok = True
+    for process in processes:
+        output, _ = process.communicate()
+        if process.returncode != 0:
+            print(output[-2000:])
+            ok = False
+    return ok
+
+
+def merge(inputs: List[str], output: str, extra: Optional[List[str]] = None) -> Tuple[int, str]:
+    """Lance la sous-commande merge et retourne (code de sortie, journal)"""
+    process = cli(['merge', '-o', output] + (extra or []) + inputs)
+    log, _ = process.communicate()
+    return process.returncode, log
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de la découverte répartie')
+    parser.add_argument('--inventory', type=int, default=5000, help='Switches de l\'inventaire hors ligne')
+    parser.add_argument('--switches', type=int, default=30, help='Switches de la fabrique factice')
+    parser.add_argument('--shards', type=int, default=3, help='Nœuds de la découverte répartie')
+    parser.add_argument('--ports', type=int, default=12, help='Voisins LLDP par switch')
+    parser.add_argument('--latency', type=float, default=0.3, help='Latence par commande en secondes')
+    parser.add_argument('--workers', type=int, default=5, help='Switches interrogés en parallèle par nœud')
+    args = parser.parse_args()
+
+    rows = []
+    checks = []
+    timings: Dict[str, float] = {}
+
+    # Affectation hors ligne
+    inventory = [{'host': f"10.{i // 62500}.{i // 250 % 250}.{i % 250 + 1}"} for i in range(args.inventory)]
+    hosts = [switch_config['host'] for switch_config in inventory]
+    for count in (4, 8):
+        start = time.perf_counter()
+        sizes = [len(select_shard(inventory, index, count)[0]) for index in range(1, count + 1)]
+        elapsed = time.perf_counter() - start
+        rows.append([f"Affectation de {args.inventory} switches en {count} partitions", f"{elapsed:.3f}s",
+                     f"{min(sizes)} à {max(sizes)} switches"])
+        checks.append((f"{count} partitions disjointes couvrant l'inventaire", sum(sizes) == args.inventory))
+        rendezvous, modulo = moved(hosts, count, shard_of), moved(hosts, count, modulo_shard)
+        rows.append([f"Passage de {count} à {count + 1} nœuds: switches déplacés", '',
+                     f"{rendezvous} (rendez-vous) vs {modulo} (modulo)"])
+        checks.append((f"Passage de {count} à {count + 1} nœuds: environ 1/{count + 1} des switches déplacés",
+                       rendezvous < 1.5 * args.inventory / (count + 1) and rendezvous < modulo))
+    assignments = {subprocess.run([sys.executable, '-c', ASSIGNMENT_SCRIPT], cwd=REPO_ROOT, capture_output=True,
+                                  text=True, env=dict(os.environ, PYTHONHASHSEED=seed)).stdout
+                   for seed in ('1', '2', 'random')}
+    checks.append(("Affectation identique d'un processus à l'autre", len(assignments) == 1 and '' not in assignments))
+
+    # De bout en bout sur la fabrique factice
+    work_dir = tempfile.mkdtemp(prefix='lldp-shard-')
+    try:
+        switches = [MockSwitch(synthetic.switch_ip(i), f"sw-{i}", synthetic.switch_outputs(i, args.ports),
+                               args.latency) for i in range(args.switches)]
+        with MockSSHFabric(switches) as fabric:
+            config = [dict(switch_config, arp_source=True) if index < 2 else switch_config
+                      for index, switch_config in enumerate(synthetic.fleet_config(args.switches, fabric.port))]
+            config_path = os.path.join(work_dir, 'switches_config.json')
+            with open(config_path, 'w', encoding='utf-8') as f:
+                json.dump({'switches': config}, f)
+            common_args = ['-c', config_path, '-w', str(args.workers), '--fixed-timing']
+
+            single_path = os.path.join(work_dir, 'single.json')
+            with timed('single', timings):
+                single_ok = wait_all([cli(common_args + ['-o', single_path])])
+
+            outputs = [os.path.join(work_dir, f"shard{index}.{'ndjson' if index == args.shards else 'json'}")
+                       for index in range(1, args.shards + 1)]
+            with timed('shards', timings):
+                shards_ok = wait_all([cli(common_args + ['--shard', f"{index}/{args.shards}", '-o', output]
+                                          + (['--format', 'ndjson'] if output.endswith('.ndjson') else []))
+                                      for index, output in enumerate(outputs, 1)])
+
+        merged_path = os.path.join(work_dir, 'merged.json')
+        with timed('merge', timings):
+            merge_code, merge_log = merge(outputs, merged_path)
+        rows.append([f"Découverte sur un seul nœud ({args.switches} switches, {args.workers} en parallèle)",
+                     f"{timings['single']:.2f}s", ''])
+        rows.append([f"Découverte sur {args.shards} nœuds en parallèle", f"{timings['shards']:.2f}s",
+                     f"x{timings['single'] / timings['shards']:.1f}"])
+        rows.append(["Fusion des sorties partielles (merge)", f"{timings['merge']:.2f}s", ''])
+
+        if not (single_ok and shards_ok and merge_code == 0):
+            print(merge_log[-2000:])
+            checks.append(("Exécutions en ligne de commande et fusion", False))
+        else:
+            with open(single_path, encoding='utf-8') as f:
+                single = json.load(f)
+            with open(merged_path, encoding='utf-8') as f:
+                merged = json.load(f)
+            checks.append(("Fusion identique à l'exécution sur un seul nœud (switches, ordre, compteurs)",
+                           comparable(merged) == comparable(single)
+                           and list(merged['switches']) == list(single['switches'])))
+            checks.append(("Durées par switch de toutes les partitions dans le résumé fusionné",
+                           set(merged['summary']['timings']['switches']) == set(single['switches'])))
+
+            code, log = merge(outputs[1:], os.path.join(work_dir, 'missing.json'))
+            checks.append(("Partition manquante refusée", code != 0 and 'partitions manquantes: 1/' in log))
+            code, _ = merge(outputs[1:], os.path.join(work_dir, 'partial.json'), ['--allow-missing'])
+            partial = {}
+            if code == 0:
+                with open(os.path.join(work_dir, 'partial.json'), encoding='utf-8') as f:
+                    partial = json.load(f)['summary']
+            shard_one = len(select_shard(config, 1, args.shards)[0]) - 2
+            checks.append(("--allow-missing: switches de la partition manquante comptés en échec",
+                           partial.get('total_switches') == args.switches
+                           and partial.get('successful_connections') == args.switches - shard_one
+                           and partial.get('shards', {}).get('missing') == [1]))
+            code, log = merge(outputs + outputs[:1], os.path.join(work_dir, 'duplicate.json'))
+            checks.append(("Partition en double refusée", code != 0 and 'en double' in log))
+            other = os.path.join(work_dir, 'other.json')
+            with open(outputs[0], encoding='utf-8') as f:
+                foreign = json.load(f)
+            foreign['summary']['shard']['count'] += 1
+            with open(other, 'w', encoding='utf-8') as f:
+                json.dump(foreign, f)
+            code, log = merge(outputs[1:] + [other], os.path.join(work_dir, 'foreign.json'))
+            checks.append(("Partition d'un autre découpage refusée", code != 0 and 'autre découpage' in log))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(f"Inventaire hors ligne: {args.inventory} switches ; fabrique factice: {args.switches} switches "
+          f"dont 2 sources ARP, latence {args.latency * 1000:.0f} ms par commande")
+    print()
+    print_table(rows, ['Étape', 'Durée', 'Résultat'])
+    print()
+    for label, ok in checks:
+        print(f"{label}: {'oui' if ok else 'NON'}")
+    if not all(ok for _, ok in checks):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Banc d'essai du démarrage de la ligne de commande et du coût d'import des modules
+
+Mesure avec 'python -X importtime' le temps d'import cumulé de chaque module
+(médiane de plusieurs processus) et vérifie qu'aucun ne charge la pile SSH
+(netmiko, paramiko, cryptography, asyncssh), requests, cProfile ni preflight :
+ils ne sont importés qu'au démarrage d'une collecte, avec --profile ou avec
+--preflight. Le coût de la pile SSH, évité par les commandes hors ligne, est
+mesuré de la même façon.
+
+Mesure aussi la durée de bout en bout des commandes hors ligne (--help, query,
+merge) par rapport à un interpréteur nu, et vérifie qu'elles fonctionnent
+depuis un répertoire sans output/ (journal et sortie créés au besoin).
+
+Usage: python3 bench/bench_startup.py --runs 7 --import-budget 150 --cli-budget 150
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import List, Tuple
+
+from common import setup_paths, print_table, REPO_ROOT, PYTHON_DIR
+
+setup_paths()
+
+from sharding import select_shard  # noqa: E402
+
+SCRIPT = os.path.join(PYTHON_DIR, 'lldp_discovery.py')
+FILTER_PLUGINS = os.path.join(REPO_ROOT, 'ansible', 'filter_plugins')
+
+# Modules chargés seulement par une collecte en direct, --profile ou --preflight
+HEAVY_MODULES = ('netmiko', 'paramiko', 'cryptography', 'asyncssh', 'requests', 'urllib3', 'cProfile', 'preflight')
+
+# (module, chemin d'import, modules lourds autorisés)
+MODULES = [
+    ('aruba_parsers', PYTHON_DIR, ()),
+    ('lldp_discovery', PYTHON_DIR, ()),
+    ('async_discovery', PYTHON_DIR, ()),
+    ('aoscx_rest', PYTHON_DIR, ()),
+    ('replay', PYTHON_DIR, ()),
+    ('sharding', PYTHON_DIR, ()),
+    ('history_store', PYTHON_DIR, ()),
+    ('aruba_filters', FILTER_PLUGINS, ()),
+]
+
+# Pile SSH importée par une collecte en direct (référence du coût évité)
+SSH_STACK = [('netmiko', PYTHON_DIR, HEAVY_MODULES), ('asyncssh', PYTHON_DIR, HEAVY_MODULES)]
+
+
+def import_time(module: str, path: str) -> Tuple[float, List[str]]:
+    """
+    Import d'un module dans un processus neuf avec -X importtime
+
+    Returns:
+        (temps d'import cumulé en millisecondes, modules importés)
+    """
+    completed = subprocess.run([sys.executable, '-X', 'importtime', '-c',
+                                f"import sys; sys.path.insert(0, {path!r}); import {module}"],
+                               cwd=REPO_ROOT, stdin=subprocess.DEVNULL, capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(f"import {module}: {completed.stderr.strip().splitlines()[-1]}")
+    cumulative = None
+    imported = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        _, total, name = line.split('|')
+        if not total.strip().isdigit():
+            continue
+        imported.append(name.strip())
+        if name.strip() == module:
+            cumulative = int(total) / 1000
+    return cumulative or 0.0, imported
+
+
+def wall_time(args: List[str], runs: int, cwd: str = REPO_ROOT) -> Tuple[float, subprocess.CompletedProcess]:
+    """Durée médiane de bout en bout d'une commande, en millisecondes, et sa dernière exécution"""
+    durations = []
+    completed = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        completed = subprocess.run([sys.executable] + args, cwd=cwd, stdin=subprocess.DEVNULL,
+                                   capture_output=True, text=True)
+        durations.append((time.perf_counter() - start) * 1000)
+    return statistics.median(durations), completed
+
+
+def write_partials(work_dir: str) -> List[str]:
+    """Deux sorties partielles --shard minimales d'un inventaire de quatre switches"""
+    config = [{'host': f"192.168.1.{i}"} for i in range(1, 5)]
+    paths = []
+    for index in (1, 2):
+        _, shard = select_shard(config, index, 2)
+        path = os.path.join(work_dir, f'shard{index}.json')
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'discovery_timestamp': '2024-05-02T14:00:00', 'switches': {},
+                       'summary': {'total_switches': 0, 'successful_connections': 0, 'total_neighbors': 0,
+                                   'shard': shard}}, f)
+        paths.append(path)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark du démarrage de la ligne de commande')
+    parser.add_argument('--runs', type=int, default=7, help='Processus par mesure (médiane)')
+    parser.add_argument('--import-budget', type=float, default=150,
+                        help='Temps d\'import cumulé maximal de chaque module, en ms')
+    parser.add_argument('--cli-budget', type=float, default=150,
+                        help='Surcoût maximal d\'une commande hors ligne sur un interpréteur nu, en ms')
+    args = parser.parse_args()
+
+    rows = []
+    checks = []
+
+    for module, path, allowed in MODULES + SSH_STACK:
+        samples = [import_time(module, path) for _ in range(args.runs)]
+        cumulative = statistics.median(sample[0] for sample in samples)
+        imported = set(samples[0][1])
+        heavy = [name for name in HEAVY_MODULES if name in imported and name not in allowed]
+        rows.append([f"import {module}", f"{cumulative:.1f} ms", ', '.join(heavy) or '-'])
+        if (module, path, allowed) in SSH_STACK:
+            continue
+        checks.append((f"import {module} sans pile SSH, requests, cProfile ni preflight", not heavy))
+        checks.append((f"import {module} en moins de {args.import_budget:.0f} ms", cumulative < args.import_budget))
+
+    work_dir = tempfile.mkdtemp(prefix='lldp-startup-')
+    try:
+        partials = write_partials(work_dir)
+        bare, _ = wall_time(['-c', 'pass'], args.runs)
+        rows.append(["Interpréteur nu (python -c pass)", f"{bare:.0f} ms", ''])
+        commands = [
+            ('lldp_discovery.py --help', [SCRIPT, '--help']),
+            ('lldp_discovery.py query --help', [SCRIPT, 'query', '--help']),
+            ('lldp_discovery.py merge (2 partitions)',
+             [SCRIPT, 'merge', '-o', os.path.join(work_dir, 'merged.json')] + partials),
+        ]
+        for label, command in commands:
+            median, completed = wall_time(command, args.runs)
+            rows.append([label, f"{median:.0f} ms", f"+{median - bare:.0f} ms"])
+            checks.append((f"{label} en moins de {args.cli_budget:.0f} ms de plus qu'un interpréteur nu",
+                           completed.returncode == 0 and median - bare < args.cli_budget))
+
+        # Répertoire de travail sans output/: le journal et la sortie sont créés au besoin
+        bare_dir = os.path.join(work_dir, 'bare')
+        os.makedirs(bare_dir)
+        config_path = os.path.join(bare_dir, 'switches_config.json')
+        with open(config_path, 'w', encoding='utf-8') as f:
+            json.dump({'switches': []}, f)
+        _, completed = wall_time([SCRIPT, '-c', config_path], 1, cwd=bare_dir)
+        checks.append(("Sans répertoire output/: arrêt propre et journal créé",
+                       completed.returncode == 1 and 'Traceback' not in completed.stderr
+                       and os.path.exists(os.path.join(bare_dir, 'output', 'lldp_discovery.log'))))
+        shutil.rmtree(os.path.join(bare_dir, 'output'))
+        _, completed = wall_time([SCRIPT, 'merge', '-o', os.path.join('output', 'merged.json')] + partials, 1,
+                                 cwd=bare_dir)
+        checks.append(("Sans répertoire output/: merge crée le répertoire de sortie",
+                       completed.returncode == 0 and os.path.exists(os.path.join(bare_dir, 'output', 'merged.json'))))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(f"Python {sys.version.split()[0]}, médiane de {args.runs} processus par mesure")
+    print()
+    print_table(rows, ['Mesure', 'Durée', 'Modules lourds / surcoût'])
+    print()
+    for label, ok in checks:
+        print(f"{label}: {'oui' if ok else 'NON'}")
+    if not all(ok for _, ok in checks):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
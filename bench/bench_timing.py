@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Banc d'essai de la temporisation adaptative des commandes
+
+Compare la découverte avec le global_delay_factor fixe historique et avec les
+profils de temporisation appris (premier passage à froid, puis profils
+chargés depuis le fichier), affiche la latence par commande et vérifie que le
+JSON produit est identique.
+
+Usage: python3 bench/bench_timing.py --switches 10 --ports 48 --latency 0.05
+"""
+
+import argparse
+import json
+import logging
+import os
+import tempfile
+
+from common import setup_paths, strip_timestamps, timed, print_table
+
+setup_paths()
+
+import synthetic  # noqa: E402
+from mock_ssh_server import MockSSHFabric, MockSwitch  # noqa: E402
+from lldp_discovery import discover_all_switches  # noqa: E402
+from command_timing import CommandTimingStore  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de la temporisation adaptative')
+    parser.add_argument('--switches', type=int, default=10, help='Nombre de switches factices')
+    parser.add_argument('--ports', type=int, default=48, help='Voisins LLDP par switch')
+    parser.add_argument('--latency', type=float, default=0.05, help='Latence par commande (s)')
+    parser.add_argument('--workers', type=int, default=1, help='Taille du pool parallèle')
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    logging.getLogger('paramiko').setLevel(logging.CRITICAL)
+
+    switches = [
+        MockSwitch(synthetic.switch_ip(i), f"sw-{i}", synthetic.switch_outputs(i, args.ports), args.latency)
+        for i in range(args.switches)
+    ]
+    timing_file = os.path.join(tempfile.mkdtemp(prefix='lldp-timing-'), 'command_timing.json')
+
+    with MockSSHFabric(switches) as fabric:
+        config = synthetic.fleet_config(args.switches, fabric.port)
+        timings = {}
+
+        with timed('délai fixe (global_delay_factor=2)', timings):
+            fixed = discover_all_switches(config, workers=args.workers)
+
+        store = CommandTimingStore(timing_file)
+        with timed('adaptatif, à froid', timings):
+            adaptive = discover_all_switches(config, workers=args.workers, timing_store=store)
+        store.save()
+
+        store = CommandTimingStore(timing_file)
+        with timed('adaptatif, profils chargés', timings):
+            discover_all_switches(config, workers=args.workers, timing_store=store)
+
+    rows = [[label, f"{seconds:.2f}s", f"{seconds / args.switches * 1000:.0f} ms"] for label, seconds in timings.items()]
+    print_table(rows, ['Mode', 'Durée', 'Par switch'])
+    print()
+
+    rows = [[command, latency['count'], f"{latency['mean'] * 1000:.0f} ms", f"{latency['p95'] * 1000:.0f} ms",
+             f"{latency['max'] * 1000:.0f} ms"]
+            for command, latency in store.latency_report().items()]
+    print_table(rows, ['Commande', 'Mesures', 'Moyenne', 'p95', 'Max'])
+    print()
+
+    identical = json.dumps(strip_timestamps(fixed)) == json.dumps(strip_timestamps(adaptive))
+    print(f"Sortie identique délai fixe/adaptatif: {'oui' if identical else 'NON'}")
+    if not identical:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Banc d'essai de la construction du graphe de topologie
+
+Génère une fabrique synthétique en arbre (liens inter-switches vus des deux
+côtés, voisins d'accès sur les autres ports), construit le graphe sur des
+fractions croissantes de la flotte pour vérifier que le coût par voisin reste
+constant, puis mesure les recherches et les exports JSON et GraphML. Vérifie
+que chaque lien inter-switches n'apparaît qu'une fois et que chaque switch est
+indexé par sa MAC de châssis.
+
+Usage: python3 bench/bench_topology.py --switches 2000 --ports 48
+"""
+
+import argparse
+import logging
+import os
+import tempfile
+import time
+from typing import Any, Dict, List, Tuple
+
+from common import setup_paths, timed, print_table
+
+setup_paths()
+
+import synthetic  # noqa: E402
+from lldp_discovery import ArubaLLDPDiscovery  # noqa: E402
+from topology import build_topology  # noqa: E402
+
+
+def build_fleet(switches: int, ports: int, fanout: int, variant: str) -> List[Tuple[str, Dict[str, Any]]]:
+    """Données de découverte d'une fabrique synthétique, comme results['switches'].items()"""
+    links = synthetic.fabric_links(switches, fanout, ports)
+    parser = ArubaLLDPDiscovery('bench', 'bench', 'bench')
+    fleet = []
+    for index in range(switches):
+        outputs = synthetic.switch_outputs(index, ports, variant=variant, links=links[index])
+        parser.host = synthetic.switch_ip(index)
+        fleet.append((parser.host, parser.build_switch_data(outputs['show lldp neighbors detail'],
+                                                             outputs['show arp'])))
+    return fleet
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark du graphe de topologie')
+    parser.add_argument('--switches', type=int, default=2000, help='Nombre de switches de la fabrique')
+    parser.add_argument('--ports', type=int, default=48, help='Voisins d\'accès par switch')
+    parser.add_argument('--fanout', type=int, default=4, help='Switches reliés sous chaque switch')
+    parser.add_argument('--variant', choices=['generic', 'aos-s', 'aos-cx'], default='aos-s',
+                        help='Format des sorties CLI synthétiques')
+    parser.add_argument('--lookups', type=int, default=100000, help='Recherches par MAC, IP et nom')
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+
+    timings: Dict[str, float] = {}
+    with timed('génération', timings):
+        fleet = build_fleet(args.switches, args.ports, args.fanout, args.variant)
+    records = sum(data['neighbors_count'] for _, data in fleet)
+    print(f"Fabrique synthétique: {args.switches} switches, {records} voisins LLDP "
+          f"({timings['génération']:.1f}s de génération et parsing)")
+    print()
+
+    rows = []
+    for fraction in (0.25, 0.5, 1.0):
+        subset = fleet[:max(1, int(len(fleet) * fraction))]
+        subset_records = sum(data['neighbors_count'] for _, data in subset)
+        start = time.perf_counter()
+        graph = build_topology(subset)
+        seconds = time.perf_counter() - start
+        rows.append([f"{len(subset)} switches", subset_records, f"{seconds:.3f}s",
+                     f"{seconds / subset_records * 1e6:.2f} µs"])
+    print_table(rows, ['Construction', 'Voisins', 'Durée', 'Par voisin'])
+    print()
+
+    count = args.lookups
+    macs = [synthetic.switch_mac(i % args.switches) for i in range(count)]
+    ips = [synthetic.switch_ip(i % args.switches) for i in range(count)]
+    names = [f"sw-{i % args.switches}" for i in range(count)]
+    timings = {}
+    with timed('find_by_mac', timings):
+        for mac in macs:
+            graph.find_by_mac(mac)
+    with timed('find_by_ip', timings):
+        for ip in ips:
+            graph.find_by_ip(ip)
+    with timed('find_by_hostname', timings):
+        for name in names:
+            graph.find_by_hostname(name)
+
+    output_dir = tempfile.mkdtemp(prefix='lldp-topology-')
+    json_path = os.path.join(output_dir, 'topology.json')
+    graphml_path = os.path.join(output_dir, 'topology.graphml')
+    with timed('export JSON', timings):
+        graph.write_json(json_path)
+    with timed('export GraphML', timings):
+        graph.write_graphml(graphml_path)
+
+    rows = [[label, f"{seconds:.3f}s",
+             f"{seconds / count * 1e6:.2f} µs" if label.startswith('find') else
+             f"{os.path.getsize(json_path if 'JSON' in label else graphml_path) / 1e6:.1f} Mo"]
+            for label, seconds in timings.items()]
+    print_table(rows, ['Opération', 'Durée', f'Par recherche ({count}) / taille'])
+    print()
+
+    summary = graph.summary()
+    expected_links = records - (args.switches - 1)
+    resolved = all(graph.find_by_ip(synthetic.switch_ip(i)) is graph.find_by_mac(synthetic.switch_mac(i))
+                   and graph.find_by_mac(synthetic.switch_mac(i))['discovered'] for i in range(args.switches))
+    print(f"Équipements: {summary['nodes']}, liens: {summary['links']} (attendu {expected_links}), "
+          f"vus des deux côtés: {summary['bidirectional_links']} (attendu {args.switches - 1})")
+    print(f"Switches indexés par leur MAC de châssis: {'oui' if resolved else 'NON'}")
+    if summary['links'] != expected_links or summary['bidirectional_links'] != args.switches - 1 or not resolved:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
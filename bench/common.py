@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Outils communs aux scripts de benchmark
+"""
+
+import os
+import sys
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PYTHON_DIR = os.path.join(REPO_ROOT, 'python')
+
+
+def setup_paths():
+    """Rend importables les modules de python/ et prépare le répertoire output/"""
+    os.chdir(REPO_ROOT)
+    os.makedirs(os.path.join(REPO_ROOT, 'output'), exist_ok=True)
+    if PYTHON_DIR not in sys.path:
+        sys.path.insert(0, PYTHON_DIR)
+
+
+def strip_timestamps(results: Dict[str, Any]) -> Dict[str, Any]:
+    """Copie des résultats consolidés sans les horodatages, pour comparaison"""
+    stripped = {key: value for key, value in results.items() if key != 'discovery_timestamp'}
+    stripped['switches'] = {
+        host: {key: value for key, value in data.items() if key != 'timestamp'}
+        for host, data in results.get('switches', {}).items()
+    }
+    return stripped
+
+
+@contextmanager
+def timed(label: str, timings: Dict[str, float]) -> Iterator[None]:
+    """Mesure la durée d'un bloc et l'enregistre sous le libellé donné"""
+    start = time.perf_counter()
+    yield
+    timings[label] = time.perf_counter() - start
+
+
+def print_table(rows: List[List[Any]], headers: List[str]):
+    """Affiche un tableau texte aligné"""
+    widths = [max(len(str(row[i])) for row in rows + [headers]) for i in range(len(headers))]
+    print("  ".join(str(h).ljust(w) for h, w in zip(headers, widths)))
+    print("  ".join("-" * w for w in widths))
+    for row in rows:
+        print("  ".join(str(c).ljust(w) for c, w in zip(row, widths)))
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Serveur HTTP factice simulant l'API REST d'une flotte de switches AOS-CX
+
+Chaque switch écoute sur sa propre adresse loopback (127.0.x.y) et sur un port
+commun, en HTTP/1.1 keep-alive. Le login délivre un cookie de session exigé
+par les requêtes GET, qui renvoient des réponses JSON préenregistrées (chemin
+relatif à /rest/<version>/, requête comprise) après une latence artificielle.
+Les connexions TCP, les logins et les requêtes sont comptés par switch.
+"""
+
+import json
+import logging
+import secrets
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterable, Optional
+from urllib.parse import parse_qs
+
+logger = logging.getLogger(__name__)
+
+
+class MockRestSwitch:
+    """Switch factice : réponses JSON par requête et latence de réponse"""
+
+    def __init__(self, host: str, payloads: Dict[str, str], latency: float = 0.0):
+        self.host = host
+        self.payloads = payloads
+        self.latency = latency
+
+
+class _MockRestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        # En-têtes et corps sont écrits séparément: sans TCP_NODELAY, l'ACK retardé ajoute ~40 ms par réponse
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.server.fabric._count('connections', self.server.switch.host)
+
+    def log_message(self, format, *args):
+        logger.debug(f"{self.server.switch.host}: {format % args}")
+
+    def _reply(self, status: int, body: str = '', headers: Optional[Dict[str, str]] = None):
+        data = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _relative_path(self) -> Optional[str]:
+        prefix = f"/rest/{self.server.fabric.api_version}/"
+        return self.path[len(prefix):] if self.path.startswith(prefix) else None
+
+    def _session(self) -> Optional[str]:
+        for cookie in self.headers.get_all('Cookie') or ():
+            for part in cookie.split(';'):
+                name, _, value = part.strip().partition('=')
+                if name == 'id' and value in self.server.fabric.sessions:
+                    return value
+        return None
+
+    def do_POST(self):
+        fabric = self.server.fabric
+        switch = self.server.switch
+        length = int(self.headers.get('Content-Length') or 0)
+        form = parse_qs(self.rfile.read(length).decode('utf-8')) if length else {}
+        path = self._relative_path()
+
+        if path == 'login':
+            if form.get('username') != [fabric.username] or form.get('password') != [fabric.password]:
+                self._reply(401, '{"message": "Login failed"}')
+                return
+            token = secrets.token_hex(16)
+            with fabric.lock:
+                fabric.sessions[token] = switch.host
+            fabric._count('logins', switch.host)
+            self._reply(200, '', {'Set-Cookie': f'id={token}; Path=/; HttpOnly'})
+        elif path == 'logout':
+            token = self._session()
+            if token:
+                with fabric.lock:
+                    fabric.sessions.pop(token, None)
+            self._reply(200)
+        else:
+            self._reply(404, '{"message": "Not found"}')
+
+    def do_GET(self):
+        switch = self.server.switch
+        if self._session() is None:
+            self._reply(401, '{"message": "Unauthorized"}')
+            return
+        path = self._relative_path()
+        self.server.fabric._count('requests', switch.host)
+        if switch.latency:
+            time.sleep(switch.latency)
+        if path in switch.payloads:
+            self._reply(200, switch.payloads[path])
+        else:
+            self._reply(404, '{"message": "Not found"}')
+
+
+class MockRestFabric:
+    """
+    Flotte de switches AOS-CX factices servie en HTTP
+
+    Args:
+        switches: Switches factices
+        port: Port d'écoute commun (0 = port éphémère choisi automatiquement)
+        username: Nom d'utilisateur accepté
+        password: Mot de passe accepté
+        api_version: Version d'API servie (/rest/<version>/)
+    """
+
+    def __init__(self, switches: Iterable[MockRestSwitch], port: int = 0, username: str = 'bench',
+                 password: str = 'bench', api_version: str = 'v10.09'):
+        self.switches = {switch.host: switch for switch in switches}
+        self.port = port
+        self.username = username
+        self.password = password
+        self.api_version = api_version
+        self.sessions: Dict[str, str] = {}
+        self.connections: Dict[str, int] = {}
+        self.logins: Dict[str, int] = {}
+        self.requests: Dict[str, int] = {}
+        self.lock = threading.Lock()
+        self._servers = []
+
+    def _count(self, counter: str, host: str):
+        with self.lock:
+            counts = getattr(self, counter)
+            counts[host] = counts.get(host, 0) + 1
+
+    def start(self) -> 'MockRestFabric':
+        """Ouvre un serveur HTTP par switch, chacun servi par son propre thread"""
+        for switch in self.switches.values():
+            server = ThreadingHTTPServer((switch.host, self.port), _MockRestHandler)
+            server.daemon_threads = True
+            server.fabric = self
+            server.switch = switch
+            if self.port == 0:
+                self.port = server.server_address[1]
+            threading.Thread(target=server.serve_forever, kwargs={'poll_interval': 0.2},
+                             name=f'mock-rest-{switch.host}', daemon=True).start()
+            self._servers.append(server)
+        return self
+
+    def stop(self):
+        """Arrête les serveurs"""
+        for server in self._servers:
+            server.shutdown()
+            server.server_close()
+        self._servers = []
+
+    def __enter__(self) -> 'MockRestFabric':
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def rest_payloads(bodies: Dict[str, object]) -> Dict[str, str]:
+    """Sérialise des réponses JSON indexées par requête"""
+    return {path: json.dumps(body) for path, body in bodies.items()}
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Serveur SSH factice simulant une flotte de switches Aruba
+
+Chaque switch écoute sur sa propre adresse loopback (127.0.x.y) et sur un port
+commun. Le shell rejoue des sorties CLI préenregistrées après une latence
+artificielle, ce qui permet de mesurer la découverte sans équipement réel.
+"""
+
+import logging
+import selectors
+import socket
+import threading
+import time
+from typing import Dict, Iterable, Optional, Set
+
+import paramiko
+
+logger = logging.getLogger(__name__)
+
+
+class MockSwitch:
+    """
+    Switch factice : prompt, sorties par commande et latence de réponse (par défaut ou par commande)
+
+    drop_sessions: nombre de connexions TCP fermées dès leur acceptation avant de
+    servir normalement (switch qui redémarre, démon SSH saturé)
+    """
+
+    def __init__(self, host: str, hostname: str, outputs: Dict[str, str], latency: float = 0.0,
+                 command_latency: Optional[Dict[str, float]] = None, drop_sessions: int = 0):
+        self.host = host
+        self.hostname = hostname
+        self.outputs = outputs
+        self.latency = latency
+        self.command_latency = command_latency or {}
+        self.drop_sessions = drop_sessions
+
+    def latency_for(self, command: str) -> float:
+        return self.command_latency.get(command, self.latency)
+
+    @property
+    def prompt(self) -> str:
+        return f"{self.hostname}# "
+
+
+class _MockServerInterface(paramiko.ServerInterface):
+    """Authentification par mot de passe et ouverture d'un shell interactif"""
+
+    def __init__(self, fabric: 'MockSSHFabric', switch: MockSwitch):
+        self.fabric = fabric
+        self.switch = switch
+        self.shell_ready = threading.Event()
+        self.exec_command: Optional[str] = None
+
+    def get_allowed_auths(self, username):
+        return 'password'
+
+    def check_auth_password(self, username, password):
+        if username == self.fabric.username and password == self.fabric.password:
+            self.fabric._count_login(self.switch.host)
+            return paramiko.AUTH_SUCCESSFUL
+        return paramiko.AUTH_FAILED
+
+    def check_channel_request(self, kind, chanid):
+        if kind == 'session':
+            return paramiko.OPEN_SUCCEEDED
+        return paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED_OPEN_REQUEST
+
+    def check_channel_pty_request(self, channel, term, width, height, pixelwidth, pixelheight, modes):
+        return True
+
+    def check_channel_shell_request(self, channel):
+        self.shell_ready.set()
+        return True
+
+    def check_channel_exec_request(self, channel, command):
+        # Commande passée directement à ssh (ssh user@host "show arp")
+        self.exec_command = command.decode(errors='ignore').strip()
+        self.shell_ready.set()
+        return True
+
+
+class MockSSHFabric:
+    """
+    Flotte de switches factices servie par un seul thread d'acceptation
+
+    Args:
+        switches: Switches factices indexés par adresse
+        port: Port d'écoute commun (0 = port éphémère choisi automatiquement)
+        username: Nom d'utilisateur accepté
+        password: Mot de passe accepté
+        hang_hosts: Adresses qui acceptent la connexion TCP mais ne répondent jamais
+        blackhole_hosts: Adresses qui ne répondent même pas à l'ouverture TCP (SYN
+            ignorés, comme un switch éteint derrière un pare-feu)
+    """
+
+    def __init__(self, switches: Iterable[MockSwitch], port: int = 0, username: str = 'bench',
+                 password: str = 'bench', hang_hosts: Optional[Set[str]] = None,
+                 blackhole_hosts: Optional[Set[str]] = None):
+        self.switches = {switch.host: switch for switch in switches}
+        self.port = port
+        self.username = username
+        self.password = password
+        self.hang_hosts = set(hang_hosts or ())
+        self.blackhole_hosts = set(blackhole_hosts or ())
+        self.logins: Dict[str, int] = {}
+        self.commands: Dict[str, int] = {}
+        self._host_key = paramiko.RSAKey.generate(2048)
+        self._selector = selectors.DefaultSelector()
+        self._sockets = []
+        self._blackholes = []
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def total_logins(self) -> int:
+        with self._lock:
+            return sum(self.logins.values())
+
+    def _count_login(self, host: str):
+        with self._lock:
+            self.logins[host] = self.logins.get(host, 0) + 1
+
+    def _count_command(self, command: str):
+        with self._lock:
+            self.commands[command] = self.commands.get(command, 0) + 1
+
+    def start(self) -> 'MockSSHFabric':
+        """Ouvre un socket d'écoute par switch et démarre le thread d'acceptation"""
+        for host in list(self.switches) + sorted(self.hang_hosts - set(self.switches)):
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            sock.bind((host, self.port))
+            if self.port == 0:
+                self.port = sock.getsockname()[1]
+            sock.listen(128)
+            sock.setblocking(False)
+            self._selector.register(sock, selectors.EVENT_READ, host)
+            self._sockets.append(sock)
+
+        for host in sorted(self.blackhole_hosts):
+            # File d'attente d'acceptation saturée et jamais vidée: les SYN suivants sont ignorés
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            sock.bind((host, self.port))
+            if self.port == 0:
+                self.port = sock.getsockname()[1]
+            sock.listen(0)
+            self._blackholes.append(sock)
+            for _ in range(2):
+                filler = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+                filler.setblocking(False)
+                filler.connect_ex((host, self.port))
+                self._blackholes.append(filler)
+
+        self._thread = threading.Thread(target=self._accept_loop, name='mock-ssh', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Arrête l'écoute (les sessions en cours se terminent d'elles-mêmes)"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=2)
+        for sock in self._sockets:
+            self._selector.unregister(sock)
+            sock.close()
+        self._sockets = []
+        for sock in self._blackholes:
+            sock.close()
+        self._blackholes = []
+
+    def __enter__(self) -> 'MockSSHFabric':
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _accept_loop(self):
+        while not self._stop.is_set():
+            for key, _ in self._selector.select(timeout=0.2):
+                try:
+                    client, _ = key.fileobj.accept()
+                except OSError:
+                    continue
+                client.setblocking(True)
+                host = key.data
+                if host in self.hang_hosts:
+                    # Connexion TCP acceptée mais jamais de bannière SSH
+                    threading.Thread(target=self._hang, args=(client,), daemon=True).start()
+                elif self.switches[host].drop_sessions > 0:
+                    self.switches[host].drop_sessions -= 1
+                    client.close()
+                else:
+                    threading.Thread(target=self._serve, args=(client, self.switches[host]),
+                                     daemon=True).start()
+
+    def _hang(self, client: socket.socket):
+        self._stop.wait()
+        client.close()
+
+    def _serve(self, client: socket.socket, switch: MockSwitch):
+        transport = paramiko.Transport(client)
+        transport.add_server_key(self._host_key)
+        server = _MockServerInterface(self, switch)
+        try:
+            transport.start_server(server=server)
+            channel = transport.accept(timeout=30)
+            if channel is None or not server.shell_ready.wait(timeout=30):
+                return
+            if server.exec_command is not None:
+                self._exec(channel, switch, server.exec_command)
+            else:
+                self._shell(channel, switch)
+        except (paramiko.SSHException, EOFError, OSError) as e:
+            logger.debug(f"Session {switch.host} terminée: {e}")
+        finally:
+            transport.close()
+
+    def _shell(self, channel: paramiko.Channel, switch: MockSwitch):
+        channel.sendall(f"\r\n{switch.prompt}".encode())
+        buffer = ''
+        previous = ''
+        while not channel.closed:
+            data = channel.recv(4096)
+            if not data:
+                return
+            for char in data.decode(errors='ignore'):
+                if char == '\n' and previous == '\r':
+                    previous = char
+                    continue
+                previous = char
+                if char not in '\r\n':
+                    buffer += char
+                    continue
+                command, buffer = buffer.strip(), ''
+                if command in ('exit', 'logout'):
+                    channel.close()
+                    return
+                channel.sendall(self._respond(switch, command).encode())
+
+    def _exec(self, channel: paramiko.Channel, switch: MockSwitch, command: str):
+        self._count_command(command)
+        if switch.latency_for(command):
+            time.sleep(switch.latency_for(command))
+        if command in switch.outputs:
+            channel.sendall(switch.outputs[command].replace('\n', '\r\n').encode())
+            channel.send_exit_status(0)
+        else:
+            channel.sendall(f"Invalid input: {command}\r\n".encode())
+            channel.send_exit_status(1)
+        channel.close()
+
+    def _respond(self, switch: MockSwitch, command: str) -> str:
+        if not command:
+            return f"\r\n{switch.prompt}"
+        self._count_command(command)
+        if command in switch.outputs:
+            if switch.latency_for(command):
+                time.sleep(switch.latency_for(command))
+            output = switch.outputs[command].replace('\n', '\r\n')
+        elif command in ('enable', 'no paging', 'terminal length 1000', 'no page'):
+            output = ''
+        else:
+            output = f"Invalid input: {command}"
+        return f"{command}\r\n{output}\r\n{switch.prompt}"
@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+"""
+Génération de sorties CLI Aruba synthétiques pour les benchmarks et le serveur SSH factice
+"""
+
+import random
+from typing import Any, Dict, List, Optional, Tuple
+
+
+SYSTEM_DESCRIPTIONS = [
+    "Aruba JL675A 6100 48G CL4 4SFP+ Swch, PL.10.09.1020",
+    "HP J9773A 2530-24G-PoEP Switch, revision YA.16.10.0009, ROM YA.15.20 (/ws/swbuildm/rel_yakima_qaoff/code/build/lakes(swbuildm_rel_yakima_qaoff_rel_yakima))",
+    "Windows 10 Enterprise",
+    "Linux 5.15.0-91-generic #101-Ubuntu SMP x86_64",
+    "Cisco IP Phone CP-8841, V3, sip88xx.14-1-1-0001-136",
+]
+
+
+def switch_ip(index: int) -> str:
+    """Adresse loopback d'un switch factice (127.0.x.y, routée vers lo sous Linux)"""
+    return f"127.0.{1 + index // 250}.{1 + index % 250}"
+
+
+def neighbor_mac(switch_index: int, port: int) -> str:
+    """Adresse MAC déterministe d'un voisin"""
+    return f"02:{(switch_index >> 8) & 0xff:02x}:{switch_index & 0xff:02x}:00:{(port >> 8) & 0xff:02x}:{port & 0xff:02x}"
+
+
+def neighbor_ip(switch_index: int, port: int) -> str:
+    """Adresse IP déterministe d'un voisin (unique jusqu'à 1 000 ports et 16 384 switches)"""
+    return f"10.{switch_index // 64 % 256}.{(switch_index % 64) * 4 + port // 250 % 4}.{port % 250 + 1}"
+
+
+def switch_mac(switch_index: int) -> str:
+    """Adresse MAC de châssis d'un switch factice (Base MAC de 'show system')"""
+    return neighbor_mac(switch_index, 0)
+
+
+def fabric_links(count: int, fanout: int = 4, ports: int = 48) -> Dict[int, List[Tuple[int, int, int]]]:
+    """
+    Liens inter-switches d'une fabrique en arbre
+
+    Le switch i > 0 est relié par son port ports + 1 au switch (i - 1) // fanout,
+    sur le port ports + 2 + (i - 1) % fanout de ce dernier. Chaque lien apparaît
+    des deux côtés, comme dans les tables LLDP réelles.
+
+    Args:
+        count: Nombre de switches
+        fanout: Switches reliés sous chaque switch
+        ports: Ports d'accès de chaque switch (les liens utilisent les ports suivants)
+
+    Returns:
+        Dict index du switch -> liste de (port local, index du switch distant, port distant)
+    """
+    links: Dict[int, List[Tuple[int, int, int]]] = {index: [] for index in range(count)}
+    for index in range(1, count):
+        parent = (index - 1) // fanout
+        parent_port = ports + 2 + (index - 1) % fanout
+        links[index].append((ports + 1, parent, parent_port))
+        links[parent].append((parent_port, index, ports + 1))
+    return links
+
+
+def lldp_neighbors_detail(switch_index: int, ports: int = 48, variant: str = 'generic',
+                          neighbors_per_port: int = 1,
+                          links: Optional[List[Tuple[int, int, int]]] = None) -> str:
+    """
+    Sortie 'show lldp neighbors detail'
+
+    Les voisins sont numérotés de 1 à ports * neighbors_per_port (le k-ième voisin
+    du port p porte le numéro k * ports + p), ce qui correspond aux entrées
+    générées par arp_table(switch_index, ports * neighbors_per_port).
+
+    Args:
+        switch_index: Index du switch dans la flotte
+        ports: Nombre de ports occupés
+        variant: Format de sortie, 'generic' (format historique du parser), 'aos-s' (2530) ou 'aos-cx' (6100)
+        neighbors_per_port: Voisins LLDP par port (téléphone IP et poste derrière, par exemple)
+        links: Liens vers d'autres switches de la flotte (voir fabric_links)
+
+    Returns:
+        Texte brut de la commande
+    """
+    render = {'generic': _generic_block, 'aos-s': _aos_s_block, 'aos-cx': _aos_cx_block}[variant]
+    lines = [" LLDP Remote Device Information Detail", ""]
+    for port in range(1, ports + 1):
+        for k in range(neighbors_per_port):
+            neighbor = k * ports + port
+            lines.extend(render(port, neighbor_mac(switch_index, neighbor), str(neighbor),
+                                f"host-{switch_index}-{neighbor}",
+                                SYSTEM_DESCRIPTIONS[neighbor % len(SYSTEM_DESCRIPTIONS)],
+                                f"Port {neighbor}", neighbor_ip(switch_index, neighbor)))
+    for port, remote_index, remote_port in links or ():
+        lines.extend(render(port, switch_mac(remote_index), str(remote_port), f"sw-{remote_index}",
+                            SYSTEM_DESCRIPTIONS[1], f"Port {remote_port}", switch_ip(remote_index)))
+    return "\n".join(lines)
+
+
+def _generic_block(port: int, mac: str, port_id: str, name: str, description: str, port_description: str,
+                   ip: str) -> List[str]:
+    return [
+        f"  Local Port   : {port}",
+        f"  Chassis ID   : {mac}",
+        f"  Port ID      : {port_id}",
+        f"  System Name  : {name}",
+        f"  System Description : {description}",
+        f"  Port Description : {port_description}",
+        f"  Management Address : {ip}",
+        "",
+    ]
+
+
+def _aos_s_block(port: int, mac: str, port_id: str, name: str, description: str, port_description: str,
+                 ip: str) -> List[str]:
+    return [
+        f"  Local Port   : {port}",
+        "  ChassisType  : mac-address",
+        f"  ChassisId    : {mac.replace(':', ' ')}",
+        "  PortType     : local",
+        f"  PortId       : {port_id}",
+        f"  SysName      : {name}",
+        f"  System Descr : {description}",
+        f"  PortDescr    : {port_description}",
+        "  Pvid         : 1",
+        "",
+        "  System Capabilities Supported  : bridge, router",
+        "  System Capabilities Enabled    : bridge",
+        "",
+        "  Remote Management Address",
+        "     Type    : ipv4",
+        f"     Address : {ip}",
+        "",
+    ]
+
+
+def _aos_cx_block(port: int, mac: str, port_id: str, name: str, description: str, port_description: str,
+                  ip: str) -> List[str]:
+    return [
+        "-" * 80,
+        f"Port                           : 1/1/{port}",
+        "Neighbor Entries               : 1",
+        "Neighbor Entries Deleted       : 0",
+        f"Neighbor Chassis-Name          : {name}",
+        f"Neighbor Chassis-Description   : {description}",
+        f"Neighbor Chassis-ID            : {mac}",
+        f"Neighbor Management-Address    : {ip}",
+        "Chassis Capabilities Available : Bridge, Router",
+        "Chassis Capabilities Enabled   : Bridge",
+        f"Neighbor Port-ID               : {port_id}",
+        f"Neighbor Port-Desc             : {port_description}",
+        "TTL                            : 120",
+        "",
+    ]
+
+
+def show_system(switch_index: int, variant: str = 'aos-s') -> str:
+    """
+    Sortie 'show system' d'un switch 2530 ('aos-s') ou 6100 ('aos-cx')
+
+    Args:
+        switch_index: Index du switch dans la flotte
+        variant: 'aos-s' ou 'aos-cx'
+
+    Returns:
+        Texte brut de la commande
+    """
+    mac = switch_mac(switch_index)
+    if variant == 'aos-cx':
+        return "\n".join([
+            f"Hostname                        : sw-{switch_index}",
+            "System Description              : PL.10.09.1020",
+            "System Contact                  :",
+            "System Location                 :",
+            "Vendor                          : Aruba",
+            "Product Name                    : JL675A 6100 48G CL4 4SFP+ Swch",
+            "Product Model                   : JL675A 6100 48G CL4 4SFP+ Swch",
+            f"Chassis Serial Nbr              : SG{switch_index:08d}",
+            f"Serial Number                   : SG{switch_index:08d}",
+            f"Base MAC Address                : {mac}",
+            "Firmware Version                : PL.10.09.1020",
+            f"System Name                     : sw-{switch_index}",
+            "Up Time                         : 12 weeks, 3 days, 4 hours, 7 minutes",
+            "CPU Util (%)                    : 3",
+            "Memory Usage (%)                : 27",
+            "",
+        ])
+    return "\n".join([
+        "",
+        " Status and Counters - General System Information",
+        "",
+        f"  System Name        : sw-{switch_index}",
+        "  System Contact     :",
+        "  System Location    :",
+        "  MAC Age Time (sec) : 300",
+        "  Time Zone          : 0",
+        "  Daylight Time Rule : None",
+        "",
+        "  Product Model      : J9773A 2530-24G-PoEP Switch",
+        f"  Software revision  : YA.16.10.0009        Base MAC Addr      : {format_mac(mac, 'aos-s')}",
+        f"  ROM Version        : YA.15.20             Serial Number      : CN{switch_index:08d}",
+        "  Firmware Version   : YA.16.10.0009",
+        "  Up Time            : 84 days              Memory   - Total   : 144,368,640",
+        "  CPU Util (%)       : 1                      Free    : 80,341,292",
+        "",
+    ])
+
+
+def format_mac(mac: str, mac_format: str = 'colon') -> str:
+    """Réécrit une MAC aa:bb:cc:dd:ee:ff au format 'colon' ou 'aos-s' (aabbcc-ddeeff)"""
+    if mac_format == 'aos-s':
+        digits = mac.replace(':', '')
+        return f"{digits[:6]}-{digits[6:]}"
+    return mac
+
+
+def arp_table(switch_index: int, ports: int = 48, extra: int = 0, seed: int = 0,
+              mac_format: str = 'colon') -> str:
+    """
+    Sortie 'show arp' contenant les voisins LLDP et des entrées supplémentaires
+
+    Args:
+        switch_index: Index du switch dans la flotte
+        ports: Nombre de voisins LLDP à inclure
+        extra: Nombre d'entrées ARP aléatoires supplémentaires
+        seed: Graine du générateur aléatoire
+        mac_format: Format des MAC, 'colon' ou 'aos-s'
+
+    Returns:
+        Texte brut de la commande
+    """
+    rng = random.Random(seed + switch_index)
+    lines = [" IP ARP table", "", "  IP Address       MAC Address       Type    Port", "  ---------------  ----------------- ------- ----"]
+    for port in range(1, ports + 1):
+        mac = format_mac(neighbor_mac(switch_index, port), mac_format)
+        lines.append(f"  {neighbor_ip(switch_index, port):<16} {mac}  dynamic {port}")
+    for i in range(extra):
+        mac = format_mac(":".join(f"{rng.randrange(256):02x}" for _ in range(6)), mac_format)
+        lines.append(f"  172.{16 + i // 65536 % 16}.{i // 256 % 256}.{i % 256:<8} {mac}  dynamic {i % 48 + 1}")
+    return "\n".join(lines) + "\n"
+
+
+def endpoint_mac(switch_index: int, endpoint: int) -> str:
+    """Adresse MAC déterministe d'un équipement terminal (sans LLDP) d'un switch"""
+    return f"06:{(switch_index >> 8) & 0xff:02x}:{switch_index & 0xff:02x}:{(endpoint >> 16) & 0xff:02x}:" \
+           f"{(endpoint >> 8) & 0xff:02x}:{endpoint & 0xff:02x}"
+
+
+def endpoint_ip(switch_index: int, endpoint: int) -> str:
+    """Adresse IP déterministe d'un équipement terminal (unique jusqu'à 1 000 équipements et 8 192 switches)"""
+    return f"10.{128 + switch_index // 64 % 128}.{(switch_index % 64) * 4 + endpoint // 250 % 4}.{endpoint % 250 + 1}"
+
+
+def local_port_name(port: int, variant: str = 'aos-s') -> str:
+    """Nom d'un port local tel qu'affiché par le switch (1 en AOS-S, 1/1/1 en AOS-CX)"""
+    return f"1/1/{port}" if variant == 'aos-cx' else str(port)
+
+
+def mac_address_table(entries: List[Tuple[str, int, int]], variant: str = 'aos-s') -> str:
+    """
+    Sortie 'show mac-address' (AOS-S) ou 'show mac-address-table' (AOS-CX)
+
+    Args:
+        entries: Entrées (MAC aa:bb:cc:dd:ee:ff, port, VLAN)
+        variant: 'aos-s' ou 'aos-cx'
+
+    Returns:
+        Texte brut de la commande
+    """
+    if variant == 'aos-cx':
+        lines = ["MAC age-time            : 300 seconds", f"Number of MAC addresses : {len(entries)}", "",
+                 "MAC Address          VLAN     Type                      Port", "-" * 62]
+        lines.extend(f"{mac:<20} {vlan:<8} dynamic                   {local_port_name(port, variant)}"
+                     for mac, port, vlan in entries)
+    else:
+        lines = ["", " Status and Counters - Port Address Table", "",
+                 "  MAC Address   Port   VLAN", "  ------------- ------ ----"]
+        lines.extend(f"  {format_mac(mac, 'aos-s')} {port:<6} {vlan}" for mac, port, vlan in entries)
+    return "\n".join(lines) + "\n"
+
+
+def switch_outputs(switch_index: int, ports: int = 48, arp_extra: int = 0, variant: str = 'generic',
+                   neighbors_per_port: int = 1, links: Optional[List[Tuple[int, int, int]]] = None) -> Dict[str, str]:
+    """Sorties d'un switch factice, indexées par commande (links: voir fabric_links)"""
+    return {
+        'show lldp neighbors detail': lldp_neighbors_detail(switch_index, ports, variant, neighbors_per_port, links),
+        'show arp': arp_table(switch_index, ports * neighbors_per_port, arp_extra,
+                              mac_format='aos-s' if variant == 'aos-s' else 'colon'),
+        'show system': show_system(switch_index, 'aos-cx' if variant == 'aos-cx' else 'aos-s'),
+    }
+
+
+def aoscx_rest_payloads(switch_index: int, ports: int = 48,
+                       links: Optional[List[Tuple[int, int, int]]] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Réponses JSON de l'API REST AOS-CX d'un switch factice
+
+    Même contenu que switch_outputs(switch_index, ports, variant='aos-cx', links=links),
+    dans le format des réponses groupées de l'API (tous les ports, toutes les VRF).
+
+    Returns:
+        Dict 'lldp', 'arp', 'system', 'chassis' -> corps de réponse
+    """
+    def interface_uri(port: int) -> str:
+        return f"/rest/v10.09/system/interfaces/1%2F1%2F{port}"
+
+    def neighbor(port: int, mac: str, port_id: str, name: str, description: str, port_description: str,
+                 ip: str) -> Dict[str, Dict[str, Any]]:
+        return {f"1/1/{port}": {f"{mac},{port_id}": {
+            'chassis_id': mac,
+            'port_id': port_id,
+            'interface': interface_uri(port),
+            'neighbor_info': {
+                'chassis_capability_available': 'Bridge, Router',
+                'chassis_capability_enabled': 'Bridge',
+                'chassis_description': description,
+                'chassis_id_subtype': 'link_local_addr',
+                'chassis_name': name,
+                'mgmt_ip_list': ip,
+                'port_description': port_description,
+                'port_id_subtype': 'if_name',
+            },
+            'neighbor_ttl': 120,
+        }}}
+
+    lldp: Dict[str, Any] = {}
+    arp: Dict[str, Any] = {}
+    for port in range(1, ports + 1):
+        lldp.update(neighbor(port, neighbor_mac(switch_index, port), str(port), f"host-{switch_index}-{port}",
+                             SYSTEM_DESCRIPTIONS[port % len(SYSTEM_DESCRIPTIONS)], f"Port {port}",
+                             neighbor_ip(switch_index, port)))
+        ip = neighbor_ip(switch_index, port)
+        arp[f"{ip},vlan1"] = {'ip_address': ip, 'mac': neighbor_mac(switch_index, port),
+                              'address_family': 'ipv4', 'state': 'reachable',
+                              'port': {f"1/1/{port}": interface_uri(port)}}
+    for port, remote_index, remote_port in links or ():
+        lldp.update(neighbor(port, switch_mac(remote_index), str(remote_port), f"sw-{remote_index}",
+                             SYSTEM_DESCRIPTIONS[1], f"Port {remote_port}", switch_ip(remote_index)))
+
+    return {
+        'lldp': lldp,
+        'arp': {'default': arp},
+        'system': {'hostname': f"sw-{switch_index}", 'platform_name': '6100',
+                   'software_version': 'PL.10.09.1020'},
+        'chassis': {'product_info': {'product_name': 'JL675A 6100 48G CL4 4SFP+ Swch',
+                                     'serial_number': f"SG{switch_index:08d}",
+                                     'base_mac_address': switch_mac(switch_index)}},
+    }
+
+
+def fleet_config(count: int, port: int, username: str = 'bench', password: str = 'bench') -> List[Dict[str, str]]:
+    """Configuration 'switches' équivalente à switches_config.json pour une flotte factice"""
+    return [
+        {
+            'host': switch_ip(index),
+            'port': port,
+            'username': username,
+            'password': password,
+            'device_type': 'aruba_os',
+        }
+        for index in range(count)
+    ]
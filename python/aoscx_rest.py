@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+"""
+Collecte LLDP par l'API REST des switches AOS-CX (6100)
+
+Les switches dont le device_type vaut 'aruba_aoscx_rest' dans
+switches_config.json sont interrogés en HTTPS au lieu de la CLI SSH : une
+session HTTP keep-alive par switch (connexion réutilisée pour toutes les
+requêtes), puis une requête par table grâce aux jokers de l'API :
+
+    POST /rest/<version>/login
+    GET  /rest/<version>/system/interfaces/*/lldp_neighbors?depth=2   (tous les ports)
+    GET  /rest/<version>/system/vrfs/*/neighbors?depth=2              (toutes les VRF)
+    GET  /rest/<version>/system/vlans/*/macs?depth=2                  (table MAC, si collectée)
+    POST /rest/<version>/logout
+
+Les réponses JSON sont converties dans le même schéma de voisins que le parser
+CLI, sans analyse de texte ; le cache de snapshots, la capture brute
+(--save-raw, une entrée par requête) et le rejeu fonctionnent à l'identique.
+
+Options de configuration propres à ce collecteur (facultatives) :
+    "port": 443, "use_ssl": true, "verify_ssl": true (false pour un certificat
+    autosigné, ou chemin d'un bundle CA),
+    "api_version": "v10.09"
+"""
+
+import json
+import logging
+import re
+import time
+from typing import Dict, List, Any, Iterable, Optional, Union
+from urllib.parse import unquote
+
+from lldp_discovery import ArubaLLDPDiscovery
+from aruba_parsers import NEIGHBOR_FIELDS, intern_field, new_neighbor, normalize_mac
+from snapshot_cache import SnapshotCache
+from command_timing import CommandTimingStore
+from raw_capture import RawCapture
+from run_metrics import RunMetrics
+from fleet_arp import FleetARPIndex
+from retry_scheduler import DiscoveryError, ERROR_TIMEOUT, ERROR_CONNECTION, ERROR_AUTH
+
+logger = logging.getLogger(__name__)
+
+REST_DEVICE_TYPE = 'aruba_aoscx_rest'
+DEFAULT_API_VERSION = 'v10.09'
+
+# Requêtes groupées, relatives à /rest/<version>/
+LLDP_REQUEST = 'system/interfaces/*/lldp_neighbors?depth=2'
+ARP_REQUEST = 'system/vrfs/*/neighbors?depth=2'
+MAC_TABLE_REQUEST = 'system/vlans/*/macs?depth=2'
+SYSTEM_REQUEST = 'system?attributes=hostname,platform_name,software_version'
+CHASSIS_REQUEST = 'system/subsystems/chassis,1?attributes=product_info'
+
+PORT_NUMBERS = re.compile(r'\d+|\D+')
+
+
+def _port_sort_key(port: str) -> List[Any]:
+    """Ordre naturel des ports (1/1/2 avant 1/1/10)"""
+    return [(0, int(part), '') if part.isdigit() else (1, 0, part) for part in PORT_NUMBERS.findall(port)]
+
+
+def _interface_name(reference: Any) -> str:
+    """Nom de port depuis une référence d'interface ('/rest/v10.09/system/interfaces/1%2F1%2F1' ou {port: uri})"""
+    if isinstance(reference, dict):
+        return unquote(str(next(iter(reference), '')))
+    return unquote(str(reference or '').rstrip('/').rsplit('/', 1)[-1])
+
+
+def _is_neighbor(entry: Any) -> bool:
+    return isinstance(entry, dict) and ('chassis_id' in entry or 'neighbor_info' in entry)
+
+
+def parse_rest_lldp_neighbors(payload: str, missing: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Convertit la réponse JSON des voisins LLDP dans le schéma du parser CLI
+
+    Accepte la réponse groupée {port: {"chassis,port": voisin}} comme la liste
+    d'un seul port {"chassis,port": voisin} (le port est alors lu dans le champ
+    'interface' du voisin).
+
+    Args:
+        payload: Corps JSON de la réponse
+        missing: Valeur utilisée pour un champ absent (comme parse_lldp_neighbors)
+
+    Returns:
+        Liste des voisins, triée par port local
+    """
+    if not payload:
+        return []
+    data = json.loads(payload)
+
+    entries = []
+    for key, value in data.items():
+        if _is_neighbor(value):
+            entries.append((_interface_name(value.get('interface')), value))
+        elif isinstance(value, dict):
+            entries.extend((unquote(key), neighbor) for neighbor in value.values() if _is_neighbor(neighbor))
+
+    neighbors = []
+    for local_port, entry in sorted(entries, key=lambda item: _port_sort_key(item[0])):
+        info = entry.get('neighbor_info') or {}
+        mgmt = info.get('mgmt_ip_list') or ''
+        if isinstance(mgmt, str):
+            mgmt = mgmt.split(',')
+        neighbor = new_neighbor(local_port)
+        values = (entry.get('chassis_id'), entry.get('port_id'), info.get('chassis_name'),
+                  info.get('chassis_description'), info.get('port_description'))
+        for field, value in zip(NEIGHBOR_FIELDS, values):
+            neighbor[field] = intern_field(field, value or missing)
+        neighbor['management_addresses'] = [address.strip() for address in mgmt
+                                            if address.strip() and ':' not in address]
+        neighbors.append(neighbor)
+    return neighbors
+
+
+def parse_rest_arp_table(payload: str) -> Dict[str, str]:
+    """
+    Convertit la réponse JSON des voisins IP (toutes VRF) en table ARP
+
+    Args:
+        payload: Corps JSON de {vrf: {"ip,port": entrée}} ou {"ip,port": entrée}
+
+    Returns:
+        Dict mapping IP -> MAC (IPv4 uniquement, comme 'show arp')
+    """
+    if not payload:
+        return {}
+    data = json.loads(payload)
+
+    arp_table = {}
+    for value in data.values():
+        entries = [value] if isinstance(value, dict) and 'ip_address' in value else \
+            (value.values() if isinstance(value, dict) else ())
+        for entry in entries:
+            if not isinstance(entry, dict):
+                continue
+            ip, mac = entry.get('ip_address'), entry.get('mac')
+            if ip and mac and entry.get('address_family', 'ipv4') == 'ipv4':
+                arp_table[ip] = mac.lower()
+    return arp_table
+
+
+def parse_rest_mac_table(payload: str) -> List[Dict[str, str]]:
+    """
+    Convertit la réponse JSON des adresses MAC (toutes VLAN) dans le schéma du parser CLI
+
+    Args:
+        payload: Corps JSON de {vlan: {"origine,mac": entrée}} ou {"origine,mac": entrée}
+
+    Returns:
+        Liste de {mac (canonique), port, vlan}
+    """
+    if not payload:
+        return []
+    data = json.loads(payload)
+
+    entries = []
+    for key, value in data.items():
+        # Réponse d'une seule VLAN: la clé est celle de l'entrée, pas la VLAN
+        single = isinstance(value, dict) and 'mac_addr' in value
+        vlan = '' if single else key
+        for entry in [value] if single else (value.values() if isinstance(value, dict) else ()):
+            if not isinstance(entry, dict):
+                continue
+            mac = normalize_mac(entry.get('mac_addr'))
+            port = _interface_name(entry.get('port'))
+            if mac and port:
+                entries.append({'mac': mac, 'port': port, 'vlan': vlan})
+    return entries
+
+
+class ArubaCXRestDiscovery(ArubaLLDPDiscovery):
+    """Découverte LLDP d'un switch AOS-CX par l'API REST"""
+
+    DEFAULT_PORT = 443
+    LLDP_COMMAND = LLDP_REQUEST
+    ARP_COMMAND = ARP_REQUEST
+    MAC_TABLE_COMMAND = MAC_TABLE_REQUEST
+
+    def __init__(self, host: str, username: str, password: str, device_type: str = REST_DEVICE_TYPE,
+                 port: int = DEFAULT_PORT, timeout: int = 60, snapshot_cache: Optional[SnapshotCache] = None,
+                 timing_store: Optional[CommandTimingStore] = None, raw_capture: Optional[RawCapture] = None,
+                 metrics: Optional[RunMetrics] = None, collect_mac_table: bool = False,
+                 static_uplinks: Optional[Iterable[str]] = None, arp_source: bool = False,
+                 fleet_arp: Optional[FleetARPIndex] = None, use_ssl: bool = True,
+                 verify_ssl: Union[bool, str] = True, api_version: str = DEFAULT_API_VERSION,
+                 deadline: Optional[float] = None):
+        """
+        Initialise le collecteur REST
+
+        Args:
+            host: Adresse IP du switch
+            username: Nom d'utilisateur
+            password: Mot de passe
+            device_type: Type d'équipement ('aruba_aoscx_rest')
+            port: Port HTTPS (443 par défaut)
+            timeout: Timeout de connexion et de lecture en secondes
+            snapshot_cache: Cache de snapshots pour la découverte incrémentale
+            timing_store: Profils de temporisation (latence par requête)
+            raw_capture: Capture des réponses brutes (--save-raw)
+            metrics: Mesures par phase de l'exécution (None = pas de mesure)
+            collect_mac_table: Collecte aussi la table d'adresses MAC (toutes les VLAN)
+            static_uplinks: Ports montants déclarés en plus de ceux détectés par LLDP
+            arp_source: Switch source de l'index ARP de la flotte
+            fleet_arp: Index ARP partagé de la flotte ; s'il est fourni, la requête ARP n'est pas envoyée
+            use_ssl: HTTPS (True) ou HTTP
+            verify_ssl: Vérification du certificat (défaut), False pour l'accepter sans
+                vérification (certificat autosigné d'usine), ou chemin d'un bundle CA
+            api_version: Version de l'API REST
+            deadline: Échéance du switch (time.monotonic()), qui borne les délais des requêtes
+        """
+        super().__init__(host, username, password, device_type, port=port, timeout=timeout,
+                         snapshot_cache=snapshot_cache, timing_store=timing_store, raw_capture=raw_capture,
+                         metrics=metrics, collect_mac_table=collect_mac_table, static_uplinks=static_uplinks,
+                         arp_source=arp_source, fleet_arp=fleet_arp, deadline=deadline)
+        self.verify_ssl = verify_ssl
+        self.base_url = f"{'https' if use_ssl else 'http'}://{host}:{port}/rest/{api_version}/"
+
+    def connect(self) -> bool:
+        """
+        Ouvre la session HTTP et s'authentifie
+
+        Returns:
+            bool: True si connexion réussie, False sinon
+        """
+        # Import à la demande: seuls les switches REST ont besoin de requests
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        session = requests.Session()
+        # Une seule connexion keep-alive par switch, réutilisée par toutes les requêtes
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=1, max_retries=0)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        session.verify = self.verify_ssl
+        if self.verify_ssl is False:
+            logger.warning(f"Certificat de {self.host} accepté sans vérification (verify_ssl: false)")
+
+        start = time.monotonic()
+        try:
+            self._check_deadline()
+            with self._phase('connect'):
+                response = session.post(self.base_url + 'login', data={'username': self.username,
+                                                                       'password': self.password},
+                                        timeout=self._bounded(self.timeout))
+        except DiscoveryError as e:
+            logger.error(f"Délai maximal dépassé pendant la connexion à {self.host}")
+            self.last_error = e
+            session.close()
+            return False
+        except requests.Timeout as e:
+            logger.error(f"Timeout lors de la connexion à {self.host}")
+            self.last_error = DiscoveryError(ERROR_TIMEOUT, str(e))
+            session.close()
+            return False
+        except requests.RequestException as e:
+            logger.error(f"Erreur de connexion à {self.host}: {str(e)}")
+            self.last_error = DiscoveryError(ERROR_CONNECTION, str(e))
+            session.close()
+            return False
+
+        if response.status_code in (401, 403):
+            logger.error(f"Erreur d'authentification pour {self.host}")
+            self.last_error = DiscoveryError(ERROR_AUTH, f"HTTP {response.status_code}")
+            session.close()
+            return False
+        if response.status_code != 200:
+            logger.error(f"Erreur de connexion à {self.host}: HTTP {response.status_code}")
+            self.last_error = DiscoveryError(ERROR_CONNECTION, f"HTTP {response.status_code}")
+            session.close()
+            return False
+        if self._expired():
+            # Switch abandonné pendant l'authentification: déconnexion, rien n'est enregistré
+            logger.error(f"Délai maximal dépassé pendant la connexion à {self.host}")
+            self.last_error = DiscoveryError(ERROR_TIMEOUT, 'délai maximal du switch dépassé')
+            self.connection = session
+            self.disconnect()
+            return False
+
+        if self.timing_store is not None:
+            self.timing_store.record(self.host, self.device_type, 'login', time.monotonic() - start)
+        self.connection = session
+        logger.info(f"Connexion réussie au switch {self.host}")
+        return True
+
+    def _run_command(self, command: str) -> str:
+        """
+        Exécute une requête GET sur la session ouverte
+
+        Args:
+            command: Chemin relatif à /rest/<version>/
+
+        Returns:
+            Corps JSON de la réponse
+        """
+        start = time.monotonic()
+        response = self.connection.get(self.base_url + command, timeout=self._bounded(self.timeout))
+        response.raise_for_status()
+        self._check_deadline()
+        if self.timing_store is not None:
+            elapsed = time.monotonic() - start
+            self.timing_store.record(self.host, self.device_type, command, elapsed)
+            logger.debug(f"'{command}' sur {self.host}: {elapsed:.3f}s")
+        return response.text
+
+    def is_alive(self) -> bool:
+        """Vérifie que la session REST est toujours authentifiée"""
+        if self.connection is None:
+            return False
+        try:
+            return self.connection.get(self.base_url + 'system?attributes=hostname',
+                                       timeout=self.timeout).status_code == 200
+        except Exception:
+            return False
+
+    def disconnect(self):
+        """Ferme la session REST (déconnexion puis fermeture de la connexion HTTP)"""
+        if self.connection:
+            with self._phase('disconnect'):
+                try:
+                    self.connection.post(self.base_url + 'logout', timeout=self._bounded(self.timeout))
+                except Exception as e:
+                    logger.debug(f"Erreur à la déconnexion de {self.host}: {str(e)}")
+                self.connection.close()
+            self.connection = None
+            logger.info(f"Connexion fermée pour {self.host}")
+
+    def get_system_info(self) -> Dict[str, str]:
+        """
+        Récupère les informations système (mêmes clés que parse_system_info)
+
+        Returns:
+            Dict avec model, serial, firmware et hostname, vide en cas d'erreur
+        """
+        try:
+            system = json.loads(self._send_command(SYSTEM_REQUEST))
+            product_info = json.loads(self._send_command(CHASSIS_REQUEST)).get('product_info') or {}
+        except Exception as e:
+            logger.error(f"Erreur lors de la récupération des informations système: {str(e)}")
+            return {}
+
+        values = {
+            'model': product_info.get('product_name') or system.get('platform_name'),
+            'serial': product_info.get('serial_number'),
+            'firmware': system.get('software_version'),
+            'hostname': system.get('hostname'),
+        }
+        return {key: str(value) for key, value in values.items() if value}
+
+    def _parse_lldp_output(self, output: str) -> List[Dict[str, Any]]:
+        return parse_rest_lldp_neighbors(output)
+
+    def _parse_arp_output(self, arp_output: str) -> Dict[str, str]:
+        return parse_rest_arp_table(arp_output)
+
+    def _parse_mac_table_output(self, mac_output: str) -> List[Dict[str, str]]:
+        return parse_rest_mac_table(mac_output)
@@ -0,0 +1,379 @@
+#!/usr/bin/env python3
+"""
+Parsers des sorties CLI Aruba partagés par le script Python et les filtres Ansible
+
+La sortie LLDP est parcourue une seule fois, ligne par ligne : chaque ligne
+"Clé : valeur" est routée vers le champ correspondant par une table de
+dispatch sur la clé normalisée, mise en cache par clé brute. Les variantes
+AOS-S (2530) et AOS-CX (6100) sont reconnues par les mêmes tables.
+
+L'enrichissement ARP passe par un index inverse MAC canonique -> IPs construit
+une fois par table ARP.
+
+La table d'adresses MAC ('show mac-address') est lue au format AOS-S
+(colonnes Port puis VLAN) comme AOS-CX (VLAN, type puis port) d'après sa ligne
+d'en-tête ; les ports montants sont ceux dont un voisin LLDP est un switch.
+
+Chaque voisin est un dict simple ; les chaînes répétées d'un voisin à l'autre
+(descriptions système, ports) sont internées et l'enrichissement ARP se fait
+en place, sans copie des voisins.
+"""
+
+import re
+import sys
+from typing import Dict, List, Any, Iterable, Mapping, Optional, Pattern, Set
+
+# Clés qui ouvrent un nouveau bloc voisin
+# AOS-S: "Local Port : 1"    AOS-CX: "Port : 1/1/1"
+BLOCK_START_KEYS = frozenset({'local port', 'port'})
+
+# Clé normalisée -> champ du voisin
+FIELD_KEYS = {
+    # Chassis ID
+    'chassis id': 'remote_chassis_id',
+    'chassisid': 'remote_chassis_id',
+    'neighbor chassis id': 'remote_chassis_id',
+    # Port ID
+    'port id': 'remote_port_id',
+    'portid': 'remote_port_id',
+    'neighbor port id': 'remote_port_id',
+    # Nom système
+    'system name': 'remote_system_name',
+    'sysname': 'remote_system_name',
+    'neighbor chassis name': 'remote_system_name',
+    # Description système
+    'system description': 'remote_system_description',
+    'system descr': 'remote_system_description',
+    'neighbor chassis description': 'remote_system_description',
+    # Description du port
+    'port description': 'remote_port_description',
+    'portdescr': 'remote_port_description',
+    'neighbor port desc': 'remote_port_description',
+}
+
+# Clés portant une adresse de management (AOS-S: bloc "Remote Management Address / Address : x")
+MGMT_ADDRESS_KEYS = frozenset({'management address', 'address', 'neighbor management address'})
+
+NEIGHBOR_FIELDS = (
+    'remote_chassis_id',
+    'remote_port_id',
+    'remote_system_name',
+    'remote_system_description',
+    'remote_port_description',
+)
+
+# Champs dont les valeurs se répètent d'un voisin à l'autre (modèles, firmwares, noms de ports):
+# internées pour n'être conservées qu'une fois. Les chassis ID et noms système, uniques, ne le sont pas.
+INTERNED_FIELDS = frozenset({'local_port', 'remote_port_id', 'remote_system_description', 'remote_port_description'})
+
+# Description système d'un switch Aruba / HP ProCurve (AOS-S: "... Switch, revision ...",
+# AOS-CX: "Aruba JL675A 6100 ... Swch, PL.10...") ; les points d'accès Aruba ne correspondent pas
+ARUBA_SWITCH_PATTERN = re.compile(r'^\s*(aruba|hpe?|procurve)\b.*\b(switch|swch)\b', re.IGNORECASE)
+
+IPV4_PATTERN = re.compile(r'\d+\.\d+\.\d+\.\d+')
+CANONICAL_MAC_PATTERN = re.compile(r'[0-9a-f]{2}(?::[0-9a-f]{2}){5}')
+MAC_OCTET_SEPARATORS = re.compile(r'[:\-\s]')
+HEX12_PATTERN = re.compile(r'[0-9a-f]{12}')
+MAC_SEPARATORS = str.maketrans('', '', ':-. ')
+ARP_LINE_PATTERN = re.compile(r'(\d+\.\d+\.\d+\.\d+)\s+([0-9a-fA-F:.-]+)\s+')
+SYSTEM_INFO_PATTERNS = {
+    'model': re.compile(r'Product Model\s*:\s*(.+)', re.IGNORECASE),
+    'serial': re.compile(r'Serial Number\s*:\s*(.+)', re.IGNORECASE),
+    'firmware': re.compile(r'Firmware Version\s*:\s*(.+)', re.IGNORECASE),
+    'hostname': re.compile(r'System Name\s*:\s*(.+)', re.IGNORECASE),
+}
+
+
+def new_neighbor(local_port: str, missing: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Voisin LLDP vide, clés dans l'ordre du JSON de sortie
+
+    Args:
+        local_port: Port local du switch
+        missing: Valeur des champs LLDP absents
+
+    Returns:
+        Dict du voisin, port local interné
+    """
+    return {
+        'local_port': sys.intern(local_port),
+        'remote_chassis_id': missing,
+        'remote_port_id': missing,
+        'remote_system_name': missing,
+        'remote_system_description': missing,
+        'remote_port_description': missing,
+        'management_addresses': [],
+    }
+
+
+def intern_field(field: str, value: Optional[str]) -> Optional[str]:
+    """Interne la valeur d'un champ LLDP répété d'un voisin à l'autre (voir INTERNED_FIELDS)"""
+    if field in INTERNED_FIELDS and isinstance(value, str) and value:
+        return sys.intern(value)
+    return value
+
+
+# Marqueurs de dispatch pour les clés qui ne sont pas des champs simples
+_BLOCK_START = 1
+_MGMT_ADDRESS = 2
+
+# Cache clé brute -> action, les mêmes clés se répétant dans chaque bloc
+_DISPATCH_CACHE: Dict[str, Any] = {}
+_DISPATCH_CACHE_MAX = 4096
+
+
+def _normalize_key(raw_key: str) -> str:
+    """Normalise une clé CLI: minuscules, tirets remplacés, espaces réduits"""
+    return ' '.join(raw_key.lower().replace('-', ' ').split())
+
+
+def _dispatch(raw_key: str) -> Any:
+    """Action associée à une clé brute: nom de champ, marqueur ou None si ignorée"""
+    action = _DISPATCH_CACHE.get(raw_key, 0)
+    if action != 0:
+        return action
+
+    key = _normalize_key(raw_key)
+    if key in BLOCK_START_KEYS:
+        action = _BLOCK_START
+    elif key in MGMT_ADDRESS_KEYS:
+        action = _MGMT_ADDRESS
+    else:
+        action = FIELD_KEYS.get(key)
+
+    if len(_DISPATCH_CACHE) >= _DISPATCH_CACHE_MAX:
+        _DISPATCH_CACHE.clear()
+    _DISPATCH_CACHE[raw_key] = action
+    return action
+
+
+def parse_lldp_neighbors(output: str, missing: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Parse la sortie de 'show lldp neighbors detail' en une seule passe
+
+    Args:
+        output: Sortie brute de la commande LLDP
+        missing: Valeur utilisée pour un champ absent (None côté script, "" côté Ansible)
+
+    Returns:
+        Liste des voisins parsés
+    """
+    neighbors = []
+    neighbor = None
+    dispatch_cache = _DISPATCH_CACHE
+    interned_fields = INTERNED_FIELDS
+    intern = sys.intern
+
+    for line in output.splitlines():
+        raw_key, sep, value = line.partition(':')
+        if not sep:
+            continue
+
+        action = dispatch_cache.get(raw_key, 0)
+        if action == 0:
+            action = _dispatch(raw_key)
+        if action is None:
+            continue
+
+        value = value.strip()
+        if not value:
+            continue
+
+        if action == _BLOCK_START:
+            neighbor = new_neighbor(value.split()[0], missing)
+            neighbors.append(neighbor)
+        elif neighbor is None:
+            continue
+        elif action == _MGMT_ADDRESS:
+            match = IPV4_PATTERN.match(value)
+            if match:
+                neighbor['management_addresses'].append(match.group(0))
+        elif not neighbor[action]:
+            # Première occurrence retenue, comme l'ancien re.search
+            if action in interned_fields:
+                value = intern(value)
+            neighbor[action] = value
+
+    return neighbors
+
+
+def parse_arp_table(arp_output: str) -> Dict[str, str]:
+    """
+    Parse la sortie de 'show arp'
+
+    Args:
+        arp_output: Sortie brute de la commande ARP
+
+    Returns:
+        Dict mapping IP -> MAC
+    """
+    arp_table = {}
+    search = ARP_LINE_PATTERN.search
+
+    for line in arp_output.split('\n'):
+        # Pattern typique: IP Address    MAC Address      Type   Port
+        match = search(line)
+        if match:
+            ip, mac = match.groups()
+            arp_table[ip] = mac.lower()
+
+    return arp_table
+
+
+def parse_mac_address_table(output: str) -> List[Dict[str, str]]:
+    """
+    Parse la sortie de 'show mac-address' (AOS-S) ou 'show mac-address-table' (AOS-CX)
+
+    L'ordre des colonnes est lu sur la ligne d'en-tête "MAC Address ..." ; sans
+    en-tête, l'ordre AOS-S (port puis VLAN) est retenu. Les lignes dont la
+    première colonne n'est pas une adresse MAC sont ignorées.
+
+    Args:
+        output: Sortie brute de la commande
+
+    Returns:
+        Liste de {mac (canonique), port, vlan}, dans l'ordre de la table
+    """
+    entries = []
+    port_column, vlan_column = 1, 2
+
+    for line in output.splitlines():
+        columns = line.split()
+        if len(columns) < 2:
+            continue
+
+        mac = normalize_mac(columns[0])
+        if mac is None:
+            header = [column.lower() for column in columns]
+            if header[:2] == ['mac', 'address'] and 'port' in header and 'vlan' in header:
+                # Colonnes de données: "MAC Address" n'en occupe qu'une
+                port_column, vlan_column = header.index('port') - 1, header.index('vlan') - 1
+            continue
+
+        if len(columns) > max(port_column, vlan_column):
+            entries.append({'mac': mac, 'port': sys.intern(columns[port_column]),
+                            'vlan': sys.intern(columns[vlan_column])})
+
+    return entries
+
+
+def uplink_ports(neighbors: Iterable[Mapping], match: Pattern = ARUBA_SWITCH_PATTERN) -> Set[str]:
+    """
+    Ports locaux reliés à un autre switch, d'après la description système des voisins LLDP
+
+    Les adresses MAC apprises sur ces ports sont celles des équipements situés
+    derrière l'autre switch : elles ne localisent pas un équipement terminal.
+
+    Args:
+        neighbors: Voisins LLDP du switch
+        match: Motif de la description système d'un switch
+
+    Returns:
+        Ensemble des ports locaux montants
+    """
+    return {neighbor.get('local_port') for neighbor in neighbors
+            if neighbor.get('local_port') and match.search(neighbor.get('remote_system_description') or '')}
+
+
+def parse_system_info(system_output: str) -> Dict[str, str]:
+    """
+    Parse la sortie de 'show system'
+
+    Args:
+        system_output: Sortie brute de la commande système
+
+    Returns:
+        Dict avec les informations système
+    """
+    system_info = {}
+
+    for key, pattern in SYSTEM_INFO_PATTERNS.items():
+        match = pattern.search(system_output)
+        if match:
+            system_info[key] = match.group(1).strip()
+
+    return system_info
+
+
+def normalize_mac(value: Optional[str]) -> Optional[str]:
+    """
+    Normalise une adresse MAC 48 bits au format canonique aa:bb:cc:dd:ee:ff
+
+    Formats acceptés: aa:bb:cc:dd:ee:ff, aa-bb-cc-dd-ee-ff, aabbcc-ddeeff (AOS-S),
+    aabb.ccdd.eeff, "aa bb cc dd ee ff" (ChassisId AOS-S), aabbccddeeff et
+    octets non complétés (a:b:c:d:e:f).
+
+    Args:
+        value: Adresse MAC brute ou chassis ID
+
+    Returns:
+        Adresse canonique, None si la valeur n'est pas une adresse MAC
+    """
+    if not value:
+        return None
+
+    value = value.strip().lower()
+    if CANONICAL_MAC_PATTERN.fullmatch(value):
+        return value
+
+    octets = MAC_OCTET_SEPARATORS.split(value)
+    if len(octets) == 6 and all(1 <= len(octet) <= 2 for octet in octets):
+        digits = ''.join(octet.zfill(2) for octet in octets)
+    else:
+        digits = value.translate(MAC_SEPARATORS)
+
+    if not HEX12_PATTERN.fullmatch(digits):
+        return None
+    return ':'.join(digits[i:i + 2] for i in range(0, 12, 2))
+
+
+def build_mac_index(arp_table: Dict[str, str]) -> Dict[str, List[str]]:
+    """
+    Construit l'index inverse MAC canonique -> IPs d'une table ARP
+
+    Args:
+        arp_table: Table ARP IP -> MAC
+
+    Returns:
+        Dict mapping MAC canonique -> liste des IPs, dans l'ordre de la table
+    """
+    mac_index: Dict[str, List[str]] = {}
+
+    for ip, mac in arp_table.items():
+        canonical = normalize_mac(mac)
+        if canonical is not None:
+            mac_index.setdefault(canonical, []).append(ip)
+
+    return mac_index
+
+
+def enrich_neighbors(neighbors: List[Dict[str, Any]], mac_index: Dict[str, List[str]]) -> List[Dict[str, Any]]:
+    """
+    Enrichit en place les voisins LLDP avec les IPs de l'index ARP
+
+    Chaque voisin est résolu par une recherche directe de son chassis ID
+    normalisé dans l'index ; un chassis ID vide ou qui n'est pas une adresse
+    MAC ne correspond à aucune entrée. Les voisins sont modifiés sans copie :
+    passer des copies pour conserver les originaux.
+
+    Args:
+        neighbors: Liste des voisins LLDP
+        mac_index: Index MAC canonique -> IPs (voir build_mac_index)
+
+    Returns:
+        La même liste, voisins enrichis
+    """
+    for neighbor in neighbors:
+        chassis_id = (neighbor.get('remote_chassis_id') or '').lower()
+        mac = normalize_mac(chassis_id)
+        matching_ips = mac_index.get(mac, []) if mac else []
+
+        # Ajout des adresses de management, sans doublon et dans un ordre stable
+        mgmt_addresses = neighbor.get('management_addresses', [])
+        all_ips = list(dict.fromkeys(matching_ips + mgmt_addresses))
+
+        neighbor['ip_addresses'] = all_ips
+        neighbor['mac_address'] = mac or chassis_id
+        neighbor['hostname'] = neighbor.get('remote_system_name', 'Unknown')
+
+    return neighbors
@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+"""
+Moteur de collecte asyncio pour la découverte LLDP à grande échelle
+
+Toutes les sessions SSH (asyncssh) partagent une seule boucle d'événements,
+bornée par un sémaphore global et par un espacement minimal des commandes par
+switch. Le parsing et l'enrichissement réutilisent ArubaLLDPDiscovery afin de
+produire exactement le même schéma de résultats que le moteur Netmiko. Les
+switches collectés par l'API REST (aruba_aoscx_rest) passent par le collecteur
+REST, exécuté dans un thread.
+"""
+
+import asyncio
+import logging
+import re
+import time
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Callable
+
+from lldp_discovery import ArubaLLDPDiscovery, REST_DEVICE_TYPES, discover_switch, new_results, record_switch_result
+from snapshot_cache import SnapshotCache
+from raw_capture import RawCapture
+from run_metrics import RunMetrics
+from fleet_arp import FleetARPIndex, is_arp_source
+from retry_scheduler import RetryScheduler, DiscoveryError, classify_error, ERROR_TIMEOUT, ERROR_CONFIG
+
+logger = logging.getLogger(__name__)
+# asyncssh journalise chaque ouverture/fermeture de canal en INFO, trop bavard sur des milliers de switches
+logging.getLogger('asyncssh').setLevel(logging.WARNING)
+
+ANSI_ESCAPE = re.compile(r'\x1b\[[0-9;?]*[A-Za-z]')
+PROMPT_PATTERN = re.compile(r'(?:^|\n)([^\n]*[>#]) ?$')
+PRESS_ANY_KEY = 'Press any key to continue'
+
+
+def _import_asyncssh():
+    """Importe asyncssh (et cryptography) au démarrage d'une collecte async, pas au chargement du module"""
+    try:
+        import asyncssh
+    except ImportError:  # dépendance optionnelle, uniquement pour --engine async
+        raise RuntimeError("Le moteur async nécessite le paquet 'asyncssh' (pip install asyncssh)") from None
+    return asyncssh
+
+
+class HostRateLimiter:
+    """Impose un espacement minimal entre deux commandes envoyées au même switch"""
+
+    def __init__(self, min_interval: float = 0.0):
+        self.min_interval = min_interval
+        self._next_allowed: Dict[str, float] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    async def wait(self, host: str):
+        """Attend que le switch puisse recevoir une nouvelle commande"""
+        if self.min_interval <= 0:
+            return
+
+        lock = self._locks.setdefault(host, asyncio.Lock())
+        async with lock:
+            loop = asyncio.get_running_loop()
+            delay = self._next_allowed.get(host, 0.0) - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._next_allowed[host] = loop.time() + self.min_interval
+
+
+class AsyncArubaSession:
+    """Session CLI interactive asyncssh sur un switch Aruba"""
+
+    def __init__(self, host: str, username: str, password: str, port: int = 22,
+                 timeout: float = 60, rate_limiter: Optional[HostRateLimiter] = None):
+        """
+        Initialise la session
+
+        Args:
+            host: Adresse IP du switch
+            username: Nom d'utilisateur
+            password: Mot de passe
+            port: Port SSH
+            timeout: Timeout de connexion et de lecture en secondes
+            rate_limiter: Limiteur de débit par switch partagé
+        """
+        self.host = host
+        self.username = username
+        self.password = password
+        self.port = port
+        self.timeout = timeout
+        self.rate_limiter = rate_limiter or HostRateLimiter()
+        self.prompt = None
+        self._conn = None
+        self._process = None
+
+    async def connect(self):
+        """Ouvre la connexion, le shell interactif et désactive la pagination"""
+        asyncssh = _import_asyncssh()
+        self._conn = await asyncio.wait_for(
+            asyncssh.connect(self.host, port=self.port, username=self.username, password=self.password,
+                             known_hosts=None, client_keys=None, agent_path=None),
+            timeout=self.timeout
+        )
+        self._process = await self._conn.create_process(term_type='vt100', term_size=(511, 24),
+                                                        encoding='utf-8', errors='ignore')
+
+        banner = await self._read_until_prompt(self.timeout)
+        self.prompt = PROMPT_PATTERN.search(banner).group(1).strip()
+        await self.send_command("no paging")
+
+    async def _read_until_prompt(self, timeout: float) -> str:
+        """Lit la sortie jusqu'au prochain prompt CLI"""
+        buffer = ''
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+
+        while True:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                raise asyncio.TimeoutError(f"Prompt non reçu de {self.host}")
+
+            chunk = await asyncio.wait_for(self._process.stdout.read(65536), timeout=remaining)
+            if not chunk:
+                raise ConnectionError(f"Session fermée par {self.host}")
+
+            buffer += ANSI_ESCAPE.sub('', chunk).replace('\r\n', '\n').replace('\r', '')
+
+            if PRESS_ANY_KEY in buffer:
+                buffer = buffer.replace(PRESS_ANY_KEY, '')
+                self._process.stdin.write('\r')
+                continue
+
+            match = PROMPT_PATTERN.search(buffer)
+            if match and (self.prompt is None or match.group(1).strip() == self.prompt):
+                return buffer
+
+    async def send_command(self, command: str) -> str:
+        """
+        Exécute une commande et retourne sa sortie sans écho ni prompt
+
+        Args:
+            command: Commande CLI
+
+        Returns:
+            Sortie de la commande
+        """
+        await self.rate_limiter.wait(self.host)
+        self._process.stdin.write(command + '\r')
+        output = await self._read_until_prompt(self.timeout)
+
+        lines = output.split('\n')
+        if lines and lines[0].strip() == command:
+            lines = lines[1:]
+        if lines and lines[-1].strip() == self.prompt:
+            lines = lines[:-1]
+        return '\n'.join(lines)
+
+    async def close(self):
+        """Ferme la session"""
+        if self._conn:
+            self._conn.close()
+            await self._conn.wait_closed()
+            logger.info(f"Connexion fermée pour {self.host}")
+
+
+async def discover_switch_async(switch_config: Dict[str, Any], rate_limiter: HostRateLimiter,
+                                timeout: float = 60,
+                                snapshot_cache: Optional[SnapshotCache] = None,
+                                raw_capture: Optional[RawCapture] = None,
+                                metrics: Optional[RunMetrics] = None,
+                                raise_errors: bool = False,
+                                fleet_arp: Optional[FleetARPIndex] = None) -> Optional[Dict[str, Any]]:
+    """
+    Découverte LLDP d'un switch via asyncssh
+
+    Args:
+        switch_config: Configuration du switch
+        rate_limiter: Limiteur de débit par switch
+        timeout: Timeout de connexion et de lecture en secondes
+        snapshot_cache: Cache de snapshots pour la découverte incrémentale
+        raw_capture: Capture des transcriptions brutes (--save-raw)
+        metrics: Mesures par phase de l'exécution (None = pas de mesure)
+        raise_errors: Lève DiscoveryError (classe de l'échec) au lieu de retourner None
+        fleet_arp: Index ARP partagé de la flotte (None = 'show arp' sur le switch)
+
+    Returns:
+        Données de découverte du switch, None en cas d'échec
+    """
+    host = switch_config.get('host')
+    username = switch_config.get('username')
+    password = switch_config.get('password')
+
+    if not all([host, username, password]):
+        logger.error(f"Configuration incomplète pour le switch: {switch_config}")
+        if raise_errors:
+            raise DiscoveryError(ERROR_CONFIG, 'configuration incomplète')
+        return None
+
+    device_type = switch_config.get('device_type', 'aruba_os')
+    if device_type in REST_DEVICE_TYPES:
+        # Collecteur REST (requests, bloquant) exécuté dans un thread
+        return await asyncio.to_thread(discover_switch, switch_config, timeout=int(timeout),
+                                       snapshot_cache=snapshot_cache, raw_capture=raw_capture, metrics=metrics,
+                                       raise_errors=raise_errors, fleet_arp=fleet_arp)
+
+    logger.info(f"Début de la découverte pour {host}")
+    session = AsyncArubaSession(host, username, password, port=int(switch_config.get('port', 22)),
+                                timeout=timeout, rate_limiter=rate_limiter)
+
+    transcript = []
+
+    async def run(command: str) -> str:
+        started_at = datetime.now().isoformat()
+        start = time.monotonic()
+        output = await session.send_command(command)
+        elapsed = time.monotonic() - start
+        if metrics is not None:
+            metrics.record_command(host, command, elapsed, len(output.encode('utf-8')))
+        transcript.append({'command': command, 'started_at': started_at,
+                           'duration': round(elapsed, 3), 'output': output})
+        return output
+
+    try:
+        start = time.monotonic()
+        try:
+            await session.connect()
+        finally:
+            if metrics is not None:
+                metrics.record(host, 'connect', time.monotonic() - start)
+        logger.info(f"Connexion réussie au switch {host}")
+        lldp_output = await run(ArubaLLDPDiscovery.LLDP_COMMAND)
+        arp_output = None
+        if fleet_arp is None:
+            arp_output = await run(ArubaLLDPDiscovery.ARP_COMMAND)
+        mac_output = None
+        if switch_config.get('collect_mac_table'):
+            mac_output = await run(ArubaLLDPDiscovery.MAC_TABLE_COMMAND)
+    except asyncio.TimeoutError as e:
+        logger.error(f"Timeout lors de la découverte de {host}")
+        if raise_errors:
+            raise DiscoveryError(ERROR_TIMEOUT, str(e))
+        return None
+    except Exception as e:
+        logger.error(f"Erreur de découverte pour {host}: {str(e)}")
+        if raise_errors:
+            raise DiscoveryError(classify_error(e), str(e))
+        return None
+    finally:
+        start = time.monotonic()
+        await session.close()
+        if metrics is not None:
+            metrics.record(host, 'disconnect', time.monotonic() - start)
+
+    if raw_capture is not None:
+        raw_capture.save(host, device_type, transcript)
+
+    parser = ArubaLLDPDiscovery(host, username, password, device_type, snapshot_cache=snapshot_cache,
+                                metrics=metrics, static_uplinks=switch_config.get('uplink_ports'),
+                                arp_source=is_arp_source(switch_config), fleet_arp=fleet_arp)
+    switch_data = parser.build_switch_data(lldp_output, arp_output, mac_output)
+    logger.info(f"Découverte terminée pour {host}: {switch_data.get('neighbors_count', 0)} voisins")
+    return switch_data
+
+
+async def _discover_all(switches_config: List[Dict[str, Any]], concurrency: int,
+                        switch_timeout: Optional[float], min_command_interval: float,
+                        on_complete: Callable[[int, Optional[Dict[str, Any]]], None],
+                        snapshot_cache: Optional[SnapshotCache] = None,
+                        raw_capture: Optional[RawCapture] = None,
+                        metrics: Optional[RunMetrics] = None,
+                        scheduler: Optional[RetryScheduler] = None,
+                        fleet_arp: Optional[FleetARPIndex] = None):
+    """
+    Lance toutes les découvertes sur une seule boucle, bornées par un sémaphore global
+
+    Avec un ordonnanceur, les erreurs passagères sont retentées dans le délai
+    maximal du switch ; le sémaphore est libéré pendant l'attente entre deux tentatives.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    rate_limiter = HostRateLimiter(min_command_interval)
+    connect_timeout = 60 if switch_timeout is None else min(60, switch_timeout)
+
+    async def bounded(index: int, switch_config: Dict[str, Any]):
+        host = switch_config.get('host')
+        attempts = 1 if scheduler is None else scheduler.attempts(host)
+        start = deadline = None
+        switch_data = None
+        for number in range(1, attempts + 1):
+            async with semaphore:
+                # Délai maximal compté depuis le premier démarrage effectif du switch
+                if start is None:
+                    start = time.monotonic()
+                    deadline = None if switch_timeout is None else start + switch_timeout
+                error = None
+                try:
+                    switch_data = await asyncio.wait_for(
+                        discover_switch_async(switch_config, rate_limiter, connect_timeout, snapshot_cache,
+                                              raw_capture, metrics, raise_errors=scheduler is not None,
+                                              fleet_arp=fleet_arp),
+                        timeout=None if deadline is None else max(0.0, deadline - time.monotonic())
+                    )
+                except asyncio.TimeoutError:
+                    logger.error(f"Délai de {switch_timeout}s dépassé pour {host}, switch abandonné")
+                    error = DiscoveryError(ERROR_TIMEOUT, 'délai maximal du switch dépassé')
+                except DiscoveryError as e:
+                    error = e
+            if scheduler is None:
+                break
+            if error is None:
+                scheduler.record_success(host)
+                break
+            delay = None
+            if deadline is None or time.monotonic() < deadline:
+                delay = scheduler.retry_delay(host, number, attempts, error, deadline)
+            if delay is None:
+                scheduler.record_failure(switch_config, error)
+                break
+            # Sémaphore libéré pendant l'attente
+            await asyncio.sleep(delay)
+        if metrics is not None:
+            metrics.record(host, 'total', time.monotonic() - start)
+        # Exécuté dans la boucle d'événements: pas d'accès concurrent aux résultats
+        on_complete(index, switch_data)
+
+    await asyncio.gather(*(bounded(index, switch_config) for index, switch_config in enumerate(switches_config)))
+
+
+def discover_all_switches_async(switches_config: List[Dict[str, Any]], concurrency: int = 100,
+                                switch_timeout: Optional[float] = None,
+                                min_command_interval: float = 0.0,
+                                on_result: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+                                snapshot_cache: Optional[SnapshotCache] = None,
+                                raw_capture: Optional[RawCapture] = None,
+                                metrics: Optional[RunMetrics] = None,
+                                scheduler: Optional[RetryScheduler] = None,
+                                fleet_arp: Optional[FleetARPIndex] = None) -> Dict[str, Any]:
+    """
+    Lance la découverte LLDP sur tous les switches avec le moteur asyncio
+
+    Args:
+        switches_config: Liste des configurations de switches
+        concurrency: Nombre maximal de sessions SSH simultanées
+        switch_timeout: Délai maximal par switch en secondes (None = illimité)
+        min_command_interval: Espacement minimal entre deux commandes sur un même switch
+        on_result: Si fourni, reçoit (host, données) dès qu'un switch est terminé ;
+            les résultats ne sont alors pas conservés dans 'switches'
+        snapshot_cache: Cache de snapshots pour la découverte incrémentale
+        raw_capture: Capture des transcriptions brutes (--save-raw)
+        metrics: Mesures par switch et par phase (None = pas de mesure)
+        scheduler: Nouvelles tentatives des erreurs passagères et disjoncteurs par
+            switch ; les switches dont le disjoncteur est ouvert ne sont pas interrogés
+        fleet_arp: Index ARP partagé de la flotte (None = 'show arp' sur chaque switch)
+
+    Returns:
+        Données de découverte consolidées (même schéma que discover_all_switches)
+    """
+    _import_asyncssh()
+
+    all_results = new_results(len(switches_config))
+    if scheduler is not None:
+        switches_config, _ = scheduler.partition(switches_config)
+
+    if on_result is not None:
+        def stream(index: int, switch_data: Optional[Dict[str, Any]]):
+            if switch_data:
+                record_switch_result(all_results, switches_config[index]['host'], switch_data, on_result)
+
+        asyncio.run(_discover_all(switches_config, max(1, concurrency), switch_timeout,
+                                  min_command_interval, stream, snapshot_cache, raw_capture,
+                                  metrics, scheduler, fleet_arp))
+        return all_results
+
+    results: List[Optional[Dict[str, Any]]] = [None] * len(switches_config)
+    asyncio.run(_discover_all(switches_config, max(1, concurrency), switch_timeout,
+                              min_command_interval, results.__setitem__, snapshot_cache, raw_capture,
+                              metrics, scheduler, fleet_arp))
+    for switch_config, switch_data in zip(switches_config, results):
+        if switch_data:
+            record_switch_result(all_results, switch_config['host'], switch_data)
+
+    return all_results
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Temporisation adaptative des commandes CLI
+
+Remplace le global_delay_factor fixe par des délais appris à partir des temps
+de retour du prompt observés, par switch et par type d'équipement, et conservés
+d'une exécution à l'autre dans un fichier JSON :
+
+    {"hosts": {host: profil}, "device_types": {type: profil}, "last_run": {...}}
+
+Un profil contient le facteur de délai Netmiko à utiliser et, par commande, la
+moyenne glissante et le maximum des temps de réponse. Après une erreur, le
+profil repasse en délais conservateurs jusqu'à plusieurs sessions réussies.
+"""
+
+import json
+import logging
+import os
+import threading
+from datetime import datetime
+from typing import Dict, List, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+# Ancienne valeur fixe, utilisée après une erreur
+CONSERVATIVE_DELAY_FACTOR = 2.0
+FAST_DELAY_FACTOR = 1.0
+# Sessions réussies consécutives avant de revenir aux délais rapides
+RELAX_AFTER_SESSIONS = 3
+
+# Délai de lecture d'une commande jamais observée (lecture pilotée par le prompt,
+# la commande rend la main dès que le prompt revient)
+CONSERVATIVE_READ_TIMEOUT = 120.0
+MIN_READ_TIMEOUT = 10.0
+READ_TIMEOUT_SAFETY = 4.0
+MIN_SAMPLES = 3
+EWMA_ALPHA = 0.3
+
+
+def _new_profile() -> Dict[str, Any]:
+    return {'delay_factor': FAST_DELAY_FACTOR, 'success_streak': 0, 'errors': 0, 'commands': {}}
+
+
+def _percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class CommandTimingStore:
+    """Profils de temporisation appris, par switch et par type d'équipement"""
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        Charge les profils existants
+
+        Args:
+            path: Fichier JSON des profils (créé à la sauvegarde) ; None pour des
+                profils en mémoire, appris pendant l'exécution uniquement
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._samples: Dict[str, List[float]] = {}
+        self._hosts: Dict[str, Dict[str, Any]] = {}
+        self._device_types: Dict[str, Dict[str, Any]] = {}
+
+        if path is None:
+            return
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self._hosts = data.get('hosts', {})
+            self._device_types = data.get('device_types', {})
+        except FileNotFoundError:
+            pass
+        except (json.JSONDecodeError, OSError) as e:
+            logger.warning(f"Profils de temporisation illisibles ({path}), ignorés: {str(e)}")
+
+    def _profile(self, host: str, device_type: str) -> Optional[Dict[str, Any]]:
+        """Profil du switch, sinon celui de son type d'équipement"""
+        return self._hosts.get(host) or self._device_types.get(device_type)
+
+    def delay_factor(self, host: str, device_type: str) -> float:
+        """Facteur de délai Netmiko à utiliser pour la connexion"""
+        with self._lock:
+            profile = self._profile(host, device_type)
+            return profile['delay_factor'] if profile else FAST_DELAY_FACTOR
+
+    def read_timeout(self, host: str, device_type: str, command: str) -> float:
+        """
+        Délai maximal d'attente du prompt pour une commande
+
+        Déduit des temps de retour observés (moyenne glissante et maximum) ;
+        délai conservateur tant que la commande n'a pas été suffisamment observée.
+        """
+        with self._lock:
+            for profile in (self._hosts.get(host), self._device_types.get(device_type)):
+                stats = profile and profile['commands'].get(command)
+                if stats and stats['samples'] >= MIN_SAMPLES:
+                    learned = max(stats['ewma'] * READ_TIMEOUT_SAFETY, stats['max'] * 2)
+                    return min(CONSERVATIVE_READ_TIMEOUT, max(MIN_READ_TIMEOUT, learned))
+        return CONSERVATIVE_READ_TIMEOUT
+
+    def record(self, host: str, device_type: str, command: str, seconds: float):
+        """Enregistre le temps de retour du prompt pour une commande"""
+        with self._lock:
+            self._samples.setdefault(command, []).append(seconds)
+            for profile in (self._hosts.setdefault(host, _new_profile()),
+                            self._device_types.setdefault(device_type, _new_profile())):
+                stats = profile['commands'].get(command)
+                if stats is None:
+                    profile['commands'][command] = {'samples': 1, 'ewma': seconds, 'max': seconds}
+                else:
+                    stats['samples'] += 1
+                    stats['ewma'] = EWMA_ALPHA * seconds + (1 - EWMA_ALPHA) * stats['ewma']
+                    stats['max'] = max(stats['max'], seconds)
+
+    def record_session(self, host: str, device_type: str):
+        """Session terminée sans erreur: rapproche le profil des délais rapides"""
+        with self._lock:
+            for profile in (self._hosts.setdefault(host, _new_profile()),
+                            self._device_types.setdefault(device_type, _new_profile())):
+                profile['success_streak'] += 1
+                if profile['success_streak'] >= RELAX_AFTER_SESSIONS:
+                    profile['delay_factor'] = FAST_DELAY_FACTOR
+
+    def record_error(self, host: str, device_type: str):
+        """Erreur de lecture ou de préparation de session: retour aux délais conservateurs"""
+        with self._lock:
+            for profile in (self._hosts.setdefault(host, _new_profile()),
+                            self._device_types.setdefault(device_type, _new_profile())):
+                profile['delay_factor'] = CONSERVATIVE_DELAY_FACTOR
+                profile['success_streak'] = 0
+                profile['errors'] += 1
+
+    def latency_report(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Latences par commande observées pendant l'exécution courante
+
+        Returns:
+            Dict commande -> nombre d'échantillons, moyenne, p95 et maximum (secondes)
+        """
+        with self._lock:
+            return {
+                command: {
+                    'count': len(values),
+                    'mean': round(sum(values) / len(values), 3),
+                    'p95': round(_percentile(values, 0.95), 3),
+                    'max': round(max(values), 3)
+                }
+                for command, values in self._samples.items()
+            }
+
+    def save(self):
+        """Sauvegarde atomique des profils et du rapport de l'exécution courante"""
+        if self.path is None:
+            return
+        report = self.latency_report()
+        with self._lock:
+            data = {'hosts': self._hosts, 'device_types': self._device_types,
+                    'last_run': {'timestamp': datetime.now().isoformat(), 'latency': report}}
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=2, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
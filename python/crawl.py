@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Découverte récursive de la flotte à partir de switches d'amorce
+
+Parcours en largeur, niveau par niveau : les switches d'un niveau sont
+interrogés en parallèle (même moteur, mêmes délais que la découverte
+classique), puis leurs voisins identifiés comme des switches Aruba par leur
+description système sont ajoutés au niveau suivant via leur adresse de
+management. Un switch n'est interrogé qu'une fois, qu'il soit revu par son
+adresse IP ou par sa MAC de châssis ; la profondeur est bornée et les adresses
+suivies sont filtrées par des listes de réseaux inclus et exclus.
+
+Les switches découverts héritent des identifiants, du type d'équipement et du
+port SSH du switch qui les a révélés.
+"""
+
+import ipaddress
+import logging
+from typing import Dict, List, Any, Callable, Iterable, Optional, Pattern, Set, Tuple
+
+from aruba_parsers import normalize_mac, ARUBA_SWITCH_PATTERN
+from lldp_discovery import new_results
+
+logger = logging.getLogger(__name__)
+
+# Clés de configuration propres à un switch, non transmises aux switches qu'il révèle
+SWITCH_SPECIFIC_KEYS = frozenset({'host', 'model', 'description', 'uplink_ports', 'arp_source'})
+
+
+def parse_networks(cidrs: Optional[Iterable[str]]) -> List[Any]:
+    """
+    Convertit une liste de réseaux CIDR
+
+    Raises:
+        ValueError: Si un réseau est invalide
+    """
+    return [ipaddress.ip_network(cidr, strict=False) for cidr in cidrs or ()]
+
+
+class CrawlScope:
+    """Réseaux dans lesquels les adresses de management peuvent être suivies"""
+
+    def __init__(self, include: Optional[Iterable[str]] = None, exclude: Optional[Iterable[str]] = None):
+        """
+        Args:
+            include: Réseaux autorisés (vide: toutes les adresses)
+            exclude: Réseaux interdits, prioritaires sur include
+
+        Raises:
+            ValueError: Si un réseau est invalide
+        """
+        self.include = parse_networks(include)
+        self.exclude = parse_networks(exclude)
+
+    def allows(self, address: str) -> bool:
+        """Indique si une adresse peut être suivie"""
+        try:
+            ip = ipaddress.ip_address(address)
+        except ValueError:
+            return False
+        if any(ip in network for network in self.exclude):
+            return False
+        return not self.include or any(ip in network for network in self.include)
+
+
+def crawl_switches(seeds: List[Dict[str, Any]],
+                   discover_level: Callable[..., Dict[str, Any]],
+                   max_depth: int = 3,
+                   scope: Optional[CrawlScope] = None,
+                   on_result: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+                   match: Pattern = ARUBA_SWITCH_PATTERN) -> Dict[str, Any]:
+    """
+    Découvre la flotte en largeur à partir des switches d'amorce
+
+    Args:
+        seeds: Configurations des switches d'amorce (format de switches_config.json)
+        discover_level: Découverte d'une liste de switches, appelée par niveau
+            avec (configurations, on_result=...) ; par exemple discover_all_switches
+            avec les options de parallélisme et de délais déjà fixées
+        max_depth: Profondeur maximale (0: switches d'amorce uniquement)
+        scope: Réseaux suivis (défaut: toutes les adresses)
+        on_result: Si fourni, reçoit (host, données) dès qu'un switch est terminé ;
+            les résultats ne sont alors pas conservés dans 'switches'
+        match: Motif de la description système des voisins à suivre
+
+    Returns:
+        Données de découverte consolidées ; summary['crawl'] donne le nombre de
+        switches interrogés par niveau et les adresses écartées
+    """
+    scope = scope or CrawlScope()
+    results = new_results(0)
+    crawl_summary = results['summary']['crawl'] = {
+        'switches_per_level': [],
+        'out_of_scope': 0,
+        'beyond_max_depth': 0
+    }
+
+    visited_hosts: Set[str] = set()
+    visited_chassis: Set[str] = set()
+    # (adresse annoncée d'un switch, son port) -> switch interrogé qui le voit sur ce port
+    reported_ports: Dict[Tuple[str, str], str] = {}
+    skipped: Set[str] = set()
+    level = []
+    for seed in seeds:
+        if seed.get('host') and seed['host'] not in visited_hosts:
+            visited_hosts.add(seed['host'])
+            level.append(seed)
+
+    depth = 0
+    while level:
+        logger.info(f"Parcours niveau {depth}: {len(level)} switches")
+        crawl_summary['switches_per_level'].append(len(level))
+
+        level_data: Dict[str, Dict[str, Any]] = {}
+
+        def collect(host: str, switch_data: Dict[str, Any]):
+            level_data[host] = switch_data
+            if on_result is not None:
+                on_result(host, switch_data)
+
+        level_results = discover_level(level, on_result=collect)
+        summary = results['summary']
+        summary['total_switches'] += len(level)
+        summary['successful_connections'] += level_results['summary']['successful_connections']
+        summary['total_neighbors'] += level_results['summary']['total_neighbors']
+
+        # Identité propre des switches interrogés: la MAC de châssis que leurs voisins
+        # interrogés voient, quelle que soit l'adresse de management qu'ils annoncent
+        polled = [(switch_config['host'], level_data[switch_config['host']]) for switch_config in level
+                  if switch_config['host'] in level_data]
+        for host, switch_data in polled:
+            for neighbor in switch_data.get('neighbors', []):
+                for address in neighbor.get('management_addresses') or ():
+                    if neighbor.get('remote_port_id'):
+                        reported_ports.setdefault((address, neighbor['remote_port_id']), host)
+        for host, switch_data in polled:
+            for neighbor in switch_data.get('neighbors', []):
+                if (host, neighbor.get('local_port')) in reported_ports:
+                    chassis = normalize_mac(neighbor.get('mac_address') or neighbor.get('remote_chassis_id'))
+                    if chassis:
+                        visited_chassis.add(chassis)
+
+        # Niveau suivant, dans l'ordre des switches puis des voisins
+        next_level = []
+        for switch_config in level:
+            switch_data = level_data.get(switch_config['host'])
+            if switch_data is None:
+                continue
+            if on_result is None:
+                results['switches'][switch_config['host']] = switch_data
+
+            for addresses, chassis in _switch_neighbors(switch_data, match):
+                if chassis in visited_chassis or any(address in visited_hosts for address in addresses):
+                    if chassis:
+                        visited_chassis.add(chassis)
+                    continue
+                key = chassis or addresses[0]
+                if key in skipped:
+                    continue
+                allowed = [address for address in addresses if scope.allows(address)]
+                if not allowed:
+                    skipped.add(key)
+                    crawl_summary['out_of_scope'] += 1
+                    continue
+                if depth + 1 > max_depth:
+                    skipped.add(key)
+                    crawl_summary['beyond_max_depth'] += 1
+                    continue
+
+                address = allowed[0]
+                visited_hosts.add(address)
+                if chassis:
+                    visited_chassis.add(chassis)
+                child = {name: value for name, value in switch_config.items() if name not in SWITCH_SPECIFIC_KEYS}
+                child['host'] = address
+                next_level.append(child)
+
+        level = next_level
+        depth += 1
+
+    if crawl_summary['out_of_scope'] or crawl_summary['beyond_max_depth']:
+        logger.info(f"Parcours: {crawl_summary['out_of_scope']} switches hors des réseaux autorisés, "
+                    f"{crawl_summary['beyond_max_depth']} au-delà de la profondeur {max_depth}")
+    return results
+
+
+def _switch_neighbors(switch_data: Dict[str, Any], match: Pattern) -> List[Tuple[List[str], Optional[str]]]:
+    """
+    Voisins d'un switch identifiés comme des switches Aruba
+
+    Returns:
+        Liste de (adresses de management, MAC de châssis normalisée ou None)
+    """
+    neighbors = []
+    for neighbor in switch_data.get('neighbors', []):
+        addresses = neighbor.get('management_addresses')
+        if not addresses or not match.search(neighbor.get('remote_system_description') or ''):
+            continue
+        neighbors.append((addresses, normalize_mac(neighbor.get('mac_address') or neighbor.get('remote_chassis_id'))))
+    return neighbors
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Index des équipements terminaux de la flotte : MAC -> (switch, port, IP, VLAN)
+
+LLDP ne voit que les équipements qui le parlent ; imprimantes, caméras et
+postes n'apparaissent que dans les tables d'adresses MAC des switches et, via
+le cœur de réseau L3, dans les tables ARP. L'index joint les tables MAC de
+tous les switches (collectées avec --mac-table, ports montants déjà exclus par
+build_switch_data) à un index MAC -> IPs construit une seule fois à partir de
+toutes les tables ARP collectées (FleetARPIndex, celles des switches
+"arp_source" comprises) : chaque entrée est résolue par une recherche en
+dictionnaire, sans parcours de la table ARP.
+
+Un équipement vu sur les ports d'accès de plusieurs switches (port montant non
+détecté, agrégat non déclaré dans uplink_ports) garde toutes ses positions et
+est compté comme ambigu dans le résumé.
+"""
+
+import json
+import logging
+from typing import Dict, List, Any, Iterable, Tuple
+
+from aruba_parsers import normalize_mac
+from fleet_arp import FleetARPIndex
+
+logger = logging.getLogger(__name__)
+
+
+class EndpointIndex:
+    """Positions des équipements terminaux, par MAC et par IP"""
+
+    def __init__(self):
+        # MAC canonique -> positions {switch, port, vlan, ip_addresses}
+        self.endpoints: Dict[str, List[Dict[str, Any]]] = {}
+        self._by_ip: Dict[str, str] = {}
+        self._switches: List[Tuple[str, Dict[str, Any]]] = []
+        self._built = False
+
+    def add_switch(self, host: str, switch_data: Dict[str, Any]):
+        """
+        Ajoute la table MAC et la table ARP d'un switch interrogé (même signature que on_result)
+
+        Args:
+            host: Adresse du switch
+            switch_data: Données du switch (mac_table, table ARP sous ARP_TABLE_KEY)
+        """
+        self._switches.append((host, switch_data))
+        self._built = False
+
+    def build(self) -> 'EndpointIndex':
+        """
+        Joint les tables MAC de la flotte à l'index ARP
+
+        Returns:
+            L'index lui-même
+        """
+        self.endpoints.clear()
+        self._by_ip.clear()
+
+        # Index MAC -> IPs de toute la flotte (le cœur L3 porte l'ARP des switches d'accès)
+        arp_index = FleetARPIndex()
+        for host, switch_data in self._switches:
+            arp_index.add_switch(host, switch_data)
+
+        for host, switch_data in self._switches:
+            switch_ip = switch_data.get('switch_ip') or host
+            for entry in switch_data.get('mac_table') or ():
+                ips = arp_index.lookup(entry['mac'])
+                self.endpoints.setdefault(entry['mac'], []).append({
+                    'switch': switch_ip,
+                    'port': entry['port'],
+                    'vlan': entry['vlan'],
+                    'ip_addresses': ips,
+                })
+                for ip in ips:
+                    self._by_ip.setdefault(ip, entry['mac'])
+
+        self._built = True
+        return self
+
+    def _ensure_built(self):
+        if not self._built:
+            self.build()
+
+    def locate(self, query: str) -> List[Dict[str, Any]]:
+        """
+        Positions d'un équipement désigné par son adresse MAC (tout format) ou IP
+
+        Returns:
+            Liste de {mac, switch, port, vlan, ip_addresses}, vide si inconnu
+        """
+        self._ensure_built()
+        mac = normalize_mac(query) or self._by_ip.get(query.strip())
+        return [dict(location, mac=mac) for location in self.endpoints.get(mac, [])]
+
+    def summary(self) -> Dict[str, int]:
+        """Nombre d'équipements, d'équipements avec IP, d'équipements ambigus et de switches"""
+        self._ensure_built()
+        return {
+            'endpoints': len(self.endpoints),
+            'with_ip': sum(1 for locations in self.endpoints.values() if locations[0]['ip_addresses']),
+            'ambiguous': sum(1 for locations in self.endpoints.values() if len(locations) > 1),
+            'switches': sum(1 for _, switch_data in self._switches if 'mac_table' in switch_data),
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Export de l'index
+
+        Returns:
+            Dict {summary, endpoints: {MAC: positions}}
+        """
+        self._ensure_built()
+        return {'summary': self.summary(), 'endpoints': self.endpoints}
+
+    def write_json(self, path: str):
+        """Écrit l'index au format JSON"""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, indent=2, ensure_ascii=False)
+
+
+def build_endpoint_index(switches: Iterable[Tuple[str, Dict[str, Any]]]) -> EndpointIndex:
+    """
+    Construit l'index des équipements à partir des résultats de découverte
+
+    Args:
+        switches: Paires (host, données du switch), par exemple results['switches'].items()
+
+    Returns:
+        Index construit
+    """
+    index = EndpointIndex()
+    for host, switch_data in switches:
+        index.add_switch(host, switch_data)
+    return index.build()
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Index ARP partagé de la flotte, collecté une seule fois sur les switches L3
+
+Les switches d'accès (2530) n'ont presque rien dans leur table ARP : 'show arp'
+y coûte un aller-retour par switch sans résoudre d'IP. Les switches marqués
+"arp_source": true dans switches_config.json (cœurs et switches L3) sont donc
+découverts en premier, normalement ; leurs tables ARP sont fusionnées en un
+index MAC -> IPs unique. Les autres switches sont ensuite découverts sans
+'show arp' et leurs voisins sont enrichis avec cet index.
+
+Si aucun switch source n'a répondu, les autres switches reviennent à leur
+propre table ARP.
+
+La table ARP parsée d'un switch source reste en mémoire dans ses données, sous
+la clé privée ARP_TABLE_KEY, le temps d'alimenter l'index : elle n'est jamais
+écrite (JSON, NDJSON), voir public_switch_data.
+"""
+
+import json
+import logging
+from typing import Dict, List, Any, Callable, Optional
+
+from aruba_parsers import build_mac_index
+from snapshot_cache import snapshot_digest
+
+logger = logging.getLogger(__name__)
+
+# Clé de switches_config.json désignant un switch source de la table ARP
+ARP_SOURCE_KEY = 'arp_source'
+
+# Clé privée des données d'un switch portant sa table ARP parsée (en mémoire seulement)
+ARP_TABLE_KEY = '_arp_table'
+
+
+def is_arp_source(switch_config: Dict[str, Any]) -> bool:
+    """Vrai si le switch est marqué comme source de la table ARP de la flotte"""
+    return bool(switch_config.get(ARP_SOURCE_KEY, False))
+
+
+def public_switch_data(switch_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Données d'un switch sans ses clés privées (table ARP), telles qu'elles sont écrites"""
+    if ARP_TABLE_KEY not in switch_data:
+        return switch_data
+    return {key: value for key, value in switch_data.items() if key != ARP_TABLE_KEY}
+
+
+class FleetARPIndex:
+    """Index MAC -> IPs fusionné des tables ARP de plusieurs switches"""
+
+    def __init__(self):
+        self.mac_index: Dict[str, List[str]] = {}
+        self.sources: List[str] = []
+        self.arp_entries = 0
+        self._digest: Optional[str] = None
+
+    def add(self, host: str, arp_table: Dict[str, str]):
+        """
+        Fusionne la table ARP d'un switch dans l'index
+
+        Args:
+            host: Adresse du switch source
+            arp_table: Table ARP IP -> MAC
+        """
+        for mac, ips in build_mac_index(arp_table).items():
+            known = self.mac_index.setdefault(mac, [])
+            known.extend(ip for ip in ips if ip not in known)
+        self.sources.append(host)
+        self.arp_entries += len(arp_table)
+        self._digest = None
+
+    def add_switch(self, host: str, switch_data: Dict[str, Any]):
+        """Fusionne la table ARP des données d'un switch (même signature que on_result)"""
+        self.add(host, switch_data.get(ARP_TABLE_KEY) or {})
+
+    def lookup(self, mac: str) -> List[str]:
+        """IPs d'une MAC canonique, liste vide si inconnue"""
+        return self.mac_index.get(mac, [])
+
+    @property
+    def digest(self) -> str:
+        """Empreinte de l'index, pour le cache de snapshots des switches enrichis avec lui"""
+        if self._digest is None:
+            self._digest = snapshot_digest(json.dumps(sorted(self.mac_index.items())))
+        return self._digest
+
+    def summary(self) -> Dict[str, int]:
+        """Nombre de switches sources, d'entrées ARP fusionnées et de MAC indexées"""
+        return {'sources': len(self.sources), 'arp_entries': self.arp_entries, 'macs': len(self.mac_index)}
+
+
+def discover_with_fleet_arp(switches_config: List[Dict[str, Any]],
+                            discover: Callable[..., Dict[str, Any]],
+                            fleet_arp: FleetARPIndex,
+                            on_result: Optional[Callable[[str, Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+    """
+    Découverte en deux phases: switches sources de l'ARP, puis tous les autres
+
+    Args:
+        switches_config: Liste des configurations de switches
+        discover: Découverte d'une liste de switches, appelée avec
+            (configurations, on_result=..., fleet_arp=...) ; fleet_arp vaut None
+            pour la première phase
+        fleet_arp: Index alimenté par la première phase ; il peut déjà contenir
+            les sources d'un appel précédent (niveaux d'un parcours récursif)
+        on_result: Si fourni, reçoit (host, données) dès qu'un switch est terminé ;
+            les résultats ne sont alors pas conservés dans 'switches'
+
+    Returns:
+        Données de découverte consolidées, dans l'ordre de la configuration
+    """
+    # Import différé: lldp_discovery importe ce module
+    from lldp_discovery import new_results
+
+    sources = [switch_config for switch_config in switches_config if is_arp_source(switch_config)]
+    others = [switch_config for switch_config in switches_config if not is_arp_source(switch_config)]
+    collected: Dict[str, Dict[str, Any]] = {}
+
+    def collect(host: str, switch_data: Dict[str, Any]):
+        fleet_arp.add_switch(host, switch_data)
+        if on_result is not None:
+            on_result(host, switch_data)
+        else:
+            collected[host] = switch_data
+
+    results = new_results(0)
+    summary = results['summary']
+
+    def run_phase(configs: List[Dict[str, Any]], callback: Callable[[str, Dict[str, Any]], None],
+                  shared: Optional[FleetARPIndex]):
+        phase_results = discover(configs, on_result=callback, fleet_arp=shared)
+        for key in ('total_switches', 'successful_connections', 'total_neighbors'):
+            summary[key] += phase_results['summary'][key]
+
+    if sources:
+        run_phase(sources, collect, None)
+    if others:
+        shared = None
+        if fleet_arp.sources:
+            shared = fleet_arp
+            logger.info(f"Index ARP de la flotte: {fleet_arp.arp_entries} entrées de "
+                        f"{len(fleet_arp.sources)} switches sources, {len(others)} switches sans 'show arp'")
+        else:
+            logger.warning("Aucune table ARP source collectée, les switches utilisent leur propre table ARP")
+        run_phase(others, on_result or collected.__setitem__, shared)
+
+    if on_result is None:
+        for switch_config in switches_config:
+            if switch_config.get('host') in collected:
+                results['switches'][switch_config['host']] = collected[switch_config['host']]
+    summary['fleet_arp'] = fleet_arp.summary()
+    return results
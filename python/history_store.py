@@ -0,0 +1,407 @@
+#!/usr/bin/env python3
+"""
+Historique SQLite des voisins découverts
+
+Chaque exécution est ajoutée à une base SQLite (mode WAL) en une seule
+transaction. Les observations inchangées ne sont pas dupliquées : un voisin
+identique (même port, mêmes attributs) vu à nouveau prolonge son intervalle de
+validité [first_seen, ended_at), et une nouvelle ligne n'est créée que lorsque
+le voisin apparaît ou change. La base grossit donc avec les changements de la
+flotte et non avec le nombre d'interrogations.
+
+Les recherches par MAC, IP, nom d'équipement et (switch, port) sont indexées ;
+'ended_at' vaut NULL tant que l'observation est en cours. Un switch injoignable
+lors d'une exécution ne ferme pas ses intervalles.
+
+Usage:
+    python3 python/lldp_discovery.py --history-db output/history.db
+    python3 python/lldp_discovery.py query --db output/history.db --mac 00:11:22:33:44:55 --since 2024-05-01
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Any, Optional, Tuple
+from urllib.parse import quote
+
+from aruba_parsers import normalize_mac
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    discovery_timestamp TEXT NOT NULL,
+    switches INTEGER NOT NULL,
+    neighbors INTEGER NOT NULL,
+    new_observations INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS observations (
+    id INTEGER PRIMARY KEY,
+    switch TEXT NOT NULL,
+    local_port TEXT NOT NULL,
+    mac TEXT,
+    chassis_id TEXT,
+    hostname TEXT COLLATE NOCASE,
+    fingerprint TEXT NOT NULL,
+    data TEXT NOT NULL,
+    first_seen TEXT NOT NULL,
+    last_seen TEXT NOT NULL,
+    ended_at TEXT
+);
+CREATE TABLE IF NOT EXISTS observation_ips (
+    observation_id INTEGER NOT NULL REFERENCES observations(id) ON DELETE CASCADE,
+    ip TEXT NOT NULL,
+    kind TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS observations_mac ON observations (mac);
+CREATE INDEX IF NOT EXISTS observations_hostname ON observations (hostname);
+CREATE INDEX IF NOT EXISTS observations_switch_port ON observations (switch, local_port);
+CREATE INDEX IF NOT EXISTS observation_ips_ip ON observation_ips (ip);
+CREATE INDEX IF NOT EXISTS observation_ips_observation ON observation_ips (observation_id);
+"""
+
+# Colonnes renvoyées par les recherches
+QUERY_COLUMNS = ('switch', 'local_port', 'mac', 'hostname', 'first_seen', 'last_seen', 'ended_at', 'data')
+
+
+def neighbor_fingerprint(neighbor: Dict[str, Any]) -> str:
+    """Empreinte des attributs d'un voisin, indépendante de l'ordre des clés"""
+    encoded = json.dumps(neighbor, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha1(encoded.encode('utf-8')).hexdigest()
+
+
+def normalize_timestamp(value: str) -> str:
+    """
+    Convertit une date ISO 8601 ('2024-05-02', '2024-05-02T10:30') au format des horodatages de la base
+
+    Raises:
+        ValueError: Si la date est invalide
+    """
+    return datetime.fromisoformat(value).isoformat()
+
+
+class HistoryStore:
+    """Base SQLite des observations de voisins, par intervalles de validité"""
+
+    def __init__(self, path: str, read_only: bool = False):
+        """
+        Ouvre (ou crée) la base
+
+        Args:
+            path: Fichier SQLite
+            read_only: Ouvre une base existante en lecture seule, sans jamais la créer
+                ni la modifier (recherches)
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._run: Optional[Dict[str, Any]] = None
+        if read_only:
+            self._conn = sqlite3.connect(f"file:{quote(path)}?mode=ro", uri=True, check_same_thread=False,
+                                         isolation_level=None)
+            return
+        # Les résultats arrivent depuis les threads de découverte en mode flux
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.executescript(SCHEMA)
+
+    def close(self):
+        """Ferme la base (annule une exécution non validée)"""
+        with self._lock:
+            if self._run is not None:
+                self._conn.execute("ROLLBACK")
+                self._run = None
+            self._conn.close()
+
+    def __enter__(self) -> 'HistoryStore':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def begin_run(self, discovery_timestamp: Optional[str] = None):
+        """
+        Ouvre la transaction d'une exécution
+
+        Args:
+            discovery_timestamp: Horodatage de l'exécution (défaut: maintenant)
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            next_id = self._conn.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM observations").fetchone()[0]
+            self._run = {
+                'timestamp': discovery_timestamp or datetime.now().isoformat(),
+                'next_id': next_id,
+                'switches': 0,
+                'neighbors': 0,
+                'new_observations': 0
+            }
+
+    def add_switch(self, host: str, switch_data: Dict[str, Any]):
+        """
+        Ajoute les voisins d'un switch à l'exécution en cours (même signature que on_result)
+
+        Les voisins identiques à une observation en cours prolongent son
+        intervalle ; les autres ouvrent une nouvelle observation, et les
+        observations en cours qui ne sont plus vues sont fermées.
+
+        Args:
+            host: Adresse du switch
+            switch_data: Données du switch (neighbors, timestamp...)
+        """
+        with self._lock:
+            run = self._run
+            if run is None:
+                raise RuntimeError("begin_run() doit être appelé avant add_switch()")
+            seen_at = switch_data.get('timestamp') or run['timestamp']
+
+            # Observations en cours du switch, par (port, empreinte)
+            current: Dict[Tuple[str, str], List[int]] = {}
+            for observation_id, local_port, fingerprint in self._conn.execute(
+                    "SELECT id, local_port, fingerprint FROM observations WHERE switch = ? AND ended_at IS NULL",
+                    (host,)):
+                current.setdefault((local_port, fingerprint), []).append(observation_id)
+
+            extended = []
+            inserted = []
+            ips = []
+            neighbors = switch_data.get('neighbors', [])
+            for neighbor in neighbors:
+                local_port = str(neighbor.get('local_port') or '')
+                fingerprint = neighbor_fingerprint(neighbor)
+                matches = current.get((local_port, fingerprint))
+                if matches:
+                    extended.append((seen_at, matches.pop()))
+                    continue
+
+                observation_id = run['next_id']
+                run['next_id'] += 1
+                chassis_id = neighbor.get('remote_chassis_id') or None
+                inserted.append((
+                    observation_id, host, local_port,
+                    normalize_mac(neighbor.get('mac_address') or chassis_id),
+                    chassis_id,
+                    neighbor.get('hostname') or neighbor.get('remote_system_name') or None,
+                    fingerprint,
+                    json.dumps(neighbor, ensure_ascii=False),
+                    seen_at, seen_at
+                ))
+                for kind, field in (('arp', 'ip_addresses'), ('management', 'management_addresses')):
+                    ips.extend((observation_id, ip, kind) for ip in neighbor.get(field) or ())
+
+            closed = [(seen_at, observation_id) for ids in current.values() for observation_id in ids]
+            self._conn.executemany("UPDATE observations SET last_seen = ? WHERE id = ?", extended)
+            self._conn.executemany("UPDATE observations SET ended_at = ? WHERE id = ?", closed)
+            self._conn.executemany(
+                "INSERT INTO observations (id, switch, local_port, mac, chassis_id, hostname, fingerprint, data, "
+                "first_seen, last_seen) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", inserted)
+            self._conn.executemany("INSERT INTO observation_ips (observation_id, ip, kind) VALUES (?, ?, ?)", ips)
+
+            run['switches'] += 1
+            run['neighbors'] += len(neighbors)
+            run['new_observations'] += len(inserted)
+
+    def commit_run(self) -> Dict[str, Any]:
+        """
+        Valide l'exécution en cours
+
+        Returns:
+            Dict {discovery_timestamp, switches, neighbors, new_observations}
+        """
+        with self._lock:
+            run = self._run
+            if run is None:
+                raise RuntimeError("Aucune exécution en cours")
+            self._conn.execute(
+                "INSERT INTO runs (discovery_timestamp, switches, neighbors, new_observations) VALUES (?, ?, ?, ?)",
+                (run['timestamp'], run['switches'], run['neighbors'], run['new_observations']))
+            self._conn.execute("COMMIT")
+            self._run = None
+        return {'discovery_timestamp': run['timestamp'], 'switches': run['switches'],
+                'neighbors': run['neighbors'], 'new_observations': run['new_observations']}
+
+    def ingest(self, results: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Ajoute une exécution complète (format de lldp_discovery.json) en une transaction
+
+        Returns:
+            Statistiques de l'exécution (voir commit_run)
+        """
+        self.begin_run(results.get('discovery_timestamp'))
+        try:
+            for host, switch_data in results.get('switches', {}).items():
+                self.add_switch(host, switch_data)
+        except Exception:
+            with self._lock:
+                self._conn.execute("ROLLBACK")
+                self._run = None
+            raise
+        return self.commit_run()
+
+    def prune(self, retention_days: float) -> int:
+        """
+        Supprime les observations terminées depuis plus de retention_days jours
+
+        Returns:
+            Nombre d'observations supprimées
+        """
+        cutoff = (datetime.now() - timedelta(days=retention_days)).isoformat()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            deleted = self._conn.execute(
+                "DELETE FROM observations WHERE ended_at IS NOT NULL AND ended_at < ?", (cutoff,)).rowcount
+            self._conn.execute("DELETE FROM runs WHERE discovery_timestamp < ?", (cutoff,))
+            self._conn.execute("COMMIT")
+        return deleted
+
+    def query(self, mac: Optional[str] = None, ip: Optional[str] = None, hostname: Optional[str] = None,
+              switch: Optional[str] = None, port: Optional[str] = None, at: Optional[str] = None,
+              since: Optional[str] = None, until: Optional[str] = None, current: bool = False,
+              limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Recherche des observations
+
+        Args:
+            mac: Adresse MAC (tout format accepté par normalize_mac)
+            ip: Adresse IP (ARP ou management)
+            hostname: Nom de l'équipement (insensible à la casse)
+            switch: Adresse du switch
+            port: Port local du switch (avec switch)
+            at: Observations valides à cet instant
+            since: Observations valides après cet instant
+            until: Observations valides avant cet instant
+            current: Observations en cours uniquement
+            limit: Nombre maximal de résultats
+
+        Returns:
+            Observations les plus récentes d'abord: switch, local_port, mac,
+            hostname, first_seen, last_seen, ended_at (None si en cours) et
+            neighbor (données complètes du voisin)
+        """
+        conditions = []
+        params: List[Any] = []
+        if mac is not None:
+            conditions.append("mac = ?")
+            params.append(normalize_mac(mac) or mac.strip().lower())
+        if ip is not None:
+            conditions.append("id IN (SELECT observation_id FROM observation_ips WHERE ip = ?)")
+            params.append(ip)
+        if hostname is not None:
+            conditions.append("hostname = ?")
+            params.append(hostname)
+        if switch is not None:
+            conditions.append("switch = ?")
+            params.append(switch)
+        if port is not None:
+            conditions.append("local_port = ?")
+            params.append(port)
+        if at is not None:
+            since = until = at
+        if until is not None:
+            conditions.append("first_seen <= ?")
+            params.append(normalize_timestamp(until))
+        if since is not None:
+            conditions.append("(ended_at IS NULL OR ended_at > ?)")
+            params.append(normalize_timestamp(since))
+        if current:
+            conditions.append("ended_at IS NULL")
+
+        sql = f"SELECT {', '.join(QUERY_COLUMNS)} FROM observations"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY first_seen DESC, id DESC"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        observations = []
+        for row in rows:
+            observation = dict(zip(QUERY_COLUMNS, row))
+            observation['neighbor'] = json.loads(observation.pop('data'))
+            observations.append(observation)
+        return observations
+
+    def stats(self) -> Dict[str, int]:
+        """Nombre d'exécutions, d'observations et d'observations en cours"""
+        with self._lock:
+            runs, polled = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(neighbors), 0) FROM runs").fetchone()
+            observations, open_observations = self._conn.execute(
+                "SELECT COUNT(*), COUNT(*) - COUNT(ended_at) FROM observations").fetchone()
+        return {'runs': runs, 'neighbors_polled': polled,
+                'observations': observations, 'open_observations': open_observations}
+
+
+def query_main(argv: Optional[List[str]] = None) -> int:
+    """Sous-commande 'query': recherche dans l'historique"""
+    parser = argparse.ArgumentParser(prog='lldp_discovery.py query',
+                                     description='Recherche dans l\'historique SQLite des voisins')
+    parser.add_argument('--db', default='output/history.db', help='Base d\'historique (défaut: output/history.db)')
+    parser.add_argument('--mac', help='Adresse MAC du voisin')
+    parser.add_argument('--ip', help='Adresse IP du voisin (ARP ou management)')
+    parser.add_argument('--hostname', help='Nom du voisin')
+    parser.add_argument('--switch', help='Adresse du switch')
+    parser.add_argument('--port', help='Port local du switch (avec --switch)')
+    parser.add_argument('--at', metavar='DATE', help='Observations valides à cet instant (ISO 8601)')
+    parser.add_argument('--since', metavar='DATE', help='Observations valides après cet instant (ISO 8601)')
+    parser.add_argument('--until', metavar='DATE', help='Observations valides avant cet instant (ISO 8601)')
+    parser.add_argument('--current', action='store_true', help='Observations en cours uniquement')
+    parser.add_argument('--limit', type=int, default=None, help='Nombre maximal de résultats')
+    parser.add_argument('--json', action='store_true', help='Sortie JSON avec les données complètes des voisins')
+    parser.add_argument('--stats', action='store_true', help='Affiche la taille de l\'historique')
+    args = parser.parse_args(argv)
+
+    if args.port and not args.switch:
+        parser.error("--port nécessite --switch")
+    if args.at and (args.since or args.until or args.current):
+        parser.error("--at n'est pas compatible avec --since, --until ni --current")
+    for value in (args.at, args.since, args.until):
+        if value:
+            try:
+                normalize_timestamp(value)
+            except ValueError:
+                parser.error(f"Date invalide: {value}")
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    # Une recherche ne crée ni ne modifie jamais l'historique
+    if not os.path.exists(args.db):
+        logger.error(f"Base d'historique introuvable: {args.db}")
+        return 1
+    try:
+        with HistoryStore(args.db, read_only=True) as store:
+            if args.stats:
+                print(json.dumps(store.stats(), indent=2))
+                return 0
+            observations = store.query(mac=args.mac, ip=args.ip, hostname=args.hostname, switch=args.switch,
+                                       port=args.port, at=args.at, since=args.since, until=args.until,
+                                       current=args.current, limit=args.limit)
+    except sqlite3.Error as e:
+        logger.error(f"Base d'historique illisible ({args.db}): {str(e)}")
+        return 1
+
+    if args.json:
+        print(json.dumps(observations, indent=2, ensure_ascii=False))
+        return 0
+    for observation in observations:
+        neighbor = observation['neighbor']
+        ips = ','.join(neighbor.get('ip_addresses') or neighbor.get('management_addresses') or []) or '-'
+        print(f"{observation['switch']} port {observation['local_port']}: "
+              f"{observation['mac'] or neighbor.get('remote_chassis_id') or '-'} "
+              f"{observation['hostname'] or '-'} {ips} "
+              f"[{observation['first_seen']} -> {observation['ended_at'] or 'en cours'}]")
+    if not observations:
+        print("Aucune observation")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(query_main())
@@ -7,29 +7,52 @@ Récupère les adresses MAC, IP et hostname des équipements connectés
 import json
 import logging
 import argparse
+import os
+import re
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from contextlib import nullcontext
+from functools import partial
 from datetime import datetime
-from typing import Dict, List, Any, Optional
-from netmiko import ConnectHandler
-from netmiko.exceptions import NetmikoTimeoutException, NetmikoAuthenticationException
-import re
+from typing import Dict, List, Any, Iterable, Optional, Callable
+from aruba_parsers import (parse_lldp_neighbors, parse_arp_table, parse_system_info, build_mac_index, enrich_neighbors,
+                           parse_mac_address_table, uplink_ports)
+from ndjson_output import NDJSONWriter
+from snapshot_cache import SnapshotCache, snapshot_digest
+from command_timing import CommandTimingStore, CONSERVATIVE_DELAY_FACTOR, CONSERVATIVE_READ_TIMEOUT
+from raw_capture import RawCapture
+from run_metrics import RunMetrics
+from fleet_arp import FleetARPIndex, ARP_TABLE_KEY, is_arp_source, public_switch_data, discover_with_fleet_arp
+from retry_scheduler import (RetryScheduler, DiscoveryError, classify_error,
+                             ERROR_TIMEOUT, ERROR_CONNECTION, ERROR_AUTH, ERROR_COMMAND, ERROR_CONFIG,
+                             CIRCUIT_CLOSED)
 
-# Configuration du logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('output/lldp_discovery.log'),
-        logging.StreamHandler(sys.stdout)
-    ]
-)
 logger = logging.getLogger(__name__)
 
+# Journal de l'exécution en ligne de commande (configuré dans main(), jamais à l'import)
+LOG_FILE = 'output/lldp_discovery.log'
+
+# Délai de lecture par défaut de send_command (Netmiko 4), borné par l'échéance du switch
+DEFAULT_READ_TIMEOUT = 10.0
+# Délais Netmiko de connexion TCP, de bannière SSH et de verrou de session (valeurs par défaut)
+CONNECT_TIMEOUTS = {'conn_timeout': 10.0, 'banner_timeout': 15.0, 'session_timeout': 60.0}
+
 
 class ArubaLLDPDiscovery:
     """Classe pour la découverte LLDP sur switches Aruba"""
     
-    def __init__(self, host: str, username: str, password: str, device_type: str = 'aruba_os'):
+    DEFAULT_PORT = 22
+    LLDP_COMMAND = "show lldp neighbors detail"
+    ARP_COMMAND = "show arp"
+    MAC_TABLE_COMMAND = "show mac-address"
+    
+    def __init__(self, host: str, username: str, password: str, device_type: str = 'aruba_os',
+                 port: int = 22, timeout: int = 60, snapshot_cache: Optional[SnapshotCache] = None,
+                 timing_store: Optional[CommandTimingStore] = None, raw_capture: Optional[RawCapture] = None,
+                 metrics: Optional[RunMetrics] = None, collect_mac_table: bool = False,
+                 static_uplinks: Optional[Iterable[str]] = None, arp_source: bool = False,
+                 fleet_arp: Optional[FleetARPIndex] = None, deadline: Optional[float] = None):
         """
         Initialise la connexion au switch Aruba
         
@@ -38,47 +61,229 @@ class ArubaLLDPDiscovery:
             username: Nom d'utilisateur
             password: Mot de passe
             device_type: Type de device Netmiko (aruba_os par défaut)
+            port: Port SSH (22 par défaut)
+            timeout: Timeout de connexion en secondes
+            snapshot_cache: Cache de snapshots pour la découverte incrémentale
+            timing_store: Profils de temporisation adaptative (None = délais fixes)
+            raw_capture: Capture des transcriptions brutes (--save-raw)
+            metrics: Mesures par phase de l'exécution (None = pas de mesure)
+            collect_mac_table: Collecte aussi la table d'adresses MAC (localisation des équipements)
+            static_uplinks: Ports montants déclarés en plus de ceux détectés par LLDP (agrégats Trk1, lag1...)
+            arp_source: Switch source de l'index ARP de la flotte (sa table ARP est gardée en mémoire dans ses
+                données, sous ARP_TABLE_KEY, sans être écrite)
+            fleet_arp: Index ARP partagé de la flotte ; s'il est fourni, 'show arp' n'est pas exécuté
+            deadline: Échéance du switch (time.monotonic()) ; les délais de connexion et de lecture
+                sont bornés par le temps restant et rien n'est plus enregistré une fois passée
         """
         self.host = host
         self.username = username
         self.password = password
         self.device_type = device_type
+        self.port = port
+        self.timeout = timeout
+        self.snapshot_cache = snapshot_cache
+        self.timing_store = timing_store
+        self.raw_capture = raw_capture
+        self.metrics = metrics
+        self.collect_mac_table = collect_mac_table
+        self.static_uplinks = frozenset(static_uplinks or ())
+        self.arp_source = arp_source
+        self.fleet_arp = fleet_arp
+        self.deadline = deadline
+        self.transcript: List[Dict[str, Any]] = []
         self.connection = None
+        # Dernier échec (connexion ou collecte), classé pour les nouvelles tentatives
+        self.last_error: Optional[DiscoveryError] = None
         
     def connect(self) -> bool:
         """
         Établit la connexion SSH au switch
         
+        Avec un profil de temporisation, la connexion utilise le facteur de délai
+        appris pour le switch ; si la préparation de session échoue, elle est
+        retentée une fois avec les délais conservateurs.
+        
         Returns:
             bool: True si connexion réussie, False sinon
         """
-        try:
-            device = {
-                'device_type': self.device_type,
-                'host': self.host,
-                'username': self.username,
-                'password': self.password,
-                'timeout': 60,
-                'global_delay_factor': 2,
-            }
-            self.connection = ConnectHandler(**device)
-            logger.info(f"Connexion réussie au switch {self.host}")
-            return True
+        # Import à la demande: le rejeu hors ligne (--replay) n'a pas besoin de Netmiko
+        from netmiko import ConnectHandler
+        from netmiko.exceptions import NetmikoTimeoutException, NetmikoAuthenticationException
+        
+        if self.timing_store is None:
+            delay_factors = [CONSERVATIVE_DELAY_FACTOR]
+        else:
+            delay_factor = self.timing_store.delay_factor(self.host, self.device_type)
+            delay_factors = [delay_factor]
+            if delay_factor < CONSERVATIVE_DELAY_FACTOR:
+                delay_factors.append(CONSERVATIVE_DELAY_FACTOR)
+        
+        for attempt, delay_factor in enumerate(delay_factors, 1):
+            start = time.monotonic()
+            try:
+                self._check_deadline()
+                device = {
+                    'device_type': self.device_type,
+                    'host': self.host,
+                    'username': self.username,
+                    'password': self.password,
+                    'port': self.port,
+                    'timeout': self._bounded(self.timeout),
+                    'global_delay_factor': delay_factor,
+                }
+                if self.deadline is not None:
+                    device.update({key: self._bounded(value) for key, value in CONNECT_TIMEOUTS.items()})
+                    device['auth_timeout'] = self._bounded(self.timeout)
+                # La préparation de session Netmiko désactive la pagination (no paging / no page)
+                self.connection = ConnectHandler(**device)
+                if self._expired():
+                    # Switch abandonné pendant la connexion: session refermée, rien n'est enregistré
+                    self.disconnect()
+                    self.connection = None
+                    self._check_deadline()
+                if self.timing_store is not None:
+                    self.timing_store.record(self.host, self.device_type, 'login', time.monotonic() - start)
+                logger.info(f"Connexion réussie au switch {self.host}")
+                return True
+                
+            except NetmikoTimeoutException as e:
+                logger.error(f"Timeout lors de la connexion à {self.host}")
+                self.last_error = DiscoveryError(ERROR_TIMEOUT, str(e))
+                return False
+            except NetmikoAuthenticationException as e:
+                logger.error(f"Erreur d'authentification pour {self.host}")
+                self.last_error = DiscoveryError(ERROR_AUTH, str(e))
+                return False
+            except DiscoveryError as e:
+                logger.error(f"Délai maximal dépassé pendant la connexion à {self.host}")
+                self.last_error = e
+                return False
+            except Exception as e:
+                if attempt < len(delay_factors) and not self._expired():
+                    logger.warning(f"Préparation de session échouée sur {self.host} ({str(e)}), "
+                                   f"nouvel essai avec des délais conservateurs")
+                    self.timing_store.record_error(self.host, self.device_type)
+                    continue
+                logger.error(f"Erreur de connexion à {self.host}: {str(e)}")
+                self.last_error = DiscoveryError(classify_error(e), str(e))
+                return False
+            finally:
+                if self.metrics is not None and not self._expired():
+                    self.metrics.record(self.host, 'connect', time.monotonic() - start)
+        return False
+    
+    def _expired(self) -> bool:
+        """Échéance du switch dépassée (switch abandonné par le pool de découverte)"""
+        return self.deadline is not None and time.monotonic() >= self.deadline
+    
+    def _check_deadline(self):
+        """Lève DiscoveryError (timeout) si l'échéance du switch est dépassée, avant tout effet de bord"""
+        if self._expired():
+            raise DiscoveryError(ERROR_TIMEOUT, 'délai maximal du switch dépassé')
+    
+    def _bounded(self, timeout: float) -> float:
+        """Délai en secondes borné par le temps restant avant l'échéance du switch"""
+        if self.deadline is None:
+            return timeout
+        return max(0.1, min(timeout, self.deadline - time.monotonic()))
+    
+    def _phase(self, name: str):
+        """Mesure d'une phase du switch, sans effet si les mesures sont désactivées"""
+        if self.metrics is None:
+            return nullcontext()
+        return self.metrics.phase(self.host, name, deadline=self.deadline)
+    
+    def _send_command(self, command: str) -> str:
+        """
+        Exécute une commande et l'ajoute à la transcription si la capture brute est active
+        
+        Avec les mesures actives, la durée de la commande et le volume reçu sont enregistrés.
+        
+        Args:
+            command: Commande CLI
             
-        except NetmikoTimeoutException:
-            logger.error(f"Timeout lors de la connexion à {self.host}")
-            return False
-        except NetmikoAuthenticationException:
-            logger.error(f"Erreur d'authentification pour {self.host}")
-            return False
-        except Exception as e:
-            logger.error(f"Erreur de connexion à {self.host}: {str(e)}")
+        Returns:
+            Sortie de la commande
+        """
+        self._check_deadline()
+        if self.raw_capture is None and self.metrics is None:
+            return self._run_command(command)
+        
+        started_at = datetime.now().isoformat()
+        start = time.monotonic()
+        output = self._run_command(command)
+        elapsed = time.monotonic() - start
+        self._check_deadline()
+        if self.metrics is not None:
+            self.metrics.record_command(self.host, command, elapsed, len(output.encode('utf-8')))
+        if self.raw_capture is not None:
+            self.transcript.append({'command': command, 'started_at': started_at,
+                                    'duration': round(elapsed, 3), 'output': output})
+        return output
+    
+    def _run_command(self, command: str) -> str:
+        """
+        Exécute une commande en rendant la main dès le retour du prompt
+        
+        Sans profil de temporisation, comportement Netmiko par défaut. Sinon la
+        lecture attend le prompt du switch avec un délai maximal appris ; si le
+        prompt n'est pas reçu à temps, la commande est relancée en lecture
+        temporisée avec des délais conservateurs.
+        
+        Args:
+            command: Commande CLI
+            
+        Returns:
+            Sortie de la commande
+        """
+        from netmiko.exceptions import ReadTimeout
+        
+        if self.timing_store is None:
+            if self.deadline is None:
+                return self.connection.send_command(command)
+            return self.connection.send_command(command, read_timeout=self._bounded(DEFAULT_READ_TIMEOUT))
+        
+        read_timeout = self._bounded(self.timing_store.read_timeout(self.host, self.device_type, command))
+        prompt_pattern = re.escape(self.connection.base_prompt) + r'[^\n]*[>#]'
+        start = time.monotonic()
+        try:
+            output = self.connection.send_command(command, expect_string=prompt_pattern,
+                                                  read_timeout=read_timeout)
+        except ReadTimeout:
+            self._check_deadline()
+            logger.warning(f"Prompt non reçu après {read_timeout:.0f}s pour '{command}' sur {self.host}, "
+                           f"lecture temporisée conservatrice")
+            self.timing_store.record_error(self.host, self.device_type)
+            # Fin de la sortie en retard purgée jusqu'au prompt avant de relancer la commande
+            try:
+                self.connection.read_until_pattern(pattern=prompt_pattern,
+                                                   read_timeout=self._bounded(CONSERVATIVE_READ_TIMEOUT))
+            except ReadTimeout:
+                self.connection.clear_buffer()
+            return self.connection.send_command_timing(command, read_timeout=self._bounded(CONSERVATIVE_READ_TIMEOUT))
+        
+        self._check_deadline()
+        elapsed = time.monotonic() - start
+        self.timing_store.record(self.host, self.device_type, command, elapsed)
+        logger.debug(f"'{command}' sur {self.host}: {elapsed:.3f}s")
+        return output
+    
+    def is_alive(self) -> bool:
+        """Test de santé de la session (transport SSH actif et canal utilisable)"""
+        try:
+            return self.connection is not None and self.connection.is_alive()
+        except Exception:
             return False
     
     def disconnect(self):
-        """Ferme la connexion SSH"""
+        """Ferme la connexion SSH (sans déconnexion propre une fois l'échéance du switch passée)"""
         if self.connection:
-            self.connection.disconnect()
+            with self._phase('disconnect'):
+                if self._expired():
+                    # La déconnexion propre attendrait la fin de la sortie en cours
+                    self.connection.paramiko_cleanup()
+                else:
+                    self.connection.disconnect()
             logger.info(f"Connexion fermée pour {self.host}")
     
     def get_lldp_neighbors(self) -> Dict[str, Any]:
@@ -94,28 +299,116 @@ class ArubaLLDPDiscovery:
         
         try:
             # Commande pour récupérer les voisins LLDP
-            lldp_output = self.connection.send_command("show lldp neighbors detail")
+            lldp_output = self._send_command(self.LLDP_COMMAND)
             
-            # Parse des informations LLDP
-            neighbors = self._parse_lldp_output(lldp_output)
+            # Table ARP pour l'enrichissement, sauf si l'index ARP de la flotte est fourni
+            arp_output = self._get_arp_output() if self.fleet_arp is None else None
             
-            # Enrichissement avec les informations ARP
-            arp_table = self._get_arp_table()
+            # Table MAC pour la localisation des équipements terminaux
+            mac_output = self._get_mac_table_output() if self.collect_mac_table else None
             
-            # Combinaison des données
-            enriched_neighbors = self._enrich_neighbor_data(neighbors, arp_table)
+            self._check_deadline()
+            if self.timing_store is not None:
+                self.timing_store.record_session(self.host, self.device_type)
+            if self.raw_capture is not None:
+                with self._phase('save_raw'):
+                    self.raw_capture.save(self.host, self.device_type, self.transcript)
+                self.transcript = []
             
-            return {
-                'switch_ip': self.host,
-                'timestamp': datetime.now().isoformat(),
-                'neighbors_count': len(enriched_neighbors),
-                'neighbors': enriched_neighbors
-            }
+            return self.build_switch_data(lldp_output, arp_output, mac_output)
             
         except Exception as e:
             logger.error(f"Erreur lors de la récupération LLDP: {str(e)}")
+            self.last_error = e if isinstance(e, DiscoveryError) else DiscoveryError(classify_error(e), str(e))
             return {}
     
+    def get_system_info(self) -> Dict[str, str]:
+        """
+        Récupère les informations système du switch (modèle, série, firmware, nom)
+        
+        Returns:
+            Dict avec les informations système, vide en cas d'erreur
+        """
+        try:
+            return parse_system_info(self._send_command("show system"))
+        except Exception as e:
+            logger.error(f"Erreur lors de la récupération des informations système: {str(e)}")
+            return {}
+    
+    def build_switch_data(self, lldp_output: str, arp_output: Optional[str],
+                          mac_output: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Construit les données du switch à partir des sorties brutes des commandes
+        
+        Avec la table MAC, les données comprennent aussi les entrées des ports
+        d'accès ('mac_table', ports montants exclus) et les ports montants, pour
+        l'index des équipements (voir endpoints.py). La table ARP d'un switch
+        source, ou d'un switch à table MAC qui a exécuté 'show arp', reste en
+        mémoire sous la clé privée ARP_TABLE_KEY pour les index et n'est jamais
+        écrite. Sans sortie ARP, les voisins sont enrichis avec l'index ARP de
+        la flotte et aucune table ARP n'est gardée.
+        
+        Args:
+            lldp_output: Sortie brute de 'show lldp neighbors detail'
+            arp_output: Sortie brute de 'show arp' (None: table non collectée)
+            mac_output: Sortie brute de 'show mac-address' (None: table non collectée)
+            
+        Returns:
+            Dict contenant les informations des voisins LLDP
+        """
+        # Mode incrémental: sorties identiques au dernier snapshot, rien à reparser
+        digest = None
+        arp_table = None
+        enriched_neighbors = None
+        shared_arp = arp_output is None and self.fleet_arp is not None
+        if self.snapshot_cache is not None:
+            digest = snapshot_digest(lldp_output, self.fleet_arp.digest if shared_arp else arp_output or '')
+            enriched_neighbors = self.snapshot_cache.lookup(self.host, digest)
+        
+        if enriched_neighbors is None:
+            # Parse des informations LLDP
+            with self._phase('parse_lldp'):
+                neighbors = self._parse_lldp_output(lldp_output)
+            
+            if shared_arp:
+                # Enrichissement avec l'index ARP de la flotte
+                with self._phase('enrich'):
+                    enriched_neighbors = enrich_neighbors(neighbors, self.fleet_arp.mac_index)
+            else:
+                # Enrichissement avec les informations ARP
+                with self._phase('parse_arp'):
+                    arp_table = self._parse_arp_output(arp_output or '')
+                logger.info(f"Table ARP récupérée: {len(arp_table)} entrées")
+                
+                # Combinaison des données
+                with self._phase('enrich'):
+                    enriched_neighbors = self._enrich_neighbor_data(neighbors, arp_table)
+            
+            if self.snapshot_cache is not None:
+                self._check_deadline()
+                self.snapshot_cache.store(self.host, digest, enriched_neighbors)
+        
+        switch_data = {
+            'switch_ip': self.host,
+            'timestamp': datetime.now().isoformat(),
+            'neighbors_count': len(enriched_neighbors),
+            'neighbors': enriched_neighbors
+        }
+        # Table ARP gardée pour les index: switch source, ou table MAC avec 'show arp' collecté sur le switch
+        if self.arp_source or (mac_output is not None and arp_output is not None):
+            if arp_table is None:
+                arp_table = self._parse_arp_output(arp_output or '')
+            switch_data[ARP_TABLE_KEY] = arp_table
+        if mac_output is not None:
+            with self._phase('mac_table'):
+                uplinks = uplink_ports(enriched_neighbors) | self.static_uplinks
+                entries = self._parse_mac_table_output(mac_output)
+                switch_data['mac_table'] = [entry for entry in entries if entry['port'] not in uplinks]
+                switch_data['uplink_ports'] = sorted(uplinks)
+            logger.info(f"Table MAC récupérée: {len(entries)} entrées, "
+                        f"{len(switch_data['mac_table'])} sur les ports d'accès")
+        return switch_data
+    
     def _parse_lldp_output(self, output: str) -> List[Dict[str, Any]]:
         """
         Parse la sortie de la commande LLDP
@@ -126,68 +419,57 @@ class ArubaLLDPDiscovery:
         Returns:
             Liste des voisins parsés
         """
-        neighbors = []
-        
-        # Pattern pour parser les informations LLDP
-        # Adaptation selon le format de sortie Aruba
-        neighbor_blocks = re.split(r'Local Port\s*:\s*(\S+)', output)[1:]
-        
-        for i in range(0, len(neighbor_blocks), 2):
-            if i + 1 < len(neighbor_blocks):
-                local_port = neighbor_blocks[i].strip()
-                neighbor_info = neighbor_blocks[i + 1]
-                
-                neighbor = {
-                    'local_port': local_port,
-                    'remote_chassis_id': self._extract_field(neighbor_info, r'Chassis ID\s*:\s*(.+)'),
-                    'remote_port_id': self._extract_field(neighbor_info, r'Port ID\s*:\s*(.+)'),
-                    'remote_system_name': self._extract_field(neighbor_info, r'System Name\s*:\s*(.+)'),
-                    'remote_system_description': self._extract_field(neighbor_info, r'System Description\s*:\s*(.+)'),
-                    'remote_port_description': self._extract_field(neighbor_info, r'Port Description\s*:\s*(.+)'),
-                    'management_addresses': self._extract_mgmt_addresses(neighbor_info)
-                }
-                
-                neighbors.append(neighbor)
-        
-        return neighbors
+        return parse_lldp_neighbors(output)
     
-    def _extract_field(self, text: str, pattern: str) -> Optional[str]:
-        """Extrait un champ spécifique du texte"""
-        match = re.search(pattern, text, re.IGNORECASE | re.MULTILINE)
-        return match.group(1).strip() if match else None
+    def _get_mac_table_output(self) -> str:
+        """
+        Récupère la sortie brute de la table d'adresses MAC du switch
+        
+        Returns:
+            Sortie de 'show mac-address', chaîne vide en cas d'erreur
+        """
+        try:
+            return self._send_command(self.MAC_TABLE_COMMAND)
+        except Exception as e:
+            logger.error(f"Erreur lors de la récupération de la table MAC: {str(e)}")
+            return ""
     
-    def _extract_mgmt_addresses(self, text: str) -> List[str]:
-        """Extrait les adresses de management"""
-        addresses = []
-        pattern = r'Management Address\s*:\s*(\d+\.\d+\.\d+\.\d+)'
-        matches = re.findall(pattern, text, re.IGNORECASE)
-        return matches
+    def _parse_mac_table_output(self, mac_output: str) -> List[Dict[str, str]]:
+        """
+        Parse la table d'adresses MAC du switch
+        
+        Args:
+            mac_output: Sortie brute de 'show mac-address'
+            
+        Returns:
+            Liste de {mac, port, vlan}
+        """
+        return parse_mac_address_table(mac_output)
     
-    def _get_arp_table(self) -> Dict[str, str]:
+    def _get_arp_output(self) -> str:
         """
-        Récupère la table ARP du switch
+        Récupère la sortie brute de la table ARP du switch
         
         Returns:
-            Dict mapping IP -> MAC
+            Sortie de 'show arp', chaîne vide en cas d'erreur
         """
         try:
-            arp_output = self.connection.send_command("show arp")
-            arp_table = {}
-            
-            # Parse de la table ARP
-            for line in arp_output.split('\n'):
-                # Pattern typique: IP Address    MAC Address      Type   Port
-                match = re.search(r'(\d+\.\d+\.\d+\.\d+)\s+([0-9a-fA-F:.-]+)\s+', line)
-                if match:
-                    ip, mac = match.groups()
-                    arp_table[ip] = mac.lower()
-            
-            logger.info(f"Table ARP récupérée: {len(arp_table)} entrées")
-            return arp_table
-            
+            return self._send_command(self.ARP_COMMAND)
         except Exception as e:
             logger.error(f"Erreur lors de la récupération ARP: {str(e)}")
-            return {}
+            return ""
+    
+    def _parse_arp_output(self, arp_output: str) -> Dict[str, str]:
+        """
+        Parse la table ARP du switch
+        
+        Args:
+            arp_output: Sortie brute de 'show arp'
+            
+        Returns:
+            Dict mapping IP -> MAC
+        """
+        return parse_arp_table(arp_output)
     
     def _enrich_neighbor_data(self, neighbors: List[Dict], arp_table: Dict[str, str]) -> List[Dict[str, Any]]:
         """
@@ -200,33 +482,7 @@ class ArubaLLDPDiscovery:
         Returns:
             Liste enrichie des voisins
         """
-        enriched = []
-        
-        for neighbor in neighbors:
-            enriched_neighbor = neighbor.copy()
-            
-            # Recherche des correspondances MAC/IP
-            chassis_id = neighbor.get('remote_chassis_id', '').lower()
-            matching_ips = []
-            
-            # Recherche par MAC address dans l'ARP
-            for ip, mac in arp_table.items():
-                if chassis_id in mac or mac in chassis_id:
-                    matching_ips.append(ip)
-            
-            # Ajout des adresses de management
-            mgmt_addresses = neighbor.get('management_addresses', [])
-            all_ips = list(set(matching_ips + mgmt_addresses))
-            
-            enriched_neighbor.update({
-                'ip_addresses': all_ips,
-                'mac_address': chassis_id,
-                'hostname': neighbor.get('remote_system_name', 'Unknown')
-            })
-            
-            enriched.append(enriched_neighbor)
-        
-        return enriched
+        return enrich_neighbors(neighbors, build_mac_index(arp_table))
 
 
 def load_switch_config(config_file: str) -> List[Dict[str, str]]:
@@ -251,97 +507,812 @@ def load_switch_config(config_file: str) -> List[Dict[str, str]]:
         return []
 
 
-def discover_all_switches(switches_config: List[Dict[str, str]]) -> Dict[str, Any]:
+# device_type collectés par l'API REST plutôt que par la CLI SSH
+REST_DEVICE_TYPES = frozenset({'aruba_aoscx_rest'})
+
+
+def discovery_class(device_type: str) -> type:
     """
-    Lance la découverte LLDP sur tous les switches
+    Classe de collecte d'un type d'équipement
     
     Args:
-        switches_config: Liste des configurations de switches
+        device_type: Type d'équipement de switches_config.json
         
     Returns:
-        Données de découverte consolidées
+        ArubaCXRestDiscovery pour les switches REST, ArubaLLDPDiscovery sinon
+    """
+    if device_type in REST_DEVICE_TYPES:
+        from aoscx_rest import ArubaCXRestDiscovery
+        return ArubaCXRestDiscovery
+    return ArubaLLDPDiscovery
+
+
+def create_discovery(switch_config: Dict[str, Any], timeout: int = 60,
+                     snapshot_cache: Optional[SnapshotCache] = None,
+                     timing_store: Optional[CommandTimingStore] = None,
+                     raw_capture: Optional[RawCapture] = None,
+                     metrics: Optional[RunMetrics] = None,
+                     fleet_arp: Optional[FleetARPIndex] = None,
+                     deadline: Optional[float] = None) -> ArubaLLDPDiscovery:
+    """
+    Instancie le collecteur d'un switch selon son device_type
+    
+    Les clés facultatives collect_mac_table et uplink_ports de la configuration
+    activent la collecte de la table MAC et déclarent des ports montants ;
+    arp_source désigne un switch source de l'index ARP de la flotte.
+    
+    Args:
+        switch_config: Configuration du switch
+        timeout: Timeout de connexion en secondes
+        snapshot_cache: Cache de snapshots pour la découverte incrémentale
+        timing_store: Profils de temporisation adaptative (None = délais fixes)
+        raw_capture: Capture des transcriptions brutes (--save-raw)
+        metrics: Mesures par phase de l'exécution (None = pas de mesure)
+        fleet_arp: Index ARP partagé de la flotte (None = table ARP du switch)
+        deadline: Échéance du switch (time.monotonic(), None = aucune)
+        
+    Returns:
+        Collecteur non connecté
+    """
+    device_type = switch_config.get('device_type', 'aruba_os')
+    cls = discovery_class(device_type)
+    options = {}
+    if device_type in REST_DEVICE_TYPES:
+        options = {key: switch_config[key] for key in ('use_ssl', 'verify_ssl', 'api_version') if key in switch_config}
+    return cls(switch_config['host'], switch_config['username'], switch_config['password'], device_type,
+               port=int(switch_config.get('port', cls.DEFAULT_PORT)), timeout=timeout,
+               snapshot_cache=snapshot_cache, timing_store=timing_store, raw_capture=raw_capture, metrics=metrics,
+               collect_mac_table=bool(switch_config.get('collect_mac_table', False)),
+               static_uplinks=switch_config.get('uplink_ports'), arp_source=is_arp_source(switch_config),
+               fleet_arp=fleet_arp, deadline=deadline, **options)
+
+
+def discover_switch(switch_config: Dict[str, Any], timeout: int = 60,
+                    snapshot_cache: Optional[SnapshotCache] = None,
+                    timing_store: Optional[CommandTimingStore] = None,
+                    raw_capture: Optional[RawCapture] = None,
+                    metrics: Optional[RunMetrics] = None,
+                    raise_errors: bool = False,
+                    fleet_arp: Optional[FleetARPIndex] = None,
+                    deadline: Optional[float] = None) -> Optional[Dict[str, Any]]:
+    """
+    Lance la découverte LLDP sur un seul switch
+    
+    Avec une échéance, les délais SSH sont bornés par le temps restant et,
+    une fois l'échéance passée, la découverte s'arrête sans rien enregistrer
+    (cache de snapshots, capture brute, temporisation, mesures).
+    
+    Args:
+        switch_config: Configuration du switch
+        timeout: Timeout de connexion SSH en secondes
+        snapshot_cache: Cache de snapshots pour la découverte incrémentale
+        timing_store: Profils de temporisation adaptative (None = délais fixes)
+        raw_capture: Capture des transcriptions brutes (--save-raw)
+        metrics: Mesures par phase de l'exécution (None = pas de mesure)
+        raise_errors: Lève DiscoveryError (classe de l'échec) au lieu de retourner None
+        fleet_arp: Index ARP partagé de la flotte (None = 'show arp' sur le switch)
+        deadline: Échéance du switch (time.monotonic(), None = aucune)
+        
+    Returns:
+        Données de découverte du switch, None en cas d'échec
     """
-    all_results = {
+    host = switch_config.get('host')
+    
+    if not all([host, switch_config.get('username'), switch_config.get('password')]):
+        logger.error(f"Configuration incomplète pour le switch: {switch_config}")
+        if raise_errors:
+            raise DiscoveryError(ERROR_CONFIG, 'configuration incomplète')
+        return None
+    
+    logger.info(f"Début de la découverte pour {host}")
+    
+    discovery = create_discovery(switch_config, timeout=timeout, snapshot_cache=snapshot_cache,
+                                 timing_store=timing_store, raw_capture=raw_capture, metrics=metrics,
+                                 fleet_arp=fleet_arp, deadline=deadline)
+    
+    if not discovery.connect():
+        logger.error(f"Impossible de se connecter à {host}")
+        if raise_errors:
+            raise discovery.last_error or DiscoveryError(ERROR_CONNECTION, 'connexion impossible')
+        return None
+    
+    try:
+        switch_data = discovery.get_lldp_neighbors()
+    finally:
+        discovery.disconnect()
+    
+    if not switch_data:
+        logger.error(f"Aucune donnée récupérée pour {host}")
+        if raise_errors:
+            raise discovery.last_error or DiscoveryError(ERROR_COMMAND, 'aucune donnée récupérée')
+        return None
+    
+    logger.info(f"Découverte terminée pour {host}: {switch_data.get('neighbors_count', 0)} voisins")
+    return switch_data
+
+
+def new_results(total_switches: int) -> Dict[str, Any]:
+    """Structure vide des données de découverte consolidées"""
+    return {
         'discovery_timestamp': datetime.now().isoformat(),
         'switches': {},
         'summary': {
-            'total_switches': len(switches_config),
+            'total_switches': total_switches,
             'successful_connections': 0,
             'total_neighbors': 0
         }
     }
+
+
+def record_switch_result(all_results: Dict[str, Any], host: str, switch_data: Dict[str, Any],
+                         on_result: Optional[Callable[[str, Dict[str, Any]], None]] = None):
+    """
+    Ajoute le résultat d'un switch aux données consolidées et met à jour le résumé
+    
+    Si on_result est fourni, le résultat lui est transmis au lieu d'être conservé
+    en mémoire ; seuls les compteurs du résumé sont mis à jour.
+    """
+    if on_result is not None:
+        on_result(host, switch_data)
+    else:
+        all_results['switches'][host] = switch_data
+    all_results['summary']['successful_connections'] += 1
+    all_results['summary']['total_neighbors'] += switch_data.get('neighbors_count', 0)
+
+
+def _timed_discover(discover_fn: Callable[..., Optional[Dict[str, Any]]], switch_config: Dict[str, Any],
+                    metrics: Optional[RunMetrics], scheduler: Optional[RetryScheduler] = None,
+                    deadline: Optional[float] = None, **kwargs) -> Optional[Dict[str, Any]]:
+    """
+    Appelle discover_fn et mesure la durée totale du switch (phase 'total') si les mesures sont actives
+    
+    L'échéance du switch (deadline) est transmise à discover_fn, qui s'arrête
+    sans effet de bord une fois abandonné. Avec un ordonnanceur, les erreurs
+    passagères sont retentées jusqu'à cette échéance et le résultat met à jour
+    le disjoncteur du switch.
+    """
+    if deadline is not None:
+        kwargs['deadline'] = deadline
+    if scheduler is not None:
+        discover_fn = partial(scheduler.call, discover_fn)
+    if metrics is None:
+        return discover_fn(switch_config, **kwargs)
+    with metrics.phase(switch_config.get('host'), 'total', deadline=deadline):
+        return discover_fn(switch_config, metrics=metrics, **kwargs)
+
+
+def _discover_parallel(switches_config: List[Dict[str, str]], workers: int, switch_timeout: Optional[float],
+                       on_complete: Callable[[int, Optional[Dict[str, Any]]], None],
+                       snapshot_cache: Optional[SnapshotCache] = None,
+                       discover_fn: Callable[..., Optional[Dict[str, Any]]] = discover_switch,
+                       timing_store: Optional[CommandTimingStore] = None,
+                       raw_capture: Optional[RawCapture] = None,
+                       metrics: Optional[RunMetrics] = None,
+                       scheduler: Optional[RetryScheduler] = None,
+                       fleet_arp: Optional[FleetARPIndex] = None):
+    """
+    Découverte concurrente avec un pool de threads borné
+    
+    Chaque switch dispose d'un délai maximal (switch_timeout) compté à partir du
+    démarrage effectif de sa tâche ; un switch qui le dépasse est abandonné et
+    compté comme en échec, sans bloquer le reste de la flotte. Les nouvelles
+    tentatives d'un switch restent dans ce délai. L'échéance est transmise à
+    discover_fn : la tâche abandonnée s'arrête d'elle-même peu après, sans
+    toucher au cache, à la capture ni aux temporisations.
+    
+    Args:
+        switches_config: Liste des configurations de switches
+        workers: Nombre maximal de switches traités simultanément
+        switch_timeout: Délai maximal par switch en secondes (None = illimité)
+        on_complete: Appelé par le thread appelant avec (index, données) à la fin de chaque switch
+        snapshot_cache: Cache de snapshots pour la découverte incrémentale
+        discover_fn: Fonction de découverte d'un switch (discover_switch par défaut)
+        timing_store: Profils de temporisation adaptative (None = délais fixes)
+        raw_capture: Capture des transcriptions brutes (--save-raw)
+        metrics: Mesures par phase de l'exécution (None = pas de mesure)
+        scheduler: Nouvelles tentatives et disjoncteurs (None = une seule tentative)
+        fleet_arp: Index ARP partagé de la flotte (None = 'show arp' sur chaque switch)
+    """
+    started: Dict[int, float] = {}
+    connect_timeout = 60 if switch_timeout is None else max(1, min(60, int(switch_timeout)))
     
-    for switch_config in switches_config:
-        host = switch_config.get('host')
-        username = switch_config.get('username')
-        password = switch_config.get('password')
-        device_type = switch_config.get('device_type', 'aruba_os')
+    def run(index: int) -> Optional[Dict[str, Any]]:
+        started[index] = time.monotonic()
+        deadline = None if switch_timeout is None else started[index] + switch_timeout
+        return _timed_discover(discover_fn, switches_config[index], metrics, scheduler, deadline,
+                               timeout=connect_timeout, snapshot_cache=snapshot_cache, timing_store=timing_store,
+                               raw_capture=raw_capture, fleet_arp=fleet_arp)
+    
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='lldp')
+    try:
+        futures = {executor.submit(run, index): index for index in range(len(switches_config))}
+        pending = set(futures)
         
-        if not all([host, username, password]):
-            logger.error(f"Configuration incomplète pour le switch: {switch_config}")
-            continue
+        while pending:
+            done, pending = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+            
+            for future in done:
+                index = futures[future]
+                try:
+                    switch_data = future.result()
+                except Exception as e:
+                    logger.error(f"Erreur inattendue pour {switches_config[index].get('host')}: {str(e)}")
+                    switch_data = None
+                on_complete(index, switch_data)
+            
+            if switch_timeout is None:
+                continue
+            
+            now = time.monotonic()
+            for future in list(pending):
+                index = futures[future]
+                if index in started and now - started[index] > switch_timeout:
+                    logger.error(f"Délai de {switch_timeout}s dépassé pour {switches_config[index].get('host')}, "
+                                 f"switch abandonné")
+                    pending.discard(future)
+                    if scheduler is not None:
+                        scheduler.record_abandoned(switches_config[index])
+                    on_complete(index, None)
+    finally:
+        # Les tâches abandonnées se terminent peu après leur échéance (délais SSH bornés par celle-ci)
+        executor.shutdown(wait=False)
+
+
+def discover_all_switches(switches_config: List[Dict[str, str]], workers: int = 1,
+                          switch_timeout: Optional[float] = None,
+                          on_result: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+                          snapshot_cache: Optional[SnapshotCache] = None,
+                          discover_fn: Callable[..., Optional[Dict[str, Any]]] = discover_switch,
+                          timing_store: Optional[CommandTimingStore] = None,
+                          raw_capture: Optional[RawCapture] = None,
+                          metrics: Optional[RunMetrics] = None,
+                          scheduler: Optional[RetryScheduler] = None,
+                          fleet_arp: Optional[FleetARPIndex] = None) -> Dict[str, Any]:
+    """
+    Lance la découverte LLDP sur tous les switches
+    
+    Args:
+        switches_config: Liste des configurations de switches
+        workers: Nombre de switches interrogés en parallèle (1 = séquentiel)
+        switch_timeout: Délai maximal par switch en secondes (None = illimité)
+        on_result: Si fourni, reçoit (host, données) dès qu'un switch est terminé ;
+            les résultats ne sont alors pas conservés dans 'switches'
+        snapshot_cache: Cache de snapshots pour la découverte incrémentale
+        discover_fn: Fonction de découverte d'un switch, même signature que
+            discover_switch (permet par exemple de réutiliser des sessions SSH)
+        timing_store: Profils de temporisation adaptative (None = délais fixes)
+        raw_capture: Capture des transcriptions brutes (--save-raw)
+        metrics: Mesures par switch et par phase (connexion, commandes, parsing,
+            enrichissement, durée totale), transmises à discover_fn
+        scheduler: Nouvelles tentatives des erreurs passagères et disjoncteurs par
+            switch ; les switches dont le disjoncteur est ouvert ne sont pas interrogés
+        fleet_arp: Index ARP partagé de la flotte, transmis à discover_fn ; les
+            switches ne sont alors pas interrogés sur leur table ARP
         
-        logger.info(f"Début de la découverte pour {host}")
+    Returns:
+        Données de découverte consolidées
+    """
+    all_results = new_results(len(switches_config))
+    if scheduler is not None:
+        # Les switches écartés restent comptés dans le total, comme un échec de connexion
+        switches_config, _ = scheduler.partition(switches_config)
+    
+    if workers <= 1 and switch_timeout is None:
+        for switch_config in switches_config:
+            switch_data = _timed_discover(discover_fn, switch_config, metrics, scheduler,
+                                          snapshot_cache=snapshot_cache, timing_store=timing_store,
+                                          raw_capture=raw_capture, fleet_arp=fleet_arp)
+            if switch_data:
+                record_switch_result(all_results, switch_config['host'], switch_data, on_result)
+        return all_results
+    
+    # L'agrégation est faite par le thread appelant uniquement
+    if on_result is not None:
+        # Flux: chaque switch est transmis dès sa fin, dans l'ordre d'achèvement
+        def stream(index: int, switch_data: Optional[Dict[str, Any]]):
+            if switch_data:
+                record_switch_result(all_results, switches_config[index]['host'], switch_data, on_result)
         
-        discovery = ArubaLLDPDiscovery(host, username, password, device_type)
+        _discover_parallel(switches_config, max(1, workers), switch_timeout, stream, snapshot_cache, discover_fn,
+                           timing_store, raw_capture, metrics, scheduler, fleet_arp)
+        return all_results
+    
+    # Dans l'ordre de la configuration, pour produire exactement le même JSON
+    # qu'une exécution séquentielle
+    results: List[Optional[Dict[str, Any]]] = [None] * len(switches_config)
+    _discover_parallel(switches_config, max(1, workers), switch_timeout, results.__setitem__, snapshot_cache,
+                       discover_fn, timing_store, raw_capture, metrics, scheduler, fleet_arp)
+    for switch_config, switch_data in zip(switches_config, results):
+        if switch_data:
+            record_switch_result(all_results, switch_config['host'], switch_data)
+    
+    return all_results
+
+
+def run_discovery(args: argparse.Namespace, switches_config: List[Dict[str, Any]],
+                  discover_fn: Callable[..., Optional[Dict[str, Any]]] = discover_switch) -> Optional[Dict[str, Any]]:
+    """
+    Exécute une découverte complète et sauvegarde les résultats selon les options
+    
+    Args:
+        args: Options de la ligne de commande
+        switches_config: Liste des configurations de switches
+        discover_fn: Fonction de découverte d'un switch (moteur netmiko)
+        
+    Returns:
+        Données de découverte consolidées, None si la sauvegarde a échoué
+    """
+    snapshot_cache = SnapshotCache(args.cache_dir) if args.incremental else None
+    timing_store = None if args.fixed_timing or args.replay else CommandTimingStore(args.timing_file)
+    raw_capture = RawCapture(args.save_raw) if args.save_raw else None
+    metrics = RunMetrics(profile=bool(args.profile))
+    
+    # Partition de l'inventaire (--shard i/N): sortie partielle, fusionnée par la sous-commande merge
+    shard = None
+    if args.shard:
+        from sharding import parse_shard, select_shard
+        switches_config, shard = select_shard(switches_config, *parse_shard(args.shard))
+        logger.info(f"Partition {args.shard}: {len(switches_config)} switches sur {shard['inventory_size']} "
+                    f"({len(shard['shared_hosts'])} switches sources ARP partagés)")
+    
+    if args.replay:
+        from raw_capture import load_manifest
+        hosts = load_manifest(args.replay).get('hosts', [])
+    else:
+        hosts = [switch_config.get('host') for switch_config in switches_config]
+    
+    # Index ARP de la flotte: switches sources découverts en premier, les autres sans 'show arp'
+    fleet_arp = None
+    arp_sources = [] if args.replay else [switch_config.get('host') for switch_config in switches_config
+                                          if is_arp_source(switch_config)]
+    if arp_sources:
+        fleet_arp = FleetARPIndex()
+    if raw_capture is not None:
+        raw_capture.write_manifest(hosts, arp_sources)
+    
+    # Vérification préalable: switches injoignables écartés sans attendre leur timeout de connexion
+    preflight_cache = None
+    skipped_switches: Dict[str, str] = {}
+    if args.skip_dead or args.preflight:
+        from preflight import PreflightCache
+        preflight_cache = PreflightCache(args.preflight_cache, ttl=args.preflight_ttl)
+    
+    # Nouvelles tentatives des erreurs passagères et disjoncteurs par switch
+    scheduler = None
+    if not args.replay and (args.retries or args.circuit_breaker):
+        scheduler = RetryScheduler(args.breaker_file if args.circuit_breaker else None, max_retries=args.retries,
+                                   base_delay=args.retry_delay, max_delay=args.retry_max_delay,
+                                   failure_threshold=args.breaker_threshold, cooldown=args.breaker_cooldown)
+    
+    # Flux NDJSON: chaque switch est écrit dès qu'il est terminé
+    writer = None
+    on_result = None
+    if args.format == 'ndjson':
+        try:
+            writer = NDJSONWriter(args.output, granularity=args.ndjson_granularity)
+            writer.write_header(hosts)
+        except Exception as e:
+            logger.error(f"Erreur lors de l'ouverture de {args.output}: {str(e)}")
+            return None
         
-        if discovery.connect():
-            switch_data = discovery.get_lldp_neighbors()
-            discovery.disconnect()
+        def on_result(host: str, switch_data: Dict[str, Any]):
+            with metrics.phase(host, 'write'):
+                writer.write_switch(host, switch_data)
+    
+    # Graphe de topologie: alimenté au fil de l'eau en ndjson, sinon depuis les résultats
+    topology = None
+    if args.topology or args.graphml:
+        from topology import TopologyGraph
+        topology = TopologyGraph()
+        if on_result is not None:
+            write_switch = on_result
             
-            if switch_data:
-                all_results['switches'][host] = switch_data
-                all_results['summary']['successful_connections'] += 1
-                all_results['summary']['total_neighbors'] += switch_data.get('neighbors_count', 0)
-                logger.info(f"Découverte terminée pour {host}: {switch_data.get('neighbors_count', 0)} voisins")
+            def on_result(host: str, switch_data: Dict[str, Any]):
+                write_switch(host, switch_data)
+                topology.add_switch(host, switch_data)
+    
+    # Index des équipements terminaux: tables MAC jointes à l'ARP de toute la flotte
+    endpoints = None
+    if args.endpoints:
+        from endpoints import EndpointIndex
+        endpoints = EndpointIndex()
+        if on_result is not None:
+            index_switch = on_result
+            
+            def on_result(host: str, switch_data: Dict[str, Any]):
+                index_switch(host, switch_data)
+                endpoints.add_switch(host, switch_data)
+    
+    # Historique SQLite: une transaction par exécution, alimentée au fil de l'eau en ndjson
+    history = None
+    if args.history_db:
+        from history_store import HistoryStore
+        try:
+            history = HistoryStore(args.history_db)
+        except Exception as e:
+            logger.error(f"Erreur lors de l'ouverture de {args.history_db}: {str(e)}")
+            return None
+        if on_result is not None:
+            history.begin_run()
+            stream_switch = on_result
+            
+            def on_result(host: str, switch_data: Dict[str, Any]):
+                stream_switch(host, switch_data)
+                history.add_switch(host, switch_data)
+    
+    # Découverte LLDP
+    def discover_fleet(configs: List[Dict[str, Any]],
+                       on_result: Optional[Callable[[str, Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        if fleet_arp is None:
+            return discover_level(configs, on_result)
+        return discover_with_fleet_arp(configs, discover_level, fleet_arp, on_result)
+    
+    def discover_level(configs: List[Dict[str, Any]],
+                       on_result: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+                       fleet_arp: Optional[FleetARPIndex] = None) -> Dict[str, Any]:
+        if preflight_cache is None:
+            return discover_engine(configs, on_result, fleet_arp)
+        from preflight import select_live_switches
+        live, skipped = select_live_switches(configs, preflight_cache, use_cache=args.skip_dead,
+                                             probe=args.preflight, probe_timeout=args.probe_timeout)
+        skipped_switches.update(skipped)
+        level_results = discover_engine(live, on_result, fleet_arp)
+        # Les switches écartés comptent dans le total, comme un échec de connexion
+        level_results['summary']['total_switches'] += len(skipped)
+        return level_results
+    
+    def discover_engine(configs: List[Dict[str, Any]],
+                        on_result: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+                        fleet_arp: Optional[FleetARPIndex] = None) -> Dict[str, Any]:
+        if args.engine == 'async':
+            from async_discovery import discover_all_switches_async
+            return discover_all_switches_async(configs, concurrency=args.workers or 100,
+                                               switch_timeout=args.switch_timeout,
+                                               min_command_interval=args.min_command_interval,
+                                               on_result=on_result, snapshot_cache=snapshot_cache,
+                                               raw_capture=raw_capture, metrics=metrics, scheduler=scheduler,
+                                               fleet_arp=fleet_arp)
+        return discover_all_switches(configs, workers=args.workers or 1,
+                                     switch_timeout=args.switch_timeout, on_result=on_result,
+                                     snapshot_cache=snapshot_cache, discover_fn=discover_fn,
+                                     timing_store=timing_store, raw_capture=raw_capture, metrics=metrics,
+                                     scheduler=scheduler, fleet_arp=fleet_arp)
+    
+    discovery_start = time.perf_counter()
+    if args.replay:
+        from replay import replay_captures
+        results = replay_captures(args.replay, workers=args.workers, on_result=on_result, metrics=metrics)
+    elif args.crawl:
+        from crawl import CrawlScope, crawl_switches
+        crawled_hosts = []
+        
+        def crawl_level(configs: List[Dict[str, Any]],
+                        on_result: Optional[Callable[[str, Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+            crawled_hosts.extend(switch_config['host'] for switch_config in configs)
+            return discover_fleet(configs, on_result)
+        
+        results = crawl_switches(switches_config, crawl_level, max_depth=args.max_depth,
+                                 scope=CrawlScope(args.include, args.exclude), on_result=on_result)
+        if raw_capture is not None:
+            # Manifeste réécrit avec tous les switches interrogés, dans l'ordre du parcours
+            raw_capture.write_manifest(crawled_hosts, arp_sources)
+    else:
+        results = discover_fleet(switches_config, on_result)
+    metrics.record_run('discovery', time.perf_counter() - discovery_start)
+    if skipped_switches:
+        results['summary']['skipped_switches'] = skipped_switches
+    if fleet_arp is not None:
+        results['summary']['fleet_arp'] = fleet_arp.summary()
+    if shard is not None:
+        results['summary']['shard'] = shard
+    if preflight_cache is not None and args.preflight:
+        try:
+            preflight_cache.save()
+        except OSError as e:
+            logger.warning(f"Impossible de sauvegarder le cache de vérification: {str(e)}")
+    if scheduler is not None:
+        results['summary']['circuit_breaker'] = scheduler.summary()
+        try:
+            scheduler.save()
+        except OSError as e:
+            logger.warning(f"Impossible de sauvegarder l'état des disjoncteurs: {str(e)}")
+    # Durées par switch et par phase dans le résumé (les phases postérieures à
+    # l'écriture de la sortie ne figurent que dans l'export --metrics-file)
+    results['summary']['timings'] = metrics.summary()
+    
+    # Sauvegarde des résultats
+    try:
+        with metrics.run_phase('write'):
+            if writer is not None:
+                writer.write_summary(results['summary'])
+                writer.close()
             else:
-                logger.error(f"Aucune donnée récupérée pour {host}")
-        else:
-            logger.error(f"Impossible de se connecter à {host}")
+                # Tables ARP gardées en mémoire seulement (index ARP de la flotte, index des équipements)
+                switches = {host: public_switch_data(switch_data) for host, switch_data in results['switches'].items()}
+                with open(args.output, 'w', encoding='utf-8') as f:
+                    json.dump(dict(results, switches=switches), f, indent=2, ensure_ascii=False)
+        logger.info(f"Résultats sauvegardés dans: {args.output}")
+        
+        if snapshot_cache is not None:
+            delta_output = f"{os.path.splitext(args.output)[0]}_delta.json"
+            delta = snapshot_cache.delta_report()
+            with open(delta_output, 'w', encoding='utf-8') as f:
+                json.dump(delta, f, indent=2, ensure_ascii=False)
+            logger.info(f"Rapport de différences sauvegardé dans: {delta_output} "
+                        f"({delta['summary']['switches_unchanged']} switches inchangés)")
+        
+        if topology is not None:
+            with metrics.run_phase('topology'):
+                for host, switch_data in results['switches'].items():
+                    topology.add_switch(host, switch_data)
+                topology.build()
+                if args.topology:
+                    topology.write_json(args.topology)
+                if args.graphml:
+                    topology.write_graphml(args.graphml)
+            graph = topology.summary()
+            logger.info(f"Topologie: {graph['nodes']} équipements, {graph['links']} liens "
+                        f"({graph['bidirectional_links']} vus des deux côtés) sauvegardée dans: "
+                        f"{', '.join(path for path in (args.topology, args.graphml) if path)}")
+        
+        if endpoints is not None:
+            with metrics.run_phase('endpoints'):
+                for host, switch_data in results['switches'].items():
+                    endpoints.add_switch(host, switch_data)
+                endpoints.build()
+                endpoints.write_json(args.endpoints)
+            located = endpoints.summary()
+            logger.info(f"Équipements terminaux: {located['endpoints']} localisés sur {located['switches']} switches "
+                        f"({located['with_ip']} avec IP, {located['ambiguous']} sur plusieurs ports d'accès) "
+                        f"sauvegardés dans: {args.endpoints}")
+        
+        if history is not None:
+            with metrics.run_phase('history'):
+                if writer is None:
+                    history.begin_run(results['discovery_timestamp'])
+                    for host, switch_data in results['switches'].items():
+                        history.add_switch(host, switch_data)
+                run = history.commit_run()
+            logger.info(f"Historique: {run['new_observations']} observations nouvelles ou modifiées "
+                        f"sur {run['neighbors']} voisins, sauvegardé dans: {args.history_db}")
+            if args.history_retention:
+                pruned = history.prune(args.history_retention)
+                if pruned:
+                    logger.info(f"Historique: {pruned} observations terminées depuis plus de "
+                                f"{args.history_retention:g} jours supprimées")
+    except Exception as e:
+        logger.error(f"Erreur lors de la sauvegarde: {str(e)}")
+        return None
+    finally:
+        if history is not None:
+            history.close()
     
-    return all_results
+    # Affichage du résumé
+    summary = results['summary']
+    logger.info(f"Découverte terminée:")
+    logger.info(f"  - Switches traités: {summary['successful_connections']}/{summary['total_switches']}")
+    logger.info(f"  - Total voisins découverts: {summary['total_neighbors']}")
+    if skipped_switches:
+        logger.info(f"  - Switches écartés avant la découverte: {len(skipped_switches)}")
+    if fleet_arp is not None:
+        shared = fleet_arp.summary()
+        logger.info(f"  - Index ARP de la flotte: {shared['macs']} MAC, {shared['arp_entries']} entrées ARP "
+                    f"de {shared['sources']}/{len(arp_sources)} switches sources")
+    if scheduler is not None:
+        breaker = summary['circuit_breaker']
+        open_circuits = sum(1 for circuit in breaker['circuits'].values() if circuit['state'] != CIRCUIT_CLOSED)
+        logger.info(f"  - Nouvelles tentatives: {breaker['retries']}, échecs par classe: {breaker['errors'] or '-'}, "
+                    f"disjoncteurs ouverts: {open_circuits} ({len(breaker['skipped'])} switches écartés)")
+    for phase, timing in metrics.summary()['phases'].items():
+        logger.info(f"  - Phase {phase}: total {timing['total']:.3f}s, moyenne {timing['mean']:.3f}s, "
+                    f"max {timing['max']:.3f}s ({timing['count']} switches)")
+    
+    if args.metrics_file:
+        try:
+            metrics.write_metrics(args.metrics_file, summary, openmetrics=args.metrics_format == 'openmetrics')
+            logger.info(f"Métriques sauvegardées dans: {args.metrics_file}")
+        except OSError as e:
+            logger.warning(f"Impossible d'écrire les métriques: {str(e)}")
+    if args.profile:
+        try:
+            metrics.write_profile(args.profile)
+            logger.info(f"Profil du parsing et de l'enrichissement sauvegardé dans: {args.profile} "
+                        f"(pstats: python -m pstats, snakeviz, flameprof)")
+        except OSError as e:
+            logger.warning(f"Impossible d'écrire le profil: {str(e)}")
+    
+    if timing_store is not None:
+        for command, latency in timing_store.latency_report().items():
+            logger.info(f"  - Latence '{command}': moyenne {latency['mean']:.3f}s, p95 {latency['p95']:.3f}s, "
+                        f"max {latency['max']:.3f}s ({latency['count']} mesures)")
+        try:
+            timing_store.save()
+        except OSError as e:
+            logger.warning(f"Impossible de sauvegarder les profils de temporisation: {str(e)}")
+    return results
 
 
 def main():
     """Fonction principale"""
-    parser = argparse.ArgumentParser(description='Découverte LLDP pour switches Aruba')
+    # Sous-commandes hors ligne, sans découverte ni logging fichier: recherche dans
+    # l'historique, fusion des sorties partielles de --shard
+    if sys.argv[1:2] == ['query']:
+        from history_store import query_main
+        sys.exit(query_main(sys.argv[2:]))
+    if sys.argv[1:2] == ['merge']:
+        from sharding import merge_main
+        sys.exit(merge_main(sys.argv[2:]))
+    
+    parser = argparse.ArgumentParser(description='Découverte LLDP pour switches Aruba',
+                                     epilog='Sous-commandes: query (recherche dans l\'historique SQLite, '
+                                            'voir "lldp_discovery.py query --help"), merge (fusion des '
+                                            'sorties partielles de --shard, voir "lldp_discovery.py merge --help")')
     parser.add_argument('-c', '--config', default='python/switches_config.json',
                        help='Fichier de configuration des switches')
-    parser.add_argument('-o', '--output', default='output/lldp_discovery.json',
-                       help='Fichier de sortie JSON')
+    parser.add_argument('-o', '--output', default=None,
+                       help='Fichier de sortie (défaut: output/lldp_discovery.json, ou .ndjson en format ndjson)')
     parser.add_argument('-v', '--verbose', action='store_true',
                        help='Mode verbose')
+    parser.add_argument('-w', '--workers', type=int, default=None,
+                       help='Nombre de switches interrogés en parallèle (défaut: 1 en netmiko, 100 en async)')
+    parser.add_argument('--switch-timeout', type=float, default=None,
+                       help='Délai maximal par switch en secondes (défaut: illimité)')
+    parser.add_argument('--engine', choices=['netmiko', 'async'], default='netmiko',
+                       help='Moteur de collecte SSH (défaut: netmiko)')
+    parser.add_argument('--min-command-interval', type=float, default=0.0,
+                       help='Espacement minimal en secondes entre deux commandes sur un même switch (moteur async)')
+    parser.add_argument('--format', choices=['json', 'ndjson'], default='json',
+                       help='Format de sortie: JSON consolidé ou flux NDJSON écrit au fil de l\'eau (défaut: json)')
+    parser.add_argument('--ndjson-granularity', choices=['switch', 'neighbor'], default='switch',
+                       help='En ndjson, un enregistrement par switch ou par voisin (défaut: switch)')
+    parser.add_argument('--incremental', action='store_true',
+                       help='Réutilise les snapshots des switches inchangés et écrit un rapport de différences')
+    parser.add_argument('--cache-dir', default='output/snapshots',
+                       help='Répertoire du cache de snapshots (défaut: output/snapshots)')
+    parser.add_argument('--timing-file', default='output/command_timing.json',
+                       help='Profils de temporisation appris par switch et type d\'équipement (défaut: output/command_timing.json)')
+    parser.add_argument('--fixed-timing', action='store_true',
+                       help='Désactive la temporisation adaptative (global_delay_factor fixe de 2)')
+    parser.add_argument('--save-raw', metavar='DIR', default=None,
+                       help='Enregistre les transcriptions CLI brutes compressées de chaque switch dans DIR')
+    parser.add_argument('--replay', metavar='DIR', default=None,
+                       help='Rejoue hors ligne les transcriptions de DIR (sans SSH, en parallèle sur tous les cœurs)')
+    parser.add_argument('--crawl', action='store_true',
+                       help='Parcours récursif: les switches de la configuration servent d\'amorce, '
+                            'les switches Aruba voisins sont découverts par leur adresse de management')
+    parser.add_argument('--max-depth', type=int, default=3,
+                       help='Parcours: profondeur maximale depuis les switches d\'amorce (défaut: 3)')
+    parser.add_argument('--include', metavar='CIDR', action='append', default=[],
+                       help='Parcours: réseau dont les adresses peuvent être suivies (répétable, défaut: tous)')
+    parser.add_argument('--exclude', metavar='CIDR', action='append', default=[],
+                       help='Parcours: réseau à ne jamais suivre (répétable, prioritaire sur --include)')
+    parser.add_argument('--topology', metavar='FILE', default=None,
+                       help='Écrit le graphe de topologie dédoublonné (liste d\'adjacence JSON) dans FILE')
+    parser.add_argument('--graphml', metavar='FILE', default=None,
+                       help='Écrit le graphe de topologie au format GraphML dans FILE')
+    parser.add_argument('--mac-table', action='store_true',
+                       help='Collecte aussi la table d\'adresses MAC de chaque switch (show mac-address)')
+    parser.add_argument('--endpoints', metavar='FILE', default=None,
+                       help='Écrit l\'index des équipements terminaux MAC -> (switch, port, IP, VLAN) dans FILE '
+                            '(active --mac-table)')
+    parser.add_argument('--history-db', metavar='FILE', default=None,
+                       help='Ajoute les voisins de l\'exécution à l\'historique SQLite FILE (voir la sous-commande query)')
+    parser.add_argument('--history-retention', metavar='DAYS', type=float, default=0,
+                       help='Supprime de l\'historique les observations terminées depuis plus de DAYS jours '
+                            '(défaut: 0, tout conserver)')
+    parser.add_argument('--skip-dead', action='store_true',
+                       help='Écarte les switches injoignables (ou aux identifiants refusés) d\'après le cache '
+                            'de vérification de test_connectivity.py')
+    parser.add_argument('--preflight', action='store_true',
+                       help='Sonde TCP concurrente avant la découverte: les switches qui ne répondent pas sont '
+                            'écartés et enregistrés dans le cache de vérification')
+    parser.add_argument('--preflight-cache', metavar='FILE', default='output/preflight_cache.json',
+                       help='Cache de vérification (défaut: output/preflight_cache.json)')
+    parser.add_argument('--preflight-ttl', type=float, default=900,
+                       help='Durée de validité des résultats du cache en secondes (défaut: 900)')
+    parser.add_argument('--probe-timeout', type=float, default=2.0,
+                       help='Délai de la sonde TCP de --preflight en secondes (défaut: 2)')
+    parser.add_argument('--retries', type=int, default=0,
+                       help='Nouvelles tentatives par switch pour les erreurs passagères (timeout, connexion, '
+                            'commande), avec un délai exponentiel (défaut: 0)')
+    parser.add_argument('--retry-delay', type=float, default=1.0,
+                       help='Délai avant la première nouvelle tentative en secondes, doublé ensuite (défaut: 1)')
+    parser.add_argument('--retry-max-delay', type=float, default=30.0,
+                       help='Délai maximal entre deux tentatives en secondes (défaut: 30)')
+    parser.add_argument('--circuit-breaker', action='store_true',
+                       help='Disjoncteur par switch conservé entre les exécutions: un switch en échec répété '
+                            'n\'est plus interrogé pendant une durée de repos croissante')
+    parser.add_argument('--breaker-file', metavar='FILE', default='output/circuit_breaker.json',
+                       help='État des disjoncteurs (défaut: output/circuit_breaker.json)')
+    parser.add_argument('--breaker-threshold', type=int, default=3,
+                       help='Échecs consécutifs avant l\'ouverture du disjoncteur (défaut: 3)')
+    parser.add_argument('--breaker-cooldown', type=float, default=300,
+                       help='Durée de repos après la première ouverture en secondes, doublée à chaque '
+                            'réouverture (défaut: 300)')
+    parser.add_argument('--metrics-file', metavar='FILE', default=None,
+                       help='Exporte les durées par switch et par phase au format texte Prometheus dans FILE '
+                            '(collecteur textfile de node_exporter)')
+    parser.add_argument('--metrics-format', choices=['prometheus', 'openmetrics'], default='prometheus',
+                       help='Format de --metrics-file (défaut: prometheus)')
+    parser.add_argument('--profile', metavar='FILE', default=None,
+                       help='Profile le parsing et l\'enrichissement avec cProfile et écrit le profil (pstats) dans FILE')
+    parser.add_argument('--shard', metavar='i/N', default=None,
+                       help='Interroge seulement la partition i sur N de l\'inventaire (hachage stable des '
+                            'adresses) et écrit une sortie partielle, à fusionner avec la sous-commande merge')
+    parser.add_argument('--daemon', action='store_true',
+                       help='Mode démon: interrogation périodique avec un pool de sessions SSH persistantes')
+    parser.add_argument('--interval', type=float, default=900,
+                       help='Mode démon: intervalle entre deux cycles en secondes (défaut: 900)')
+    parser.add_argument('--jitter', type=float, default=0.1,
+                       help='Mode démon: variation aléatoire de l\'intervalle, en fraction (défaut: 0.1)')
+    parser.add_argument('--max-sessions', type=int, default=100,
+                       help='Mode démon: nombre maximal de sessions SSH ouvertes (défaut: 100)')
+    parser.add_argument('--cycles', type=int, default=0,
+                       help='Mode démon: nombre de cycles avant arrêt (défaut: 0, illimité)')
     
     args = parser.parse_args()
     
+    if args.output is None:
+        args.output = 'output/lldp_discovery.ndjson' if args.format == 'ndjson' else 'output/lldp_discovery.json'
+    if args.daemon and args.engine != 'netmiko':
+        parser.error("--daemon n'est disponible qu'avec le moteur netmiko")
+    if args.replay and (args.daemon or args.save_raw or args.incremental or args.crawl
+                        or args.skip_dead or args.preflight):
+        parser.error("--replay n'est pas compatible avec --daemon, --save-raw, --incremental, --crawl, "
+                     "--skip-dead ni --preflight")
+    if args.shard:
+        from sharding import parse_shard
+        try:
+            parse_shard(args.shard)
+        except ValueError as e:
+            parser.error(str(e))
+        if args.replay or args.crawl:
+            parser.error("--shard n'est pas compatible avec --replay ni --crawl")
+    if args.crawl:
+        from crawl import parse_networks
+        try:
+            parse_networks(args.include + args.exclude)
+        except ValueError as e:
+            parser.error(f"Réseau invalide: {e}")
+    
+    # Configuration du logging (ici et non à l'import: le module est aussi chargé par le plugin Ansible),
+    # après la validation des arguments ; les répertoires du journal et de la sortie sont créés s'ils manquent
+    for path in (LOG_FILE, args.output):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler(LOG_FILE),
+            logging.StreamHandler(sys.stdout)
+        ]
+    )
+    
     if args.verbose:
         logging.getLogger().setLevel(logging.DEBUG)
     
     logger.info("Début de la découverte LLDP")
     
+    if args.replay:
+        if run_discovery(args, []) is None:
+            sys.exit(1)
+        return
+    
     # Chargement de la configuration
     switches_config = load_switch_config(args.config)
     if not switches_config:
         logger.error("Aucune configuration de switch trouvée")
         sys.exit(1)
+    if args.mac_table or args.endpoints:
+        switches_config = [dict(switch_config, collect_mac_table=True) for switch_config in switches_config]
     
-    # Découverte LLDP
-    results = discover_all_switches(switches_config)
+    if args.daemon:
+        from polling_daemon import run_daemon
+        run_daemon(args, switches_config)
+        return
     
-    # Sauvegarde des résultats
-    try:
-        with open(args.output, 'w', encoding='utf-8') as f:
-            json.dump(results, f, indent=2, ensure_ascii=False)
-        logger.info(f"Résultats sauvegardés dans: {args.output}")
-    except Exception as e:
-        logger.error(f"Erreur lors de la sauvegarde: {str(e)}")
+    if run_discovery(args, switches_config) is None:
         sys.exit(1)
-    
-    # Affichage du résumé
-    summary = results['summary']
-    logger.info(f"Découverte terminée:")
-    logger.info(f"  - Switches traités: {summary['successful_connections']}/{summary['total_switches']}")
-    logger.info(f"  - Total voisins découverts: {summary['total_neighbors']}")
 
 
 if __name__ == "__main__":
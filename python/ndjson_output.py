@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Sortie NDJSON en flux pour la découverte LLDP
+
+Chaque ligne du fichier est un enregistrement JSON autonome, écrit et vidé sur
+disque dès qu'un switch est terminé :
+
+    {"type": "header", "discovery_timestamp": "...", "hosts": [...]}
+    {"type": "switch", "host": "...", "data": {...}}
+    {"type": "neighbor", "host": "...", "neighbor": {...}}   (granularité 'neighbor')
+    {"type": "summary", "summary": {...}}
+
+Le lecteur reconstruit le JSON consolidé habituel ; utilisable en ligne de
+commande pour convertir un flux existant :
+
+    python3 python/ndjson_output.py output/lldp_discovery.ndjson -o output/lldp_discovery.json
+"""
+
+import argparse
+import json
+import logging
+import sys
+from datetime import datetime
+from typing import Dict, List, Any, Iterator, Optional
+
+from fleet_arp import public_switch_data
+
+logger = logging.getLogger(__name__)
+
+
+class NDJSONWriter:
+    """Écrit les résultats de découverte en NDJSON au fil de l'eau"""
+
+    def __init__(self, path: str, granularity: str = 'switch'):
+        """
+        Ouvre le fichier de sortie
+
+        Args:
+            path: Chemin du fichier NDJSON
+            granularity: 'switch' (un enregistrement par switch) ou 'neighbor'
+                (un enregistrement par voisin, précédé de l'en-tête du switch)
+        """
+        if granularity not in ('switch', 'neighbor'):
+            raise ValueError(f"Granularité inconnue: {granularity}")
+        self.path = path
+        self.granularity = granularity
+        self._file = open(path, 'w', encoding='utf-8')
+
+    def _write(self, record: Dict[str, Any]):
+        self._file.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')))
+        self._file.write('\n')
+
+    def write_header(self, hosts: List[str], discovery_timestamp: Optional[str] = None):
+        """
+        Écrit l'enregistrement d'en-tête
+
+        Args:
+            hosts: Switches de la configuration, dans l'ordre, pour la reconstruction
+            discovery_timestamp: Horodatage de début de découverte (maintenant par défaut)
+        """
+        self._write({
+            'type': 'header',
+            'discovery_timestamp': discovery_timestamp or datetime.now().isoformat(),
+            'hosts': hosts
+        })
+        self._file.flush()
+
+    def write_switch(self, host: str, switch_data: Dict[str, Any]):
+        """Écrit le résultat d'un switch, sans ses clés privées, et vide le tampon"""
+        switch_data = public_switch_data(switch_data)
+        if self.granularity == 'switch':
+            self._write({'type': 'switch', 'host': host, 'data': switch_data})
+        else:
+            header = {key: value for key, value in switch_data.items() if key != 'neighbors'}
+            self._write({'type': 'switch', 'host': host, 'data': header})
+            for neighbor in switch_data.get('neighbors', []):
+                self._write({'type': 'neighbor', 'host': host, 'neighbor': neighbor})
+        self._file.flush()
+
+    def write_summary(self, summary: Dict[str, Any]):
+        """Écrit l'enregistrement de fin avec le résumé"""
+        self._write({'type': 'summary', 'summary': summary})
+        self._file.flush()
+
+    def close(self):
+        """Ferme le fichier"""
+        if not self._file.closed:
+            self._file.close()
+
+
+def iter_records(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Lit les enregistrements d'un fichier NDJSON
+
+    Une dernière ligne tronquée (exécution interrompue) est ignorée.
+
+    Args:
+        path: Chemin du fichier NDJSON
+
+    Yields:
+        Enregistrements décodés
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                logger.warning(f"Ligne {line_number} illisible ignorée dans {path}")
+
+
+def read_ndjson(path: str) -> Dict[str, Any]:
+    """
+    Reconstruit le JSON consolidé à partir d'un flux NDJSON
+
+    Les switches sont remis dans l'ordre de la configuration (en-tête). Si le
+    flux ne contient pas d'enregistrement de fin, le résumé est recalculé à
+    partir des switches présents.
+
+    Args:
+        path: Chemin du fichier NDJSON
+
+    Returns:
+        Données de découverte consolidées
+    """
+    header: Dict[str, Any] = {}
+    switches: Dict[str, Dict[str, Any]] = {}
+    summary = None
+
+    for record in iter_records(path):
+        record_type = record.get('type')
+        if record_type == 'header':
+            header = record
+        elif record_type == 'switch':
+            switches[record['host']] = record['data']
+        elif record_type == 'neighbor':
+            switch_data = switches.get(record['host'])
+            if switch_data is None:
+                logger.warning(f"Voisin sans switch ignoré: {record['host']}")
+                continue
+            switch_data.setdefault('neighbors', []).append(record['neighbor'])
+        elif record_type == 'summary':
+            summary = record['summary']
+
+    for switch_data in switches.values():
+        switch_data.setdefault('neighbors', [])
+
+    order = {host: position for position, host in enumerate(header.get('hosts', []))}
+    ordered = sorted(switches, key=lambda host: order.get(host, len(order)))
+
+    if summary is None:
+        logger.warning(f"Flux incomplet (pas de résumé) dans {path}, résumé recalculé")
+        summary = {
+            'total_switches': len(header.get('hosts', [])) or len(switches),
+            'successful_connections': len(switches),
+            'total_neighbors': sum(data.get('neighbors_count', 0) for data in switches.values())
+        }
+
+    return {
+        'discovery_timestamp': header.get('discovery_timestamp'),
+        'switches': {host: switches[host] for host in ordered},
+        'summary': summary
+    }
+
+
+def main():
+    """Convertit un flux NDJSON en JSON consolidé"""
+    parser = argparse.ArgumentParser(description='Conversion NDJSON -> JSON consolidé')
+    parser.add_argument('input', help='Fichier NDJSON produit par lldp_discovery.py --format ndjson')
+    parser.add_argument('-o', '--output', default=None,
+                        help='Fichier JSON de sortie (défaut: sortie standard)')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    try:
+        results = read_ndjson(args.input)
+    except FileNotFoundError:
+        logger.error(f"Fichier non trouvé: {args.input}")
+        sys.exit(1)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        logger.info(f"Résultats sauvegardés dans: {args.output}")
+    else:
+        json.dump(results, sys.stdout, indent=2, ensure_ascii=False)
+        sys.stdout.write('\n')
+
+
+if __name__ == "__main__":
+    main()
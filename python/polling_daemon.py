@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Démon d'interrogation LLDP périodique avec pool de sessions SSH persistantes
+
+Les sessions Netmiko authentifiées sont conservées entre deux cycles et
+indexées par switch : seul le premier cycle paie la poignée de main SSH, la
+détection du prompt et la désactivation de la pagination. Une session dont le
+test de santé échoue est reconnectée de façon transparente ; le nombre de
+sessions ouvertes est plafonné avec une éviction LRU.
+"""
+
+import argparse
+import logging
+import random
+import signal
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional, Set
+
+from lldp_discovery import ArubaLLDPDiscovery, create_discovery, run_discovery
+from snapshot_cache import SnapshotCache
+from command_timing import CommandTimingStore
+from raw_capture import RawCapture
+from run_metrics import RunMetrics
+from fleet_arp import FleetARPIndex
+from retry_scheduler import DiscoveryError, ERROR_CONNECTION, ERROR_COMMAND, ERROR_CONFIG
+
+logger = logging.getLogger(__name__)
+
+
+class SessionPool:
+    """Pool de sessions ArubaLLDPDiscovery connectées, indexées par switch, avec éviction LRU"""
+
+    def __init__(self, max_sessions: int = 100):
+        """
+        Initialise le pool
+
+        Args:
+            max_sessions: Nombre maximal de sessions SSH ouvertes simultanément
+        """
+        self.max_sessions = max(1, max_sessions)
+        self.logins = 0
+        self.evictions = 0
+        self._idle: 'OrderedDict[str, ArubaLLDPDiscovery]' = OrderedDict()
+        self._in_use: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._idle) + len(self._in_use)
+
+    def _checkout(self, switch_config: Dict[str, Any], timeout: int,
+                  timing_store: Optional[CommandTimingStore] = None,
+                  metrics: Optional[RunMetrics] = None,
+                  deadline: Optional[float] = None) -> ArubaLLDPDiscovery:
+        """Sort une session du pool, en la (re)connectant si nécessaire (DiscoveryError si la connexion échoue)"""
+        host = switch_config['host']
+        with self._lock:
+            session = self._idle.pop(host, None)
+            self._in_use.add(host)
+        if session is not None:
+            session.deadline = deadline
+
+        if session is not None and not session.is_alive():
+            logger.info(f"Session inactive pour {host}, reconnexion")
+            self._close(session)
+            session = None
+
+        if session is None:
+            # Place pour la nouvelle session avant l'ouverture, la session en cours de sortie comprise
+            self._evict_idle()
+            session = create_discovery(switch_config, timeout=timeout, timing_store=timing_store, metrics=metrics,
+                                       deadline=deadline)
+            if not session.connect():
+                with self._lock:
+                    self._in_use.discard(host)
+                raise session.last_error or DiscoveryError(ERROR_CONNECTION, 'connexion impossible')
+            with self._lock:
+                self.logins += 1
+
+        return session
+
+    def _checkin(self, host: str, session: Optional[ArubaLLDPDiscovery]):
+        """Remet une session dans le pool et évince les sessions inactives les plus anciennes"""
+        with self._lock:
+            self._in_use.discard(host)
+            if session is not None:
+                self._idle[host] = session
+        self._evict_idle()
+
+    def _evict_idle(self):
+        """Ferme les sessions inactives les plus anciennes tant que le pool dépasse max_sessions"""
+        evicted = []
+        with self._lock:
+            while self._idle and len(self._idle) + len(self._in_use) > self.max_sessions:
+                evicted.append(self._idle.popitem(last=False)[1])
+                self.evictions += 1
+
+        for old_session in evicted:
+            logger.debug(f"Éviction LRU de la session {old_session.host}")
+            self._close(old_session)
+
+    @staticmethod
+    def _close(session: ArubaLLDPDiscovery):
+        try:
+            session.disconnect()
+        except Exception as e:
+            logger.debug(f"Erreur à la fermeture de {session.host}: {str(e)}")
+
+    def discover(self, switch_config: Dict[str, Any], timeout: int = 60,
+                 snapshot_cache: Optional[SnapshotCache] = None,
+                 timing_store: Optional[CommandTimingStore] = None,
+                 raw_capture: Optional[RawCapture] = None,
+                 metrics: Optional[RunMetrics] = None,
+                 raise_errors: bool = False,
+                 fleet_arp: Optional[FleetARPIndex] = None,
+                 deadline: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        Découverte LLDP d'un switch sur une session du pool
+
+        Même signature que discover_switch. En cas d'échec sur une session
+        réutilisée, une nouvelle session est ouverte et la découverte relancée
+        une fois.
+
+        Args:
+            switch_config: Configuration du switch
+            timeout: Timeout de connexion SSH en secondes
+            snapshot_cache: Cache de snapshots pour la découverte incrémentale
+            timing_store: Profils de temporisation adaptative (None = délais fixes)
+            raw_capture: Capture des transcriptions brutes (--save-raw)
+            metrics: Mesures par phase de l'exécution (None = pas de mesure)
+            raise_errors: Lève DiscoveryError (classe de l'échec) au lieu de retourner None
+            fleet_arp: Index ARP partagé de la flotte (None = 'show arp' sur le switch)
+            deadline: Échéance du switch (time.monotonic(), None = aucune)
+
+        Returns:
+            Données de découverte du switch, None en cas d'échec
+        """
+        host = switch_config.get('host')
+        if not all([host, switch_config.get('username'), switch_config.get('password')]):
+            logger.error(f"Configuration incomplète pour le switch: {switch_config}")
+            if raise_errors:
+                raise DiscoveryError(ERROR_CONFIG, 'configuration incomplète')
+            return None
+
+        logger.info(f"Début de la découverte pour {host}")
+
+        error = None
+        for attempt in range(2):
+            try:
+                session = self._checkout(switch_config, timeout, timing_store, metrics, deadline)
+            except DiscoveryError:
+                logger.error(f"Impossible de se connecter à {host}")
+                if raise_errors:
+                    raise
+                return None
+
+            session.snapshot_cache = snapshot_cache
+            session.timing_store = timing_store
+            session.raw_capture = raw_capture
+            session.metrics = metrics
+            session.fleet_arp = fleet_arp
+            session.transcript = []
+            switch_data = session.get_lldp_neighbors()
+            if switch_data:
+                self._checkin(host, session)
+                logger.info(f"Découverte terminée pour {host}: {switch_data.get('neighbors_count', 0)} voisins")
+                return switch_data
+
+            # Session probablement cassée: fermeture puis nouvelle tentative sur une session neuve
+            error = session.last_error
+            self._close(session)
+            self._checkin(host, None)
+            if attempt == 0:
+                logger.info(f"Échec sur la session de {host}, reconnexion")
+
+        logger.error(f"Aucune donnée récupérée pour {host}")
+        if raise_errors:
+            raise error or DiscoveryError(ERROR_COMMAND, 'aucune donnée récupérée')
+        return None
+
+    def close(self):
+        """Ferme toutes les sessions inactives"""
+        with self._lock:
+            sessions = list(self._idle.values())
+            self._idle.clear()
+        for session in sessions:
+            self._close(session)
+
+
+def next_delay(interval: float, jitter: float, rng: Optional[random.Random] = None) -> float:
+    """Intervalle avant le prochain cycle, avec une variation aléatoire de ±jitter"""
+    rng = rng or random
+    return max(0.0, interval * (1 + rng.uniform(-jitter, jitter)))
+
+
+def run_daemon(args: argparse.Namespace, switches_config: List[Dict[str, Any]],
+               stop_event: Optional[threading.Event] = None) -> SessionPool:
+    """
+    Boucle d'interrogation périodique
+
+    Chaque cycle exécute run_discovery avec les options de la ligne de commande
+    (mêmes fichiers de sortie, JSON ou NDJSON) en réutilisant les sessions du pool.
+
+    Args:
+        args: Options de la ligne de commande (interval, jitter, max_sessions, cycles...)
+        switches_config: Liste des configurations de switches
+        stop_event: Événement d'arrêt (SIGTERM/SIGINT par défaut)
+
+    Returns:
+        Le pool de sessions, fermé
+    """
+    stop_event = stop_event or threading.Event()
+    pool = SessionPool(args.max_sessions)
+    if (args.workers or 1) > pool.max_sessions:
+        # Chaque switch interrogé occupe une session: au-delà, le plafond serait dépassé
+        logger.warning(f"--workers {args.workers} ramené à --max-sessions {pool.max_sessions}")
+        args = argparse.Namespace(**vars(args))
+        args.workers = pool.max_sessions
+
+    if threading.current_thread() is threading.main_thread():
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, lambda *_: stop_event.set())
+
+    cycle = 0
+    logger.info(f"Mode démon: intervalle {args.interval}s (±{args.jitter:.0%}), "
+                f"{pool.max_sessions} sessions maximum")
+    try:
+        while not stop_event.is_set():
+            cycle += 1
+            start = time.monotonic()
+            logger.info(f"Cycle {cycle}: début")
+            run_discovery(args, switches_config, discover_fn=pool.discover)
+            logger.info(f"Cycle {cycle}: terminé en {time.monotonic() - start:.1f}s "
+                        f"({len(pool)} sessions ouvertes, {pool.logins} connexions SSH depuis le démarrage)")
+
+            if args.cycles and cycle >= args.cycles:
+                break
+            stop_event.wait(next_delay(args.interval, args.jitter))
+    finally:
+        pool.close()
+        logger.info("Mode démon arrêté, sessions fermées")
+
+    return pool
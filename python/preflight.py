@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+"""
+Vérification rapide et parallèle de l'accessibilité des switches
+
+Deux étapes, chacune sur toute la flotte à la fois :
+  1. sonde TCP non bloquante sur le port de collecte (22, ou 443 en REST), avec
+     un délai court : toutes les connexions sont lancées ensemble et attendues
+     par un seul sélecteur ;
+  2. authentification seule (SSH sans shell ni commande, ou login REST), en
+     parallèle, uniquement sur les switches qui ont répondu.
+
+Les résultats sont conservés dans un cache JSON avec une durée de validité :
+
+    {"hosts": {host: {"status", "checked_at", "port", "detail", "credentials"}}}
+
+lldp_discovery.py s'en sert pour écarter les switches connus comme injoignables
+(ou dont les identifiants actuels ont été refusés) au lieu d'attendre le timeout
+de connexion sur chacun d'eux.
+"""
+
+import errno
+import hashlib
+import ipaddress
+import json
+import logging
+import os
+import selectors
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Statuts d'un switch
+STATUS_OK = 'ok'
+STATUS_REACHABLE = 'reachable'
+STATUS_UNREACHABLE = 'unreachable'
+STATUS_AUTH_FAILED = 'auth_failed'
+STATUS_ERROR = 'error'
+
+DEFAULT_TTL = 900.0
+DEFAULT_PROBE_TIMEOUT = 2.0
+# Connexions TCP en cours simultanément (descripteurs de fichiers)
+PROBE_BATCH = 512
+
+
+def switch_port(switch_config: Dict[str, Any]) -> int:
+    """Port de collecte d'un switch (port configuré, sinon celui de son collecteur)"""
+    from lldp_discovery import discovery_class
+    cls = discovery_class(switch_config.get('device_type', 'aruba_os'))
+    return int(switch_config.get('port', cls.DEFAULT_PORT))
+
+
+def credentials_fingerprint(switch_config: Dict[str, Any]) -> str:
+    """Empreinte des identifiants: un refus d'authentification ne vaut que pour les identifiants testés"""
+    digest = hashlib.sha256(f"{switch_config.get('username')}\0{switch_config.get('password')}".encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+
+def _resolve(host: str, port: int) -> Tuple[int, Tuple]:
+    """Famille et adresse de connexion (résolution DNS bloquante si host n'est pas une IP)"""
+    try:
+        address = ipaddress.ip_address(host)
+        return (socket.AF_INET6, (host, port, 0, 0)) if address.version == 6 else (socket.AF_INET, (host, port))
+    except ValueError:
+        family, _, _, _, sockaddr = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)[0]
+        return family, sockaddr
+
+
+def probe_tcp(targets: List[Tuple[str, int]], timeout: float = DEFAULT_PROBE_TIMEOUT,
+              batch: int = PROBE_BATCH) -> Dict[Tuple[str, int], Optional[str]]:
+    """
+    Sonde TCP concurrente: connexions non bloquantes attendues par un seul sélecteur
+
+    Args:
+        targets: Couples (host, port)
+        timeout: Délai maximal d'établissement de la connexion, par lot
+        batch: Nombre maximal de connexions en cours simultanément
+
+    Returns:
+        Dict (host, port) -> None si le port répond, sinon la cause de l'échec
+    """
+    results: Dict[Tuple[str, int], Optional[str]] = {}
+    targets = list(dict.fromkeys(targets))
+
+    for offset in range(0, len(targets), batch):
+        selector = selectors.DefaultSelector()
+        pending = 0
+        for target in targets[offset:offset + batch]:
+            try:
+                family, sockaddr = _resolve(*target)
+            except OSError as e:
+                results[target] = f"résolution impossible: {e}"
+                continue
+            # Échec propre à une cible (famille d'adresses non prise en charge, plus de
+            # descripteurs...): enregistré pour elle, sans interrompre la sonde des autres
+            sock = None
+            try:
+                sock = socket.socket(family, socket.SOCK_STREAM)
+                sock.setblocking(False)
+                code = sock.connect_ex(sockaddr)
+            except OSError as e:
+                results[target] = f"connexion impossible: {e}"
+                if sock is not None:
+                    sock.close()
+                continue
+            if code not in (0, errno.EINPROGRESS, errno.EWOULDBLOCK):
+                results[target] = os.strerror(code)
+                sock.close()
+                continue
+            selector.register(sock, selectors.EVENT_WRITE, target)
+            pending += 1
+
+        deadline = time.monotonic() + timeout
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            for key, _ in selector.select(remaining):
+                code = key.fileobj.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+                results[key.data] = None if code == 0 else os.strerror(code)
+                selector.unregister(key.fileobj)
+                key.fileobj.close()
+                pending -= 1
+
+        for key in list(selector.get_map().values()):
+            results[key.data] = f"pas de réponse en {timeout:g}s"
+            key.fileobj.close()
+        selector.close()
+    return results
+
+
+def check_auth(switch_config: Dict[str, Any], timeout: float = 10) -> Tuple[str, Optional[str]]:
+    """
+    Authentification seule sur un switch, sans ouvrir de shell ni lancer de commande
+
+    SSH: poignée de main et authentification par mot de passe (paramiko, comme
+    Netmiko) ; REST: login puis logout.
+
+    Args:
+        switch_config: Configuration du switch
+        timeout: Délai maximal de connexion et d'authentification
+
+    Returns:
+        (statut, détail de l'échec ou None)
+    """
+    from lldp_discovery import REST_DEVICE_TYPES, create_discovery
+
+    if switch_config.get('device_type', 'aruba_os') in REST_DEVICE_TYPES:
+        discovery = create_discovery(switch_config, timeout=int(timeout))
+        if not discovery.connect():
+            return STATUS_ERROR, "login REST refusé ou impossible"
+        discovery.disconnect()
+        return STATUS_OK, None
+
+    # Import à la demande: la sonde TCP seule n'a pas besoin de paramiko
+    import paramiko
+
+    username, password = switch_config['username'], switch_config['password']
+    sock = transport = None
+    try:
+        sock = socket.create_connection((switch_config['host'], switch_port(switch_config)), timeout=timeout)
+        transport = paramiko.Transport(sock)
+        transport.banner_timeout = timeout
+        transport.auth_timeout = timeout
+        try:
+            transport.start_client(timeout=timeout)
+        except paramiko.SSHException as e:
+            # Port ouvert mais service SSH muet: aussi coûteux qu'un switch injoignable pour la découverte
+            if 'banner' in str(e).lower():
+                return STATUS_UNREACHABLE, f"bannière SSH non reçue en {timeout:g}s"
+            raise
+        # start_client rend la main sans erreur à l'expiration de son délai
+        if transport.session_id is None:
+            return STATUS_UNREACHABLE, f"négociation SSH inachevée en {timeout:g}s"
+        try:
+            transport.auth_password(username, password)
+        except paramiko.BadAuthenticationType as e:
+            if 'keyboard-interactive' not in e.allowed_types:
+                raise
+            transport.auth_interactive(username, lambda title, instructions, prompts: [password] * len(prompts))
+        return STATUS_OK, None
+    except paramiko.AuthenticationException:
+        return STATUS_AUTH_FAILED, "identifiants refusés"
+    except (socket.timeout, TimeoutError):
+        return STATUS_UNREACHABLE, f"pas de réponse SSH en {timeout:g}s"
+    except Exception as e:
+        return STATUS_ERROR, str(e) or type(e).__name__
+    finally:
+        # Le transport ferme sa socket ; sans transport, la socket est fermée ici
+        if transport is not None:
+            transport.close()
+        elif sock is not None:
+            sock.close()
+
+
+class PreflightCache:
+    """Résultats de vérification par switch, valables ttl secondes"""
+
+    def __init__(self, path: Optional[str] = None, ttl: float = DEFAULT_TTL):
+        """
+        Charge le cache existant
+
+        Args:
+            path: Fichier JSON du cache (créé à la sauvegarde) ; None pour un cache en mémoire
+            ttl: Durée de validité d'un résultat en secondes
+        """
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._hosts: Dict[str, Dict[str, Any]] = {}
+
+        if path is None:
+            return
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                self._hosts = json.load(f).get('hosts', {})
+        except FileNotFoundError:
+            pass
+        except (json.JSONDecodeError, OSError, AttributeError) as e:
+            logger.warning(f"Cache de vérification illisible ({path}), ignoré: {str(e)}")
+
+    def record(self, switch_config: Dict[str, Any], status: str, detail: Optional[str] = None):
+        """Enregistre le résultat de la vérification d'un switch"""
+        entry = {'status': status, 'checked_at': datetime.now().isoformat(), 'port': switch_port(switch_config),
+                 'detail': detail, 'credentials': credentials_fingerprint(switch_config)}
+        with self._lock:
+            self._hosts[switch_config['host']] = entry
+
+    def lookup(self, switch_config: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Résultat encore valide pour le switch (même port), None sinon"""
+        with self._lock:
+            entry = self._hosts.get(switch_config.get('host'))
+        if not entry or entry.get('port') != switch_port(switch_config):
+            return None
+        try:
+            age = (datetime.now() - datetime.fromisoformat(entry['checked_at'])).total_seconds()
+        except (KeyError, TypeError, ValueError):
+            return None
+        return entry if 0 <= age <= self.ttl else None
+
+    def dead_reason(self, switch_config: Dict[str, Any]) -> Optional[str]:
+        """
+        Raison d'écarter un switch d'après le cache
+
+        Returns:
+            Statut 'unreachable', ou 'auth_failed' si les identifiants n'ont pas
+            changé depuis le refus ; None si le switch doit être interrogé
+        """
+        entry = self.lookup(switch_config)
+        if entry is None:
+            return None
+        if entry['status'] == STATUS_UNREACHABLE:
+            return STATUS_UNREACHABLE
+        if entry['status'] == STATUS_AUTH_FAILED and entry.get('credentials') == credentials_fingerprint(switch_config):
+            return STATUS_AUTH_FAILED
+        return None
+
+    def partition(self, switches_config: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], Dict[str, str]]:
+        """
+        Sépare les switches à interroger de ceux connus comme injoignables
+
+        Returns:
+            (switches à interroger, {host écarté: statut})
+        """
+        live, skipped = [], {}
+        for switch_config in switches_config:
+            reason = self.dead_reason(switch_config)
+            if reason is None:
+                live.append(switch_config)
+            else:
+                skipped[switch_config['host']] = reason
+        return live, skipped
+
+    def save(self):
+        """Sauvegarde atomique du cache, sans les résultats expirés"""
+        if self.path is None:
+            return
+        now = datetime.now()
+        with self._lock:
+            hosts = {}
+            for host, entry in self._hosts.items():
+                try:
+                    if (now - datetime.fromisoformat(entry['checked_at'])).total_seconds() <= self.ttl:
+                        hosts[host] = entry
+                except (KeyError, TypeError, ValueError):
+                    continue
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'hosts': hosts}, f, indent=2, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+
+
+def run_preflight(switches_config: List[Dict[str, Any]], probe_timeout: float = DEFAULT_PROBE_TIMEOUT,
+                  auth: bool = True, auth_timeout: float = 10, workers: int = 50,
+                  cache: Optional[PreflightCache] = None) -> List[Dict[str, Any]]:
+    """
+    Vérifie l'accessibilité de toute la flotte: sonde TCP, puis authentification des switches qui répondent
+
+    Args:
+        switches_config: Liste des configurations de switches
+        probe_timeout: Délai maximal de la sonde TCP
+        auth: Teste l'authentification des switches qui répondent
+        auth_timeout: Délai maximal de connexion et d'authentification
+        workers: Authentifications simultanées
+        cache: Cache mis à jour avec les résultats
+
+    Returns:
+        Une entrée {host, port, status, detail, auth_seconds} par switch, dans l'ordre de la configuration
+    """
+    switches_config = [switch_config for switch_config in switches_config if switch_config.get('host')]
+    targets = [(switch_config['host'], switch_port(switch_config)) for switch_config in switches_config]
+
+    probes = probe_tcp(targets, probe_timeout)
+    results = []
+    for target in targets:
+        failure = probes.get(target)
+        results.append({'host': target[0], 'port': target[1],
+                        'status': STATUS_UNREACHABLE if failure else STATUS_REACHABLE,
+                        'detail': failure, 'auth_seconds': None})
+
+    responding = [index for index, result in enumerate(results) if result['status'] == STATUS_REACHABLE]
+    if auth and responding:
+        def authenticate(index: int):
+            switch_config = switches_config[index]
+            if not (switch_config.get('username') and switch_config.get('password')):
+                return STATUS_ERROR, "configuration incomplète", 0.0
+            auth_start = time.monotonic()
+            status, detail = check_auth(switch_config, auth_timeout)
+            return status, detail, time.monotonic() - auth_start
+
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(responding))),
+                                thread_name_prefix='preflight') as executor:
+            for index, (status, detail, seconds) in zip(responding, executor.map(authenticate, responding)):
+                results[index].update({'status': status, 'detail': detail, 'auth_seconds': round(seconds, 3)})
+
+    if cache is not None:
+        for switch_config, result in zip(switches_config, results):
+            cache.record(switch_config, result['status'], result['detail'])
+    return results
+
+
+def select_live_switches(switches_config: List[Dict[str, Any]], cache: PreflightCache, use_cache: bool = True,
+                         probe: bool = False, probe_timeout: float = DEFAULT_PROBE_TIMEOUT
+                         ) -> Tuple[List[Dict[str, Any]], Dict[str, str]]:
+    """
+    Écarte avant la découverte les switches connus comme injoignables et, avec probe, ceux qui ne répondent pas
+
+    Args:
+        switches_config: Liste des configurations de switches
+        cache: Cache des vérifications (mis à jour par la sonde)
+        use_cache: Écarte les switches injoignables ou refusés d'après le cache
+        probe: Sonde TCP des switches restants, sans authentification
+        probe_timeout: Délai maximal de la sonde TCP
+
+    Returns:
+        (switches à interroger, {host écarté: statut}), dans l'ordre de la configuration
+    """
+    if use_cache:
+        live, skipped = cache.partition(switches_config)
+    else:
+        live, skipped = list(switches_config), {}
+    if probe and live:
+        results = run_preflight(live, probe_timeout=probe_timeout, auth=False, cache=cache)
+        unreachable = {result['host'] for result in results if result['status'] == STATUS_UNREACHABLE}
+        skipped.update((host, STATUS_UNREACHABLE) for host in unreachable)
+        live = [switch_config for switch_config in live if switch_config.get('host') not in unreachable]
+    if skipped:
+        logger.info(f"{len(skipped)} switches écartés avant la découverte: "
+                    f"{', '.join(f'{host} ({status})' for host, status in skipped.items())}")
+    return live, skipped
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Capture des transcriptions CLI brutes par switch (--save-raw)
+
+Chaque switch produit un fichier <host>.json.gz contenant les sorties brutes
+des commandes avec leur horodatage et leur durée ; un manifeste conserve
+l'ordre de la configuration pour que le rejeu (voir replay.py) reproduise
+exactement le JSON consolidé d'une exécution en direct :
+
+    DIR/manifest.json       {"captured_at": "...", "hosts": [...]}
+    DIR/<host>.json.gz      {"host": "...", "device_type": "...", "captured_at": "...",
+                             "commands": [{"command": "...", "started_at": "...",
+                                           "duration": 0.12, "output": "..."}]}
+"""
+
+import gzip
+import json
+import logging
+import os
+import re
+from datetime import datetime
+from typing import Dict, List, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+UNSAFE_FILENAME_CHARS = re.compile(r'[^A-Za-z0-9._-]')
+CAPTURE_SUFFIX = '.json.gz'
+MANIFEST_NAME = 'manifest.json'
+
+
+def capture_filename(host: str) -> str:
+    """Nom du fichier de transcription d'un switch"""
+    return UNSAFE_FILENAME_CHARS.sub('_', host) + CAPTURE_SUFFIX
+
+
+class RawCapture:
+    """Écrit les transcriptions brutes compressées, un fichier par switch"""
+
+    def __init__(self, capture_dir: str):
+        """
+        Prépare le répertoire de capture
+
+        Args:
+            capture_dir: Répertoire des transcriptions
+        """
+        self.capture_dir = capture_dir
+        os.makedirs(capture_dir, exist_ok=True)
+
+    def write_manifest(self, hosts: List[str], arp_sources: Optional[List[str]] = None):
+        """
+        Enregistre l'ordre des switches de la configuration
+
+        Args:
+            hosts: Switches dans l'ordre de la configuration
+            arp_sources: Switches sources de l'index ARP de la flotte ; les autres
+                n'ont pas de table ARP capturée
+        """
+        manifest = {'captured_at': datetime.now().isoformat(), 'hosts': hosts}
+        if arp_sources:
+            manifest['arp_sources'] = arp_sources
+        with open(os.path.join(self.capture_dir, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+
+    def save(self, host: str, device_type: str, commands: List[Dict[str, Any]]):
+        """
+        Enregistre la transcription d'un switch
+
+        Args:
+            host: Adresse du switch
+            device_type: Type de device Netmiko
+            commands: Commandes exécutées (command, started_at, duration, output)
+        """
+        path = os.path.join(self.capture_dir, capture_filename(host))
+        tmp_path = f"{path}.tmp"
+        try:
+            with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+                json.dump({'host': host, 'device_type': device_type, 'captured_at': datetime.now().isoformat(),
+                           'commands': commands}, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.error(f"Impossible d'enregistrer la transcription de {host}: {str(e)}")
+
+
+def load_capture(path: str) -> Optional[Dict[str, Any]]:
+    """
+    Lit une transcription compressée
+
+    Args:
+        path: Fichier <host>.json.gz
+
+    Returns:
+        Transcription décodée, None si le fichier est illisible
+    """
+    try:
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, EOFError, json.JSONDecodeError) as e:
+        logger.error(f"Transcription illisible ignorée ({path}): {str(e)}")
+        return None
+
+
+def load_manifest(capture_dir: str) -> Dict[str, Any]:
+    """Manifeste d'un répertoire de capture, vide s'il est absent ou illisible"""
+    try:
+        with open(os.path.join(capture_dir, MANIFEST_NAME), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+
+def list_captures(capture_dir: str) -> List[str]:
+    """
+    Fichiers de transcription d'un répertoire, dans l'ordre de la configuration
+
+    Les switches absents du manifeste sont placés à la fin, par nom de fichier.
+
+    Args:
+        capture_dir: Répertoire des transcriptions
+
+    Returns:
+        Chemins des fichiers <host>.json.gz
+    """
+    paths = sorted(os.path.join(capture_dir, name) for name in os.listdir(capture_dir)
+                   if name.endswith(CAPTURE_SUFFIX))
+    hosts = load_manifest(capture_dir).get('hosts', [])
+    order = {os.path.join(capture_dir, capture_filename(host)): position for position, host in enumerate(hosts)}
+    return sorted(paths, key=lambda path: order.get(path, len(order)))
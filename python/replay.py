@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Rejeu hors ligne des transcriptions brutes (--replay)
+
+Reconstruit les résultats de découverte à partir d'un répertoire produit par
+--save-raw : parsing LLDP, parsing ARP, enrichissement et consolidation, sans
+connexion SSH ni import de Netmiko. Les switches sont répartis sur plusieurs
+processus pour exploiter tous les cœurs ; les durées par phase ne sont mesurées
+que lors d'un rejeu dans un seul processus (--workers 1 ou --profile).
+
+Une capture faite avec un index ARP de la flotte (switches "arp_source") est
+rejouée de même : l'index est reconstruit à partir des tables ARP capturées sur
+les switches sources, puis sert aux switches capturés sans 'show arp'.
+"""
+
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Dict, Any, FrozenSet, Iterable, Optional, Callable, Tuple
+
+from lldp_discovery import discovery_class, new_results, record_switch_result
+from raw_capture import load_capture, load_manifest, list_captures, capture_filename
+from run_metrics import RunMetrics
+from fleet_arp import FleetARPIndex
+
+logger = logging.getLogger(__name__)
+
+
+def replay_capture(path: str, metrics: Optional[RunMetrics] = None, fleet_arp: Optional[FleetARPIndex] = None,
+                   arp_sources: FrozenSet[str] = frozenset()) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+    """
+    Rejoue la transcription d'un switch
+
+    Args:
+        path: Fichier <host>.json.gz
+        metrics: Mesures par phase (parsing, enrichissement), dans le processus courant uniquement
+        fleet_arp: Index ARP de la flotte, pour les switches capturés sans table ARP
+        arp_sources: Switches sources de l'index ARP lors de la capture
+
+    Returns:
+        (host, données du switch) ; données None si la transcription est illisible
+    """
+    capture = load_capture(path)
+    if capture is None:
+        return None, None
+
+    outputs = {entry['command']: entry.get('output', '') for entry in capture.get('commands', [])}
+    device_type = capture.get('device_type', 'aruba_os')
+    parser = discovery_class(device_type)(capture['host'], '', '', device_type, metrics=metrics,
+                                          arp_source=capture['host'] in arp_sources, fleet_arp=fleet_arp)
+    # Tables ARP et MAC rejouées seulement si elles ont été capturées
+    switch_data = parser.build_switch_data(outputs.get(parser.LLDP_COMMAND, ''), outputs.get(parser.ARP_COMMAND),
+                                           outputs.get(parser.MAC_TABLE_COMMAND))
+    # Horodatage de la capture, pas celui du rejeu
+    switch_data['timestamp'] = capture.get('captured_at', switch_data['timestamp'])
+    return capture['host'], switch_data
+
+
+def replay_captures(capture_dir: str, workers: Optional[int] = None,
+                    on_result: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+                    metrics: Optional[RunMetrics] = None) -> Dict[str, Any]:
+    """
+    Rejoue toutes les transcriptions d'un répertoire
+
+    Args:
+        capture_dir: Répertoire produit par --save-raw
+        workers: Nombre de processus (défaut: nombre de cœurs)
+        on_result: Si fourni, reçoit (host, données) pour chaque switch ;
+            les résultats ne sont alors pas conservés dans 'switches'
+        metrics: Mesures par phase ; alimentées seulement par un rejeu dans un seul
+            processus, imposé si le profilage est actif
+
+    Returns:
+        Données de découverte consolidées, dans l'ordre de la configuration capturée
+    """
+    paths = list_captures(capture_dir)
+    manifest = load_manifest(capture_dir)
+    # Les switches en échec lors de la capture comptent dans le total, comme en direct
+    all_results = new_results(len(manifest.get('hosts', [])) or len(paths))
+    if not paths:
+        logger.error(f"Aucune transcription trouvée dans {capture_dir}")
+        return all_results
+
+    arp_sources = frozenset(manifest.get('arp_sources', []))
+    fleet_arp = load_fleet_arp(capture_dir, arp_sources) if arp_sources else None
+    replay = partial(replay_capture, fleet_arp=fleet_arp, arp_sources=arp_sources)
+
+    workers = max(1, min(workers or os.cpu_count() or 1, len(paths)))
+    if metrics is not None and metrics.profiler is not None and workers > 1:
+        logger.info("Profilage actif: rejeu dans un seul processus")
+        workers = 1
+    logger.info(f"Rejeu de {len(paths)} transcriptions sur {workers} processus")
+
+    if workers == 1:
+        first_capture = _collect(map(partial(replay, metrics=metrics), paths), all_results, on_result)
+    else:
+        chunksize = max(1, len(paths) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            first_capture = _collect(executor.map(replay, paths, chunksize=chunksize),
+                                     all_results, on_result)
+
+    if first_capture:
+        all_results['discovery_timestamp'] = first_capture
+    if fleet_arp is not None:
+        all_results['summary']['fleet_arp'] = fleet_arp.summary()
+    return all_results
+
+
+def load_fleet_arp(capture_dir: str, arp_sources: Iterable[str]) -> FleetARPIndex:
+    """
+    Reconstruit l'index ARP de la flotte à partir des captures des switches sources
+
+    Args:
+        capture_dir: Répertoire produit par --save-raw
+        arp_sources: Switches sources de l'index lors de la capture
+
+    Returns:
+        Index ARP de la flotte (sources absentes ou illisibles ignorées)
+    """
+    fleet_arp = FleetARPIndex()
+    for host in arp_sources:
+        capture = load_capture(os.path.join(capture_dir, capture_filename(host)))
+        if capture is None:
+            continue
+        device_type = capture.get('device_type', 'aruba_os')
+        parser = discovery_class(device_type)(host, '', '', device_type)
+        arp_output = next((entry.get('output', '') for entry in capture.get('commands', [])
+                           if entry['command'] == parser.ARP_COMMAND), None)
+        if arp_output is not None:
+            fleet_arp.add(host, parser._parse_arp_output(arp_output))
+    return fleet_arp
+
+
+def _collect(results: Iterable[Tuple[Optional[str], Optional[Dict[str, Any]]]], all_results: Dict[str, Any],
+             on_result: Optional[Callable[[str, Dict[str, Any]], None]]) -> Optional[str]:
+    """Agrège les résultats du rejeu dans l'ordre des transcriptions et retourne la première capture"""
+    first_capture = None
+    for host, switch_data in results:
+        if switch_data:
+            record_switch_result(all_results, host, switch_data, on_result)
+            if first_capture is None or switch_data['timestamp'] < first_capture:
+                first_capture = switch_data['timestamp']
+    return first_capture
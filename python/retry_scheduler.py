@@ -0,0 +1,393 @@
+#!/usr/bin/env python3
+"""
+Nouvelles tentatives et disjoncteur par switch pour la découverte
+
+Chaque échec est classé (timeout, connexion, authentification, commande,
+configuration). Les erreurs passagères (timeout, connexion, commande) sont
+retentées avec un délai exponentiel à variation aléatoire, sans dépasser le
+délai maximal du switch ; une erreur d'authentification ou de configuration
+ne l'est jamais.
+
+Un disjoncteur par switch, conservé dans un fichier JSON d'une exécution à
+l'autre, s'ouvre après plusieurs échecs consécutifs : le switch n'est plus
+interrogé pendant une durée de repos qui double à chaque nouvelle ouverture.
+À l'expiration, une seule tentative de sonde est faite (état semi-ouvert) ;
+un succès referme le disjoncteur.
+
+    {"hosts": {host: {"state", "failures", "trips", "last_error", "detail",
+                      "last_failure", "open_until", "credentials"}}}
+"""
+
+import json
+import logging
+import os
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Any, Optional, Callable, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Classes d'erreur
+ERROR_TIMEOUT = 'timeout'
+ERROR_CONNECTION = 'connection'
+ERROR_AUTH = 'auth'
+ERROR_COMMAND = 'command'
+ERROR_CONFIG = 'config'
+
+TRANSIENT_ERRORS = frozenset({ERROR_TIMEOUT, ERROR_CONNECTION, ERROR_COMMAND})
+
+# États du disjoncteur
+CIRCUIT_CLOSED = 'closed'
+CIRCUIT_OPEN = 'open'
+CIRCUIT_HALF_OPEN = 'half_open'
+
+DEFAULT_MAX_RETRIES = 2
+DEFAULT_BASE_DELAY = 1.0
+DEFAULT_MAX_DELAY = 30.0
+DEFAULT_FAILURE_THRESHOLD = 3
+DEFAULT_COOLDOWN = 300.0
+DEFAULT_MAX_COOLDOWN = 86400.0
+
+# Noms d'exceptions reconnus sans importer Netmiko, paramiko, asyncssh ni requests
+_AUTH_EXCEPTIONS = frozenset({'NetmikoAuthenticationException', 'AuthenticationException', 'PermissionDenied'})
+_TIMEOUT_EXCEPTIONS = frozenset({'NetmikoTimeoutException', 'ReadTimeout', 'TimeoutError', 'Timeout'})
+_CONNECTION_EXCEPTIONS = frozenset({'SSHException', 'ConnectionError', 'ConnectionLost', 'DisconnectError'})
+
+
+class DiscoveryError(Exception):
+    """Échec de la découverte d'un switch, avec sa classe d'erreur"""
+
+    def __init__(self, kind: str, detail: str = ''):
+        super().__init__(detail or kind)
+        self.kind = kind
+        self.detail = detail
+
+    @property
+    def transient(self) -> bool:
+        """Erreur passagère, qui mérite une nouvelle tentative"""
+        return self.kind in TRANSIENT_ERRORS
+
+
+def classify_error(error: BaseException) -> str:
+    """
+    Classe d'une exception levée pendant la découverte
+
+    Args:
+        error: Exception de Netmiko, paramiko, asyncssh, requests ou de la bibliothèque standard
+
+    Returns:
+        ERROR_AUTH, ERROR_TIMEOUT, ERROR_CONNECTION ou ERROR_COMMAND
+    """
+    if isinstance(error, DiscoveryError):
+        return error.kind
+    names = {cls.__name__ for cls in type(error).__mro__}
+    if names & _AUTH_EXCEPTIONS:
+        return ERROR_AUTH
+    if names & _TIMEOUT_EXCEPTIONS:
+        return ERROR_TIMEOUT
+    if names & _CONNECTION_EXCEPTIONS or isinstance(error, OSError):
+        return ERROR_CONNECTION
+    return ERROR_COMMAND
+
+
+def backoff_delay(attempt: int, base_delay: float = DEFAULT_BASE_DELAY, max_delay: float = DEFAULT_MAX_DELAY,
+                  rng: Optional[random.Random] = None) -> float:
+    """
+    Délai avant la nouvelle tentative numéro attempt (1 = première nouvelle tentative)
+
+    Délai exponentiel plafonné, dont la seconde moitié est tirée au hasard pour
+    que les switches tombés en même temps ne soient pas retentés ensemble.
+    """
+    rng = rng or random
+    ceiling = min(max_delay, base_delay * 2 ** (attempt - 1))
+    return ceiling / 2 + rng.uniform(0, ceiling / 2)
+
+
+def _credentials_fingerprint(switch_config: Dict[str, Any]) -> str:
+    # Import à la demande: preflight charge socket et selectors, inutiles aux commandes hors ligne
+    from preflight import credentials_fingerprint
+    return credentials_fingerprint(switch_config)
+
+
+class RetryScheduler:
+    """Nouvelles tentatives des erreurs passagères et disjoncteur persistant par switch"""
+
+    def __init__(self, path: Optional[str] = None, max_retries: int = DEFAULT_MAX_RETRIES,
+                 base_delay: float = DEFAULT_BASE_DELAY, max_delay: float = DEFAULT_MAX_DELAY,
+                 failure_threshold: int = DEFAULT_FAILURE_THRESHOLD, cooldown: float = DEFAULT_COOLDOWN,
+                 max_cooldown: float = DEFAULT_MAX_COOLDOWN, rng: Optional[random.Random] = None):
+        """
+        Charge l'état des disjoncteurs
+
+        Args:
+            path: Fichier JSON des disjoncteurs (créé à la sauvegarde) ; None pour un état en mémoire
+            max_retries: Nouvelles tentatives par switch pour une erreur passagère
+            base_delay: Délai avant la première nouvelle tentative (doublé ensuite)
+            max_delay: Délai maximal entre deux tentatives
+            failure_threshold: Échecs consécutifs avant l'ouverture du disjoncteur
+            cooldown: Durée de repos après la première ouverture (doublée à chaque réouverture)
+            max_cooldown: Durée de repos maximale
+            rng: Générateur aléatoire des délais
+        """
+        self.path = path
+        self.max_retries = max(0, max_retries)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.failure_threshold = max(1, failure_threshold)
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.rng = rng or random.Random()
+        self.retries = 0
+        self.errors: Dict[str, int] = {}
+        self.skipped: Dict[str, str] = {}
+        # Jeton de l'appel en cours par switch (call), retiré quand le switch est abandonné
+        self._running: Dict[str, object] = {}
+        self._lock = threading.Lock()
+        self._hosts: Dict[str, Dict[str, Any]] = {}
+
+        if path is None:
+            return
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                self._hosts = json.load(f).get('hosts', {})
+        except FileNotFoundError:
+            pass
+        except (json.JSONDecodeError, OSError, AttributeError) as e:
+            logger.warning(f"État des disjoncteurs illisible ({path}), ignoré: {str(e)}")
+
+    def state(self, host: str) -> str:
+        """État du disjoncteur d'un switch (fermé, ouvert, ou semi-ouvert après la durée de repos)"""
+        with self._lock:
+            entry = self._hosts.get(host)
+        return self._circuit_state(entry)
+
+    @staticmethod
+    def _circuit_state(entry: Optional[Dict[str, Any]]) -> str:
+        if not entry or entry.get('state') != CIRCUIT_OPEN:
+            return CIRCUIT_CLOSED
+        try:
+            open_until = datetime.fromisoformat(entry['open_until'])
+        except (KeyError, TypeError, ValueError):
+            return CIRCUIT_HALF_OPEN
+        return CIRCUIT_OPEN if datetime.now() < open_until else CIRCUIT_HALF_OPEN
+
+    def allow(self, switch_config: Dict[str, Any]) -> bool:
+        """
+        Le switch peut-il être interrogé
+
+        Un disjoncteur ouvert sur un refus d'authentification est refermé si les
+        identifiants ont changé depuis.
+        """
+        host = switch_config.get('host')
+        if self.state(host) != CIRCUIT_OPEN:
+            return True
+        with self._lock:
+            entry = self._hosts.get(host, {})
+            if entry.get('last_error') == ERROR_AUTH and \
+                    entry.get('credentials') != _credentials_fingerprint(switch_config):
+                del self._hosts[host]
+                logger.info(f"Identifiants modifiés pour {host}, disjoncteur refermé")
+                return True
+        return False
+
+    def partition(self, switches_config: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], Dict[str, str]]:
+        """
+        Sépare les switches à interroger de ceux dont le disjoncteur est ouvert
+
+        Returns:
+            (switches à interroger, {host écarté: fin de la durée de repos})
+        """
+        allowed, blocked = [], {}
+        for switch_config in switches_config:
+            if self.allow(switch_config):
+                allowed.append(switch_config)
+            else:
+                host = switch_config['host']
+                with self._lock:
+                    blocked[host] = self._hosts.get(host, {}).get('open_until')
+        if blocked:
+            with self._lock:
+                self.skipped.update(blocked)
+            logger.info(f"{len(blocked)} switches écartés, disjoncteur ouvert: {', '.join(blocked)}")
+        return allowed, blocked
+
+    def attempts(self, host: str) -> int:
+        """Nombre de tentatives autorisées: une seule sonde si le disjoncteur est semi-ouvert"""
+        return 1 if self.state(host) == CIRCUIT_HALF_OPEN else 1 + self.max_retries
+
+    def retry_delay(self, host: str, attempt: int, attempts: int, error: DiscoveryError,
+                    deadline: Optional[float] = None) -> Optional[float]:
+        """
+        Délai avant la tentative suivante
+
+        Args:
+            host: Switch
+            attempt: Numéro de la tentative qui vient d'échouer (1 = première)
+            attempts: Nombre de tentatives autorisées
+            error: Erreur de la tentative
+            deadline: Échéance du switch (time.monotonic()), au-delà de laquelle il est abandonné
+
+        Returns:
+            Délai en secondes, None si l'erreur n'est pas retentée
+        """
+        if not error.transient or attempt >= attempts:
+            return None
+        delay = backoff_delay(attempt, self.base_delay, self.max_delay, self.rng)
+        if deadline is not None and time.monotonic() + delay >= deadline:
+            logger.warning(f"Pas de nouvelle tentative pour {host}: délai maximal du switch atteint")
+            return None
+        with self._lock:
+            self.retries += 1
+        logger.warning(f"Échec sur {host} ({error.kind}: {error.detail}), "
+                       f"nouvelle tentative {attempt}/{attempts - 1} dans {delay:.1f}s")
+        return delay
+
+    def record_success(self, host: str, token: Optional[object] = None):
+        """
+        Referme le disjoncteur du switch
+
+        Le succès tardif d'une tâche abandonnée referme aussi le disjoncteur.
+
+        Args:
+            host: Switch
+            token: Jeton de l'appel (call), None hors de call
+        """
+        with self._lock:
+            if token is not None and self._running.get(host) is token:
+                del self._running[host]
+            entry = self._hosts.pop(host, None)
+        if entry and entry.get('state') == CIRCUIT_OPEN:
+            logger.info(f"Switch {host} de nouveau joignable, disjoncteur refermé")
+
+    def record_failure(self, switch_config: Dict[str, Any], error: DiscoveryError, token: Optional[object] = None):
+        """
+        Compte l'échec définitif d'un switch (après ses nouvelles tentatives)
+
+        Le disjoncteur s'ouvre au seuil d'échecs consécutifs, ou aussitôt si la
+        sonde d'un disjoncteur semi-ouvert échoue ; la durée de repos double à
+        chaque ouverture. Les erreurs de configuration ne sont pas comptées.
+        L'échec tardif d'une tâche abandonnée n'est pas compté une seconde fois.
+
+        Args:
+            switch_config: Configuration du switch
+            error: Erreur de la dernière tentative
+            token: Jeton de l'appel (call), None hors de call
+        """
+        host = switch_config.get('host')
+        with self._lock:
+            if token is not None:
+                if self._running.get(host) is not token:
+                    return
+                del self._running[host]
+            self._count_failure(switch_config, error)
+
+    def _count_failure(self, switch_config: Dict[str, Any], error: DiscoveryError):
+        """Compte un échec et ouvre le disjoncteur au besoin (appelé sous self._lock)"""
+        host = switch_config.get('host')
+        self.errors[error.kind] = self.errors.get(error.kind, 0) + 1
+        if error.kind == ERROR_CONFIG:
+            return
+
+        now = datetime.now()
+        entry = self._hosts.setdefault(host, {'state': CIRCUIT_CLOSED, 'failures': 0, 'trips': 0})
+        half_open = self._circuit_state(entry) == CIRCUIT_HALF_OPEN
+        entry['failures'] = entry.get('failures', 0) + 1
+        # Première ligne seulement: les messages Netmiko détaillent les causes possibles sur plusieurs lignes
+        detail = (error.detail or '').strip().split('\n')[0]
+        entry.update({'last_error': error.kind, 'detail': detail, 'last_failure': now.isoformat(),
+                      'credentials': _credentials_fingerprint(switch_config)})
+        if not half_open and entry['failures'] < self.failure_threshold:
+            return
+
+        entry['trips'] = entry.get('trips', 0) + 1
+        cooldown = min(self.max_cooldown, self.cooldown * 2 ** (entry['trips'] - 1))
+        entry['state'] = CIRCUIT_OPEN
+        entry['open_until'] = (now + timedelta(seconds=cooldown)).isoformat()
+        logger.warning(f"Disjoncteur ouvert pour {host} après {entry['failures']} échecs consécutifs "
+                       f"({error.kind}), prochaine tentative dans {cooldown:.0f}s")
+
+    def record_abandoned(self, switch_config: Dict[str, Any]):
+        """
+        Compte un switch abandonné sur son délai maximal comme un timeout
+
+        La tâche abandonnée s'arrête à son échéance ; son échec tardif n'est pas
+        compté une seconde fois, son succès tardif referme le disjoncteur. Un
+        switch dont la tâche a déjà rendu compte n'est pas compté de nouveau.
+        """
+        host = switch_config.get('host')
+        with self._lock:
+            if self._running.pop(host, None) is None:
+                return
+            self._count_failure(switch_config, DiscoveryError(ERROR_TIMEOUT, 'délai maximal du switch dépassé'))
+
+    def call(self, discover_fn: Callable[..., Optional[Dict[str, Any]]], switch_config: Dict[str, Any],
+             deadline: Optional[float] = None, **kwargs) -> Optional[Dict[str, Any]]:
+        """
+        Appelle discover_fn en retentant les erreurs passagères
+
+        Args:
+            discover_fn: Fonction de découverte d'un switch, appelée avec raise_errors=True
+            switch_config: Configuration du switch
+            deadline: Échéance du switch (time.monotonic()), aucune tentative ne la dépasse ;
+                transmise aussi à discover_fn
+            **kwargs: Arguments transmis à discover_fn
+
+        Returns:
+            Données de découverte du switch, None après le dernier échec
+        """
+        host = switch_config.get('host')
+        if deadline is not None:
+            kwargs['deadline'] = deadline
+        token = object()
+        with self._lock:
+            self._running[host] = token
+        attempts = self.attempts(host)
+        for attempt in range(1, attempts + 1):
+            try:
+                switch_data = discover_fn(switch_config, raise_errors=True, **kwargs)
+            except Exception as e:
+                error = e if isinstance(e, DiscoveryError) else DiscoveryError(classify_error(e), str(e))
+            else:
+                self.record_success(host, token)
+                return switch_data
+
+            delay = self.retry_delay(host, attempt, attempts, error, deadline)
+            if delay is None:
+                break
+            time.sleep(delay)
+
+        self.record_failure(switch_config, error, token)
+        return None
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Résumé de l'exécution et des disjoncteurs
+
+        Returns:
+            Dict {retries, errors: {classe: échecs définitifs}, skipped: {host écarté: fin du repos},
+                  circuits: {host: {state, failures, trips, last_error, detail, open_until}}}
+            (circuits limité aux switches en échec)
+        """
+        with self._lock:
+            hosts = dict(self._hosts)
+            summary = {'retries': self.retries, 'errors': dict(self.errors), 'skipped': dict(self.skipped)}
+        summary['circuits'] = {host: {'state': self.state(host), 'failures': entry.get('failures', 0),
+                                      'trips': entry.get('trips', 0), 'last_error': entry.get('last_error'),
+                                      'detail': entry.get('detail'), 'open_until': entry.get('open_until')}
+                               for host, entry in sorted(hosts.items())}
+        return summary
+
+    def save(self):
+        """Sauvegarde atomique de l'état des disjoncteurs"""
+        if self.path is None:
+            return
+        with self._lock:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'hosts': self._hosts}, f, indent=2, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Mesures par switch et par phase d'une exécution de découverte
+
+Chaque switch enregistre la durée de ses phases (connexion, chaque commande
+avec le volume reçu, parsing LLDP, parsing ARP, enrichissement, écriture,
+déconnexion) ; l'exécution enregistre ses propres phases (découverte, écriture
+du fichier de sortie, topologie, historique). Le résumé est intégré au JSON de
+sortie (summary['timings']) et peut être exporté au format texte Prometheus
+(collecteur textfile de node_exporter) ou OpenMetrics.
+
+Avec un profileur (--profile), les phases de parsing et d'enrichissement sont
+aussi profilées avec cProfile ; elles sont alors sérialisées entre threads, un
+seul profileur pouvant être actif à la fois.
+"""
+
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Any, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+# Phases profilées avec --profile
+PROFILED_PHASES = frozenset({'parse_lldp', 'parse_arp', 'enrich'})
+
+METRIC_PREFIX = 'lldp_discovery'
+
+
+def _escape_label(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def aggregate_phases(switches: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, float]]:
+    """
+    Agrège les durées par switch en statistiques par phase
+
+    Args:
+        switches: Mesures par switch {host: {phases, commands}} (voir RunMetrics.summary)
+
+    Returns:
+        Dict {phase: {count, total, mean, max}} tous switches confondus
+        (commandes sous 'command:<commande>')
+    """
+    samples: Dict[str, List[float]] = {}
+    for data in switches.values():
+        for name, seconds in data['phases'].items():
+            samples.setdefault(name, []).append(seconds)
+        for command, values in data['commands'].items():
+            samples.setdefault(f"command:{command}", []).append(values['seconds'])
+    return {name: {'count': len(values), 'total': round(sum(values), 6),
+                   'mean': round(sum(values) / len(values), 6), 'max': round(max(values), 6)}
+            for name, values in samples.items()}
+
+
+class RunMetrics:
+    """Durées par switch et par phase, volumes reçus et phases de l'exécution"""
+
+    def __init__(self, profile: bool = False):
+        """
+        Args:
+            profile: Profile les phases de parsing et d'enrichissement avec cProfile
+        """
+        self._lock = threading.Lock()
+        self._switches: Dict[str, Dict[str, Any]] = {}
+        self._run: Dict[str, float] = {}
+        self.profiler = None
+        if profile:
+            # Import à la demande: cProfile n'est chargé qu'avec --profile
+            import cProfile
+            self.profiler = cProfile.Profile()
+        self._profile_lock = threading.Lock()
+
+    def _switch(self, host: str) -> Dict[str, Any]:
+        switch = self._switches.get(host)
+        if switch is None:
+            switch = self._switches[host] = {'phases': {}, 'commands': {}, 'bytes_received': 0}
+        return switch
+
+    def record(self, host: str, phase: str, seconds: float):
+        """Ajoute la durée d'une phase d'un switch (cumulée si la phase se répète)"""
+        with self._lock:
+            phases = self._switch(host)['phases']
+            phases[phase] = phases.get(phase, 0.0) + seconds
+
+    def record_command(self, host: str, command: str, seconds: float, received: int):
+        """Ajoute la durée d'une commande et le volume reçu (octets)"""
+        with self._lock:
+            switch = self._switch(host)
+            command_metrics = switch['commands'].setdefault(command, {'seconds': 0.0, 'bytes': 0})
+            command_metrics['seconds'] += seconds
+            command_metrics['bytes'] += received
+            switch['bytes_received'] += received
+
+    def record_run(self, phase: str, seconds: float):
+        """Ajoute la durée d'une phase de l'exécution"""
+        with self._lock:
+            self._run[phase] = self._run.get(phase, 0.0) + seconds
+
+    @contextmanager
+    def phase(self, host: str, name: str, deadline: Optional[float] = None) -> Iterator[None]:
+        """
+        Mesure une phase d'un switch (profilée avec --profile pour parsing et enrichissement)
+
+        Une phase qui se termine après l'échéance du switch (deadline, time.monotonic())
+        n'est pas enregistrée : le switch a été abandonné et compté en échec.
+        """
+        if self.profiler is not None and name in PROFILED_PHASES:
+            with self._profile_lock:
+                start = time.perf_counter()
+                self.profiler.enable()
+                try:
+                    yield
+                finally:
+                    self.profiler.disable()
+                    if deadline is None or time.monotonic() < deadline:
+                        self.record(host, name, time.perf_counter() - start)
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            if deadline is None or time.monotonic() < deadline:
+                self.record(host, name, time.perf_counter() - start)
+
+    @contextmanager
+    def run_phase(self, name: str) -> Iterator[None]:
+        """Mesure une phase de l'exécution"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_run(name, time.perf_counter() - start)
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Résumé des mesures
+
+        Returns:
+            Dict {run: durées des phases de l'exécution,
+                  phases: {phase: {count, total, mean, max}} tous switches confondus
+                          (commandes sous 'command:<commande>'),
+                  switches: {host: {phases, commands: {commande: {seconds, bytes}}, bytes_received}}}
+        """
+        with self._lock:
+            switches = {host: {'phases': {name: round(seconds, 6) for name, seconds in data['phases'].items()},
+                               'commands': {command: {'seconds': round(values['seconds'], 6),
+                                                      'bytes': values['bytes']}
+                                            for command, values in data['commands'].items()},
+                               'bytes_received': data['bytes_received']}
+                        for host, data in self._switches.items()}
+            run = {name: round(seconds, 6) for name, seconds in self._run.items()}
+
+        return {'run': run, 'phases': aggregate_phases(switches), 'switches': switches}
+
+    def to_prometheus(self, results_summary: Optional[Dict[str, Any]] = None, openmetrics: bool = False) -> str:
+        """
+        Export au format texte Prometheus ou OpenMetrics
+
+        Args:
+            results_summary: Résumé de la découverte (compteurs de switches et de voisins)
+            openmetrics: Format OpenMetrics (unités déclarées, marqueur # EOF)
+
+        Returns:
+            Texte de l'exposition
+        """
+        summary = self.summary()
+        lines: List[str] = []
+
+        def family(name: str, help_text: str, unit: str = ''):
+            lines.append(f"# HELP {METRIC_PREFIX}_{name} {help_text}")
+            lines.append(f"# TYPE {METRIC_PREFIX}_{name} gauge")
+            if openmetrics and unit:
+                lines.append(f"# UNIT {METRIC_PREFIX}_{name} {unit}")
+
+        def sample(name: str, labels: Dict[str, str], value: float):
+            label_text = ','.join(f'{key}="{_escape_label(label)}"' for key, label in labels.items())
+            lines.append(f"{METRIC_PREFIX}_{name}{{{label_text}}} {value}" if label_text
+                         else f"{METRIC_PREFIX}_{name} {value}")
+
+        family('last_run_timestamp_seconds', 'Fin de la dernière exécution (epoch)', 'seconds')
+        sample('last_run_timestamp_seconds', {}, round(time.time(), 3))
+        if results_summary:
+            family('switches', 'Switches de la configuration et switches interrogés avec succès')
+            sample('switches', {'status': 'configured'}, results_summary.get('total_switches', 0))
+            sample('switches', {'status': 'successful'}, results_summary.get('successful_connections', 0))
+            family('neighbors', 'Voisins LLDP découverts')
+            sample('neighbors', {}, results_summary.get('total_neighbors', 0))
+
+        family('run_phase_seconds', 'Durée des phases de l\'exécution', 'seconds')
+        for name, seconds in summary['run'].items():
+            sample('run_phase_seconds', {'phase': name}, seconds)
+        family('phase_seconds', 'Durée des phases par switch', 'seconds')
+        for host, data in summary['switches'].items():
+            for name, seconds in data['phases'].items():
+                sample('phase_seconds', {'switch': host, 'phase': name}, seconds)
+        family('command_seconds', 'Durée des commandes par switch', 'seconds')
+        for host, data in summary['switches'].items():
+            for command, values in data['commands'].items():
+                sample('command_seconds', {'switch': host, 'command': command}, values['seconds'])
+        family('received_bytes', 'Volume reçu par switch et par commande', 'bytes')
+        for host, data in summary['switches'].items():
+            for command, values in data['commands'].items():
+                sample('received_bytes', {'switch': host, 'command': command}, values['bytes'])
+
+        if openmetrics:
+            lines.append('# EOF')
+        return '\n'.join(lines) + '\n'
+
+    def write_metrics(self, path: str, results_summary: Optional[Dict[str, Any]] = None, openmetrics: bool = False):
+        """Écrit l'exposition de façon atomique (lue à tout moment par le collecteur textfile)"""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(self.to_prometheus(results_summary, openmetrics))
+        os.replace(tmp_path, path)
+
+    def write_profile(self, path: str):
+        """Écrit le profil cProfile des phases de parsing et d'enrichissement (format pstats)"""
+        if self.profiler is None:
+            return
+        self.profiler.dump_stats(path)
@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+Découverte répartie sur plusieurs nœuds (--shard i/N) et fusion des sorties partielles
+
+L'inventaire de switches_config.json est partagé en N partitions par hachage
+de rendez-vous de l'adresse de chaque switch : l'affectation ne dépend que de
+l'adresse et de N (ni de l'ordre de la configuration, ni du processus), et
+passer de N à N+1 nœuds ne déplace qu'environ 1/(N+1) des switches, ce qui
+préserve les caches locaux de chaque nœud (snapshots, temporisation,
+disjoncteurs). Les switches "arp_source" sont interrogés par toutes les
+partitions, chacune ayant besoin de l'index ARP de la flotte.
+
+Chaque nœud écrit une sortie partielle au schéma habituel (JSON ou NDJSON) dont
+le résumé porte la description de sa partition :
+
+    summary['shard'] = {index, count, inventory_size, inventory_digest,
+                        hosts: {host: position dans l'inventaire}, shared_hosts}
+
+La sous-commande merge rassemble les sorties partielles dans le JSON consolidé
+et recalcule le résumé ; elle refuse les partitions manquantes (sauf
+--allow-missing), en double ou issues d'inventaires différents.
+
+Usage:
+    python3 python/lldp_discovery.py --shard 1/3 -o output/shard1.json
+    python3 python/lldp_discovery.py merge -o output/lldp_discovery.json output/shard*.json
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import re
+import sys
+from typing import Dict, List, Any, Iterable, Optional, Tuple
+
+from fleet_arp import is_arp_source
+from run_metrics import aggregate_phases
+
+logger = logging.getLogger(__name__)
+
+SHARD_PATTERN = re.compile(r'^\s*(\d+)\s*/\s*(\d+)\s*$')
+
+
+def parse_shard(spec: str) -> Tuple[int, int]:
+    """
+    Décode une partition 'i/N' (i de 1 à N)
+
+    Returns:
+        (i, N)
+
+    Raises:
+        ValueError: Format invalide ou i hors de 1..N
+    """
+    match = SHARD_PATTERN.match(spec or '')
+    if not match:
+        raise ValueError(f"partition invalide '{spec}' (format attendu: i/N)")
+    index, count = int(match.group(1)), int(match.group(2))
+    if count < 1 or not 1 <= index <= count:
+        raise ValueError(f"partition invalide '{spec}' (i doit être compris entre 1 et N)")
+    return index, count
+
+
+def _weight(host: str, shard: int) -> int:
+    return int.from_bytes(hashlib.blake2b(f"{shard}/{host}".encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+def shard_of(host: str, count: int) -> int:
+    """
+    Partition d'un switch (hachage de rendez-vous: la partition de poids maximal)
+
+    Args:
+        host: Adresse du switch
+        count: Nombre de partitions
+
+    Returns:
+        Numéro de partition, de 1 à count
+    """
+    return max(range(1, count + 1), key=lambda shard: _weight(host, shard))
+
+
+def inventory_digest(hosts: Iterable[str]) -> str:
+    """Empreinte de l'inventaire, indépendante de l'ordre de la configuration"""
+    return hashlib.sha256('\n'.join(sorted(set(hosts))).encode('utf-8')).hexdigest()
+
+
+def select_shard(switches_config: List[Dict[str, Any]], index: int,
+                 count: int) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Switches d'une partition, dans l'ordre de la configuration
+
+    Args:
+        switches_config: Inventaire complet
+        index: Numéro de la partition (1 à count)
+        count: Nombre de partitions
+
+    Returns:
+        (configurations de la partition, description de la partition pour summary['shard'])
+    """
+    selected = []
+    hosts: Dict[str, int] = {}
+    shared = []
+    for position, switch_config in enumerate(switches_config):
+        host = switch_config.get('host') or ''
+        if is_arp_source(switch_config):
+            shared.append(host)
+        elif shard_of(host, count) != index:
+            continue
+        selected.append(switch_config)
+        hosts[host] = position
+    shard = {
+        'index': index,
+        'count': count,
+        'inventory_size': len(switches_config),
+        'inventory_digest': inventory_digest(switch_config.get('host') or '' for switch_config in switches_config),
+        'hosts': hosts,
+        'shared_hosts': shared,
+    }
+    return selected, shard
+
+
+def merge_shards(partials: List[Tuple[str, Dict[str, Any]]], allow_missing: bool = False) -> Dict[str, Any]:
+    """
+    Fusionne les sorties partielles en données de découverte consolidées
+
+    Les switches sont remis dans l'ordre de l'inventaire ; un switch partagé
+    (arp_source) est pris dans la première partition qui l'a découvert. Le
+    résumé est recalculé: total de l'inventaire (les switches des partitions
+    manquantes comptent comme des échecs), switches découverts, voisins,
+    switches écartés, disjoncteurs et durées par phase.
+
+    Args:
+        partials: Paires (nom du fichier, données de découverte partielles)
+        allow_missing: Fusionne même si des partitions manquent
+
+    Returns:
+        Données de découverte consolidées ; summary['shards'] liste les partitions
+        fusionnées et manquantes
+
+    Raises:
+        ValueError: Sortie non partitionnée, inventaires différents, partition
+            en double ou manquante, switch hors de sa partition
+    """
+    problems = []
+    by_index: Dict[int, Tuple[str, Dict[str, Any]]] = {}
+    reference = None
+    for name, results in partials:
+        shard = results.get('summary', {}).get('shard')
+        if not shard:
+            problems.append(f"{name}: pas une sortie partielle (--shard) ou flux incomplet")
+            continue
+        if reference is None:
+            reference = shard
+        elif (shard['count'], shard['inventory_digest']) != (reference['count'], reference['inventory_digest']):
+            problems.append(f"{name}: partition {shard['index']}/{shard['count']} d'un autre inventaire ou "
+                            f"d'un autre découpage que {reference['index']}/{reference['count']}")
+            continue
+        if shard['index'] in by_index:
+            problems.append(f"{name}: partition {shard['index']}/{shard['count']} en double "
+                            f"(déjà fournie par {by_index[shard['index']][0]})")
+            continue
+        by_index[shard['index']] = (name, results)
+
+    if reference is None:
+        raise ValueError('; '.join(problems) or "aucune sortie partielle")
+    count = reference['count']
+    missing = [index for index in range(1, count + 1) if index not in by_index]
+    if missing and not allow_missing:
+        problems.append(f"partitions manquantes: {', '.join(f'{index}/{count}' for index in missing)}")
+
+    positions: Dict[str, int] = {}
+    switches: Dict[str, Dict[str, Any]] = {}
+    timings: Dict[str, Dict[str, Any]] = {}
+    owners: Dict[str, int] = {}
+    for index in sorted(by_index):
+        name, results = by_index[index]
+        shard = results['summary']['shard']
+        shared = set(shard.get('shared_hosts', []))
+        positions.update(shard['hosts'])
+        switch_timings = results['summary'].get('timings', {}).get('switches', {})
+        for host, switch_data in results.get('switches', {}).items():
+            if host not in shard['hosts']:
+                problems.append(f"{name}: switch {host} hors de la partition {index}/{count}")
+            elif host in owners and host not in shared:
+                problems.append(f"{name}: switch {host} déjà présent dans la partition {owners[host]}/{count}")
+            elif host not in owners:
+                owners[host] = index
+                switches[host] = switch_data
+                if host in switch_timings:
+                    timings[host] = switch_timings[host]
+    if problems:
+        raise ValueError('; '.join(problems))
+
+    merged_summary: Dict[str, Any] = {
+        'total_switches': reference['inventory_size'],
+        'successful_connections': len(switches),
+        'total_neighbors': sum(switch_data.get('neighbors_count', 0) for switch_data in switches.values()),
+    }
+    summaries = [by_index[index][1]['summary'] for index in sorted(by_index)]
+    skipped = {}
+    for summary in summaries:
+        skipped.update(summary.get('skipped_switches', {}))
+    if skipped:
+        merged_summary['skipped_switches'] = skipped
+    breakers = [summary['circuit_breaker'] for summary in summaries if 'circuit_breaker' in summary]
+    if breakers:
+        errors: Dict[str, int] = {}
+        for breaker in breakers:
+            for error_class, failures in breaker.get('errors', {}).items():
+                errors[error_class] = errors.get(error_class, 0) + failures
+        merged_summary['circuit_breaker'] = {
+            'retries': sum(breaker.get('retries', 0) for breaker in breakers),
+            'errors': errors,
+            'skipped': {host: until for breaker in breakers for host, until in breaker.get('skipped', {}).items()},
+            'circuits': dict(sorted((host, circuit) for breaker in breakers
+                                    for host, circuit in breaker.get('circuits', {}).items())),
+        }
+    fleet_arp = next((summary['fleet_arp'] for summary in summaries if 'fleet_arp' in summary), None)
+    if fleet_arp is not None:
+        merged_summary['fleet_arp'] = fleet_arp
+    if any('timings' in summary for summary in summaries):
+        # Partitions exécutées en parallèle: durée de l'exécution la plus longue
+        run: Dict[str, float] = {}
+        for summary in summaries:
+            for phase, seconds in summary.get('timings', {}).get('run', {}).items():
+                run[phase] = max(run.get(phase, 0.0), seconds)
+        merged_summary['timings'] = {'run': run, 'phases': aggregate_phases(timings), 'switches': timings}
+    merged_summary['shards'] = {'count': count, 'merged': sorted(by_index), 'missing': missing}
+
+    timestamps = [results.get('discovery_timestamp') for _, results in by_index.values()]
+    ordered = sorted(switches, key=lambda host: positions.get(host, len(positions)))
+    return {
+        'discovery_timestamp': min((timestamp for timestamp in timestamps if timestamp), default=None),
+        'switches': {host: switches[host] for host in ordered},
+        'summary': merged_summary,
+    }
+
+
+def load_partial(path: str) -> Dict[str, Any]:
+    """Lit une sortie partielle JSON ou NDJSON (extension .ndjson)"""
+    if path.endswith('.ndjson'):
+        from ndjson_output import read_ndjson
+        return read_ndjson(path)
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def merge_main(argv: Optional[List[str]] = None) -> int:
+    """Sous-commande 'merge': fusion des sorties partielles de --shard"""
+    parser = argparse.ArgumentParser(prog='lldp_discovery.py merge',
+                                     description='Fusionne les sorties partielles de --shard i/N')
+    parser.add_argument('inputs', nargs='+', help='Sorties partielles (JSON, ou NDJSON avec l\'extension .ndjson)')
+    parser.add_argument('-o', '--output', default='output/lldp_discovery.json',
+                        help='Fichier JSON consolidé (défaut: output/lldp_discovery.json)')
+    parser.add_argument('--allow-missing', action='store_true',
+                        help='Fusionne même si des partitions manquent (leurs switches comptent comme des échecs)')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    partials = []
+    for path in args.inputs:
+        try:
+            partials.append((path, load_partial(path)))
+        except (OSError, json.JSONDecodeError) as e:
+            logger.error(f"Sortie partielle illisible ({path}): {str(e)}")
+            return 1
+    try:
+        merged = merge_shards(partials, allow_missing=args.allow_missing)
+    except ValueError as e:
+        logger.error(f"Fusion impossible: {str(e)}")
+        return 1
+
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(merged, f, indent=2, ensure_ascii=False)
+    summary = merged['summary']
+    shards = summary['shards']
+    logger.info(f"Partitions fusionnées: {len(shards['merged'])}/{shards['count']}"
+                + (f" (manquantes: {', '.join(map(str, shards['missing']))})" if shards['missing'] else ''))
+    logger.info(f"  - Switches traités: {summary['successful_connections']}/{summary['total_switches']}")
+    logger.info(f"  - Total voisins découverts: {summary['total_neighbors']}")
+    logger.info(f"Résultats sauvegardés dans: {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(merge_main())
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Cache de snapshots par switch pour la découverte incrémentale
+
+Pour chaque switch, le cache conserve l'empreinte SHA-256 des sorties brutes
+'show lldp neighbors detail' et 'show arp' ainsi que les voisins enrichis
+correspondants. Si l'empreinte n'a pas changé depuis la dernière exécution, le
+parsing et l'enrichissement sont évités ; sinon les voisins sont comparés au
+snapshot précédent pour produire un rapport de différences par port.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+UNSAFE_FILENAME_CHARS = re.compile(r'[^A-Za-z0-9._-]')
+
+
+def snapshot_digest(*outputs: str) -> str:
+    """Empreinte SHA-256 des sorties brutes des commandes"""
+    digest = hashlib.sha256()
+    for output in outputs:
+        digest.update(output.encode('utf-8', errors='replace'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def _neighbor_key(neighbor: Dict[str, Any]) -> Tuple[str, str]:
+    """Clé d'un voisin: port local et identifiant du voisin sur ce port"""
+    return neighbor.get('local_port') or '', neighbor.get('mac_address') or neighbor.get('remote_chassis_id') or ''
+
+
+def diff_neighbors(previous: List[Dict[str, Any]], current: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Compare deux listes de voisins enrichis
+
+    Args:
+        previous: Voisins du snapshot précédent
+        current: Voisins de l'exécution courante
+
+    Returns:
+        Dict avec les voisins 'added', 'removed' et 'changed' (port, avant, après)
+    """
+    before = {_neighbor_key(neighbor): neighbor for neighbor in previous}
+    after = {_neighbor_key(neighbor): neighbor for neighbor in current}
+
+    changed = [
+        {'local_port': key[0], 'before': neighbor, 'after': after[key]}
+        for key, neighbor in before.items()
+        if key in after and after[key] != neighbor
+    ]
+
+    return {
+        'added': [neighbor for key, neighbor in after.items() if key not in before],
+        'removed': [neighbor for key, neighbor in before.items() if key not in after],
+        'changed': changed
+    }
+
+
+class SnapshotCache:
+    """Cache disque des snapshots par switch et collecte du rapport de différences"""
+
+    def __init__(self, cache_dir: str):
+        """
+        Initialise le cache
+
+        Args:
+            cache_dir: Répertoire des snapshots (un fichier JSON par switch)
+        """
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._deltas: Dict[str, Dict[str, Any]] = {}
+        self._unchanged = 0
+
+    def _path(self, host: str) -> str:
+        return os.path.join(self.cache_dir, UNSAFE_FILENAME_CHARS.sub('_', host) + '.json')
+
+    def _load(self, host: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._path(host), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (json.JSONDecodeError, OSError) as e:
+            logger.warning(f"Snapshot illisible pour {host}, ignoré: {str(e)}")
+            return None
+
+    def lookup(self, host: str, digest: str) -> Optional[List[Dict[str, Any]]]:
+        """
+        Retourne les voisins en cache si l'empreinte est inchangée
+
+        Args:
+            host: Adresse du switch
+            digest: Empreinte des sorties brutes courantes
+
+        Returns:
+            Voisins enrichis du snapshot, None si absent ou différent
+        """
+        snapshot = self._load(host)
+        if snapshot is None or snapshot.get('digest') != digest:
+            return None
+
+        with self._lock:
+            self._unchanged += 1
+        logger.info(f"Sorties inchangées pour {host}, parsing évité")
+        return snapshot.get('neighbors', [])
+
+    def store(self, host: str, digest: str, neighbors: List[Dict[str, Any]]):
+        """
+        Enregistre un nouveau snapshot et calcule les différences avec le précédent
+
+        Args:
+            host: Adresse du switch
+            digest: Empreinte des sorties brutes
+            neighbors: Voisins enrichis
+        """
+        previous = self._load(host)
+        delta = diff_neighbors(previous.get('neighbors', []) if previous else [], neighbors)
+        delta['new_switch'] = previous is None
+
+        path = self._path(host)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'host': host, 'digest': digest, 'timestamp': datetime.now().isoformat(),
+                       'neighbors': neighbors}, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self._deltas[host] = delta
+
+    def delta_report(self) -> Dict[str, Any]:
+        """
+        Rapport de différences de l'exécution courante
+
+        Returns:
+            Différences par switch modifié et résumé global
+        """
+        with self._lock:
+            deltas = {host: delta for host, delta in self._deltas.items()
+                      if delta['new_switch'] or delta['added'] or delta['removed'] or delta['changed']}
+            unchanged = self._unchanged + len(self._deltas) - len(deltas)
+
+        return {
+            'discovery_timestamp': datetime.now().isoformat(),
+            'switches': deltas,
+            'summary': {
+                'switches_unchanged': unchanged,
+                'switches_changed': sum(1 for delta in deltas.values() if not delta['new_switch']),
+                'switches_new': sum(1 for delta in deltas.values() if delta['new_switch']),
+                'neighbors_added': sum(len(delta['added']) for delta in deltas.values()),
+                'neighbors_removed': sum(len(delta['removed']) for delta in deltas.values()),
+                'neighbors_changed': sum(len(delta['changed']) for delta in deltas.values())
+            }
+        }
@@ -2,15 +2,32 @@
 """
 Script de test de connectivité pour switches Aruba
 Utile pour valider la configuration avant la découverte LLDP
+
+Vérification parallèle de toute la flotte : sonde TCP concurrente avec un délai
+court, puis authentification seule sur les switches qui répondent. Les
+résultats alimentent le cache utilisé par lldp_discovery.py --skip-dead. Avec
+--commands, les switches authentifiés sont ensuite testés un par un (LLDP, ARP).
 """
 
+import argparse
 import json
 import sys
-from netmiko import ConnectHandler
-from netmiko.exceptions import NetmikoTimeoutException, NetmikoAuthenticationException
+import time
+
+from lldp_discovery import REST_DEVICE_TYPES
+from preflight import (PreflightCache, run_preflight, DEFAULT_PROBE_TIMEOUT, DEFAULT_TTL,
+                       STATUS_OK, STATUS_REACHABLE, STATUS_UNREACHABLE, STATUS_AUTH_FAILED, STATUS_ERROR)
 
+STATUS_LABELS = {
+    STATUS_OK: '✓ accessible',
+    STATUS_REACHABLE: '✓ port ouvert',
+    STATUS_UNREACHABLE: '✗ injoignable',
+    STATUS_AUTH_FAILED: '✗ authentification refusée',
+    STATUS_ERROR: '✗ erreur',
+}
 
-def test_switch_connection(host, username, password, device_type='aruba_os'):
+
+def test_switch_connection(host, username, password, device_type='aruba_os', port=22):
     """
     Test la connexion à un switch Aruba
     
@@ -19,10 +36,15 @@ def test_switch_connection(host, username, password, device_type='aruba_os'):
         username: Nom d'utilisateur
         password: Mot de passe
         device_type: Type de device Netmiko
+        port: Port SSH
         
     Returns:
         bool: True si connexion réussie, False sinon
     """
+    # Import à la demande: la vérification rapide n'ouvre pas de session Netmiko
+    from netmiko import ConnectHandler
+    from netmiko.exceptions import NetmikoTimeoutException, NetmikoAuthenticationException
+    
     print(f"Test de connexion à {host}...")
     
     try:
@@ -31,6 +53,7 @@ def test_switch_connection(host, username, password, device_type='aruba_os'):
             'host': host,
             'username': username,
             'password': password,
+            'port': port,
             'timeout': 30,
         }
         
@@ -73,16 +96,34 @@ def test_switch_connection(host, username, password, device_type='aruba_os'):
 
 def main():
     """Fonction principale de test"""
-    config_file = 'python/switches_config.json'
+    parser = argparse.ArgumentParser(description='Vérification rapide de la connectivité des switches Aruba')
+    parser.add_argument('-c', '--config', default='python/switches_config.json',
+                        help='Fichier de configuration des switches')
+    parser.add_argument('-w', '--workers', type=int, default=50,
+                        help='Authentifications simultanées (défaut: 50)')
+    parser.add_argument('--probe-timeout', type=float, default=DEFAULT_PROBE_TIMEOUT,
+                        help=f'Délai de la sonde TCP en secondes (défaut: {DEFAULT_PROBE_TIMEOUT:g})')
+    parser.add_argument('--auth-timeout', type=float, default=10,
+                        help='Délai de connexion et d\'authentification en secondes (défaut: 10)')
+    parser.add_argument('--no-auth', action='store_true',
+                        help='Sonde TCP uniquement, sans authentification')
+    parser.add_argument('--commands', action='store_true',
+                        help='Teste ensuite LLDP et ARP sur chaque switch authentifié (séquentiel, plus lent)')
+    parser.add_argument('--cache', default='output/preflight_cache.json',
+                        help='Cache des résultats lu par lldp_discovery.py --skip-dead '
+                             '(défaut: output/preflight_cache.json, "" pour désactiver)')
+    parser.add_argument('--ttl', type=float, default=DEFAULT_TTL,
+                        help=f'Durée de validité des résultats du cache en secondes (défaut: {DEFAULT_TTL:g})')
+    args = parser.parse_args()
     
     try:
-        with open(config_file, 'r') as f:
+        with open(args.config, 'r') as f:
             config = json.load(f)
     except FileNotFoundError:
-        print(f"Fichier de configuration non trouvé: {config_file}")
+        print(f"Fichier de configuration non trouvé: {args.config}")
         sys.exit(1)
     except json.JSONDecodeError:
-        print(f"Erreur de format JSON: {config_file}")
+        print(f"Erreur de format JSON: {args.config}")
         sys.exit(1)
     
     switches = config.get('switches', [])
@@ -90,29 +131,55 @@ def main():
         print("Aucun switch configuré")
         sys.exit(1)
     
-    print(f"Test de connectivité pour {len(switches)} switches...\n")
-    
-    success_count = 0
+    complete = []
     for switch in switches:
-        host = switch.get('host')
-        username = switch.get('username')
-        password = switch.get('password')
-        device_type = switch.get('device_type', 'aruba_os')
-        
-        if not all([host, username, password]):
+        if all([switch.get('host'), switch.get('username'), switch.get('password')]):
+            complete.append(switch)
+        else:
             print(f"Configuration incomplète pour: {switch}")
-            continue
-        
-        if test_switch_connection(host, username, password, device_type):
-            success_count += 1
-        print()
     
-    print(f"Résumé: {success_count}/{len(switches)} switches accessibles")
+    print(f"Test de connectivité pour {len(switches)} switches...\n")
+    
+    cache = PreflightCache(args.cache, ttl=args.ttl) if args.cache else None
+    start = time.monotonic()
+    results = run_preflight(complete, probe_timeout=args.probe_timeout, auth=not args.no_auth,
+                            auth_timeout=args.auth_timeout, workers=args.workers, cache=cache)
+    elapsed = time.monotonic() - start
+    
+    for result in results:
+        detail = f" ({result['detail']})" if result['detail'] else ''
+        auth_time = f" en {result['auth_seconds']:.2f}s" if result['auth_seconds'] is not None else ''
+        print(f"  {STATUS_LABELS.get(result['status'], result['status'])}: "
+              f"{result['host']}:{result['port']}{auth_time}{detail}")
+    print()
+    
+    if cache is not None:
+        try:
+            cache.save()
+        except OSError as e:
+            print(f"Impossible d'écrire le cache {args.cache}: {str(e)}")
+    
+    success_status = STATUS_REACHABLE if args.no_auth else STATUS_OK
+    accessible = [switch for switch, result in zip(complete, results) if result['status'] == success_status]
+    
+    if args.commands:
+        for switch in accessible:
+            if switch.get('device_type', 'aruba_os') in REST_DEVICE_TYPES:
+                continue
+            test_switch_connection(switch['host'], switch['username'], switch['password'],
+                                   switch.get('device_type', 'aruba_os'), int(switch.get('port', 22)))
+            print()
+    
+    success_count = len(accessible)
+    print(f"Résumé: {success_count}/{len(switches)} switches accessibles (vérifiés en {elapsed:.1f}s)")
     
     if success_count == len(switches):
         print("✓ Tous les switches sont accessibles. Vous pouvez lancer la découverte LLDP.")
     else:
         print("⚠ Certains switches ne sont pas accessibles. Vérifiez la configuration.")
+        if cache is not None:
+            print(f"  Les switches injoignables seront écartés par: lldp_discovery.py --skip-dead "
+                  f"--preflight-cache {args.cache} (pendant {args.ttl:g}s)")
 
 
 if __name__ == "__main__":
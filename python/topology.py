@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+Graphe de topologie de la flotte construit à partir des voisins LLDP
+
+Chaque lien inter-switches apparaît deux fois dans les données de découverte,
+une fois depuis chaque extrémité. Le graphe indexe les équipements par adresse
+MAC de châssis normalisée et ne conserve qu'une arête par lien :
+(switch local, port local) <-> (châssis distant, port distant).
+
+L'adresse MAC d'un switch interrogé n'apparaît pas dans ses propres données ;
+elle est retrouvée par son adresse IP dans les voisins vus par les autres
+switches (adresses de management et ARP). Un switch que personne ne voit
+reste indexé par son adresse IP.
+
+Toutes les étapes sont des parcours uniques avec des recherches en
+dictionnaire, linéaires en nombre de voisins.
+"""
+
+import json
+import logging
+from typing import Dict, List, Any, Iterable, Optional, Tuple
+from xml.sax.saxutils import escape, quoteattr
+
+from aruba_parsers import normalize_mac
+
+logger = logging.getLogger(__name__)
+
+# Attributs exportés dans le GraphML: (nom, cible, type)
+GRAPHML_KEYS = (
+    ('mac', 'node', 'string'),
+    ('hostname', 'node', 'string'),
+    ('ip_addresses', 'node', 'string'),
+    ('description', 'node', 'string'),
+    ('discovered', 'node', 'boolean'),
+    ('source_port', 'edge', 'string'),
+    ('target_port', 'edge', 'string'),
+    ('observations', 'edge', 'int'),
+)
+
+
+def _port_key(port: Any) -> str:
+    """Forme de comparaison d'un nom de port ('1', '1/1/1')"""
+    return str(port or '').strip().lower()
+
+
+class TopologyGraph:
+    """Graphe des équipements et des liens de la flotte"""
+
+    def __init__(self):
+        # Identifiant du nœud (MAC canonique, sinon IP ou chassis ID brut) -> attributs
+        self.nodes: Dict[str, Dict[str, Any]] = {}
+        self.edges: List[Dict[str, Any]] = []
+        self._edge_index: Dict[Tuple[Tuple[str, str], Tuple[str, str]], int] = {}
+        self._adjacency: Dict[str, List[int]] = {}
+        self._by_ip: Dict[str, str] = {}
+        self._by_hostname: Dict[str, List[str]] = {}
+        self._switches: List[Tuple[str, Dict[str, Any]]] = []
+        self._built = False
+
+    def add_switch(self, host: str, switch_data: Dict[str, Any]):
+        """
+        Ajoute les voisins d'un switch interrogé (même signature que on_result)
+
+        Args:
+            host: Adresse du switch
+            switch_data: Données du switch (neighbors, switch_ip...)
+        """
+        self._switches.append((host, switch_data))
+        self._built = False
+
+    def build(self) -> 'TopologyGraph':
+        """
+        Construit les nœuds, les arêtes dédoublonnées et les index de recherche
+
+        Returns:
+            Le graphe lui-même
+        """
+        self.nodes.clear()
+        self.edges.clear()
+        self._edge_index.clear()
+        self._adjacency.clear()
+        self._by_ip.clear()
+        self._by_hostname.clear()
+
+        # Passe 1: équipements vus comme voisins, et index IP -> nœud (management d'abord, puis ARP)
+        by_management: Dict[str, str] = {}
+        by_arp: Dict[str, str] = {}
+        neighbor_ids: List[List[str]] = []
+        for host, switch_data in self._switches:
+            ids = []
+            for neighbor in switch_data.get('neighbors', []):
+                node_id = self._neighbor_id(host, neighbor)
+                ids.append(node_id)
+                node = self._node(node_id)
+                for ip in neighbor.get('management_addresses') or ():
+                    by_management.setdefault(ip, node_id)
+                for ip in neighbor.get('ip_addresses') or ():
+                    by_arp.setdefault(ip, node_id)
+                    node['ip_addresses'].setdefault(ip, None)
+                name = neighbor.get('remote_system_name')
+                if name:
+                    node['hostnames'].setdefault(name, None)
+                if not node['description']:
+                    node['description'] = neighbor.get('remote_system_description') or ''
+            neighbor_ids.append(ids)
+
+        # Passe 2: switches interrogés rattachés à leur nœud, puis une arête par lien
+        unresolved = 0
+        for (host, switch_data), ids in zip(self._switches, neighbor_ids):
+            switch_ip = switch_data.get('switch_ip') or host
+            local_id = by_management.get(switch_ip) or by_arp.get(switch_ip)
+            if local_id is None:
+                local_id = switch_ip
+                unresolved += 1
+            local = self._node(local_id)
+            local['discovered'] = True
+            local['switch_ip'] = switch_ip
+            local['ip_addresses'].setdefault(switch_ip, None)
+            if not local['description']:
+                local['description'] = switch_data.get('switch_model') or ''
+
+            for neighbor, remote_id in zip(switch_data.get('neighbors', []), ids):
+                self._add_edge(local_id, neighbor.get('local_port', ''), remote_id, neighbor.get('remote_port_id', ''))
+
+        # Index de recherche
+        for node_id, node in self.nodes.items():
+            for ip in node['ip_addresses']:
+                self._by_ip.setdefault(ip, node_id)
+            for hostname in node['hostnames']:
+                self._by_hostname.setdefault(hostname.lower(), []).append(node_id)
+
+        if unresolved:
+            logger.info(f"Topologie: {unresolved} switches sans adresse MAC connue, indexés par leur IP")
+        self._built = True
+        return self
+
+    def _neighbor_id(self, host: str, neighbor: Dict[str, Any]) -> str:
+        """Identifiant du nœud d'un voisin: MAC canonique, sinon chassis ID brut, sinon port du switch"""
+        chassis_id = neighbor.get('remote_chassis_id') or ''
+        mac = normalize_mac(neighbor.get('mac_address') or chassis_id)
+        if mac:
+            return mac
+        if chassis_id.strip():
+            return chassis_id.strip().lower()
+        return f"{host}:{neighbor.get('local_port', '')}"
+
+    def _node(self, node_id: str) -> Dict[str, Any]:
+        node = self.nodes.get(node_id)
+        if node is None:
+            node = self.nodes[node_id] = {
+                'id': node_id,
+                'mac': normalize_mac(node_id),
+                # Dicts utilisés comme ensembles ordonnés
+                'hostnames': {},
+                'ip_addresses': {},
+                'description': '',
+                'discovered': False,
+            }
+        return node
+
+    def _add_edge(self, local_id: str, local_port: str, remote_id: str, remote_port: str):
+        """Ajoute un lien, ou compte une observation supplémentaire s'il est déjà connu depuis l'autre côté"""
+        local_end = (local_id, _port_key(local_port))
+        remote_end = (remote_id, _port_key(remote_port))
+        key = (local_end, remote_end) if local_end <= remote_end else (remote_end, local_end)
+
+        index = self._edge_index.get(key)
+        if index is not None:
+            self.edges[index]['observations'] += 1
+            return
+
+        index = self._edge_index[key] = len(self.edges)
+        self.edges.append({'source': local_id, 'source_port': local_port,
+                           'target': remote_id, 'target_port': remote_port, 'observations': 1})
+        self._adjacency.setdefault(local_id, []).append(index)
+        if remote_id != local_id:
+            self._adjacency.setdefault(remote_id, []).append(index)
+
+    def _ensure_built(self):
+        if not self._built:
+            self.build()
+
+    def find_by_mac(self, mac: str) -> Optional[Dict[str, Any]]:
+        """Nœud d'une adresse MAC (tout format accepté par normalize_mac), None si inconnu"""
+        self._ensure_built()
+        return self.nodes.get(normalize_mac(mac) or (mac or '').strip().lower())
+
+    def find_by_ip(self, ip: str) -> Optional[Dict[str, Any]]:
+        """Nœud portant une adresse IP (management ou ARP), None si inconnu"""
+        self._ensure_built()
+        node_id = self._by_ip.get(ip)
+        return self.nodes[node_id] if node_id is not None else None
+
+    def find_by_hostname(self, hostname: str) -> List[Dict[str, Any]]:
+        """Nœuds annonçant ce nom système (insensible à la casse)"""
+        self._ensure_built()
+        return [self.nodes[node_id] for node_id in self._by_hostname.get(hostname.lower(), [])]
+
+    def neighbors(self, node_id: str) -> List[Dict[str, Any]]:
+        """
+        Liens d'un nœud, vus depuis ce nœud
+
+        Returns:
+            Liste de {neighbor, local_port, remote_port, observations}
+        """
+        self._ensure_built()
+        links = []
+        for index in self._adjacency.get(node_id, []):
+            edge = self.edges[index]
+            if edge['source'] == node_id:
+                links.append({'neighbor': edge['target'], 'local_port': edge['source_port'],
+                              'remote_port': edge['target_port'], 'observations': edge['observations']})
+            else:
+                links.append({'neighbor': edge['source'], 'local_port': edge['target_port'],
+                              'remote_port': edge['source_port'], 'observations': edge['observations']})
+        return links
+
+    def summary(self) -> Dict[str, int]:
+        """Nombre de nœuds, de switches interrogés, de liens et de liens vus des deux côtés"""
+        self._ensure_built()
+        return {
+            'nodes': len(self.nodes),
+            'switches': sum(1 for node in self.nodes.values() if node['discovered']),
+            'links': len(self.edges),
+            'bidirectional_links': sum(1 for edge in self.edges if edge['observations'] > 1),
+        }
+
+    @staticmethod
+    def _export_node(node: Dict[str, Any]) -> Dict[str, Any]:
+        exported = {
+            'id': node['id'],
+            'mac': node['mac'],
+            'hostname': next(iter(node['hostnames']), ''),
+            'hostnames': list(node['hostnames']),
+            'ip_addresses': list(node['ip_addresses']),
+            'description': node['description'],
+            'discovered': node['discovered'],
+        }
+        if 'switch_ip' in node:
+            exported['switch_ip'] = node['switch_ip']
+        return exported
+
+    def to_adjacency(self) -> Dict[str, Any]:
+        """
+        Export en liste d'adjacence
+
+        Returns:
+            Dict {summary, nodes, adjacency: {id du nœud: liens vus depuis ce nœud}}
+        """
+        self._ensure_built()
+        return {
+            'summary': self.summary(),
+            'nodes': [self._export_node(node) for node in self.nodes.values()],
+            'adjacency': {node_id: self.neighbors(node_id) for node_id in self.nodes},
+        }
+
+    def write_json(self, path: str):
+        """Écrit la liste d'adjacence au format JSON"""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_adjacency(), f, indent=2, ensure_ascii=False)
+
+    def write_graphml(self, path: str):
+        """Écrit le graphe au format GraphML (écriture en flux, sans arbre XML en mémoire)"""
+        self._ensure_built()
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+            f.write('<graphml xmlns="http://graphml.graphdrawing.org/xmlns">\n')
+            for name, target, attr_type in GRAPHML_KEYS:
+                f.write(f'  <key id="{name}" for="{target}" attr.name="{name}" attr.type="{attr_type}"/>\n')
+            f.write('  <graph id="lldp" edgedefault="undirected">\n')
+
+            for node in self.nodes.values():
+                exported = self._export_node(node)
+                f.write(f'    <node id={quoteattr(node["id"])}>\n')
+                for name, value in (('mac', exported['mac'] or ''), ('hostname', exported['hostname']),
+                                    ('ip_addresses', ' '.join(exported['ip_addresses'])),
+                                    ('description', exported['description']),
+                                    ('discovered', 'true' if exported['discovered'] else 'false')):
+                    f.write(f'      <data key="{name}">{escape(value)}</data>\n')
+                f.write('    </node>\n')
+
+            for index, edge in enumerate(self.edges):
+                f.write(f'    <edge id="e{index}" source={quoteattr(edge["source"])} '
+                        f'target={quoteattr(edge["target"])}>\n')
+                f.write(f'      <data key="source_port">{escape(str(edge["source_port"]))}</data>\n')
+                f.write(f'      <data key="target_port">{escape(str(edge["target_port"]))}</data>\n')
+                f.write(f'      <data key="observations">{edge["observations"]}</data>\n')
+                f.write('    </edge>\n')
+
+            f.write('  </graph>\n')
+            f.write('</graphml>\n')
+
+
+def build_topology(switches: Iterable[Tuple[str, Dict[str, Any]]]) -> TopologyGraph:
+    """
+    Construit le graphe de topologie à partir des résultats de découverte
+
+    Args:
+        switches: Paires (host, données du switch), par exemple results['switches'].items()
+
+    Returns:
+        Graphe construit
+    """
+    graph = TopologyGraph()
+    for host, switch_data in switches:
+        graph.add_switch(host, switch_data)
+    return graph.build()
@@ -37,6 +37,7 @@ show_help() {
     echo "  -c CONFIG_FILE    - Fichier de configuration (défaut: python/switches_config.json)"
     echo "  -o OUTPUT_FILE    - Fichier de sortie (défaut: output/lldp_discovery.json)"
     echo "  -v                - Mode verbose"
+    echo "  -w WORKERS        - Nombre de switches interrogés en parallèle"
     echo ""
     echo "Options Ansible:"
     echo "  -i INVENTORY      - Fichier d'inventaire (défaut: ansible/inventory.ini)"
@@ -93,6 +94,10 @@ run_python() {
                 cmd="$cmd -v"
                 shift
                 ;;
+            -w|--workers)
+                cmd="$cmd --workers $2"
+                shift 2
+                ;;
             *)
                 print_error "Option inconnue: $1"
                 show_help